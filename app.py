@@ -6,6 +6,7 @@ from core.state import init_state, get_zones_df, get_settings
 from core.calculations import (
     calc_climatizacion, calc_ventilacion_y_todo_aire, calc_electricidad, calc_agua_y_acs, calc_reservas_espacios, calc_pci
 )
+from core import perf
 
 st.set_page_config(
     page_title="Predimensionamiento de instalaciones",
@@ -14,6 +15,7 @@ st.set_page_config(
 )
 
 init_state()
+_perf_page = perf.begin("page.app")
 
 st.title("🏢 Predimensionamiento de instalaciones (Anteproyecto)")
 st.caption("Basado en: 'LAS INSTALACIONES A PALMOS - Manual de Predimensionado' (JG Ingenieros).")
@@ -53,3 +55,4 @@ with col2:
 st.divider()
 st.info("Siguiente paso: abre **Datos y zonas** para ajustar usos, superficies, zona climática y nivel de carga. Luego revisa cada módulo.")
 
+perf.end(_perf_page)
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Medición del tiempo de importación (arranque en frío) de `core` y de cada página.
+
+Cada objetivo se importa en un intérprete nuevo (sin cachés de módulos), se repite
+varias veces y se toma la mediana. Para las páginas se miden sus imports de primer
+nivel (extraídos con `ast`), que es lo que paga Streamlit antes de pintar nada.
+
+Uso:
+    python -m benchmarks.import_time                 # compara contra import_budget.json
+    python -m benchmarks.import_time --update        # reescribe el presupuesto
+    python -m benchmarks.import_time --json out.json # guarda el informe
+
+Sale con código 1 si algún objetivo supera su presupuesto o carga un módulo prohibido
+(p.ej. reportlab/openpyxl fuera de la exportación).
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET_PATH = Path(__file__).resolve().parent / "import_budget.json"
+
+CORE_MODULES = [
+    "core",
+    "core.constants",
+    "core.catalog",
+    "core.utils",
+    "core.state",
+    "core.calculations",
+    "core.exporters",
+]
+
+# Dependencias que solo deben cargarse al exportar
+FORBIDDEN_AT_IMPORT = ["reportlab", "openpyxl"]
+
+# Margen aplicado al reescribir el presupuesto (--update)
+BUDGET_MARGIN = 1.5
+
+_PROBE = """
+import sys, time, json
+t0 = time.perf_counter()
+{imports}
+dt = time.perf_counter() - t0
+print(json.dumps({{"s": dt, "loaded": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+def _page_imports(path: Path) -> str:
+    """Imports de primer nivel de un script de página/app, como código ejecutable."""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    nodes = [n for n in tree.body if isinstance(n, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(n) for n in nodes)
+
+def targets() -> Dict[str, str]:
+    """{nombre objetivo: código de import}"""
+    out: Dict[str, str] = {m: f"import {m}" for m in CORE_MODULES}
+    out["app.py"] = _page_imports(ROOT / "app.py")
+    for p in sorted((ROOT / "pages").glob("*.py")):
+        out[f"pages/{p.name}"] = _page_imports(p)
+    return out
+
+def measure(code: str, repeat: int = 5) -> Dict[str, Any]:
+    """Mediana (ms) de `repeat` importaciones en frío + módulos prohibidos cargados."""
+    probe = _PROBE.format(imports=code, forbidden=FORBIDDEN_AT_IMPORT)
+    times: List[float] = []
+    loaded: List[str] = []
+    for _ in range(max(1, repeat)):
+        proc = subprocess.run(
+            [sys.executable, "-c", probe], cwd=ROOT, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "error"}
+        res = json.loads(proc.stdout.strip().splitlines()[-1])
+        times.append(res["s"] * 1000.0)
+        loaded = res["loaded"]
+    return {"ms": round(statistics.median(times), 1), "min_ms": round(min(times), 1), "forbidden_loaded": loaded}
+
+def load_budget(path: Path = BUDGET_PATH) -> Dict[str, float]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8")).get("budget_ms", {})
+
+def run(repeat: int = 5, budget: Dict[str, float] | None = None) -> Dict[str, Any]:
+    budget = load_budget() if budget is None else budget
+    report: Dict[str, Any] = {"python": sys.version.split()[0], "repeat": repeat, "targets": {}, "regressions": []}
+    for name, code in targets().items():
+        res = measure(code, repeat=repeat)
+        lim = budget.get(name)
+        res["budget_ms"] = lim
+        if "error" in res:
+            report["regressions"].append(f"{name}: error de importación ({res['error']})")
+        else:
+            if lim is not None and res["ms"] > lim:
+                report["regressions"].append(f"{name}: {res['ms']:.0f} ms > presupuesto {lim:.0f} ms")
+            if res["forbidden_loaded"]:
+                report["regressions"].append(f"{name}: carga {', '.join(res['forbidden_loaded'])} al importar")
+        report["targets"][name] = res
+    return report
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--json", type=Path, default=None, help="Ruta del informe JSON")
+    ap.add_argument("--update", action="store_true", help="Reescribe import_budget.json con las medidas actuales")
+    args = ap.parse_args(argv)
+
+    report = run(repeat=args.repeat, budget={} if args.update else None)
+    for name, res in report["targets"].items():
+        if "error" in res:
+            print(f"{name:40s}  ERROR {res['error']}")
+        else:
+            lim = res["budget_ms"]
+            print(f"{name:40s} {res['ms']:8.1f} ms" + (f"  (presupuesto {lim:.0f} ms)" if lim else ""))
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+    if args.update:
+        budget = {n: round(max(r["ms"] * BUDGET_MARGIN, 50.0)) for n, r in report["targets"].items() if "ms" in r}
+        BUDGET_PATH.write_text(json.dumps({"budget_ms": budget}, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Presupuesto actualizado: {BUDGET_PATH}")
+        return 0
+
+    for msg in report["regressions"]:
+        print(f"REGRESIÓN  {msg}")
+    return 1 if report["regressions"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
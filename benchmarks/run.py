@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks de los cálculos y exportadores sobre carteras sintéticas (10 … 10^6 zonas).
+
+Para cada tamaño mide tiempo (mediana de `--repeat`) y pico de memoria (tracemalloc) de
+`normalize_zones_df`, cada `calc_*`, `export_excel` y `export_pdf_memoria`; comprueba los
+totales contra `reference.json` y compara tiempos contra un informe base para marcar
+regresiones.
+
+Uso:
+    python -m benchmarks.run --sizes 10 100 1000 10000 --json bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+    python -m benchmarks.run --update-reference
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from .synthetic import synthetic_portfolio, synthetic_settings
+
+HERE = Path(__file__).resolve().parent
+REFERENCE_PATH = HERE / "reference.json"
+BASELINE_PATH = HERE / "baseline.json"
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+SEED = 20240601
+
+# Exportar más filas que esto no aporta información y el Excel tiene límite de filas
+EXPORT_MAX_ZONES = 10_000
+
+# Umbral de regresión frente al informe base (tiempo relativo y ruido absoluto)
+REGRESSION_RATIO = 1.25
+REGRESSION_MIN_MS = 5.0
+
+# Tolerancia relativa en la comprobación de totales
+REFERENCE_RTOL = 1e-6
+
+def _cases(zones_df, settings) -> Dict[str, Callable[[], Any]]:
+    from core import calculations as calc
+    from core import exporters
+    from core.schema import enforce_zones_schema
+    cases: Dict[str, Callable[[], Any]] = {
+        "enforce_zones_schema": lambda: enforce_zones_schema(zones_df),
+        "normalize_zones_df": lambda: calc.normalize_zones_df(zones_df),
+        "calc_climatizacion": lambda: calc.calc_climatizacion(zones_df, settings),
+        "calc_ventilacion_y_todo_aire": lambda: calc.calc_ventilacion_y_todo_aire(zones_df, settings),
+        "calc_electricidad": lambda: calc.calc_electricidad(zones_df, settings),
+        "calc_agua_y_acs": lambda: calc.calc_agua_y_acs(zones_df, settings),
+        "calc_reservas_espacios": lambda: calc.calc_reservas_espacios(zones_df, settings),
+        "calc_pci": lambda: calc.calc_pci(settings),
+    }
+    if len(zones_df) <= EXPORT_MAX_ZONES:
+        def _results():
+            out: Dict[str, Any] = {"Zonas": zones_df}
+            for name in ("calc_climatizacion", "calc_ventilacion_y_todo_aire", "calc_electricidad", "calc_agua_y_acs", "calc_reservas_espacios"):
+                df, _, tot = cases[name]()
+                out[name] = df
+                out[name + "_tot"] = {k: v for k, v in tot.items() if isinstance(v, (int, float, str))}
+            return out
+        results = _results()
+        tables = {k: v for k, v in results.items() if not isinstance(v, dict)}
+        totals = {k: v for k, v in results.items() if isinstance(v, dict)}
+        cases["export_excel"] = lambda: exporters.export_excel(results)
+        cases["export_pdf_memoria"] = lambda: exporters.export_pdf_memoria(settings["meta_proyecto"], tables, totals)
+    return cases
+
+def _measure(fn: Callable[[], Any], repeat: int) -> Tuple[Dict[str, float], Any]:
+    times: List[float] = []
+    out = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000.0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3), "peak_mb": round(peak / 2**20, 3)}, out
+
+def _fingerprint(name: str, out: Any) -> Dict[str, Any]:
+    """Resumen comparable del resultado: totales numéricos, nº filas y nº avisos."""
+    if name == "normalize_zones_df":
+        return {"rows": int(len(out)), "superficie": float(out["Superficie (m²)"].fillna(0).sum()),
+                "personas": float(out["Personas_calc"].fillna(0).sum())}
+    if isinstance(out, tuple) and len(out) == 3:
+        df, warnings, totals = out
+        fp: Dict[str, Any] = {"rows": int(len(df)), "warnings": len(warnings)}
+        for k, v in totals.items():
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                fp[k] = float(v)
+        return fp
+    if name == "enforce_zones_schema":
+        return {"rows": int(len(out)), "superficie": float(out["Superficie (m²)"].fillna(0).sum())}
+    if isinstance(out, (bytes, bytearray)):
+        return {}  # el contenido binario incluye marcas de tiempo
+    return {}
+
+def _compare_reference(fp: Dict[str, Any], ref: Dict[str, Any]) -> List[str]:
+    diffs = []
+    for k, rv in ref.items():
+        v = fp.get(k)
+        if v is None:
+            diffs.append(f"{k}: falta")
+        elif isinstance(rv, float) or isinstance(v, float):
+            if not math.isclose(float(v), float(rv), rel_tol=REFERENCE_RTOL, abs_tol=1e-9):
+                diffs.append(f"{k}: {v} != {rv}")
+        elif v != rv:
+            diffs.append(f"{k}: {v} != {rv}")
+    return diffs
+
+def run(sizes: List[int], repeat: int = 3, zones_per_building: int = 50) -> Dict[str, Any]:
+    settings = synthetic_settings(SEED)
+    report: Dict[str, Any] = {
+        "python": sys.version.split()[0],
+        "seed": SEED,
+        "repeat": repeat,
+        "sizes": {},
+    }
+    for n in sizes:
+        zones_df = synthetic_portfolio(n, zones_per_building=zones_per_building, seed=SEED)
+        entry: Dict[str, Any] = {}
+        for name, fn in _cases(zones_df, settings).items():
+            stats, out = _measure(fn, repeat if n < 100_000 else 1)
+            stats["fingerprint"] = _fingerprint(name, out)
+            entry[name] = stats
+        report["sizes"][str(n)] = entry
+    return report
+
+def check_reference(report: Dict[str, Any], reference: Dict[str, Any]) -> List[str]:
+    problems = []
+    for n, entry in report["sizes"].items():
+        for name, stats in entry.items():
+            ref = reference.get(n, {}).get(name)
+            if ref is None:
+                continue
+            for d in _compare_reference(stats["fingerprint"], ref):
+                problems.append(f"[{n}] {name}: {d}")
+    return problems
+
+def compare_baseline(report: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    regressions = []
+    for n, entry in report["sizes"].items():
+        for name, stats in entry.items():
+            base = baseline.get("sizes", {}).get(n, {}).get(name)
+            if not base:
+                continue
+            if stats["ms"] > base["ms"] * REGRESSION_RATIO and stats["ms"] - base["ms"] > REGRESSION_MIN_MS:
+                regressions.append(f"[{n}] {name}: {stats['ms']:.1f} ms (base {base['ms']:.1f} ms)")
+            if base.get("peak_mb") and stats["peak_mb"] > base["peak_mb"] * REGRESSION_RATIO and stats["peak_mb"] - base["peak_mb"] > 1.0:
+                regressions.append(f"[{n}] {name}: pico {stats['peak_mb']:.1f} MB (base {base['peak_mb']:.1f} MB)")
+    return regressions
+
+def _load(path: Path) -> Dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Nº de zonas (10 … 1000000)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--zones-per-building", type=int, default=50)
+    ap.add_argument("--json", type=Path, default=None, help="Ruta del informe JSON")
+    ap.add_argument("--baseline", type=Path, default=BASELINE_PATH, help="Informe base para detectar regresiones")
+    ap.add_argument("--update-baseline", action="store_true", help="Guarda este informe como base")
+    ap.add_argument("--update-reference", action="store_true", help="Guarda los totales actuales como referencia")
+    args = ap.parse_args(argv)
+
+    report = run(args.sizes, repeat=args.repeat, zones_per_building=args.zones_per_building)
+
+    for n, entry in report["sizes"].items():
+        print(f"== {n} zonas")
+        for name, s in entry.items():
+            print(f"  {name:32s} {s['ms']:10.2f} ms  {s['peak_mb']:9.2f} MB")
+
+    reference = _load(REFERENCE_PATH)
+    report["reference_mismatches"] = check_reference(report, reference)
+    report["regressions"] = compare_baseline(report, _load(args.baseline))
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    if args.update_reference:
+        for n, entry in report["sizes"].items():
+            reference[n] = {name: s["fingerprint"] for name, s in entry.items() if s["fingerprint"]}
+        REFERENCE_PATH.write_text(json.dumps(reference, indent=1, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"Referencia actualizada: {REFERENCE_PATH}")
+        report["reference_mismatches"] = []
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=1, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"Base actualizada: {args.baseline}")
+        report["regressions"] = []
+
+    for msg in report["reference_mismatches"]:
+        print(f"REFERENCIA  {msg}")
+    for msg in report["regressions"]:
+        print(f"REGRESIÓN  {msg}")
+    return 1 if (report["reference_mismatches"] or report["regressions"]) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Generador sintético (con semilla) de edificios y carteras de zonas para benchmarks.
+
+Produce tablas con las mismas columnas que `core.state.DEFAULT_COLUMNS`, recorriendo
+todos los usos de `core.catalog.all_usos()`, todas las zonas climáticas, niveles de carga
+y exposiciones, con overrides y patrones de datos incompletos/sucios como los que llegan
+por CSV (decimales con coma, celdas vacías, texto no numérico).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.catalog import all_usos
+from core.constants import ZONAS_CLIMATICAS, NIVELES_CARGA, EXPOSICION_TODO_AIRE, TABLA_1_ESPACIO_GLOBAL
+from core.state import DEFAULT_COLUMNS
+
+OVERRIDE_COLUMNS = [
+    "Frío override (W/m²)",
+    "Calor override (W/m²)",
+    "Ventilación override (L/s·m²)",
+    "Eléctrica override (W/m²)",
+    "Eléctrica comp. override (W/m²)",
+]
+
+def _dirty_numbers(rng: np.random.Generator, values: np.ndarray, missing_rate: float, dirty_rate: float) -> np.ndarray:
+    """
+    Convierte un vector numérico en object con huecos y formatos de CSV:
+    None, "", "12,5" (coma decimal), " 12.5 " y basura no numérica.
+    """
+    out = values.astype(object)
+    n = len(values)
+    u = rng.random(n)
+    miss = u < missing_rate
+    out[miss] = None
+    dirty = (u >= missing_rate) & (u < missing_rate + dirty_rate)
+    idx = np.flatnonzero(dirty)
+    if len(idx):
+        kind = rng.integers(0, 4, len(idx))
+        for k, i in zip(kind, idx):
+            v = values[i]
+            if k == 0:
+                out[i] = f"{v:.2f}".replace(".", ",")
+            elif k == 1:
+                out[i] = f" {v:.2f} "
+            elif k == 2:
+                out[i] = ""
+            else:
+                out[i] = "n/d"
+    return out
+
+def synthetic_zones(
+    n: int,
+    seed: int = 0,
+    uso: Optional[str] = None,
+    zona_climatica: Optional[str] = None,
+    override_rate: float = 0.05,
+    missing_rate: float = 0.02,
+    dirty_rate: float = 0.02,
+) -> pd.DataFrame:
+    """
+    Tabla de `n` zonas. Si se indican `uso`/`zona_climatica` se fijan para todas las filas
+    (modelo "1 edificio = 1 uso"); si no, se reparten entre todos los valores del catálogo.
+    """
+    rng = np.random.default_rng(seed)
+    usos = np.array(all_usos(), dtype=object)
+    zonas = np.array(ZONAS_CLIMATICAS, dtype=object)
+    niveles = np.array(NIVELES_CARGA, dtype=object)
+    expos = np.array(EXPOSICION_TODO_AIRE, dtype=object)
+    cats = np.array(list(TABLA_1_ESPACIO_GLOBAL.keys()) + [None], dtype=object)
+
+    area = np.round(rng.lognormal(mean=5.5, sigma=1.0, size=n), 2)
+    dens = np.round(rng.choice([0.02, 0.05, 0.08, 0.1, 0.2, 0.5], size=n), 3)
+
+    df = pd.DataFrame({
+        "ID": np.arange(1, n + 1),
+        "Nombre zona": [f"Z{i:07d}" for i in range(1, n + 1)],
+        "Uso": uso if uso is not None else usos[rng.integers(0, len(usos), n)],
+        "Superficie (m²)": _dirty_numbers(rng, area, missing_rate, dirty_rate),
+        "Zona climática": zona_climatica if zona_climatica is not None else zonas[rng.integers(0, len(zonas), n)],
+        "Nivel carga (B/M/A)": niveles[rng.integers(0, len(niveles), n)],
+        "Exposición (E/S/W, N, Interior)": expos[rng.integers(0, len(expos), n)],
+    })
+
+    # Ocupación: densidad (la mayoría), personas directas, camas o cubiertos
+    occ = rng.random(n)
+    dens_col = np.where(occ < 0.7, dens, np.nan)
+    df["Densidad (pers/m²)"] = _dirty_numbers(rng, dens_col, missing_rate, dirty_rate)
+    df.loc[np.isnan(dens_col), "Densidad (pers/m²)"] = None
+    pers = np.where((occ >= 0.7) & (occ < 0.85), np.round(area * 0.05), np.nan)
+    df["Personas"] = np.where(np.isnan(pers), None, pers).astype(object)
+    camas = np.where((occ >= 0.85) & (occ < 0.93), rng.integers(1, 400, n), np.nan)
+    df["Camas"] = np.where(np.isnan(camas), None, camas).astype(object)
+    cub = np.where(occ >= 0.93, rng.integers(10, 2000, n), np.nan)
+    df["Cubiertos/día"] = np.where(np.isnan(cub), None, cub).astype(object)
+
+    df["Suministro complementario"] = rng.random(n) < 0.3
+
+    base = {
+        "Frío override (W/m²)": (60, 250),
+        "Calor override (W/m²)": (25, 200),
+        "Ventilación override (L/s·m²)": (0.3, 8.0),
+        "Eléctrica override (W/m²)": (50, 220),
+        "Eléctrica comp. override (W/m²)": (20, 60),
+    }
+    for col, (lo, hi) in base.items():
+        vals = np.round(rng.uniform(lo, hi, n), 2)
+        vals[rng.random(n) >= override_rate] = np.nan
+        ov = _dirty_numbers(rng, vals, 0.0, dirty_rate * override_rate)
+        ov[np.isnan(vals)] = None
+        df[col] = ov
+
+    df["Categoría global (Tabla 1)"] = cats[rng.integers(0, len(cats), n)]
+    return df[DEFAULT_COLUMNS]
+
+def synthetic_portfolio(n_zones: int, zones_per_building: int = 50, seed: int = 0, **kw: Any) -> pd.DataFrame:
+    """
+    Cartera de edificios: cada edificio tiene un uso y una zona climática únicos
+    (como exige la app) y la cartera recorre todo el catálogo. Añade la columna "Edificio".
+    """
+    rng = np.random.default_rng(seed)
+    usos = all_usos()
+    zonas = ZONAS_CLIMATICAS
+    n_buildings = max(1, -(-n_zones // max(1, zones_per_building)))
+    parts = []
+    remaining = n_zones
+    for b in range(n_buildings):
+        nb = min(zones_per_building, remaining)
+        remaining -= nb
+        uso = usos[b % len(usos)]
+        zona = zonas[(b // len(usos) + b) % len(zonas)]
+        part = synthetic_zones(nb, seed=int(rng.integers(0, 2**31)), uso=uso, zona_climatica=zona, **kw)
+        part.insert(0, "Edificio", f"E{b + 1:05d}")
+        parts.append(part)
+    df = pd.concat(parts, ignore_index=True)
+    df["ID"] = np.arange(1, len(df) + 1)
+    return df
+
+def synthetic_settings(seed: int = 0) -> Dict[str, Any]:
+    """Settings completos (mismas claves que `core.state.init_state`) con todo activado."""
+    from core.constants import TABLA_2_ESPACIO_POR_INSTALACION
+    rng = np.random.default_rng(seed)
+    return {
+        "oversize_frio": 1.00,
+        "oversize_calor": 1.10,
+        "uso_edificio": "Oficinas",
+        "gfa_above_m2": 4500.0,
+        "gfa_below_m2": 1000.0,
+        "todo_aire_activo": True,
+        "mapa_uso_tabla9": {},
+        "mapa_uso_tabla13": {},
+        "mapa_uso_tabla14": {},
+        "instalaciones_seleccion": list(TABLA_2_ESPACIO_POR_INSTALACION.keys()),
+        "parking_plazas": int(rng.integers(20, 200)),
+        "pci_mangueras_caudal_lps": 0.0,
+        "pci_mangueras_tiempo_h": 1.0,
+        "pci_rociadores_caudal_lps": 0.0,
+        "pci_rociadores_tiempo_h": 1.5,
+        "pci_extincion_gas": True,
+        "pci_activo": True,
+        "motores": [
+            {"nombre": f"M{i}", "potencia_kw": float(rng.uniform(1, 90)), "tension_v": 400, "cosphi": 0.85, "eta": 0.9, "multiplo_arranque": 6.0}
+            for i in range(5)
+        ],
+        "meta_proyecto": {"proyecto": "Benchmark", "ubicacion": "", "titulo": "Memoria de Predimensionamiento"},
+    }
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+Acumulación de ACS frente a potencia de generación.
+
+El consumo diario de ACS de cada zona (Tabla 14, L/día) se reparte en el día de diseño
+con el perfil de extracción de su horario de uso y se suma para el edificio. Para una
+rejilla de volúmenes de acumulación × potencias de generación se simula el depósito
+paso a paso (60 o 15 min) con todos los puntos de la rejilla a la vez (una matriz
+volúmenes × potencias por paso de tiempo):
+
+    E ← min(E + P·Δt − extracción − pérdidas, E_máx),  E_máx = V·ρ·cp·(T_acum − T_red)·f_útil
+
+El punto es viable si la energía acumulada nunca es negativa durante varios días de
+diseño seguidos (el depósito empieza lleno) y la generación diaria cubre la extracción
+más las pérdidas. La frontera es
+la potencia mínima viable de cada volumen; sobre ella se proponen pares con acumulación
+(V > 0): mínimo volumen con la potencia acotada a la de la Tabla 14, mínima potencia y
+mínimo coste con precios unitarios orientativos.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import perf
+from .profiles import HORARIOS, horario_de_uso
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Extracción de ACS por horario (fracción del consumo diario en cada hora, laborable):
+# más concentrada que la ocupación (duchas de mañana y noche, servicios de comidas).
+PERFILES_ACS: Dict[str, List[float]] = {
+    "residencial": [0.01, 0.005, 0.005, 0.005, 0.005, 0.01, 0.04, 0.10, 0.09, 0.06, 0.04, 0.03,
+                    0.04, 0.05, 0.04, 0.03, 0.03, 0.03, 0.04, 0.07, 0.09, 0.08, 0.05, 0.025],
+    "hotel": [0.01, 0.005, 0.005, 0.005, 0.005, 0.01, 0.04, 0.12, 0.13, 0.09, 0.05, 0.03,
+              0.03, 0.03, 0.025, 0.02, 0.02, 0.025, 0.04, 0.07, 0.08, 0.07, 0.05, 0.025],
+    "hospital": [0.015, 0.01, 0.01, 0.01, 0.015, 0.02, 0.05, 0.09, 0.09, 0.08, 0.07, 0.06,
+                 0.06, 0.05, 0.04, 0.04, 0.04, 0.04, 0.04, 0.05, 0.05, 0.04, 0.03, 0.02],
+    "restauracion": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.01, 0.02, 0.03, 0.05, 0.08,
+                     0.12, 0.14, 0.12, 0.08, 0.04, 0.03, 0.03, 0.05, 0.08, 0.07, 0.04, 0.01],
+    "deportivo": [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.04, 0.08, 0.08, 0.05, 0.05,
+                  0.05, 0.05, 0.04, 0.04, 0.04, 0.05, 0.08, 0.12, 0.12, 0.11, 0.05, 0.0],
+}
+KWH_L_K = 4.186 / 3600.0  # kWh por litro y K (agua)
+# Reparto de la extracción dentro de cada hora en pasos de 15 min (punta al inicio)
+REPARTO_15_MIN = np.array([0.35, 0.30, 0.20, 0.15])
+
+OPCIONES: Dict[str, Any] = {
+    "paso_min": 60, "dias": 3, "factor_dia_punta": 1.0,
+    "t_acumulacion": 60.0, "t_red": 10.0, "t_uso": 60.0, "fraccion_util": 0.85,
+    "perdidas_kwh_l_dia": 0.004,
+    "coste_eur_l": 3.0, "coste_eur_kw": 250.0,
+    "volumenes": 30, "potencias": 40,
+}
+
+def draw_shape(horario: str) -> np.ndarray:
+    """Fracción del consumo diario de ACS en cada hora (suma 1)."""
+    shape = np.asarray(PERFILES_ACS.get(horario) or HORARIOS[horario][0], dtype=float) + 1e-3
+    return shape / shape.sum()
+
+def draw_profile(res: "pd.DataFrame", zones_df: "pd.DataFrame", paso_min: int = 60, factor: float = 1.0) -> np.ndarray:
+    """Extracción del edificio en el día de diseño (L por paso): Σ zonas L/día × perfil de su horario."""
+    import pandas as pd
+    litros = pd.to_numeric(res.get("ACS (L/día)"), errors="coerce").fillna(0.0).to_numpy(dtype=float) if "ACS (L/día)" in res else np.zeros(len(res))
+    usos = (res["Uso"] if "Uso" in res.columns else zones_df.get("Uso", pd.Series([""] * len(res)))).astype(str)
+    horario = usos.map(horario_de_uso).to_numpy()
+    keys, inv = np.unique(horario, return_inverse=True) if len(horario) else (np.array([]), np.array([], dtype=int))
+    por_horario = np.bincount(inv, weights=litros, minlength=len(keys)) * factor
+    hourly = por_horario @ np.array([draw_shape(k) for k in keys]).reshape(len(keys), 24) if len(keys) else np.zeros(24)
+    if paso_min == 15:
+        return (hourly[:, None] * REPARTO_15_MIN[None, :]).ravel()
+    return hourly
+
+@perf.timed("acs.simulate_grid")
+def simulate_grid(draw_l: np.ndarray, volumes_l: np.ndarray, powers_kw: np.ndarray, paso_min: int = 60,
+                  dias: int = 3, t_acum: float = 60.0, t_red: float = 10.0, t_uso: float = 60.0,
+                  fraccion_util: float = 0.85, perdidas_kwh_l_dia: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Simula a la vez toda la rejilla volúmenes × potencias durante `dias` días de diseño.
+    Devuelve la energía mínima alcanzada (kWh, negativa = déficit), el déficit y la
+    viabilidad de cada punto.
+    """
+    dt = paso_min / 60.0
+    draw_kwh = np.asarray(draw_l, dtype=float) * KWH_L_K * (t_uso - t_red)
+    v = np.asarray(volumes_l, dtype=float)[:, None]
+    p = np.asarray(powers_kw, dtype=float)[None, :]
+    e_max = np.broadcast_to(v * KWH_L_K * (t_acum - t_red) * fraccion_util, (v.shape[0], p.shape[1])).copy()
+    loss = v * perdidas_kwh_l_dia * dt / 24.0
+    gain = p * dt
+    e = e_max.copy()
+    e_min = e_max.copy()
+    for _ in range(int(dias)):
+        for d in draw_kwh:
+            e = np.minimum(e + gain - d - loss, e_max)
+            np.minimum(e_min, e, out=e_min)
+    # además la generación diaria debe cubrir extracción + pérdidas (si no, el depósito
+    # se vacía con los días aunque la carga inicial aguante los días simulados)
+    balance = gain * len(draw_kwh) - draw_kwh.sum() - loss * len(draw_kwh)
+    return {"e_min_kwh": e_min, "deficit_kwh": np.maximum(-e_min, 0.0), "viable": (e_min >= -1e-9) & (balance >= -1e-9)}
+
+def frontier(volumes_l: np.ndarray, powers_kw: np.ndarray, viable: np.ndarray) -> np.ndarray:
+    """Potencia mínima viable de cada volumen (NaN si ninguna de la rejilla basta)."""
+    first = np.argmax(viable, axis=1)
+    return np.where(viable.any(axis=1), np.asarray(powers_kw, dtype=float)[first], np.nan)
+
+@perf.timed("calc_acumulacion_acs")
+def calc_acumulacion_acs(res: "pd.DataFrame", zones_df: "pd.DataFrame", settings: Dict[str, Any],
+                         volumes_l: Optional[np.ndarray] = None, powers_kw: Optional[np.ndarray] = None
+                         ) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `res`: salida de `calc_agua_y_acs`. Devuelve (frontera volumen → potencia mínima,
+    avisos, totales) con la rejilla simulada, el perfil de extracción y los pares
+    recomendados. Sin rejilla explícita se toma de 0 a 1,5 × el consumo diario y de la
+    potencia media a la de la hora punta sin acumulación.
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("acs_acumulacion", {}) or {})}
+    warnings: List[WarningItem] = []
+    paso = int(o["paso_min"])
+    draw = draw_profile(res, zones_df, paso, float(o["factor_dia_punta"]))
+    dt = paso / 60.0
+    kwh_l = KWH_L_K * (float(o["t_uso"]) - float(o["t_red"]))
+    litros_dia = float(draw.sum())
+    p_media = litros_dia * kwh_l / 24.0
+    p_punta = float(draw.max(initial=0.0)) * kwh_l / dt
+    if volumes_l is None:
+        volumes_l = np.linspace(0.0, max(1.5 * litros_dia, 100.0), int(o["volumenes"]))
+    if powers_kw is None:
+        perd = float(np.max(volumes_l)) * float(o["perdidas_kwh_l_dia"]) / 24.0
+        powers_kw = np.linspace(max(p_media, 0.1), max(p_punta, p_media, 0.1) * 1.05 + perd, int(o["potencias"]))
+    sim = simulate_grid(draw, volumes_l, powers_kw, paso, int(o["dias"]), float(o["t_acumulacion"]), float(o["t_red"]),
+                        float(o["t_uso"]), float(o["fraccion_util"]), float(o["perdidas_kwh_l_dia"]))
+    p_min = frontier(volumes_l, powers_kw, sim["viable"])
+    front = pd.DataFrame({"Volumen (L)": volumes_l, "Potencia mínima (kW)": p_min})
+
+    tabla14_kw = float(pd.to_numeric(res.get("Potencia ACS (kW)"), errors="coerce").fillna(0.0).sum()) if "Potencia ACS (kW)" in res else 0.0
+    ok = np.flatnonzero(~np.isnan(p_min))
+    vol_tabla14 = None
+    if tabla14_kw > 0 and len(ok):
+        cubre = ok[p_min[ok] <= tabla14_kw + 1e-9]
+        vol_tabla14 = float(volumes_l[cubre[0]]) if len(cubre) else None
+    # V = 0 es generación instantánea (sin acumulación): no se recomienda
+    acum = ok[volumes_l[ok] > 0]
+    rec: List[Dict[str, Any]] = []
+    if len(acum):
+        coste = volumes_l[acum] * float(o["coste_eur_l"]) + p_min[acum] * float(o["coste_eur_kw"])
+        # mínimo volumen con potencia acotada (la de la Tabla 14, si la hay y alguna la respeta)
+        acotada = acum[p_min[acum] <= tabla14_kw + 1e-9] if tabla14_kw > 0 else acum[:0]
+        v_min = ("Mínimo volumen (P ≤ Tabla 14)", acotada[0]) if len(acotada) else ("Mínimo volumen", acum[0])
+        for nombre, i in (v_min, ("Mínima potencia", acum[np.argmin(p_min[acum])]), ("Mínimo coste", acum[np.argmin(coste)])):
+            rec.append({"Criterio": nombre, "Volumen (L)": float(volumes_l[i]), "Potencia (kW)": float(p_min[i]),
+                        "Coste orientativo (€)": float(volumes_l[i] * float(o["coste_eur_l"]) + p_min[i] * float(o["coste_eur_kw"]))})
+    else:
+        warnings.append(WarningItem("ACS", "-", "Ningún punto de la rejilla con acumulación cubre la demanda: amplía volúmenes o potencias."))
+    if litros_dia <= 0:
+        warnings.append(WarningItem("ACS", "-", "Sin consumo de ACS: revisa el mapeo a la Tabla 14."))
+
+    totals: Dict[str, Any] = {
+        "litros_dia": litros_dia, "potencia_media_kw": p_media, "potencia_punta_sin_acumulacion_kw": p_punta,
+        "potencia_tabla14_kw": tabla14_kw, "volumen_para_tabla14_l": vol_tabla14,
+        "recomendaciones": pd.DataFrame(rec, columns=["Criterio", "Volumen (L)", "Potencia (kW)", "Coste orientativo (€)"]),
+        "perfil_l": draw, "paso_min": paso, "volumenes_l": volumes_l, "potencias_kw": powers_kw,
+        "viable": sim["viable"], "deficit_kwh": sim["deficit_kwh"],
+    }
+    return front, warnings, totals
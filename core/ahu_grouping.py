@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Agrupación de zonas en climatizadores (UTA) con caudal máximo por unidad.
+
+Caudal de cada zona: todo-aire (Tabla 9) o, si no aplica, ventilación (Tabla 10). Las
+zonas se agrupan por los criterios elegidos (edificio, exposición, nivel de carga y,
+opcionalmente, planta) y, dentro de cada grupo, se ordenan por planta y por orden de la
+tabla (adyacencia), de modo que cada UTA sirve zonas contiguas:
+
+1. reparto equilibrado: con k = ⌈Q_grupo / Q_máx⌉ unidades, cada zona va a la unidad
+   ⌊k · (caudal acumulado hasta su mitad) / Q_grupo⌋ (todas las zonas a la vez);
+2. los grupos con alguna unidad por encima de Q_máx suben k y se repite solo en ellos;
+3. refinado: las unidades pequeñas (< fracción mínima de Q_máx) se funden con otra del
+   mismo grupo sin el último criterio (la más cargada en la que quepan).
+Las zonas con caudal mayor que Q_máx tienen su propia UTA (varias unidades en paralelo).
+
+Por UTA se da el caudal, las zonas y la superficie servida, el equipo del catálogo y la
+reserva de espacio de la Tabla 2 ("Tratamiento aire") para esa superficie.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import perf
+from .constants import TABLA_2_ESPACIO_POR_INSTALACION
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Criterio -> columna de la tabla de zonas
+CRITERIOS_AGRUPACION = {
+    "Edificio": "Edificio",
+    "Exposición": "Exposición (E/S/W, N, Interior)",
+    "Nivel de carga": "Nivel carga (B/M/A)",
+    "Planta": "Planta",
+}
+OPCIONES: Dict[str, Any] = {
+    "caudal_max_m3h": 30000.0, "agrupar_por": ["Edificio", "Exposición", "Nivel de carga"],
+    "fraccion_minima": 0.3, "fusionar": True, "seleccionar_equipo": True,
+    "instalacion_tabla2": "Tratamiento aire - Caudal constante (baja velocidad)",
+}
+
+@perf.timed("uta.group")
+def group_zones(q: np.ndarray, grupo: np.ndarray, orden: np.ndarray, q_max: float,
+                relajado: Optional[np.ndarray] = None, fraccion_minima: float = 0.0) -> np.ndarray:
+    """
+    UTA de cada zona (-1 si no tiene caudal). `grupo`: código de grupo compatible por
+    zona; `orden`: clave de adyacencia dentro del grupo; `relajado`: código del grupo sin
+    el último criterio, para fundir unidades pequeñas.
+    """
+    q = np.nan_to_num(np.asarray(q, dtype=float), nan=0.0)
+    n = len(q)
+    out = np.full(n, -1, dtype=np.int64)
+    valid = q > 0
+    if not valid.any():
+        return out
+    grupo = np.asarray(grupo, dtype=np.int64)
+    relajado = grupo if relajado is None else np.asarray(relajado, dtype=np.int64)
+    big = valid & (q > q_max)
+    norm = np.flatnonzero(valid & ~big)
+    s = norm[np.lexsort((np.asarray(orden)[norm], grupo[norm]))]
+
+    next_id = 0
+    if len(s):
+        qs = q[s]
+        g_codes, g = np.unique(grupo[s], return_inverse=True)
+        tot = np.bincount(g, weights=qs)
+        # caudal acumulado dentro del grupo hasta la mitad de cada zona
+        first = np.searchsorted(g, np.arange(len(g_codes)))
+        cs = np.cumsum(qs)
+        mid = cs - qs / 2.0 - np.concatenate([[0.0], cs])[first][g]
+        k = np.maximum(np.ceil(tot / q_max - 1e-9), 1.0)
+        while True:
+            base = np.concatenate([[0], np.cumsum(k)[:-1]]).astype(np.int64)
+            b = base[g] + np.minimum(np.floor(k[g] * mid / tot[g]), k[g] - 1).astype(np.int64)
+            load = np.bincount(b, weights=qs, minlength=int(k.sum()))
+            over = load > q_max + 1e-9
+            if not over.any():
+                break
+            grp_over = np.unique(np.searchsorted(base, np.flatnonzero(over), side="right") - 1)
+            k[grp_over] += 1.0
+        next_id = int(k.sum())
+        # refinado: fundir unidades pequeñas con la más cargada del grupo relajado en la que quepan
+        destino = np.arange(next_id)
+        if fraccion_minima > 0:
+            rel = np.zeros(next_id, dtype=np.int64)
+            rel[b] = relajado[s]
+            present = np.bincount(b, minlength=next_id) > 0
+            for u in np.argsort(load).tolist():
+                if not present[u] or load[u] >= fraccion_minima * q_max:
+                    continue
+                cand = np.flatnonzero(present & (rel == rel[u]) & (load + load[u] <= q_max + 1e-9))
+                cand = cand[cand != u]
+                if len(cand):
+                    t = int(cand[np.argmax(load[cand])])
+                    destino[u] = t
+                    load[t] += load[u]
+                    load[u] = 0.0
+                    present[u] = False
+            while True:  # resolver cadenas de fusiones
+                nxt = destino[destino]
+                if np.array_equal(nxt, destino):
+                    break
+                destino = nxt
+        out[s] = destino[b]
+    for i in np.flatnonzero(big).tolist():
+        out[i] = next_id
+        next_id += 1
+    # numeración compacta
+    used = np.unique(out[out >= 0])
+    out[out >= 0] = np.searchsorted(used, out[out >= 0])
+    return out
+
+@perf.timed("calc_agrupacion_uta")
+def calc_agrupacion_uta(res: "pd.DataFrame", zones_df: "pd.DataFrame", settings: Dict[str, Any]
+                        ) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `res`: salida de `calc_ventilacion_y_todo_aire` (mismo orden de zonas que `zones_df`).
+    Devuelve (una fila por UTA, avisos, totales) con totals["asignacion"] (UTA de cada zona)
+    y la reserva de Tabla 2 total.
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("agrupacion_uta", {}) or {})}
+    warnings: List[WarningItem] = []
+    n = len(res)
+    same = len(zones_df) == n
+    q_max = float(o["caudal_max_m3h"]) / 3.6
+
+    def _col(c: str) -> np.ndarray:
+        return pd.to_numeric(res[c], errors="coerce").to_numpy(dtype=float) if c in res.columns else np.full(n, np.nan)
+    todo, vent = _col("Todo-aire total (L/s)"), _col("Ventilación total (L/s)")
+    q = np.nan_to_num(np.where(np.isnan(todo), vent, todo), nan=0.0)
+    area = np.nan_to_num(_col("Superficie (m²)"), nan=0.0)
+    zona = res["Zona"].astype(str).to_numpy() if "Zona" in res.columns else np.array([f"Zona {i + 1}" for i in range(n)], dtype=object)
+
+    criterios = [c for c in o["agrupar_por"] if same and CRITERIOS_AGRUPACION.get(c) in zones_df.columns]
+    claves = {c: zones_df[CRITERIOS_AGRUPACION[c]].astype(str).str.strip().to_numpy() for c in criterios}
+
+    def _codes(cols: List[str]) -> np.ndarray:
+        if not cols:
+            return np.zeros(n, dtype=np.int64)
+        return pd.DataFrame({c: claves[c] for c in cols}).groupby(cols, sort=False).ngroup().to_numpy()
+    grupo = _codes(criterios)
+    relajado = _codes(criterios[:-1]) if o["fusionar"] else grupo
+    planta = pd.to_numeric(zones_df["Planta"], errors="coerce").fillna(0).to_numpy() if same and "Planta" in zones_df.columns else np.zeros(n)
+    orden = np.lexsort((np.arange(n), planta)).argsort()  # planta y después orden de la tabla
+    uta = group_zones(q, grupo, orden, q_max, relajado, float(o["fraccion_minima"]) if o["fusionar"] else 0.0)
+
+    pmin, pmax = TABLA_2_ESPACIO_POR_INSTALACION.get(o["instalacion_tabla2"], (0.0, 0.0))
+    m = uta >= 0
+    n_uta = int(uta.max()) + 1 if m.any() else 0
+    nombres = [f"UTA-{i + 1:02d}" for i in range(n_uta)]
+    caudal = np.bincount(uta[m], weights=q[m], minlength=n_uta)
+    sup = np.bincount(uta[m], weights=area[m], minlength=n_uta)
+    asign = pd.DataFrame({"Zona": zona, "UTA": np.where(m, np.array(nombres + [""], dtype=object)[np.where(m, uta, n_uta)], None),
+                          "Caudal (L/s)": q})
+    gb = pd.DataFrame({"uta": uta[m], "zona": zona[m], **{c: claves[c][m] for c in criterios}}).groupby("uta", sort=True)
+    utas = pd.DataFrame({"UTA": nombres})
+    for c in criterios:
+        vals = gb[c].agg(lambda s: s.iloc[0] if s.nunique() == 1 else " / ".join(sorted(s.unique())))
+        utas[c] = vals.reindex(range(n_uta)).to_numpy()
+    utas["Zonas"] = np.bincount(uta[m], minlength=n_uta)
+    utas["Caudal (L/s)"] = caudal
+    utas["Caudal (m³/h)"] = caudal * 3.6
+    unidades = np.maximum(np.ceil(caudal / q_max - 1e-9), 1.0).astype(np.int64)
+    utas["Unidades"] = unidades
+    utas["Carga (%)"] = caudal / (unidades * q_max) * 100.0
+    utas["Superficie servida (m²)"] = sup
+    utas["Reserva Tabla 2 mín. (m²)"] = sup * pmin / 100.0
+    utas["Reserva Tabla 2 máx. (m²)"] = sup * pmax / 100.0
+    utas["Zonas servidas"] = gb["zona"].agg(", ".join).reindex(range(n_uta)).to_numpy() if n_uta else []
+
+    if o["seleccionar_equipo"] and n_uta:
+        from .equipment import OPCIONES as OPCIONES_EQUIPOS, load_catalog
+        oe = {**OPCIONES_EQUIPOS, **(settings.get("equipos", {}) or {})}
+        cat = load_catalog(oe.get("catalogo"))
+        if not cat.modelos["Climatizador"].empty:
+            k, mezclar = int(oe["max_unidades"]), bool(oe["mezclar_modelos"])
+            best = cat.select("Climatizador", caudal * 3.6, k, bool(oe["n_mas_1"]), mezclar, oe["criterio"])
+            c = cat.combos("Climatizador", k, mezclar)
+            utas["Equipo"] = [cat.describe("Climatizador", c["n"][b]) if b >= 0 else "Sin combinación válida" for b in best.tolist()]
+            utas["Huella equipo (m²)"] = np.where(best >= 0, c["huella_m2"][np.maximum(best, 0)], np.nan)
+
+    for i in np.flatnonzero(unidades > 1)[:10].tolist():
+        warnings.append(WarningItem("UTA", nombres[i], f"La UTA mueve {caudal[i] * 3.6:,.0f} m³/h, más que el caudal máximo por "
+                                    f"unidad: {int(unidades[i])} unidades en paralelo."))
+    if n and not (q > 0).any():
+        warnings.append(WarningItem("UTA", "-", "Ninguna zona tiene caudal de todo-aire ni de ventilación."))
+    faltan = [c for c in o["agrupar_por"] if c not in criterios and c not in ("Edificio", "Planta")]  # opcionales
+    if faltan and same and n:
+        warnings.append(WarningItem("UTA", "-", f"Sin columna para agrupar por: {', '.join(faltan)}."))
+
+    totals: Dict[str, Any] = {
+        "n_uta": n_uta, "caudal_total_m3h": float(caudal.sum() * 3.6),
+        "carga_media_pct": float(caudal.sum() / (unidades.sum() * q_max) * 100.0) if n_uta else 0.0,
+        "reserva_tabla2_min_m2": float(sup.sum() * pmin / 100.0), "reserva_tabla2_max_m2": float(sup.sum() * pmax / 100.0),
+        "asignacion": asign, "criterios": criterios,
+    }
+    return utas, warnings, totals
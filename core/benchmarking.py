@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de benchmarking: compara los ratios del proyecto (W/m² de frío, calor y
+eléctrica, L/s·m² de ventilación) con los de proyectos anteriores del mismo uso, zona
+climática y nivel de carga.
+
+Por cada (uso, zona climática, nivel, ratio) se mantiene un boceto de cuantiles con
+buckets logarítmicos de error relativo acotado (tipo DDSketch): se actualiza al registrar
+un proyecto, se combina con otro índice sumando buckets y responde percentiles sin
+recorrer los proyectos históricos. Se guarda como JSON local.
+
+Variable de entorno:
+- PREDIM_BENCH_INDEX=<ruta>  fichero del índice (por defecto ~/.predim/indice_benchmarking.json)
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from .cube import ResultsCube
+
+ALPHA = 0.01  # error relativo de los cuantiles (1 %)
+INDEX_VERSION = 1
+
+# Ratio -> (módulo del cubo, magnitud, factor a la unidad del ratio)
+RATIOS: Dict[str, Tuple[str, str, float]] = {
+    "Frío (W/m²)": ("clima", "Potencia frío (kW)", 1000.0),
+    "Calor (W/m²)": ("clima", "Potencia calor (kW)", 1000.0),
+    "Eléctrica (W/m²)": ("ele", "Potencia normal (kW)", 1000.0),
+    "Ventilación (L/s·m²)": ("vent", "Ventilación total (L/s)", 1.0),
+}
+KEY_DIMS = ["Uso", "Zona climática", "Nivel"]
+
+def default_index_path() -> Path:
+    env = os.environ.get("PREDIM_BENCH_INDEX", "").strip()
+    return Path(env) if env else Path.home() / ".predim" / "indice_benchmarking.json"
+
+class QuantileSketch:
+    """
+    Boceto de cuantiles mergeable: el valor x > 0 cae en el bucket ceil(log_γ x), con
+    γ = (1+α)/(1-α), de modo que cualquier cuantil se devuelve con error relativo ≤ α.
+    Los valores ≤ 0 se cuentan aparte. Admite restar valores (re-registrar un proyecto).
+    """
+    def __init__(self, alpha: float = ALPHA):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero = 0
+        self.count = 0
+
+    def _key(self, x: float) -> int:
+        return int(math.ceil(math.log(x) / self._log_gamma))
+
+    def _value(self, k: int) -> float:
+        return 2.0 * self.gamma ** k / (self.gamma + 1.0)
+
+    def add(self, x: float, n: int = 1) -> None:
+        if not (x == x):  # NaN
+            return
+        if x <= 0:
+            self.zero += n
+        else:
+            k = self._key(x)
+            self.bins[k] = self.bins.get(k, 0) + n
+        self.count += n
+
+    def add_many(self, values: Iterable[float]) -> None:
+        import numpy as np
+        x = np.asarray(values if hasattr(values, "__len__") else list(values), dtype=float)
+        x = x[~np.isnan(x)]
+        pos = x[x > 0]
+        self.zero += int(len(x) - len(pos))
+        self.count += int(len(x))
+        if len(pos):
+            keys, counts = np.unique(np.ceil(np.log(pos) / self._log_gamma).astype(np.int64), return_counts=True)
+            for k, c in zip(keys.tolist(), counts.tolist()):
+                self.bins[k] = self.bins.get(k, 0) + c
+
+    def remove(self, x: float, n: int = 1) -> None:
+        if not (x == x):
+            return
+        if x <= 0:
+            self.zero = max(0, self.zero - n)
+        else:
+            k = self._key(x)
+            left = self.bins.get(k, 0) - n
+            if left > 0:
+                self.bins[k] = left
+            else:
+                self.bins.pop(k, None)
+        self.count = self.zero + sum(self.bins.values())
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if abs(other.alpha - self.alpha) > 1e-12:
+            raise ValueError("No se pueden combinar bocetos con distinta precisión (alpha).")
+        for k, c in other.bins.items():
+            self.bins[k] = self.bins.get(k, 0) + c
+        self.zero += other.zero
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero:
+            return 0.0
+        acc = self.zero
+        for k in sorted(self.bins):
+            acc += self.bins[k]
+            if acc > rank:
+                return self._value(k)
+        return self._value(max(self.bins))
+
+    def percentile_of(self, x: float) -> Optional[float]:
+        """Percentil (0–100) de `x`: proporción por debajo más la mitad de la de su bucket."""
+        if self.count <= 0 or not (x == x):
+            return None
+        if x <= 0:
+            below, equal = 0, self.zero
+        else:
+            k = self._key(x)
+            below = self.zero + sum(c for kk, c in self.bins.items() if kk < k)
+            equal = self.bins.get(k, 0)
+        return 100.0 * (below + 0.5 * equal) / self.count
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"alpha": self.alpha, "zero": self.zero, "bins": {str(k): c for k, c in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "QuantileSketch":
+        s = cls(float(d.get("alpha", ALPHA)))
+        s.zero = int(d.get("zero", 0))
+        s.bins = {int(k): int(c) for k, c in (d.get("bins") or {}).items()}
+        s.count = s.zero + sum(s.bins.values())
+        return s
+
+def _key(uso: Any, zona: Any, nivel: Any, ratio: str) -> str:
+    return "|".join(str(v) for v in (uso, zona, nivel, ratio))
+
+class BenchmarkIndex:
+    """
+    Bocetos por clave "uso|zona|nivel|ratio" y, por proyecto, los ratios que aportó (unas
+    decenas de números) para poder sustituirlo al volver a registrarlo sin duplicarlo.
+    """
+    def __init__(self, alpha: float = ALPHA):
+        self.alpha = alpha
+        self.sketches: Dict[str, QuantileSketch] = {}
+        self.projects: Dict[str, Dict[str, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.projects)
+
+    def sketch(self, key: str) -> Optional[QuantileSketch]:
+        return self.sketches.get(key)
+
+    def register(self, project_id: str, ratios: Dict[str, float]) -> None:
+        """Añade (o sustituye) los ratios de un proyecto."""
+        self.unregister(project_id)
+        for key, value in ratios.items():
+            sk = self.sketches.get(key)
+            if sk is None:
+                sk = self.sketches[key] = QuantileSketch(self.alpha)
+            sk.add(value)
+        self.projects[project_id] = dict(ratios)
+
+    def unregister(self, project_id: str) -> bool:
+        old = self.projects.pop(project_id, None)
+        if old is None:
+            return False
+        for key, value in old.items():
+            sk = self.sketches.get(key)
+            if sk is not None:
+                sk.remove(value)
+                if sk.count == 0:
+                    del self.sketches[key]
+        return True
+
+    def merge(self, other: "BenchmarkIndex") -> int:
+        """Combina otro índice (p. ej. de otro equipo). Devuelve el nº de proyectos nuevos."""
+        new = 0
+        for key, sk in other.sketches.items():
+            mine = self.sketches.get(key)
+            if mine is None:
+                mine = self.sketches[key] = QuantileSketch(self.alpha)
+            mine.merge(sk)
+        for pid, ratios in other.projects.items():
+            if pid in self.projects:
+                # proyecto presente en ambos: no contarlo dos veces
+                for key, value in ratios.items():
+                    if key in self.sketches:
+                        self.sketches[key].remove(value)
+            else:
+                self.projects[pid] = dict(ratios)
+                new += 1
+        return new
+
+    # -- persistencia --
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "alpha": self.alpha,
+            "sketches": {k: s.to_dict() for k, s in sorted(self.sketches.items())},
+            "projects": self.projects,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "BenchmarkIndex":
+        idx = cls(float(d.get("alpha", ALPHA)))
+        idx.sketches = {k: QuantileSketch.from_dict(v) for k, v in (d.get("sketches") or {}).items()}
+        idx.projects = {str(k): {kk: float(vv) for kk, vv in v.items()} for k, v in (d.get("projects") or {}).items()}
+        return idx
+
+    def save(self, path: Optional[Path] = None) -> Path:
+        path = Path(path) if path else default_index_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(self.to_dict(), ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        return path
+
+def load_index(path: Optional[Path] = None) -> BenchmarkIndex:
+    """Índice guardado (vacío si no existe o no se puede leer)."""
+    path = Path(path) if path else default_index_path()
+    try:
+        return BenchmarkIndex.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    except (OSError, ValueError):
+        return BenchmarkIndex()
+
+# -----------------------------
+# Ratios del proyecto (desde los cubos de resultados)
+# -----------------------------
+def project_ratios(cubes: Dict[str, "ResultsCube"]) -> "pd.DataFrame":
+    """
+    Ratios por (uso, zona climática, nivel): suma de la magnitud / suma de superficie de las
+    zonas con dato. Columnas: Uso, Zona climática, Nivel, Ratio, Valor, Superficie (m²).
+    """
+    import pandas as pd
+    rows: List[Dict[str, Any]] = []
+    for ratio, (mod, measure, factor) in RATIOS.items():
+        cube = cubes.get(mod)
+        if cube is None or cube.empty or not all(d in cube.dims for d in KEY_DIMS):
+            continue
+        tab = cube.breakdown(KEY_DIMS, counts=True)
+        for r in tab.itertuples(index=False):
+            rec = dict(zip(tab.columns, r))
+            area = float(rec.get("Superficie (m²)") or 0.0)
+            if area <= 0 or not rec.get("n · " + measure):
+                continue
+            rows.append({
+                "Uso": rec["Uso"], "Zona climática": rec["Zona climática"], "Nivel": rec["Nivel"],
+                "Ratio": ratio, "Valor": factor * float(rec[measure]) / area, "Superficie (m²)": area,
+            })
+    return pd.DataFrame(rows, columns=["Uso", "Zona climática", "Nivel", "Ratio", "Valor", "Superficie (m²)"])
+
+def ratios_dict(ratios_df: "pd.DataFrame") -> Dict[str, float]:
+    return {_key(r["Uso"], r["Zona climática"], r["Nivel"], r["Ratio"]): float(r["Valor"]) for r in ratios_df.to_dict("records")}
+
+def compare(index: BenchmarkIndex, ratios_df: "pd.DataFrame", quantiles: Tuple[float, ...] = (0.1, 0.5, 0.9)) -> "pd.DataFrame":
+    """Añade a cada ratio del proyecto su percentil y los cuantiles de referencia del índice."""
+    out = ratios_df.copy()
+    n, pct = [], []
+    qcols: Dict[str, List[Optional[float]]] = {f"p{int(q * 100)}": [] for q in quantiles}
+    for r in ratios_df.to_dict("records"):
+        sk = index.sketch(_key(r["Uso"], r["Zona climática"], r["Nivel"], r["Ratio"]))
+        n.append(sk.count if sk else 0)
+        pct.append(sk.percentile_of(r["Valor"]) if sk else None)
+        for q in quantiles:
+            qcols[f"p{int(q * 100)}"].append(sk.quantile(q) if sk else None)
+    out["Proyectos"] = n
+    out["Percentil"] = pct
+    for c, v in qcols.items():
+        out[c] = v
+    return out
@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Dimensionado de líneas (sección por intensidad admisible y por caída de tensión).
+
+Todo trabaja sobre arrays: cada circuito es una posición y la sección se elige con
+`np.searchsorted` sobre tablas ordenadas, sin bucles por circuito.
+
+- Protección: In normalizada inmediatamente superior a Ib (Ib ≤ In).
+- Intensidad admisible: la menor sección con Iz · factor ≥ In (In ≤ Iz). Las tablas de
+  todas las combinaciones material × aislamiento × método se concatenan desplazadas
+  (fila k + k · OFFSET), de modo que una sola búsqueda resuelve todos los circuitos.
+- Caída de tensión: la menor sección con ΔV ≤ ΔV máx, primero sin reactancia (cota
+  inferior directa) y después corrigiendo con la reactancia de la línea.
+- Si ninguna sección de la tabla basta se reparten conductores en paralelo.
+
+Valores orientativos de anteproyecto (UNE-HD 60364-5-52, tres conductores cargados,
+30 °C al aire / 20 °C enterrado). No sustituyen el cálculo del proyecto eléctrico.
+"""
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import numpy as np
+
+from . import perf
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from .load_tree import LoadTree
+
+SECCIONES_MM2 = np.array([1.5, 2.5, 4, 6, 10, 16, 25, 35, 50, 70, 95, 120, 150, 185, 240, 300], dtype=float)
+
+# Intensidad admisible (A), cobre XLPE/EPR, tres conductores cargados
+METODOS: Dict[str, str] = {
+    "A1": "Empotrado en pared aislante",
+    "B1": "Bajo tubo en superficie (unipolares)",
+    "B2": "Bajo tubo en superficie (multipolar)",
+    "C": "Sobre pared",
+    "E": "Bandeja perforada",
+    "D": "Enterrado bajo tubo",
+}
+_IZ_CU_XLPE: Dict[str, List[float]] = {
+    "A1": [13.5, 18, 24, 31, 42, 56, 73, 89, 108, 136, 164, 188, 216, 245, 286, 328],
+    "B1": [17, 23, 31, 40, 54, 73, 95, 117, 141, 179, 216, 249, 285, 324, 380, 435],
+    "B2": [16.5, 22, 30, 38, 51, 68, 89, 109, 130, 164, 197, 227, 259, 295, 346, 396],
+    "C": [19.5, 27, 36, 46, 63, 85, 112, 138, 168, 213, 258, 299, 344, 392, 461, 530],
+    "E": [23, 32, 42, 54, 75, 100, 127, 158, 192, 246, 298, 346, 395, 450, 538, 621],
+    "D": [22, 29, 37, 46, 61, 79, 101, 122, 144, 178, 211, 240, 271, 304, 351, 396],
+}
+MATERIALES = ["Cu", "Al"]
+AISLAMIENTOS = ["XLPE", "PVC"]
+# relación aproximada con la tabla Cu/XLPE; el aluminio no se usa por debajo de 16 mm²
+FACTOR_MATERIAL = {"Cu": 1.0, "Al": 0.78}
+FACTOR_AISLAMIENTO = {"XLPE": 1.0, "PVC": 0.8}
+SECCION_MIN_AL_MM2 = 16.0
+# resistividad a la temperatura de servicio (Ω·mm²/m): XLPE 90 °C, PVC 70 °C
+RESISTIVIDAD = {("Cu", "XLPE"): 0.0225, ("Cu", "PVC"): 0.0210, ("Al", "XLPE"): 0.0364, ("Al", "PVC"): 0.0337}
+REACTANCIA_OHM_M = 0.08e-3
+
+INTENSIDADES_NORMALIZADAS = np.array([6, 10, 16, 20, 25, 32, 40, 50, 63, 80, 100, 125, 160, 200, 250, 315, 400, 500,
+                                      630, 800, 1000, 1250, 1600, 2000, 2500, 3200, 4000], dtype=float)
+
+COMBOS = [(m, a, k) for m in MATERIALES for a in AISLAMIENTOS for k in METODOS]
+
+def _ampacity_table() -> np.ndarray:
+    """(combinaciones × secciones); NaN donde la sección no se admite (Al < 16 mm²)."""
+    base = np.array([_IZ_CU_XLPE[k] for (_, _, k) in COMBOS], dtype=float)
+    f = np.array([FACTOR_MATERIAL[m] * FACTOR_AISLAMIENTO[a] for (m, a, _) in COMBOS])
+    tab = base * f[:, None]
+    is_al = np.array([m == "Al" for (m, _, _) in COMBOS])
+    tab[np.ix_(is_al, SECCIONES_MM2 < SECCION_MIN_AL_MM2)] = np.nan
+    return tab
+
+IZ_TABLA = _ampacity_table()
+# filas concatenadas y desplazadas: búsqueda única para todas las combinaciones
+_OFFSET = float(np.nanmax(IZ_TABLA)) * 10.0
+_IZ_FLAT = (np.nan_to_num(IZ_TABLA, nan=0.0) + np.arange(len(COMBOS))[:, None] * _OFFSET).ravel()
+_RHO_COMBO = np.array([RESISTIVIDAD[(m, a)] for (m, a, _) in COMBOS])
+
+def combo_codes(material: np.ndarray, aislamiento: np.ndarray, metodo: np.ndarray) -> np.ndarray:
+    """Código de combinación por circuito (ValueError si algún valor no existe)."""
+    index = {c: i for i, c in enumerate(COMBOS)}
+    keys = list(zip(material.tolist(), aislamiento.tolist(), metodo.tolist()))
+    unknown = sorted({k for k in keys if k not in index})
+    if unknown:
+        raise ValueError(f"Combinación de material/aislamiento/método no tabulada: {unknown[:3]}.")
+    return np.fromiter((index[k] for k in keys), dtype=np.int64, count=len(keys))
+
+@perf.timed("cables.size")
+def size_arrays(ib_a: np.ndarray, length_m: np.ndarray, voltage_v: np.ndarray, cosphi: np.ndarray,
+                combo: np.ndarray, dv_max_pct: np.ndarray, factor: Optional[np.ndarray] = None,
+                i_start_a: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Sección mínima de cada circuito. Todos los argumentos son arrays de igual longitud
+    (`combo` de `combo_codes`; `factor` = corrección por agrupamiento/temperatura).
+    Tensión > 300 V se trata como trifásica (√3), el resto como monofásica (2 conductores).
+    ValueError si alguna tensión no es positiva.
+    """
+    ib = np.nan_to_num(np.asarray(ib_a, dtype=float), nan=0.0).clip(min=0.0)
+    n = len(ib)
+    length = np.nan_to_num(np.asarray(length_m, dtype=float), nan=0.0).clip(min=0.0)
+    u = np.asarray(voltage_v, dtype=float)
+    if not (u > 0).all():
+        raise ValueError(f"Tensión no válida (≤ 0 V o vacía) en {int((~(u > 0)).sum())} circuitos.")
+    cos = np.clip(np.nan_to_num(np.asarray(cosphi, dtype=float), nan=1.0), 0.05, 1.0)
+    sin = np.sqrt(1.0 - cos ** 2)
+    combo = np.asarray(combo, dtype=np.int64)
+    dv_max = np.asarray(dv_max_pct, dtype=float)
+    f = np.ones(n) if factor is None else np.clip(np.nan_to_num(np.asarray(factor, dtype=float), nan=1.0), 0.05, None)
+    k = np.where(u > 300.0, math.sqrt(3.0), 2.0)
+    rho = _RHO_COMBO[combo]
+    nsec = len(SECCIONES_MM2)
+
+    # protección (Ib ≤ In); por encima de la mayor In normalizada se toma Ib
+    j = np.searchsorted(INTENSIDADES_NORMALIZADAS, ib, side="left")
+    i_n = np.where(j < len(INTENSIDADES_NORMALIZADAS), INTENSIDADES_NORMALIZADAS[np.minimum(j, len(INTENSIDADES_NORMALIZADAS) - 1)], ib)
+    iz_req = i_n / f
+
+    # sección por caída de tensión sin reactancia: S ≥ k·ρ·L·I·cosφ / (ΔV·U)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s_dv = np.where(dv_max > 0, k * rho * length * ib * cos / (dv_max / 100.0 * u), 0.0)
+
+    # conductores en paralelo si no basta la mayor sección
+    iz_top = np.nan_to_num(IZ_TABLA[:, -1])[combo]
+    paralelo = np.maximum(np.ceil(np.maximum(iz_req / iz_top, s_dv / SECCIONES_MM2[-1]) - 1e-9), 1.0)
+
+    # intensidad: búsqueda única en la tabla concatenada
+    pos = np.searchsorted(_IZ_FLAT, iz_req / paralelo + combo * _OFFSET, side="left") - combo * nsec
+    idx_iz = np.clip(pos, 0, nsec - 1)
+    idx_dv = np.clip(np.searchsorted(SECCIONES_MM2, s_dv / paralelo - 1e-9, side="left"), 0, nsec - 1)
+    idx = np.maximum(idx_iz, idx_dv)
+
+    def drop(i: np.ndarray, s_idx: np.ndarray) -> np.ndarray:
+        s = SECCIONES_MM2[s_idx]
+        z = rho * cos / s + REACTANCIA_OHM_M * sin
+        return 100.0 * k * length * i / paralelo * z / u
+
+    # con reactancia la caída puede superar el límite: se sube de sección (o se añade un
+    # conductor en paralelo si ya está en la mayor) solo donde haga falta
+    dv = drop(ib, idx)
+    bad = (dv > dv_max) & (dv_max > 0)
+    while bad.any():
+        top = bad & (idx == nsec - 1)
+        idx[bad & ~top] += 1
+        paralelo[top] += 1
+        dv = drop(ib, idx)
+        bad = (dv > dv_max) & (dv_max > 0)
+
+    seccion = SECCIONES_MM2[idx]
+    iz = np.nan_to_num(IZ_TABLA[combo, idx]) * f * paralelo
+    criterio = np.where(idx_dv > idx_iz, "Caída de tensión", "Intensidad")
+    out = {"in_a": i_n, "seccion_mm2": seccion, "paralelo": paralelo.astype(np.int64), "iz_a": iz, "dv_pct": dv,
+           "criterio": criterio, "cumple": (ib <= i_n + 1e-9) & (i_n <= iz + 1e-9) & ((dv <= dv_max + 1e-9) | (dv_max <= 0))}
+    if i_start_a is not None:
+        out["dv_arranque_pct"] = drop(np.asarray(i_start_a, dtype=float), idx)  # NaN = sin arranque
+    return out
+
+# -----------------------------
+# Interfaz de tabla
+# -----------------------------
+CIRCUIT_COLUMNS = ["Circuito", "Ib (A)", "Longitud (m)", "Tensión (V)", "cosφ", "Material", "Aislamiento", "Método",
+                   "ΔV máx (%)", "Factor corrección"]
+DEFAULTS: Dict[str, Any] = {"Longitud (m)": 25.0, "Tensión (V)": 400.0, "cosφ": 0.9, "Material": "Cu", "Aislamiento": "XLPE",
+                            "Método": "B1", "ΔV máx (%)": 5.0, "Factor corrección": 1.0}
+
+def size_cables(circuits: "pd.DataFrame", i_start_a: Optional[np.ndarray] = None) -> "pd.DataFrame":
+    """
+    Tabla de circuitos (`CIRCUIT_COLUMNS`; vacíos = `DEFAULTS`) -> misma tabla con In,
+    sección, conductores en paralelo, Iz, ΔV y criterio dimensionante.
+    ValueError si una combinación material/aislamiento/método no existe o si una tensión
+    no es positiva.
+    """
+    import pandas as pd
+    n = len(circuits)
+
+    def num(name: str) -> np.ndarray:
+        v = pd.to_numeric(circuits[name], errors="coerce").to_numpy(dtype=float) if name in circuits.columns else np.full(n, np.nan)
+        return np.where(np.isnan(v), DEFAULTS.get(name, 0.0), v)
+
+    def txt(name: str) -> np.ndarray:
+        if name not in circuits.columns:
+            return np.full(n, DEFAULTS[name], dtype=object)
+        s = circuits[name].astype(object).where(circuits[name].notna(), DEFAULTS[name]).astype(str).str.strip()
+        return s.where(s != "", DEFAULTS[name]).to_numpy(dtype=object)
+
+    combo = combo_codes(txt("Material"), txt("Aislamiento"), txt("Método"))
+    r = size_arrays(num("Ib (A)"), num("Longitud (m)"), num("Tensión (V)"), num("cosφ"), combo, num("ΔV máx (%)"),
+                    num("Factor corrección"), i_start_a=i_start_a)
+    out = circuits.copy()
+    out["In (A)"] = r["in_a"]
+    out["Sección (mm²)"] = r["seccion_mm2"]
+    out["Conductores en paralelo"] = r["paralelo"]
+    out["Iz (A)"] = r["iz_a"]
+    out["ΔV (%)"] = r["dv_pct"]
+    if "dv_arranque_pct" in r:
+        out["ΔV arranque (%)"] = r["dv_arranque_pct"]
+    out["Criterio"] = r["criterio"]
+    out["Cumple"] = r["cumple"]
+    return out
+
+# -----------------------------
+# Líneas del cuadro de cargas
+# -----------------------------
+OPCIONES: Dict[str, Any] = {"material": "Cu", "aislamiento": "XLPE", "metodo": "B1",
+                            "longitud_alimentacion_m": 50.0, "longitud_circuito_m": 25.0,
+                            "dv_alimentacion_pct": 1.5, "dv_circuito_pct": 3.0, "dv_total_pct": 5.0}
+
+def size_tree(tree: "LoadTree", nodes: "pd.DataFrame", opciones: Optional[Dict[str, Any]] = None) -> "pd.DataFrame":
+    """
+    Una línea por nodo del cuadro de cargas (alimentación de cuadros y circuitos), en el
+    orden de `tree`, con la Ib agregada del nodo. Las columnas opcionales de `nodes`
+    ("Longitud (m)", "Material", "Aislamiento", "Método", "ΔV máx (%)", "Factor corrección")
+    prevalecen sobre `opciones` (ver `OPCIONES`). Añade la caída acumulada desde el CGBT.
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(opciones or {})}
+    agg = tree.aggregate()
+    panel = tree.is_panel
+    is_motor = np.array([t == "Motor" for t in tree.tipos], dtype=bool)
+    circuits = pd.DataFrame({
+        "Circuito": tree.ids,
+        "Ib (A)": agg["ib_a"],
+        "Longitud (m)": np.where(panel, o["longitud_alimentacion_m"], o["longitud_circuito_m"]),
+        "Tensión (V)": tree.tension,
+        "cosφ": agg["cosphi"],
+        "Material": o["material"], "Aislamiento": o["aislamiento"], "Método": o["metodo"],
+        "ΔV máx (%)": np.where(panel, o["dv_alimentacion_pct"], o["dv_circuito_pct"]),
+        "Factor corrección": 1.0,
+    })
+    if len(nodes) == len(tree):
+        for col in ("Longitud (m)", "Material", "Aislamiento", "Método", "ΔV máx (%)", "Factor corrección"):
+            if col in nodes.columns:
+                v = nodes[col].to_numpy()
+                given = nodes[col].notna().to_numpy() & (nodes[col].astype(str).str.strip() != "").to_numpy()
+                circuits[col] = circuits[col].astype(object).where(~given, v)
+    out = size_cables(circuits, i_start_a=np.where(is_motor, agg["inrush_a"], np.nan))
+    out["ΔV acumulada (%)"] = tree.accumulate_down(out["ΔV (%)"].to_numpy())
+    out["Cumple"] = out["Cumple"] & (out["ΔV acumulada (%)"] <= float(o["dv_total_pct"]) + 1e-9)
+    return out
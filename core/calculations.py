@@ -1,9 +1,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from typing import Dict, List, Tuple, Any, Optional
-import pandas as pd
-import math
+from typing import TYPE_CHECKING, Dict, List, Tuple, Any, Optional
 import numpy as np
 
 from .constants import (
@@ -15,6 +13,12 @@ from .constants import (
     USO_A_CATEGORIA_GLOBAL, TABLA_1_ESPACIO_GLOBAL, TABLA_2_ESPACIO_POR_INSTALACION
 )
 from .utils import WarningItem, to_float, nz
+from . import perf
+from .cube import build_cube
+from .diversity import simultaneidad
+
+if TYPE_CHECKING:  # pandas (y core.schema, que lo importa) se cargan en la primera llamada
+    import pandas as pd
 
 # -----------------------------
 # Helpers
@@ -39,8 +43,9 @@ def _get_override(row: pd.Series, col: str) -> Optional[float]:
     return to_float(row.get(col))
 
 def _zone_name(row: pd.Series) -> str:
+    import pandas as pd
     n = row.get("Nombre zona")
-    if n is None or str(n).strip()=="":
+    if n is None or n is pd.NA or str(n).strip()=="":
         return f"Zona {row.get('ID', '')}".strip()
     return str(n).strip()
 
@@ -68,124 +73,13 @@ def _calc_unidades_ocupacion(row: pd.Series) -> Tuple[str, float]:
     return "persona", _calc_personas(row)
 
 # -----------------------------
-# Normalización DF
-# -----------------------------
-def normalize_zones_df(zones_df: pd.DataFrame) -> pd.DataFrame:
-    df = zones_df.copy()
-    if "ID" not in df.columns:
-        df.insert(0, "ID", range(1, len(df)+1))
-    # normalizar superficies y ocupación
-    df["Superficie (m²)"] = df["Superficie (m²)"].apply(to_float)
-    df["Personas_calc"] = df.apply(_calc_personas, axis=1)
-    return df
-
-# -----------------------------
-# Cálculos por módulo
+# Totales (compartidos con core.incremental)
 # -----------------------------
-def calc_climatizacion(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem], Dict[str, float]]:
+def parking_ventilacion(settings: Dict[str, Any]) -> Tuple[float, float, Optional[str]]:
     """
-    Devuelve:
-      - df con resultados por zona (frío y calor)
-      - warnings
-      - totales (kW)
+    Ventilación aparcamiento bajo rasante (CTE – aportación vs extracción, por plazas).
+    Devuelve (aporte L/s, extracción L/s, aviso o None).
     """
-    df = normalize_zones_df(zones_df)
-    warnings: List[WarningItem] = []
-
-    oversize_frio = float(settings.get("oversize_frio", 1.00))
-    oversize_calor = float(settings.get("oversize_calor", 1.10))
-
-    out_rows = []
-    total_frio_w = 0.0
-    total_calor_w = 0.0
-
-    for _, r in df.iterrows():
-        zona = _zone_name(r)
-        uso = str(r.get("Uso", "")).strip()
-        nivel = str(r.get("Nivel carga (B/M/A)", "M")).strip() or "M"
-        clima = str(r.get("Zona climática", "")).strip()
-        area = nz(to_float(r.get("Superficie (m²)")))
-
-        # frío
-        frio_override = _get_override(r, "Frío override (W/m²)")
-        frio_base = None
-        if frio_override is not None:
-            frio_base = frio_override
-        else:
-            if uso in TABLA_5_FRIO_W_M2 and nivel in TABLA_5_FRIO_W_M2[uso]:
-                frio_base = TABLA_5_FRIO_W_M2[uso][nivel]
-            else:
-                warnings.append(WarningItem("Climatización", zona, f"Sin dato de frío para uso '{uso}' (Tabla 5). Usa override."))
-        factor_frio = TABLA_6_FACTOR_FRIO.get(clima)
-        if factor_frio is None:
-            warnings.append(WarningItem("Climatización", zona, f"Zona climática '{clima}' no encontrada en Tabla 6 (frío)."))
-            factor_frio = np.nan
-
-        frio_wm2 = (frio_base * factor_frio) if (frio_base is not None and factor_frio==factor_frio) else np.nan
-        frio_w = frio_wm2 * area if frio_wm2==frio_wm2 else np.nan
-
-        # calor
-        calor_override = _get_override(r, "Calor override (W/m²)")
-        calor_base = None
-        if calor_override is not None:
-            calor_base = calor_override
-        else:
-            if uso in TABLA_7_CALOR_W_M2 and nivel in TABLA_7_CALOR_W_M2[uso]:
-                calor_base = TABLA_7_CALOR_W_M2[uso][nivel]
-            else:
-                warnings.append(WarningItem("Climatización", zona, f"Sin dato de calor para uso '{uso}' (Tabla 7). Usa override."))
-
-        factor_calor, aviso = _factor_calor_por_zona(clima)
-        if aviso:
-            warnings.append(WarningItem("Climatización", zona, aviso))
-        if factor_calor is None:
-            factor_calor = np.nan
-
-        calor_wm2 = (calor_base * factor_calor) if (calor_base is not None and factor_calor==factor_calor) else np.nan
-        calor_w = calor_wm2 * area if calor_wm2==calor_wm2 else np.nan
-
-        if frio_w==frio_w:
-            total_frio_w += float(frio_w)
-        if calor_w==calor_w:
-            total_calor_w += float(calor_w)
-
-        out_rows.append({
-            "ID": r.get("ID"),
-            "Zona": zona,
-            "Uso": uso,
-            "Superficie (m²)": area,
-            "Zona climática": clima,
-            "Nivel": nivel,
-            "Frío base (W/m²)": frio_base,
-            "Factor frío (Tabla 6)": factor_frio,
-            "Frío (W/m²)": frio_wm2,
-            "Potencia frío (kW)": (frio_w/1000.0) if frio_w==frio_w else np.nan,
-            "Calor base (W/m²)": calor_base,
-            "Factor calor (Tabla 8)": factor_calor,
-            "Calor (W/m²)": calor_wm2,
-            "Potencia calor (kW)": (calor_w/1000.0) if calor_w==calor_w else np.nan,
-        })
-
-    res = pd.DataFrame(out_rows)
-    totals = {
-        "frio_total_kw": total_frio_w/1000.0,
-        "calor_total_kw": total_calor_w/1000.0,
-        "frio_generador_kw": (total_frio_w/1000.0)*oversize_frio,
-        "calor_generador_kw": (total_calor_w/1000.0)*oversize_calor,
-    }
-    return res, warnings, totals
-
-def calc_ventilacion_y_todo_aire(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem], Dict[str, float]]:
-    """
-    Ventilación exterior (Tabla 10) y caudal tratado para sistemas todo-aire (Tabla 9).
-    """
-    df = normalize_zones_df(zones_df)
-    warnings: List[WarningItem] = []
-
-    total_vent_lps = 0.0
-    total_todoaire_lps = 0.0
-
-    # Ventilación aparcamiento bajo rasante (CTE – aportación vs extracción, por plazas)
     parking_spaces = float(settings.get("parking_plazas", 0) or 0)
 
     # Defaults: HS3 salubridad -> 120/120; SI3 control de humos -> 120/150 (editable)
@@ -200,100 +94,51 @@ def calc_ventilacion_y_todo_aire(zones_df: pd.DataFrame, settings: Dict[str, Any
     parking_supply_lps_per = float(settings.get("parking_aporte_lps_por_plaza", def_aporte) or def_aporte)
     parking_extract_lps_per = float(settings.get("parking_extraccion_lps_por_plaza", def_extr) or def_extr)
 
-    parking_supply_lps = 0.0
-    parking_extract_lps = 0.0
     try:
         gfa_below = float(settings.get("gfa_below_m2", 0) or 0)
     except Exception:
         gfa_below = 0.0
 
     if parking_spaces > 0:
-        parking_supply_lps = parking_spaces * parking_supply_lps_per
-        parking_extract_lps = parking_spaces * parking_extract_lps_per
-    else:
-        # Si hay bajo rasante, avisar para que indiquen plazas (si aplica garaje)
-        if gfa_below > 0:
-            warnings.append(WarningItem("Ventilación", "Bajo rasante", "Indica nº de plazas de parking para calcular ventilación de garaje (CTE)."))
-
-    out_rows = []
-    for _, r in df.iterrows():
-        zona = _zone_name(r)
-        uso = str(r.get("Uso", "")).strip()
-        nivel = str(r.get("Nivel carga (B/M/A)", "M")).strip() or "M"
-        expos = str(r.get("Exposición (E/S/W, N, Interior)", "Interior")).strip() or "Interior"
-        area = nz(to_float(r.get("Superficie (m²)")))
-
-        # Ventilación exterior (Tabla 10)
-        vent_override = _get_override(r, "Ventilación override (L/s·m²)")
-        vent_lsm2 = None
-        if vent_override is not None:
-            vent_lsm2 = vent_override
-        else:
-            vent_lsm2 = TABLA_10_VENTILACION_LS_M2.get(uso)
-            if vent_lsm2 is None:
-                warnings.append(WarningItem("Ventilación", zona, f"Sin dato de ventilación para uso '{uso}' (Tabla 10). Usa override."))
-        vent_lps = (vent_lsm2 * area) if vent_lsm2 is not None else np.nan
-        # Todo-aire (Tabla 9)
-        # Mapear el uso a la tipología de Tabla 9 (si aplica)
-        todo_aire_activo = bool(settings.get("todo_aire_activo", False))
-        mapping = settings.get("mapa_uso_tabla9", {}) or {}
-
-        def _auto_tipologia_tabla9(u: str) -> Optional[str]:
-            uu = (u or "").strip()
-            if uu in TABLA_9_TODO_AIRE_LS_M2:
-                return uu
-            # heurísticos para usos habituales
-            if uu == "Oficinas":
-                return "Oficinas - Espacio abierto"
-            if uu == "Hoteles":
-                return "Hoteles (habitaciones)"
-            if uu in ("Museos", "Bibliotecas"):
-                return "Museos / Bibliotecas"
-            if uu in ("Auditorios", "Teatros"):
-                return "Auditorios / Teatros"
-            return None
-
-        tip9 = mapping.get(uso) or (_auto_tipologia_tabla9(uso) if todo_aire_activo else None)
-        todoaire_lsm2 = None
-        if todo_aire_activo:
-            if tip9:
-                try:
-                    todoaire_lsm2 = TABLA_9_TODO_AIRE_LS_M2[tip9][expos][nivel]
-                    if todoaire_lsm2 is None:
-                        warnings.append(WarningItem("Todo-aire", zona, f"Tabla 9 no aporta valor para '{tip9}' en exposición '{expos}' y nivel '{nivel}'."))
-                except Exception:
-                    warnings.append(WarningItem("Todo-aire", zona, f"Error consultando Tabla 9 para tipología '{tip9}'."))
-            else:
-                warnings.append(WarningItem("Todo-aire", zona, f"Uso '{uso}' no mapeado a Tabla 9. Selecciona tipología en la página de Ventilación/Todo-aire."))
-
-        todoaire_lps = (todoaire_lsm2 * area) if (todoaire_lsm2 is not None) else np.nan
-
-        if vent_lps==vent_lps:
-            total_vent_lps += float(vent_lps)
-        if todoaire_lps==todoaire_lps:
-            total_todoaire_lps += float(todoaire_lps)
-
-        out_rows.append({
-            "ID": r.get("ID"),
-            "Zona": zona,
-            "Uso": uso,
-            "Superficie (m²)": area,
-            "Nivel": nivel,
-            "Exposición": expos,
-            "Ventilación (L/s·m²)": vent_lsm2,
-            "Ventilación total (L/s)": vent_lps,
-            "Tipología Tabla 9": tip9,
-            "Todo-aire (L/s·m²)": todoaire_lsm2,
-            "Todo-aire total (L/s)": todoaire_lps,
+        return parking_spaces * parking_supply_lps_per, parking_spaces * parking_extract_lps_per, None
+    # Si hay bajo rasante, avisar para que indiquen plazas (si aplica garaje)
+    if gfa_below > 0:
+        return 0.0, 0.0, "Indica nº de plazas de parking para calcular ventilación de garaje (CTE)."
+    return 0.0, 0.0, None
+
+def totals_climatizacion(frio_kw: float, calor_kw: float, settings: Dict[str, Any],
+                         simult: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """`simult`: resultado de `diversity.simultaneidad`; si se da, los generadores usan la punta coincidente."""
+    oversize_frio = float(settings.get("oversize_frio", 1.00))
+    oversize_calor = float(settings.get("oversize_calor", 1.10))
+    totals: Dict[str, Any] = {
+        "frio_total_kw": frio_kw,
+        "calor_total_kw": calor_kw,
+        "frio_generador_kw": frio_kw*oversize_frio,
+        "calor_generador_kw": calor_kw*oversize_calor,
+    }
+    if simult:
+        frio_c, calor_c = simult["Frío"]["coincidente_kw"], simult["Calor"]["coincidente_kw"]
+        totals.update({
+            "frio_coincidente_kw": frio_c,
+            "calor_coincidente_kw": calor_c,
+            "fs_frio": simult["Frío"]["factor"],
+            "fs_calor": simult["Calor"]["factor"],
+            "frio_punta_momento": simult["Frío"]["momento"] or "",
+            "calor_punta_momento": simult["Calor"]["momento"] or "",
+            "frio_generador_kw": frio_c*oversize_frio,
+            "calor_generador_kw": calor_c*oversize_calor,
         })
+    return totals
 
-    res = pd.DataFrame(out_rows)
+def totals_ventilacion(vent_lps: float, todoaire_lps: float, settings: Dict[str, Any]) -> Dict[str, float]:
+    parking_supply_lps, parking_extract_lps, _ = parking_ventilacion(settings)
 
     # Totales: mantener separada la ventilación de sobre rasante (Tabla 10) y la extracción de garaje (CTE HS 3).
-    vent_sobre_rasante_lps = total_vent_lps
+    vent_sobre_rasante_lps = vent_lps
     vent_sobre_rasante_m3h = vent_sobre_rasante_lps * 3.6
 
-    totals = {
+    return {
         # Alias para compatibilidad: "vent_total_*" = sobre rasante (NO incluye garaje)
         "vent_total_lps": vent_sobre_rasante_lps,
         "vent_total_m3h": vent_sobre_rasante_m3h,
@@ -308,13 +153,455 @@ def calc_ventilacion_y_todo_aire(zones_df: pd.DataFrame, settings: Dict[str, Any
         "vent_garaje_aporte_m3h": parking_supply_lps * 3.6,
         "vent_garaje_extraccion_m3h": parking_extract_lps * 3.6,
 
-        "todoaire_total_lps": total_todoaire_lps,
-        "todoaire_total_m3h": total_todoaire_lps * 3.6,
+        "todoaire_total_lps": todoaire_lps,
+        "todoaire_total_m3h": todoaire_lps * 3.6,
+    }
+
+def totals_electricidad(normal_kw: float, comp_kw: float, simult: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """`simult`: resultado de `diversity.simultaneidad`; si se da, BT/MT se decide con la punta coincidente."""
+    normal_c = simult["Eléctrica"]["coincidente_kw"] if simult else normal_kw
+    # criterio BT/MT del documento
+    acometida = "BT" if normal_c < 400 else "MT"
+    totals: Dict[str, Any] = {
+        "potencia_normal_kw": normal_kw,
+        "potencia_comp_kw": comp_kw,
+        "potencia_total_kw": normal_kw + comp_kw,
+        "acometida_sugerida": acometida,
+        "nota_reserva_compania": "Conviene prever reserva de espacio si P>100 kW (texto del documento).",
+    }
+    if simult:
+        totals.update({
+            "potencia_normal_coincidente_kw": normal_c,
+            "potencia_total_coincidente_kw": normal_c + comp_kw,
+            "fs_electrica": simult["Eléctrica"]["factor"],
+            "electrica_punta_momento": simult["Eléctrica"]["momento"] or "",
+        })
+    return totals
+
+def totals_agua(agua_l_dia: float, acs_l_dia: float, acs_kw: float) -> Dict[str, float]:
+    return {
+        "agua_fria_total_L_dia": agua_l_dia,
+        "agua_fria_total_m3_dia": agua_l_dia/1000.0,
+        "acs_total_L_dia": acs_l_dia,
+        "acs_total_m3_dia": acs_l_dia/1000.0,
+        "acs_potencia_total_kw": acs_kw,
+    }
+
+def totals_reservas(area_m2: float, global_min_m2: float, global_max_m2: float) -> Dict[str, float]:
+    return {
+        "superficie_total_m2": area_m2,
+        "reserva_global_min_m2": global_min_m2,
+        "reserva_global_max_m2": global_max_m2,
     }
+
+def categoria_global(df: pd.DataFrame) -> pd.Series:
+    """
+    Categoría de Tabla 1 por zona (object): la columna 'Categoría global (Tabla 1)' y, si
+    falta o está vacía, la del mapeo por defecto del uso. `df` debe estar normalizado.
+    """
+    cat_override_col = "Categoría global (Tabla 1)"
+    backfill = df["Uso"].astype(object).map(USO_A_CATEGORIA_GLOBAL)
+    # If missing, create from default mapping; if present but empty/NaN, backfill from default mapping.
+    if cat_override_col not in df.columns:
+        return backfill
+    col = df[cat_override_col].astype(object)
+    # treat NaN / empty strings as missing
+    missing_mask = col.isna() | (col.astype(str).str.strip() == "") | (col.astype(str).str.strip().str.lower() == "nan")
+    col = col.copy()
+    col[missing_mask] = backfill[missing_mask]
+    return col
+
+def reservas_por_zona(df: pd.DataFrame) -> pd.DataFrame:
+    """Superficie y reserva global mín./máx. (Tabla 1) de cada zona. `df` debe estar normalizado."""
+    import pandas as pd
+    cat = categoria_global(df)
+    pmin = cat.map(lambda c: TABLA_1_ESPACIO_GLOBAL[c][0] if c in TABLA_1_ESPACIO_GLOBAL else 0.0).astype(float)
+    pmax = cat.map(lambda c: TABLA_1_ESPACIO_GLOBAL[c][1] if c in TABLA_1_ESPACIO_GLOBAL else 0.0).astype(float)
+    area = df["Superficie (m²)"].fillna(0.0)
+    return pd.DataFrame({"Superficie (m²)": area, "Reserva global mín. (m²)": area*pmin/100.0, "Reserva global máx. (m²)": area*pmax/100.0})
+
+def fila_reservas(r: Any) -> Dict[str, float]:
+    """Como `reservas_por_zona` para una sola fila normalizada."""
+    import pandas as pd
+    cat = r.get("Categoría global (Tabla 1)")
+    if cat is None or cat is pd.NA or cat != cat or str(cat).strip() == "" or str(cat).strip().lower() == "nan":
+        cat = USO_A_CATEGORIA_GLOBAL.get(r.get("Uso"))
+    pmin, pmax = TABLA_1_ESPACIO_GLOBAL.get(cat, (0.0, 0.0)) if cat is not None else (0.0, 0.0)
+    area = nz(to_float(r.get("Superficie (m²)")))
+    return {"Superficie (m²)": area, "Reserva global mín. (m²)": area*pmin/100.0, "Reserva global máx. (m²)": area*pmax/100.0}
+
+# -----------------------------
+# Normalización DF
+# -----------------------------
+@perf.timed("normalize_zones_df")
+def normalize_zones_df(zones_df: pd.DataFrame) -> pd.DataFrame:
+    import pandas as pd
+    from .schema import parse_numeric, NUMERIC_COLUMNS
+    # copia superficial: solo se reasignan columnas completas, la tabla original no se modifica
+    df = zones_df.copy(deep=False)
+    if "ID" not in df.columns:
+        df.insert(0, "ID", range(1, len(df)+1))
+    # normalizar magnitudes por columnas (coma decimal, miles, vacíos); las columnas ya
+    # float64 no se reprocesan y los bucles por zona reciben floats (NaN = sin dato)
+    for c in NUMERIC_COLUMNS:
+        if c != "ID" and c in df.columns:
+            df[c] = parse_numeric(df[c])
+    area = df["Superficie (m²)"]
+    dens = df["Densidad (pers/m²)"] if "Densidad (pers/m²)" in df.columns else pd.Series(np.nan, index=df.index)
+    pers = df["Personas"].fillna(0.0) if "Personas" in df.columns else pd.Series(0.0, index=df.index)
+    df["Personas_calc"] = np.where((dens > 0) & (area > 0), dens * area, pers)
+    return df
+
+# -----------------------------
+# Cálculo por zona (compartido con core.incremental)
+# -----------------------------
+# Cada función recibe una fila normalizada (Series o dict) y devuelve la fila de resultados
+# de su módulo; los avisos se añaden a `warnings`.
+def fila_climatizacion(r: Any, warnings: List[WarningItem]) -> Dict[str, Any]:
+    zona = _zone_name(r)
+    uso = str(r.get("Uso", "")).strip()
+    nivel = str(r.get("Nivel carga (B/M/A)", "M")).strip() or "M"
+    clima = str(r.get("Zona climática", "")).strip()
+    area = nz(to_float(r.get("Superficie (m²)")))
+
+    # frío
+    frio_override = _get_override(r, "Frío override (W/m²)")
+    frio_base = None
+    if frio_override is not None:
+        frio_base = frio_override
+    else:
+        if uso in TABLA_5_FRIO_W_M2 and nivel in TABLA_5_FRIO_W_M2[uso]:
+            frio_base = TABLA_5_FRIO_W_M2[uso][nivel]
+        else:
+            warnings.append(WarningItem("Climatización", zona, f"Sin dato de frío para uso '{uso}' (Tabla 5). Usa override."))
+    factor_frio = TABLA_6_FACTOR_FRIO.get(clima)
+    if factor_frio is None:
+        warnings.append(WarningItem("Climatización", zona, f"Zona climática '{clima}' no encontrada en Tabla 6 (frío)."))
+        factor_frio = np.nan
+
+    frio_wm2 = (frio_base * factor_frio) if (frio_base is not None and factor_frio==factor_frio) else np.nan
+    frio_w = frio_wm2 * area if frio_wm2==frio_wm2 else np.nan
+
+    # calor
+    calor_override = _get_override(r, "Calor override (W/m²)")
+    calor_base = None
+    if calor_override is not None:
+        calor_base = calor_override
+    else:
+        if uso in TABLA_7_CALOR_W_M2 and nivel in TABLA_7_CALOR_W_M2[uso]:
+            calor_base = TABLA_7_CALOR_W_M2[uso][nivel]
+        else:
+            warnings.append(WarningItem("Climatización", zona, f"Sin dato de calor para uso '{uso}' (Tabla 7). Usa override."))
+
+    factor_calor, aviso = _factor_calor_por_zona(clima)
+    if aviso:
+        warnings.append(WarningItem("Climatización", zona, aviso))
+    if factor_calor is None:
+        factor_calor = np.nan
+
+    calor_wm2 = (calor_base * factor_calor) if (calor_base is not None and factor_calor==factor_calor) else np.nan
+    calor_w = calor_wm2 * area if calor_wm2==calor_wm2 else np.nan
+
+    return {
+        "ID": r.get("ID"),
+        "Zona": zona,
+        "Uso": uso,
+        "Superficie (m²)": area,
+        "Zona climática": clima,
+        "Nivel": nivel,
+        "Frío base (W/m²)": frio_base,
+        "Factor frío (Tabla 6)": factor_frio,
+        "Frío (W/m²)": frio_wm2,
+        "Potencia frío (kW)": (frio_w/1000.0) if frio_w==frio_w else np.nan,
+        "Calor base (W/m²)": calor_base,
+        "Factor calor (Tabla 8)": factor_calor,
+        "Calor (W/m²)": calor_wm2,
+        "Potencia calor (kW)": (calor_w/1000.0) if calor_w==calor_w else np.nan,
+    }
+
+def _auto_tipologia_tabla9(u: str) -> Optional[str]:
+    uu = (u or "").strip()
+    if uu in TABLA_9_TODO_AIRE_LS_M2:
+        return uu
+    # heurísticos para usos habituales
+    if uu == "Oficinas":
+        return "Oficinas - Espacio abierto"
+    if uu == "Hoteles":
+        return "Hoteles (habitaciones)"
+    if uu in ("Museos", "Bibliotecas"):
+        return "Museos / Bibliotecas"
+    if uu in ("Auditorios", "Teatros"):
+        return "Auditorios / Teatros"
+    return None
+
+def fila_ventilacion(r: Any, settings: Dict[str, Any], warnings: List[WarningItem]) -> Dict[str, Any]:
+    zona = _zone_name(r)
+    uso = str(r.get("Uso", "")).strip()
+    nivel = str(r.get("Nivel carga (B/M/A)", "M")).strip() or "M"
+    expos = str(r.get("Exposición (E/S/W, N, Interior)", "Interior")).strip() or "Interior"
+    area = nz(to_float(r.get("Superficie (m²)")))
+
+    # Ventilación exterior (Tabla 10)
+    vent_override = _get_override(r, "Ventilación override (L/s·m²)")
+    vent_lsm2 = None
+    if vent_override is not None:
+        vent_lsm2 = vent_override
+    else:
+        vent_lsm2 = TABLA_10_VENTILACION_LS_M2.get(uso)
+        if vent_lsm2 is None:
+            warnings.append(WarningItem("Ventilación", zona, f"Sin dato de ventilación para uso '{uso}' (Tabla 10). Usa override."))
+    vent_lps = (vent_lsm2 * area) if vent_lsm2 is not None else np.nan
+    # Todo-aire (Tabla 9)
+    # Mapear el uso a la tipología de Tabla 9 (si aplica)
+    todo_aire_activo = bool(settings.get("todo_aire_activo", False))
+    mapping = settings.get("mapa_uso_tabla9", {}) or {}
+
+    tip9 = mapping.get(uso) or (_auto_tipologia_tabla9(uso) if todo_aire_activo else None)
+    todoaire_lsm2 = None
+    if todo_aire_activo:
+        if tip9:
+            try:
+                todoaire_lsm2 = TABLA_9_TODO_AIRE_LS_M2[tip9][expos][nivel]
+                if todoaire_lsm2 is None:
+                    warnings.append(WarningItem("Todo-aire", zona, f"Tabla 9 no aporta valor para '{tip9}' en exposición '{expos}' y nivel '{nivel}'."))
+            except Exception:
+                warnings.append(WarningItem("Todo-aire", zona, f"Error consultando Tabla 9 para tipología '{tip9}'."))
+        else:
+            warnings.append(WarningItem("Todo-aire", zona, f"Uso '{uso}' no mapeado a Tabla 9. Selecciona tipología en la página de Ventilación/Todo-aire."))
+
+    todoaire_lps = (todoaire_lsm2 * area) if (todoaire_lsm2 is not None) else np.nan
+
+    return {
+        "ID": r.get("ID"),
+        "Zona": zona,
+        "Uso": uso,
+        "Superficie (m²)": area,
+        "Nivel": nivel,
+        "Exposición": expos,
+        "Ventilación (L/s·m²)": vent_lsm2,
+        "Ventilación total (L/s)": vent_lps,
+        "Tipología Tabla 9": tip9,
+        "Todo-aire (L/s·m²)": todoaire_lsm2,
+        "Todo-aire total (L/s)": todoaire_lps,
+    }
+
+def fila_electricidad(r: Any, warnings: List[WarningItem]) -> Dict[str, Any]:
+    zona = _zone_name(r)
+    uso = str(r.get("Uso", "")).strip()
+    area = nz(to_float(r.get("Superficie (m²)")))
+    comp = bool(r.get("Suministro complementario", False))
+
+    # normal
+    e_override = _get_override(r, "Eléctrica override (W/m²)")
+    w_m2 = e_override if e_override is not None else TABLA_11_ELECTRICA_W_M2.get(uso)
+    if w_m2 is None:
+        warnings.append(WarningItem("Electricidad", zona, f"Sin potencia específica para uso '{uso}' (Tabla 11). Usa override."))
+    p_kw = (w_m2 * area)/1000.0 if w_m2 is not None else np.nan
+
+    # complementario
+    ec_override = _get_override(r, "Eléctrica comp. override (W/m²)")
+    wc_m2 = None
+    if comp:
+        wc_m2 = ec_override if ec_override is not None else TABLA_12_ELECTRICA_COMP_W_M2.get(uso)
+        if wc_m2 is None:
+            warnings.append(WarningItem("Electricidad", zona, f"Complementario activado pero sin dato para '{uso}' (Tabla 12). Usa override."))
+    p_comp_kw = (wc_m2 * area)/1000.0 if wc_m2 is not None else 0.0
+
+    return {
+        "ID": r.get("ID"),
+        "Zona": zona,
+        "Uso": uso,
+        "Superficie (m²)": area,
+        "W/m² normal": w_m2,
+        "Potencia normal (kW)": p_kw,
+        "Complementario": comp,
+        "W/m² comp": wc_m2 if comp else None,
+        "Potencia comp (kW)": p_comp_kw if comp else 0.0,
+    }
+
+def _auto_key_tabla13(u: str) -> Optional[str]:
+    uu = (u or "").strip()
+    if uu in TABLA_13_AGUA_FRIA_L_DIA:
+        return uu
+    if uu == "Oficinas":
+        return "Oficinas sin cafetería"
+    if uu == "Enseñanza (aularios)":
+        return "Escuelas, institutos"
+    if uu.startswith("Hospitales"):
+        return "Hospitales"
+    if uu == "Hoteles":
+        return "Hoteles media categoría"
+    if "Restaur" in uu or "Cafeter" in uu:
+        return "Restaurantes"
+    return None
+
+def _auto_key_tabla14(u: str) -> Optional[str]:
+    uu = (u or "").strip()
+    if uu in TABLA_14_ACS:
+        return uu
+    if uu in ("Oficinas sin cafetería", "Oficinas con cafetería"):
+        return "Oficinas"
+    if uu == "Enseñanza (aularios)":
+        return "Escuelas, institutos"
+    if uu.startswith("Hospitales"):
+        return "Hospitales"
+    if uu == "Hoteles":
+        return "Hoteles media categoría"
+    if "Restaur" in uu or "Cafeter" in uu:
+        return "Restaurantes"
+    return None
+
+def fila_agua_y_acs(r: Any, settings: Dict[str, Any], warnings: List[WarningItem]) -> Dict[str, Any]:
+    # mapeo simple uso->fila tabla 13/14 (editable)
+    map_agua = settings.get("mapa_uso_tabla13", {})
+    map_acs = settings.get("mapa_uso_tabla14", {})
+
+    zona = _zone_name(r)
+    uso = str(r.get("Uso", "")).strip()
+    unidad, n = _calc_unidades_ocupacion(r)
+    # Agua fría (Tabla 13)
+    key13 = map_agua.get(uso) or _auto_key_tabla13(uso)
+    agua_l = np.nan
+    if key13:
+        unit13, val13 = TABLA_13_AGUA_FRIA_L_DIA.get(key13, (None, None))
+        if unit13 is None:
+            warnings.append(WarningItem("Agua", zona, f"Mapeo a Tabla 13 inválido: '{key13}'."))
+        else:
+            # comprobar unidad
+            if unit13.endswith("/persona") and unidad != "persona":
+                warnings.append(WarningItem("Agua", zona, f"Tabla 13 '{key13}' usa persona, pero la zona tiene '{unidad}'. Se usa Personas_calc."))
+                n_use = nz(r.get("Personas_calc"))
+            elif unit13.endswith("/cama") and unidad != "cama":
+                warnings.append(WarningItem("Agua", zona, f"Tabla 13 '{key13}' usa cama, pero la zona no informa camas."))
+                n_use = n
+            elif unit13.endswith("/cubierto") and unidad != "cubierto":
+                warnings.append(WarningItem("Agua", zona, f"Tabla 13 '{key13}' usa cubierto, pero la zona no informa cubiertos/día."))
+                n_use = n
+            else:
+                n_use = n
+            agua_l = float(val13) * float(n_use)
+    else:
+        warnings.append(WarningItem("Agua", zona, f"Uso '{uso}' no mapeado a Tabla 13. Selecciona tipología en la página de Agua/ACS."))
+    # ACS (Tabla 14)
+    key14 = map_acs.get(uso) or _auto_key_tabla14(uso)
+    acs_l = np.nan
+    acs_kw = np.nan
+    if key14:
+        rec = TABLA_14_ACS.get(key14)
+        if not rec:
+            warnings.append(WarningItem("ACS", zona, f"Mapeo a Tabla 14 inválido: '{key14}'."))
+        else:
+            unit_l, val_l, unit_kw, val_kw = rec
+            if unit_l.endswith("/persona") and unidad != "persona":
+                warnings.append(WarningItem("ACS", zona, f"Tabla 14 '{key14}' usa persona, pero la zona tiene '{unidad}'. Se usa Personas_calc."))
+                n_use = nz(r.get("Personas_calc"))
+            else:
+                n_use = n
+            acs_l = float(val_l) * float(n_use)
+            acs_kw = float(val_kw) * float(n_use)
+    else:
+        warnings.append(WarningItem("ACS", zona, f"Uso '{uso}' no mapeado a Tabla 14. Selecciona tipología en la página de Agua/ACS."))
+
+    return {
+        "ID": r.get("ID"),
+        "Zona": zona,
+        "Uso": uso,
+        "Unidad ocupación": unidad,
+        "Cantidad": n,
+        "Agua fría tipología (Tabla 13)": key13,
+        "Agua fría (L/día)": agua_l,
+        "ACS tipología (Tabla 14)": key14,
+        "ACS (L/día)": acs_l,
+        "Potencia ACS (kW)": acs_kw,
+    }
+
+# -----------------------------
+# Cálculos por módulo
+# -----------------------------
+@perf.timed("calc_climatizacion")
+def calc_climatizacion(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem], Dict[str, float]]:
+    """
+    Devuelve:
+      - df con resultados por zona (frío y calor)
+      - warnings
+      - totales (kW)
+    """
+    import pandas as pd
+    df = normalize_zones_df(zones_df)
+    warnings: List[WarningItem] = []
+
+    out_rows = []
+    total_frio_kw = 0.0
+    total_calor_kw = 0.0
+
+    with perf.span("clima.zonas"):
+        for _, r in df.iterrows():
+            fila = fila_climatizacion(r, warnings)
+            if fila["Potencia frío (kW)"]==fila["Potencia frío (kW)"]:
+                total_frio_kw += float(fila["Potencia frío (kW)"])
+            if fila["Potencia calor (kW)"]==fila["Potencia calor (kW)"]:
+                total_calor_kw += float(fila["Potencia calor (kW)"])
+            out_rows.append(fila)
+
+    with perf.span("clima.dataframe"):
+        res = pd.DataFrame(out_rows)
+    simult = None
+    if settings.get("simultaneidad_activa"):
+        with perf.span("clima.simultaneidad"):
+            simult = simultaneidad(df, {"Frío": res.get("Potencia frío (kW)"), "Calor": res.get("Potencia calor (kW)")}, settings)
+    totals = totals_climatizacion(total_frio_kw, total_calor_kw, settings, simult)
+    with perf.span("clima.cubo"):
+        totals["cubo"] = build_cube(df, {
+            "Superficie (m²)": df["Superficie (m²)"],
+            "Personas": df["Personas_calc"],
+            "Potencia frío (kW)": res.get("Potencia frío (kW)"),
+            "Potencia calor (kW)": res.get("Potencia calor (kW)"),
+        })
     return res, warnings, totals
 
+@perf.timed("calc_ventilacion_y_todo_aire")
+def calc_ventilacion_y_todo_aire(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem], Dict[str, float]]:
+    """
+    Ventilación exterior (Tabla 10) y caudal tratado para sistemas todo-aire (Tabla 9).
+    """
+    import pandas as pd
+    df = normalize_zones_df(zones_df)
+    warnings: List[WarningItem] = []
+
+    total_vent_lps = 0.0
+    total_todoaire_lps = 0.0
 
+    _, _, aviso = parking_ventilacion(settings)
+    if aviso:
+        warnings.append(WarningItem("Ventilación", "Bajo rasante", aviso))
+
+    out_rows = []
+    with perf.span("vent.zonas"):
+        for _, r in df.iterrows():
+            fila = fila_ventilacion(r, settings, warnings)
+            if fila["Ventilación total (L/s)"]==fila["Ventilación total (L/s)"]:
+                total_vent_lps += float(fila["Ventilación total (L/s)"])
+            if fila["Todo-aire total (L/s)"]==fila["Todo-aire total (L/s)"]:
+                total_todoaire_lps += float(fila["Todo-aire total (L/s)"])
+            out_rows.append(fila)
+
+    with perf.span("vent.dataframe"):
+        res = pd.DataFrame(out_rows)
+
+    totals = totals_ventilacion(total_vent_lps, total_todoaire_lps, settings)
+    with perf.span("vent.cubo"):
+        totals["cubo"] = build_cube(df, {
+            "Superficie (m²)": df["Superficie (m²)"],
+            "Personas": df["Personas_calc"],
+            "Ventilación total (L/s)": res.get("Ventilación total (L/s)"),
+            "Todo-aire total (L/s)": res.get("Todo-aire total (L/s)"),
+        })
+    return res, warnings, totals
+
+
+@perf.timed("calc_electricidad")
 def calc_electricidad(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem], Dict[str, Any]]:
+    import pandas as pd
     df = normalize_zones_df(zones_df)
     warnings: List[WarningItem] = []
     out_rows = []
@@ -322,58 +609,29 @@ def calc_electricidad(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple
     total_kw = 0.0
     total_comp_kw = 0.0
 
-    for _, r in df.iterrows():
-        zona = _zone_name(r)
-        uso = str(r.get("Uso", "")).strip()
-        area = nz(to_float(r.get("Superficie (m²)")))
-        comp = bool(r.get("Suministro complementario", False))
-
-        # normal
-        e_override = _get_override(r, "Eléctrica override (W/m²)")
-        w_m2 = e_override if e_override is not None else TABLA_11_ELECTRICA_W_M2.get(uso)
-        if w_m2 is None:
-            warnings.append(WarningItem("Electricidad", zona, f"Sin potencia específica para uso '{uso}' (Tabla 11). Usa override."))
-        p_kw = (w_m2 * area)/1000.0 if w_m2 is not None else np.nan
-
-        # complementario
-        ec_override = _get_override(r, "Eléctrica comp. override (W/m²)")
-        wc_m2 = None
-        if comp:
-            wc_m2 = ec_override if ec_override is not None else TABLA_12_ELECTRICA_COMP_W_M2.get(uso)
-            if wc_m2 is None:
-                warnings.append(WarningItem("Electricidad", zona, f"Complementario activado pero sin dato para '{uso}' (Tabla 12). Usa override."))
-        p_comp_kw = (wc_m2 * area)/1000.0 if wc_m2 is not None else 0.0
-
-        if p_kw==p_kw:
-            total_kw += float(p_kw)
-        if p_comp_kw==p_comp_kw:
-            total_comp_kw += float(p_comp_kw)
-
-        out_rows.append({
-            "ID": r.get("ID"),
-            "Zona": zona,
-            "Uso": uso,
-            "Superficie (m²)": area,
-            "W/m² normal": w_m2,
-            "Potencia normal (kW)": p_kw,
-            "Complementario": comp,
-            "W/m² comp": wc_m2 if comp else None,
-            "Potencia comp (kW)": p_comp_kw if comp else 0.0,
+    with perf.span("ele.zonas"):
+        for _, r in df.iterrows():
+            fila = fila_electricidad(r, warnings)
+            if fila["Potencia normal (kW)"]==fila["Potencia normal (kW)"]:
+                total_kw += float(fila["Potencia normal (kW)"])
+            total_comp_kw += float(fila["Potencia comp (kW)"])
+            out_rows.append(fila)
+
+    with perf.span("ele.dataframe"):
+        res = pd.DataFrame(out_rows)
+
+    simult = None
+    if settings.get("simultaneidad_activa"):
+        with perf.span("ele.simultaneidad"):
+            simult = simultaneidad(df, {"Eléctrica": res.get("Potencia normal (kW)")}, settings)
+    totals: Dict[str, Any] = totals_electricidad(total_kw, total_comp_kw, simult)
+    with perf.span("ele.cubo"):
+        totals["cubo"] = build_cube(df, {
+            "Superficie (m²)": df["Superficie (m²)"],
+            "Potencia normal (kW)": res.get("Potencia normal (kW)"),
+            "Potencia comp (kW)": res.get("Potencia comp (kW)"),
         })
 
-    res = pd.DataFrame(out_rows)
-
-    # criterio BT/MT del documento
-    acometida = "BT" if total_kw < 400 else "MT"
-
-    totals: Dict[str, Any] = {
-        "potencia_normal_kw": total_kw,
-        "potencia_comp_kw": total_comp_kw,
-        "potencia_total_kw": total_kw + total_comp_kw,
-        "acometida_sugerida": acometida,
-        "nota_reserva_compania": "Conviene prever reserva de espacio si P>100 kW (texto del documento).",
-    }
-
     # módulo opcional motores (no proviene del documento, es ampliación)
     motors = settings.get("motores", [])
     if motors:
@@ -400,7 +658,9 @@ def calc_electricidad(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple
 
     return res, warnings, totals
 
+@perf.timed("calc_agua_y_acs")
 def calc_agua_y_acs(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem], Dict[str, float]]:
+    import pandas as pd
     df = normalize_zones_df(zones_df)
     warnings: List[WarningItem] = []
     out_rows = []
@@ -409,139 +669,43 @@ def calc_agua_y_acs(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple[p
     total_acs_l_dia = 0.0
     total_acs_kw = 0.0
 
-    # mapeo simple uso->fila tabla 13/14 (editable)
-    map_agua = settings.get("mapa_uso_tabla13", {})
-    map_acs = settings.get("mapa_uso_tabla14", {})
-
-    for _, r in df.iterrows():
-        zona = _zone_name(r)
-        uso = str(r.get("Uso", "")).strip()
-        unidad, n = _calc_unidades_ocupacion(r)
-        # Agua fría (Tabla 13)
-        def _auto_key_tabla13(u: str) -> Optional[str]:
-            uu = (u or "").strip()
-            if uu in TABLA_13_AGUA_FRIA_L_DIA:
-                return uu
-            if uu == "Oficinas":
-                return "Oficinas sin cafetería"
-            if uu == "Enseñanza (aularios)":
-                return "Escuelas, institutos"
-            if uu.startswith("Hospitales"):
-                return "Hospitales"
-            if uu == "Hoteles":
-                return "Hoteles media categoría"
-            if "Restaur" in uu or "Cafeter" in uu:
-                return "Restaurantes"
-            return None
-
-        key13 = map_agua.get(uso) or _auto_key_tabla13(uso)
-        agua_l = np.nan
-        if key13:
-            unit13, val13 = TABLA_13_AGUA_FRIA_L_DIA.get(key13, (None, None))
-            if unit13 is None:
-                warnings.append(WarningItem("Agua", zona, f"Mapeo a Tabla 13 inválido: '{key13}'."))
-            else:
-                # comprobar unidad
-                if unit13.endswith("/persona") and unidad != "persona":
-                    warnings.append(WarningItem("Agua", zona, f"Tabla 13 '{key13}' usa persona, pero la zona tiene '{unidad}'. Se usa Personas_calc."))
-                    n_use = nz(r.get("Personas_calc"))
-                elif unit13.endswith("/cama") and unidad != "cama":
-                    warnings.append(WarningItem("Agua", zona, f"Tabla 13 '{key13}' usa cama, pero la zona no informa camas."))
-                    n_use = n
-                elif unit13.endswith("/cubierto") and unidad != "cubierto":
-                    warnings.append(WarningItem("Agua", zona, f"Tabla 13 '{key13}' usa cubierto, pero la zona no informa cubiertos/día."))
-                    n_use = n
-                else:
-                    n_use = n
-                agua_l = float(val13) * float(n_use)
-        else:
-            warnings.append(WarningItem("Agua", zona, f"Uso '{uso}' no mapeado a Tabla 13. Selecciona tipología en la página de Agua/ACS."))
-        # ACS (Tabla 14)
-        def _auto_key_tabla14(u: str) -> Optional[str]:
-            uu = (u or "").strip()
-            if uu in TABLA_14_ACS:
-                return uu
-            if uu in ("Oficinas sin cafetería", "Oficinas con cafetería"):
-                return "Oficinas"
-            if uu == "Enseñanza (aularios)":
-                return "Escuelas, institutos"
-            if uu.startswith("Hospitales"):
-                return "Hospitales"
-            if uu == "Hoteles":
-                return "Hoteles media categoría"
-            if "Restaur" in uu or "Cafeter" in uu:
-                return "Restaurantes"
-            return None
-
-        key14 = map_acs.get(uso) or _auto_key_tabla14(uso)
-        acs_l = np.nan
-        acs_kw = np.nan
-        if key14:
-            rec = TABLA_14_ACS.get(key14)
-            if not rec:
-                warnings.append(WarningItem("ACS", zona, f"Mapeo a Tabla 14 inválido: '{key14}'."))
-            else:
-                unit_l, val_l, unit_kw, val_kw = rec
-                if unit_l.endswith("/persona") and unidad != "persona":
-                    warnings.append(WarningItem("ACS", zona, f"Tabla 14 '{key14}' usa persona, pero la zona tiene '{unidad}'. Se usa Personas_calc."))
-                    n_use = nz(r.get("Personas_calc"))
-                else:
-                    n_use = n
-                acs_l = float(val_l) * float(n_use)
-                acs_kw = float(val_kw) * float(n_use)
-        else:
-            warnings.append(WarningItem("ACS", zona, f"Uso '{uso}' no mapeado a Tabla 14. Selecciona tipología en la página de Agua/ACS."))
-
-        if agua_l==agua_l:
-            total_agua_l_dia += float(agua_l)
-        if acs_l==acs_l:
-            total_acs_l_dia += float(acs_l)
-        if acs_kw==acs_kw:
-            total_acs_kw += float(acs_kw)
-
-        out_rows.append({
-            "ID": r.get("ID"),
-            "Zona": zona,
-            "Uso": uso,
-            "Unidad ocupación": unidad,
-            "Cantidad": n,
-            "Agua fría tipología (Tabla 13)": key13,
-            "Agua fría (L/día)": agua_l,
-            "ACS tipología (Tabla 14)": key14,
-            "ACS (L/día)": acs_l,
-            "Potencia ACS (kW)": acs_kw,
+    with perf.span("agua.zonas"):
+        for _, r in df.iterrows():
+            fila = fila_agua_y_acs(r, settings, warnings)
+            if fila["Agua fría (L/día)"]==fila["Agua fría (L/día)"]:
+                total_agua_l_dia += float(fila["Agua fría (L/día)"])
+            if fila["ACS (L/día)"]==fila["ACS (L/día)"]:
+                total_acs_l_dia += float(fila["ACS (L/día)"])
+            if fila["Potencia ACS (kW)"]==fila["Potencia ACS (kW)"]:
+                total_acs_kw += float(fila["Potencia ACS (kW)"])
+            out_rows.append(fila)
+
+    with perf.span("agua.dataframe"):
+        res = pd.DataFrame(out_rows)
+    totals = totals_agua(total_agua_l_dia, total_acs_l_dia, total_acs_kw)
+    with perf.span("agua.cubo"):
+        totals["cubo"] = build_cube(df, {
+            "Personas": df["Personas_calc"],
+            "Agua fría (L/día)": res.get("Agua fría (L/día)"),
+            "ACS (L/día)": res.get("ACS (L/día)"),
+            "Potencia ACS (kW)": res.get("Potencia ACS (kW)"),
         })
-
-    res = pd.DataFrame(out_rows)
-    totals = {
-        "agua_fria_total_L_dia": total_agua_l_dia,
-        "agua_fria_total_m3_dia": total_agua_l_dia/1000.0,
-        "acs_total_L_dia": total_acs_l_dia,
-        "acs_total_m3_dia": total_acs_l_dia/1000.0,
-        "acs_potencia_total_kw": total_acs_kw,
-    }
     return res, warnings, totals
 
+@perf.timed("calc_reservas_espacios")
 def calc_reservas_espacios(zones_df: pd.DataFrame, settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem], Dict[str, Any]]:
     """
     Estima reservas de espacio:
     - Global (Tabla 1), ponderando por uso/categoría
     - Por instalación (Tabla 2), según selección de sistemas
     """
+    import pandas as pd
     df = normalize_zones_df(zones_df)
     warnings: List[WarningItem] = []
 
     # categoría global por zona
     cat_override_col = "Categoría global (Tabla 1)"
-    # If missing, create from default mapping; if present but empty/NaN, backfill from default mapping.
-    if cat_override_col not in df.columns:
-        df[cat_override_col] = df["Uso"].map(USO_A_CATEGORIA_GLOBAL)
-    else:
-        backfill = df["Uso"].map(USO_A_CATEGORIA_GLOBAL)
-        col = df[cat_override_col]
-        # treat NaN / empty strings as missing
-        missing_mask = col.isna() | (col.astype(str).str.strip() == "") | (col.astype(str).str.strip().str.lower() == "nan")
-        df.loc[missing_mask, cat_override_col] = backfill[missing_mask]
+    df[cat_override_col] = categoria_global(df)
 
     # total área
     total_area = float(df["Superficie (m²)"].fillna(0).sum())
@@ -580,14 +744,14 @@ def calc_reservas_espacios(zones_df: pd.DataFrame, settings: Dict[str, Any]) ->
             "m² max": total_area * pmax/100.0,
         })
 
-    res = pd.DataFrame(inst_rows)
-    totals = {
-        "superficie_total_m2": total_area,
-        "reserva_global_min_m2": global_min,
-        "reserva_global_max_m2": global_max,
-    }
+    with perf.span("espacios.dataframe"):
+        res = pd.DataFrame(inst_rows)
+    totals = totals_reservas(total_area, global_min, global_max)
+    with perf.span("espacios.cubo"):
+        totals["cubo"] = build_cube(df, reservas_por_zona(df))
     return res, warnings, totals
 
+@perf.timed("calc_pci")
 def calc_pci(settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem], Dict[str, float]]:
     """
     PCI (pre-dimensioning):
@@ -597,6 +761,7 @@ def calc_pci(settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem],
 
     Nota: Si el documento JG no proporciona ratios por m² para PCI, se aplican ratios "habituales" como valor por defecto.
     """
+    import pandas as pd
     warnings: List[WarningItem] = []
     out: List[Dict[str, Any]] = []
 
@@ -657,7 +822,8 @@ def calc_pci(settings: Dict[str, Any]) -> Tuple[pd.DataFrame, List[WarningItem],
     if gas_ext:
         out.append({"Sistema": "Extinción por gas (informativo)", "Caudal (L/s)": None, "Tiempo (h)": None, "Volumen reserva (m³)": None, "Modo caudal": None})
 
-    res = pd.DataFrame(out)
+    with perf.span("pci.dataframe"):
+        res = pd.DataFrame(out)
 
     totals: Dict[str, float] = {
         "pci_reserva_total_m3": float(round(v_total, 2)),
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Estimación de costes de ejecución (capex) a partir de los resultados del predimensionamiento.
+
+Precios del cuadro local `data/precios.csv` (una fila por partida: magnitud, unidad y
+precio unitario) y coeficientes regionales de `data/coeficientes_regionales.csv`. Las
+magnitudes por edificio (columna de agrupación) salen de las calculadoras:
+
+- frio_kw / calor_kw: potencias de climatización; aire_ls: todo-aire (Tabla 9) o, si no
+  aplica, ventilación (Tabla 10); electrica_kw: potencia normal + complementaria;
+- pci_m3: reserva de PCI del proyecto, repartida por superficie;
+- tabla2_m2: superficie × % de la Tabla 2 de cada instalación seleccionada (mín., media
+  o máx.).
+
+Todo se resuelve con arrays: matriz edificios × magnitudes (`np.add.at`), columnas
+por partida × escala (porcentaje de la Tabla 2) y capex = cantidades × precio unitario ×
+coeficiente regional del edificio. La cartera (varios edificios en la tabla de zonas, con
+su región en la columna `Región`) se calcula en la misma pasada.
+"""
+from __future__ import annotations
+
+import functools
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import perf
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+PRECIOS_CSV = DATA_DIR / "precios.csv"
+COEFICIENTES_CSV = DATA_DIR / "coeficientes_regionales.csv"
+
+# Magnitud -> unidad de la cantidad
+MAGNITUDES: Dict[str, str] = {
+    "frio_kw": "kW", "calor_kw": "kW", "aire_ls": "L/s", "electrica_kw": "kW", "pci_m3": "m³", "tabla2_m2": "m²",
+}
+RESERVAS = ["Mínima", "Media", "Máxima"]
+OPCIONES: Dict[str, Any] = {
+    "region": "Referencia", "columna_region": "Región", "agrupacion": "Edificio",
+    "reserva_tabla2": "Media", "precios": None, "coeficientes": None,
+}
+
+class PriceBook:
+    """Cuadro de precios en arrays paralelos (posición = partida) y coeficientes por región."""
+    def __init__(self, precios: "pd.DataFrame", coeficientes: "pd.DataFrame"):
+        import pandas as pd
+        p = precios[precios["magnitud"].isin(list(MAGNITUDES))].reset_index(drop=True)
+        self.magnitudes = p["magnitud"].astype(str).to_numpy()
+        self.instalaciones = np.where(self.magnitudes == "tabla2_m2", p["partida"].astype(str).to_numpy(), "")
+        self.partidas = np.array([f"Tabla 2: {i}" if t else str(n) for n, i, t in
+                                  zip(p["partida"].tolist(), self.instalaciones.tolist(), (self.magnitudes == "tabla2_m2").tolist())],
+                                 dtype=object)
+        self.unidades = p["unidad"].astype(str).to_numpy()
+        self.precios = pd.to_numeric(p["precio_eur"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+        self.regiones: Dict[str, float] = dict(zip(coeficientes["region"].astype(str).str.strip(),
+                                                   pd.to_numeric(coeficientes["factor"], errors="coerce").fillna(1.0)))
+
+    def factores(self, regiones: np.ndarray) -> np.ndarray:
+        """Coeficiente de cada región (NaN si no está en el cuadro)."""
+        return np.array([self.regiones.get(str(r).strip(), np.nan) for r in np.asarray(regiones).tolist()], dtype=float)
+
+    def frame(self) -> "pd.DataFrame":
+        import pandas as pd
+        return pd.DataFrame({"Partida": self.partidas, "Magnitud": self.magnitudes, "Unidad": self.unidades,
+                             "Precio unitario (€)": self.precios})
+
+def load_price_book(precios: Optional[Path] = None, coeficientes: Optional[Path] = None) -> PriceBook:
+    """Cuadro de precios desde CSV (por defecto los de `data/`), una vez por proceso y rutas."""
+    return _load_price_book(str(precios or PRECIOS_CSV), str(coeficientes or COEFICIENTES_CSV))
+
+@functools.lru_cache(maxsize=4)
+def _load_price_book(precios: str, coeficientes: str) -> PriceBook:
+    import pandas as pd
+    return PriceBook(pd.read_csv(precios), pd.read_csv(coeficientes))
+
+def capex(cantidades: np.ndarray, precios: np.ndarray, factores: np.ndarray) -> np.ndarray:
+    """
+    Coste de cada (… × edificio × partida): cantidades × precio unitario × coeficiente
+    regional del edificio. Admite dimensiones iniciales (p. ej. proyectos de una cartera).
+    """
+    return np.asarray(cantidades, dtype=float) * np.asarray(precios, dtype=float) * np.asarray(factores, dtype=float)[..., None]
+
+@perf.timed("calc_costes")
+def calc_costes(res_clima: "pd.DataFrame", res_vent: "pd.DataFrame", res_ele: "pd.DataFrame", res_esp: "pd.DataFrame",
+                totals_pci: Dict[str, Any], zones_df: "pd.DataFrame", settings: Dict[str, Any],
+                cuadro: Optional[PriceBook] = None) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `res_clima`, `res_vent`, `res_ele`: salidas por zona de `calc_climatizacion`,
+    `calc_ventilacion_y_todo_aire` y `calc_electricidad` (mismo orden que `zones_df`);
+    `res_esp`: instalaciones de la Tabla 2 de `calc_reservas_espacios`; `totals_pci`: de
+    `calc_pci`. Devuelve (una fila por edificio y partida con cantidad, avisos, totales
+    con totals["por_edificio"] y totals["por_partida"]).
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("costes", {}) or {})}
+    warnings: List[WarningItem] = []
+    pb = cuadro or load_price_book(o["precios"], o["coeficientes"])
+    n = len(res_clima)
+
+    def _col(df: "pd.DataFrame", c: str) -> np.ndarray:
+        return pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) if c in df.columns and len(df) == n else np.full(n, np.nan)
+    col = o["agrupacion"]
+    same = len(zones_df) == n
+    if same and col in zones_df.columns:
+        e = zones_df[col].fillna("").astype(str)
+        g = e.groupby(e, sort=False)
+        codes, grupos = g.ngroup().to_numpy(), [str(k) for k in g.groups.keys()]
+    else:
+        codes, grupos = np.zeros(n, dtype=np.int64), ["Edificio"]
+    nb = len(grupos)
+
+    with perf.span("costes.cantidades"):
+        area = np.nan_to_num(_col(res_clima, "Superficie (m²)"), nan=0.0)
+        todo, vent = _col(res_vent, "Todo-aire total (L/s)"), _col(res_vent, "Ventilación total (L/s)")
+        zonas = np.column_stack([
+            _col(res_clima, "Potencia frío (kW)"), _col(res_clima, "Potencia calor (kW)"),
+            np.where(np.isnan(todo), vent, todo),
+            np.nan_to_num(_col(res_ele, "Potencia normal (kW)"), nan=0.0) + np.nan_to_num(_col(res_ele, "Potencia comp (kW)"), nan=0.0),
+            area,
+        ])
+        zonas = np.nan_to_num(zonas, nan=0.0)
+        por_edif = np.zeros((nb, zonas.shape[1]))
+        if n:
+            np.add.at(por_edif, codes, zonas)
+        a_b = por_edif[:, 4]
+        a_tot = float(a_b.sum())
+        pci = float(totals_pci.get("pci_reserva_total_m3", 0.0) or 0.0)
+        pci_b = a_b / a_tot * pci if a_tot > 0 else np.full(nb, pci / nb)
+        # edificios × magnitudes (mismo orden que MAGNITUDES; tabla2_m2 = superficie)
+        mag = np.column_stack([por_edif[:, :4], pci_b, a_b])
+
+        # columnas por partida y escala (porcentaje de la Tabla 2 de las instalaciones seleccionadas)
+        k = {m: i for i, m in enumerate(MAGNITUDES)}
+        j = np.array([k[m] for m in pb.magnitudes.tolist()], dtype=np.int64)
+        pct = {}
+        if {"Instalación", "% min", "% max"} <= set(res_esp.columns):
+            ip = res_esp[["% min", "% max"]].to_numpy(dtype=float)
+            sel = {"Mínima": ip[:, 0], "Máxima": ip[:, 1]}.get(o["reserva_tabla2"], ip.mean(axis=1))
+            pct = dict(zip(res_esp["Instalación"].astype(str).tolist(), sel.tolist()))
+        escala = np.array([pct.get(i, 0.0) / 100.0 if m == "tabla2_m2" else 1.0
+                           for m, i in zip(pb.magnitudes.tolist(), pb.instalaciones.tolist())])
+        cantidades = mag[:, j] * escala  # edificios × partidas
+
+    with perf.span("costes.capex"):
+        if same and o["columna_region"] in zones_df.columns:
+            r = zones_df[o["columna_region"]].fillna("").astype(str).str.strip().replace({"nan": "", "None": ""}).to_numpy(dtype=object)
+            first = np.full(nb, "", dtype=object)
+            con = np.flatnonzero(r != "")
+            if n and len(con):
+                u, pos = np.unique(codes[con][::-1], return_index=True)  # primera zona con región de cada edificio
+                first[u] = r[con][::-1][pos]
+            regiones = np.where(first == "", o["region"], first)
+        else:
+            regiones = np.full(nb, o["region"], dtype=object)
+        factores = pb.factores(regiones)
+        desconocidas = sorted({str(x) for x in np.asarray(regiones)[np.isnan(factores)].tolist()})
+        factores = np.nan_to_num(factores, nan=1.0)
+        coste = capex(cantidades, pb.precios, factores)
+
+    keep = (cantidades > 0).ravel()
+    res = pd.DataFrame({
+        "Edificio": np.repeat(np.array(grupos, dtype=object), len(pb.partidas)), "Región": np.repeat(regiones, len(pb.partidas)),
+        "Partida": np.tile(pb.partidas, nb), "Cantidad": cantidades.ravel(),
+        "Unidad": np.tile(np.array([MAGNITUDES[m] for m in pb.magnitudes.tolist()], dtype=object), nb),
+        "Precio unitario (€)": np.tile(pb.precios, nb), "Coef. regional": np.repeat(factores, len(pb.partidas)),
+        "Coste (€)": coste.ravel(),
+    })[keep].reset_index(drop=True)
+
+    salas = pb.magnitudes == "tabla2_m2"
+    inst_b, salas_b = coste[:, ~salas].sum(axis=1), coste[:, salas].sum(axis=1)
+    total_b = inst_b + salas_b
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eur_m2 = np.where(a_b > 0, total_b / a_b, np.nan)
+    por_edificio = pd.DataFrame({
+        "Edificio": grupos, "Región": regiones, "Coef. regional": factores, "Superficie (m²)": a_b,
+        "Instalaciones (€)": inst_b, "Salas Tabla 2 (€)": salas_b, "Total (€)": total_b, "€/m²": eur_m2,
+    })
+    por_partida = pd.DataFrame({"Partida": pb.partidas, "Coste (€)": coste.sum(axis=0)})
+    por_partida = por_partida[por_partida["Coste (€)"] > 0].reset_index(drop=True)
+
+    if desconocidas:
+        warnings.append(WarningItem("Costes", "-", f"Regiones sin coeficiente en el cuadro (se usa 1,00): {', '.join(desconocidas[:10])}."))
+    faltan = sorted(set(pct) - set(pb.instalaciones.tolist()))
+    if faltan:
+        warnings.append(WarningItem("Costes", "Tabla 2", f"Instalaciones sin precio por m²: {', '.join(faltan)}."))
+    if n and a_tot <= 0:
+        warnings.append(WarningItem("Costes", "-", "Superficie total nula: sin salas de la Tabla 2 y con la reserva de PCI repartida por igual."))
+
+    total = float(total_b.sum())
+    totals: Dict[str, Any] = {
+        "capex_total_eur": total, "capex_instalaciones_eur": float(inst_b.sum()), "capex_salas_eur": float(salas_b.sum()),
+        "capex_eur_m2": total / a_tot if a_tot > 0 else 0.0, "n_edificios": nb,
+        "por_edificio": por_edificio, "por_partida": por_partida,
+    }
+    return res, warnings, totals
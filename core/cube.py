@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Cubo de resultados: sumas y recuentos de cada magnitud (superficie, ocupación, kW, L/s,
+L/día…) agregados por uso × nivel × exposición × zona climática (× edificio en carteras).
+
+Cada calculadora lo materializa junto a su tabla por zonas (`totals["cubo"]`). Los
+desgloses y gráficos de las páginas se sirven del cubo, cuyo tamaño depende del nº de
+combinaciones de dimensiones y no del nº de zonas.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Union
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Dimensión (nombre mostrado) -> columna de la tabla de zonas
+DIMENSIONS: Dict[str, str] = {
+    "Uso": "Uso",
+    "Nivel": "Nivel carga (B/M/A)",
+    "Exposición": "Exposición (E/S/W, N, Interior)",
+    "Zona climática": "Zona climática",
+    "Edificio": "Edificio",
+}
+
+ZONES_COUNT = "Zonas"
+COUNT_PREFIX = "n · "  # recuento de zonas con dato de cada magnitud
+
+class ResultsCube:
+    """
+    Celdas agregadas: una fila por combinación de dimensiones presente, con "Zonas",
+    la suma de cada magnitud y su recuento de zonas con dato ("n · <magnitud>").
+    """
+    def __init__(self, cells: "pd.DataFrame", dims: List[str], measures: List[str]):
+        self.cells = cells
+        self.dims = dims
+        self.measures = measures
+
+    @property
+    def empty(self) -> bool:
+        return len(self.cells) == 0
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def breakdown(self, by: Union[str, Sequence[str]], counts: bool = False) -> "pd.DataFrame":
+        """Suma de cada magnitud (y nº de zonas) agrupando por una o varias dimensiones."""
+        by = [by] if isinstance(by, str) else list(by)
+        cols = [ZONES_COUNT] + self.measures
+        if counts:
+            cols += [COUNT_PREFIX + m for m in self.measures]
+        if not by:
+            return self.cells[cols].sum().to_frame().T
+        return self.cells.groupby(by, observed=True, dropna=False, sort=True)[cols].sum().reset_index()
+
+    def total(self, measure: str) -> float:
+        return float(self.cells[measure].sum()) if measure in self.cells else 0.0
+
+def build_cube(zones_df: "pd.DataFrame", measures: Dict[str, Any]) -> ResultsCube:
+    """
+    `zones_df`: tabla de zonas normalizada; `measures`: magnitud -> valores por zona en el
+    mismo orden de filas (Serie, array o None; NaN = sin dato).
+    """
+    import numpy as np
+    import pandas as pd
+    dims = [d for d, col in DIMENSIONS.items() if col in zones_df.columns]
+    data = {d: zones_df[DIMENSIONS[d]].reset_index(drop=True) for d in dims}
+    n = len(zones_df)
+    data[ZONES_COUNT] = np.ones(n, dtype=np.int64)
+    for m, vals in measures.items():
+        if vals is None or n == 0:  # tabla de resultados vacía o sin la columna
+            v = np.full(n, np.nan)
+        else:
+            v = np.asarray(pd.Series(vals).astype(float), dtype=float)
+        data[m] = v
+        data[COUNT_PREFIX + m] = (~np.isnan(v)).astype(np.int64)
+    flat = pd.DataFrame(data, index=pd.RangeIndex(n))
+    if n <= 1:
+        cells = flat  # una zona ya es una celda (caso habitual al recalcular una sola fila)
+    elif not dims:
+        cells = flat.sum(numeric_only=True).to_frame().T
+    else:
+        cells = flat.groupby(dims, observed=True, dropna=False, sort=False).sum().reset_index()
+    return ResultsCube(cells, dims, list(measures))
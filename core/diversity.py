@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Simultaneidad (diversidad) de puntas por horarios de uso.
+
+Cada zona recibe la semana tipo de su uso (laborable / fin de semana, ver
+`core.profiles.HORARIOS`) en cada mes, con la temperatura orientativa de su zona
+climática. La punta coincidente del edificio es el máximo de la suma de las curvas de
+todas las zonas; el factor de simultaneidad es punta coincidente / suma de puntas.
+
+Con un solo uso y una sola zona climática todas las zonas comparten curva y el factor
+es 1; baja en carteras o conjuntos con usos que no coinciden en el tiempo.
+"""
+from __future__ import annotations
+
+import functools
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+import numpy as np
+
+from . import perf
+from .profiles import FORMA_DE_MODULO, MESES, group_shapes, zone_groups
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DIAS = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+DIA_TIPO = 15  # la semana tipo de cada mes empieza el día 15
+
+@functools.lru_cache(maxsize=1)
+def calendario_tipo() -> Dict[str, np.ndarray]:
+    """12 semanas tipo (una por mes, de lunes a domingo): 12 × 168 pasos horarios."""
+    inicio_mes = np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+    dia = (inicio_mes[:, None] + DIA_TIPO - 1 + np.arange(7)[None, :]).ravel()  # 84 días del año
+    return {
+        "hora": np.tile(np.arange(24), 84),
+        "dia": np.repeat(dia, 24),
+        "mes": np.repeat(np.arange(12), 7 * 24),
+        "laborable": np.repeat(np.tile(np.arange(7) < 5, 12), 24),
+    }
+
+@functools.lru_cache(maxsize=256)
+def _shapes(groups: Tuple[Tuple[str, str], ...]) -> Dict[str, np.ndarray]:
+    return group_shapes(list(groups), calendario_tipo())
+
+def describe_step(step: int) -> str:
+    """Paso de la semana tipo -> texto ("Jul, lunes 16 h")."""
+    mes, resto = divmod(int(step), 7 * 24)
+    dia, hora = divmod(resto, 24)
+    return f"{MESES[mes]}, {DIAS[dia]} {hora} h"
+
+@perf.timed("simultaneidad")
+def simultaneidad(zones_df: "pd.DataFrame", peaks: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """
+    `peaks`: módulo ("Frío", "Calor", "Eléctrica") -> punta de cada zona (kW, mismo orden que
+    `zones_df`; NaN = sin dato). Devuelve por módulo la suma de puntas, la punta
+    coincidente, el factor de simultaneidad y el momento de la punta.
+    """
+    group_idx, groups = zone_groups(zones_df, settings)
+    shapes = _shapes(tuple(groups))
+    out: Dict[str, Dict[str, Any]] = {}
+    for modulo, vals in peaks.items():
+        v = np.nan_to_num(np.asarray(vals if vals is not None else np.zeros(len(zones_df)), dtype=float), nan=0.0)
+        suma = float(v.sum())
+        if suma <= 0 or not len(groups):
+            out[modulo] = {"suma_kw": suma, "coincidente_kw": suma, "factor": 1.0, "momento": None}
+            continue
+        # (grupos) @ (grupos × pasos): curva del conjunto en la semana tipo de cada mes
+        curve = np.bincount(group_idx, weights=v, minlength=len(groups)) @ shapes[FORMA_DE_MODULO[modulo]].astype(np.float64)
+        step = int(np.argmax(curve))
+        coincidente = min(float(curve[step]), suma)
+        out[modulo] = {"suma_kw": suma, "coincidente_kw": coincidente, "factor": coincidente / suma,
+                       "momento": describe_step(step)}
+    return out
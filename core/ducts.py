@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Predimensionado de conductos de aire, patinillos y plenum.
+
+Parte de los caudales por zona de `calc_ventilacion_y_todo_aire` (impulsión = caudal
+todo-aire si existe, si no el de ventilación; retorno/extracción = impulsión × factor) y
+de la aportación/extracción del garaje. Monta la red por niveles igual que la hidráulica
+(`pipes.LevelNetwork`: central → agrupaciones → ramal de zona) y dimensiona todos los
+tramos de todas las redes en una llamada a `size_ducts` por tipo de tramo:
+
+- tablas de medidas normalizadas ordenadas por sección: circulares (EN 1506) o
+  rectangulares (ancho × alto con relación de aspecto máxima y, en los tramos
+  horizontales, alto limitado por el plenum);
+- criterio de velocidad máxima por nivel o de pérdida de carga constante (Pa/m, con la
+  velocidad principal como tope): `np.searchsorted` sobre la sección mínima y subida de
+  medida solo donde aún no se cumple (diámetro equivalente de Huebscher);
+- caudales que no caben en la mayor medida se reparten en conductos en paralelo.
+
+Los tramos del nivel montante (o del primer nivel de agrupación) suben por patinillo:
+su sección exterior (aislamiento + holgura de montaje) se suma por montante y, por las
+plantas que atraviesa, se contrasta con la reserva "Tratamiento aire" de la Tabla 2.
+"""
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import numpy as np
+
+from . import perf
+from .constants import TABLA_2_ESPACIO_POR_INSTALACION
+from .pipes import F_MIN, LevelNetwork, gradient_pa_m
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Conducto circular (EN 1506), diámetro en mm
+DIAMETROS_MM = (80, 100, 125, 160, 200, 250, 315, 355, 400, 450, 500, 560, 630, 710, 800, 900, 1000, 1120, 1250)
+# Conducto rectangular: serie de lados en mm (ancho ≥ alto)
+LADOS_MM = (100, 150, 200, 250, 300, 350, 400, 450, 500, 550, 600, 650, 700, 750, 800, 900, 1000, 1100,
+            1200, 1300, 1400, 1500, 1600, 1800, 2000)
+# Material -> rugosidad absoluta (mm)
+MATERIALES_CONDUCTO = {"Chapa galvanizada": 0.09, "Panel de lana de vidrio": 0.9}
+FORMAS = ["Rectangular", "Circular"]
+METODOS = ["Velocidad", "Pérdida constante"]
+AIRE_RHO, AIRE_NU = 1.204, 1.516e-5  # aire a 20 °C: kg/m³, m²/s
+
+OPCIONES: Dict[str, Any] = {
+    "forma": "Rectangular", "material": "Chapa galvanizada", "metodo": "Velocidad",
+    "v_central": 8.0, "v_nivel": 6.0, "v_terminal": 4.0, "v_garaje": 10.0, "r_max_pa_m": 1.0,
+    "relacion_aspecto": 4.0, "altura_plenum_mm": 400.0,
+    "factor_retorno": 0.9,
+    "niveles": ["Edificio"], "nivel_montante": "Montante", "plantas_por_montante": 1,
+    "aislamiento_mm": 25.0, "holgura_mm": 50.0,
+    "instalacion_tabla2": "Tratamiento aire - Caudal constante (baja velocidad)",
+}
+SISTEMAS = ("Impulsión", "Retorno / extracción")
+MAX_AVISOS = 20
+
+def rectangular_table(h_max_mm: float = math.inf, aspect_max: float = 4.0) -> Tuple[np.ndarray, np.ndarray]:
+    """Medidas rectangulares (ancho, alto en mm) admisibles, ordenadas por sección y diámetro equivalente."""
+    lados = np.asarray(LADOS_MM, dtype=float)
+    w, h = np.meshgrid(lados, lados, indexing="ij")
+    ok = (h <= w) & (w <= aspect_max * h + 1e-9) & (h <= h_max_mm + 1e-9)
+    if not ok.any():  # plenum menor que el lado mínimo: se deja el menor alto
+        ok = (h == lados[0]) & (w <= aspect_max * h + 1e-9)
+    w, h = w[ok], h[ok]
+    order = np.lexsort((equivalent_diameter(w, h), w * h))
+    return w[order], h[order]
+
+def equivalent_diameter(w: np.ndarray, h: np.ndarray) -> np.ndarray:
+    """Diámetro equivalente a igual pérdida de carga (Huebscher): 1,30·(a·b)^0,625 / (a+b)^0,25."""
+    return 1.30 * (w * h) ** 0.625 / (w + h) ** 0.25
+
+@perf.timed("conductos.size")
+def size_ducts(q_ls: np.ndarray, forma: str, v_max: np.ndarray, r_max_pa_m: np.ndarray,
+               material: str = "Chapa galvanizada", h_max_mm: float = math.inf,
+               aspect_max: float = 4.0) -> Dict[str, np.ndarray]:
+    """
+    Medida normalizada mínima (por sección) para cada caudal (L/s) con velocidad ≤ v_max
+    (m/s) y pérdida unitaria ≤ r_max (Pa/m); si no cabe en la mayor medida se reparte en
+    conductos iguales en paralelo. Devuelve medida, nº en paralelo, ancho/alto (o
+    diámetro), diámetro equivalente, velocidad y pérdida unitaria de cada conducto,
+    criterio y si cumple.
+    """
+    if forma == "Circular":
+        w = h = np.asarray(DIAMETROS_MM, dtype=float)
+        area = math.pi * (w / 1000.0) ** 2 / 4.0
+        de = w / 1000.0
+        nombres = np.array([f"Ø{int(d)}" for d in DIAMETROS_MM], dtype=object)
+    else:
+        w, h = rectangular_table(h_max_mm, aspect_max)
+        area = w * h / 1e6
+        de = equivalent_diameter(w, h) / 1000.0
+        nombres = np.array([f"{int(a)}×{int(b)}" for a, b in zip(w, h)], dtype=object)
+    eps = MATERIALES_CONDUCTO.get(material, 0.09) / 1000.0
+    q = np.nan_to_num(np.asarray(q_ls, dtype=float), nan=0.0).clip(min=0.0) / 1000.0
+    v_max = np.broadcast_to(np.asarray(v_max, dtype=float), q.shape)
+    r_max = np.broadcast_to(np.asarray(r_max_pa_m, dtype=float), q.shape)
+    top = len(area) - 1  # la mayor sección es también el mayor diámetro equivalente
+
+    def grad(qq: np.ndarray, i: np.ndarray) -> np.ndarray:
+        return gradient_pa_m(qq, de[i], eps, AIRE_RHO, AIRE_NU)
+
+    # conductos en paralelo si el caudal no cabe en la mayor medida
+    paralelo = np.maximum(np.ceil(q / (area[top] * v_max) - 1e-9), 1.0)
+    tops = np.full(q.shape, top)
+    bad = grad(q / paralelo, tops) > r_max
+    while bad.any():
+        paralelo[bad] += 1.0
+        bad = grad(q / paralelo, tops) > r_max
+    q = q / paralelo
+
+    # velocidad: sección ≥ Q/v; pérdida: cota inferior del diámetro con f ≥ F_MIN
+    # (la sección rectangular nunca es menor que la del círculo de su diámetro equivalente)
+    idx_v = np.searchsorted(area, q / v_max, side="left")
+    d_r = (8.0 * F_MIN * AIRE_RHO * q ** 2 / (math.pi ** 2 * r_max)) ** 0.2
+    idx = np.minimum(np.maximum(idx_v, np.searchsorted(area, math.pi * d_r ** 2 / 4.0, side="left")), top)
+    r = grad(q, idx)
+    bad = (r > r_max) & (idx < top)
+    while bad.any():
+        idx[bad] += 1
+        r = grad(q, idx)
+        bad = (r > r_max) & (idx < top)
+
+    v = q / area[idx]
+    criterio = np.where(np.minimum(idx_v, top) >= idx, "Velocidad", "Pérdida de carga")
+    return {"idx": idx, "medida": nombres[idx], "paralelo": paralelo.astype(np.int64),
+            "ancho_mm": w[idx], "alto_mm": h[idx], "de_mm": de[idx] * 1000.0, "area_m2": area[idx],
+            "v_ms": v, "r_pa_m": r, "criterio": criterio,
+            "cumple": (v <= v_max + 1e-9) & (r <= r_max + 1e-9)}
+
+def _riser_depth(net: LevelNetwork, nivel_montante: str) -> int:
+    """Profundidad de los tramos que suben por patinillo: nivel montante, primer nivel o central."""
+    if nivel_montante in net.niveles:
+        return net.niveles.index(nivel_montante) + 1
+    return 1 if net.niveles else 0
+
+@perf.timed("calc_conductos")
+def calc_conductos(res: "pd.DataFrame", zones_df: "pd.DataFrame", settings: Dict[str, Any],
+                   totals: Dict[str, Any]) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `res`/`totals`: salida de `calc_ventilacion_y_todo_aire` (mismo orden de zonas que
+    `zones_df`). Devuelve (tramos, avisos, totales) con totals["patinillos"] (sección por
+    montante), la altura de plenum necesaria y el contraste con la Tabla 2.
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("conductos", {}) or {})}
+    warnings: List[WarningItem] = []
+    n = len(res)
+    niveles = [c for c in o["niveles"] if c in zones_df.columns] if len(zones_df) == n else []
+    zona = res["Zona"].astype(str).tolist() if "Zona" in res.columns else [f"Zona {i + 1}" for i in range(n)]
+    net = LevelNetwork(zones_df, niveles, zona)
+    d_montante = _riser_depth(net, o["nivel_montante"])
+
+    def _col(c: str) -> np.ndarray:
+        return pd.to_numeric(res[c], errors="coerce").to_numpy(dtype=float) if c in res.columns else np.full(n, np.nan)
+    vent, todo = _col("Ventilación total (L/s)"), _col("Todo-aire total (L/s)")
+    impulsion = np.nan_to_num(np.where(np.isnan(todo), vent, todo), nan=0.0)
+    q_sis = [net.sum_up(impulsion), net.sum_up(impulsion * float(o["factor_retorno"]))]
+    q_garaje = np.array([float(totals.get("vent_garaje_aporte_lps", 0.0) or 0.0),
+                         float(totals.get("vent_garaje_extraccion_lps", 0.0) or 0.0)])
+
+    # velocidad máxima por tramo; con pérdida constante, la principal es solo un tope
+    pc = o["metodo"] == "Pérdida constante"
+    v_red = np.full(len(net), float(o["v_central"])) if pc else \
+        np.select([net.depth == 0, net.is_leaf], [float(o["v_central"]), float(o["v_terminal"])], float(o["v_nivel"]))
+    r_max = float(o["r_max_pa_m"]) if pc else math.inf
+    q = np.concatenate(q_sis + [q_garaje])
+    v_max = np.concatenate([v_red, v_red, np.full(2, float(o["v_garaje"]))])
+    # tramos horizontales (bajo el nivel montante) limitados por la altura del plenum
+    e = float(o["aislamiento_mm"])
+    horizontal = np.concatenate([net.depth > d_montante] * 2 + [np.zeros(2, dtype=bool)])
+    h_max = float(o["altura_plenum_mm"]) - 2.0 * e
+    s: Dict[str, np.ndarray] = {}
+    for mask, hm in ((~horizontal, math.inf), (horizontal, h_max)):
+        part = size_ducts(q[mask], o["forma"], v_max[mask], r_max, o["material"], hm, float(o["relacion_aspecto"]))
+        for k, val in part.items():
+            if k not in s:
+                s[k] = np.empty(len(q), dtype=object if val.dtype.kind in "OU" else val.dtype)
+            s[k][mask] = val
+    paralelo = s["paralelo"]
+    medida = np.where(paralelo > 1, [f"{k} × {m}" for k, m in zip(paralelo.tolist(), s["medida"].tolist())], s["medida"])
+
+    tramo_sistema = np.repeat(np.array(list(SISTEMAS) + ["Garaje"], dtype=object), [len(net), len(net), 2])
+    nivel = np.concatenate([net.nivel, net.nivel, np.array(["Garaje", "Garaje"], dtype=object)])
+    nombres = net.names * 2 + ["Aportación", "Extracción"]
+    zonas = np.concatenate([net.n_zonas, net.n_zonas, [0, 0]])
+    ext = (s["ancho_mm"] + 2.0 * e + 2.0 * float(o["holgura_mm"])) * (s["alto_mm"] + 2.0 * e + 2.0 * float(o["holgura_mm"])) / 1e6
+    tramos = pd.DataFrame({
+        "Sistema": tramo_sistema, "Nivel": nivel, "Tramo": nombres, "Zonas": zonas,
+        "Caudal (L/s)": q, "Caudal (m³/h)": q * 3.6, "Medida (mm)": medida,
+        "Ancho / Ø (mm)": s["ancho_mm"], "Alto (mm)": s["alto_mm"], "De (mm)": s["de_mm"],
+        "v (m/s)": s["v_ms"], "R (Pa/m)": s["r_pa_m"], "Criterio": s["criterio"], "Cumple": s["cumple"],
+        "Patinillo": np.concatenate([net.depth == d_montante] * 2 + [np.ones(2, dtype=bool)]),
+        "Sección exterior (m²)": ext * paralelo,
+    })
+    tramos = tramos[tramos["Caudal (L/s)"] > 0].reset_index(drop=True)
+
+    # patinillos: suma de secciones exteriores por montante (impulsión + retorno) y garaje
+    pat = tramos[tramos["Patinillo"]]
+    if "Planta" in zones_df.columns and len(zones_df) == n and d_montante > 0:
+        grupo = net.codes[d_montante - 1]
+        plantas_g = pd.Series(zones_df["Planta"].astype(str).to_numpy()).groupby(grupo).nunique().to_numpy()
+        plantas = dict(zip(net.group_names[d_montante - 1], plantas_g.tolist()))
+    else:
+        plantas = {}
+    patinillos = pat.groupby(["Nivel", "Tramo"], sort=False)["Sección exterior (m²)"].sum().reset_index()
+    patinillos = patinillos.rename(columns={"Tramo": "Montante", "Sección exterior (m²)": "Sección por planta (m²)"})
+    patinillos["Plantas"] = [1 if nv == "Garaje" else int(plantas.get(m, o["plantas_por_montante"]))
+                             for nv, m in zip(patinillos["Nivel"], patinillos["Montante"])]
+    patinillos["Superficie ocupada (m²)"] = patinillos["Sección por planta (m²)"] * patinillos["Plantas"]
+
+    # plenum: mayor alto exterior de los tramos horizontales
+    hz_alto = s["alto_mm"][horizontal & (q > 0)]
+    plenum_req = float(hz_alto.max(initial=0.0)) + 2.0 * e if len(hz_alto) else 0.0
+    if o["forma"] == "Circular" and plenum_req > float(o["altura_plenum_mm"]) + 1e-9:
+        n_no = int(np.count_nonzero(hz_alto + 2.0 * e > float(o["altura_plenum_mm"]) + 1e-9))
+        warnings.append(WarningItem("Conductos", "-", f"{n_no} tramos horizontales circulares no caben en el plenum "
+                                    f"({plenum_req:.0f} mm > {float(o['altura_plenum_mm']):.0f} mm): usa conducto rectangular."))
+
+    # contraste con la reserva de Tabla 2 (sin los patinillos del garaje)
+    area_total = float(pd.to_numeric(zones_df.get("Superficie (m²)"), errors="coerce").fillna(0.0).sum()) if "Superficie (m²)" in zones_df else 0.0
+    pmin, pmax = TABLA_2_ESPACIO_POR_INSTALACION.get(o["instalacion_tabla2"], (0.0, 0.0))
+    ocupado = float(patinillos.loc[patinillos["Nivel"] != "Garaje", "Superficie ocupada (m²)"].sum())
+    reserva_min, reserva_max = area_total * pmin / 100.0, area_total * pmax / 100.0
+    if reserva_min > 0 and ocupado > reserva_min:
+        warnings.append(WarningItem("Conductos", "Tabla 2", f"Los patinillos ocupan {ocupado:.1f} m², más que la reserva mínima de "
+                                    f"'{o['instalacion_tabla2']}' ({reserva_min:.1f} m²), que incluye además las salas de climatizadores."))
+
+    paralelos = tramos.index[tramos["Medida (mm)"].str.contains(" × ", regex=False)]
+    for i in paralelos[:MAX_AVISOS].tolist():
+        warnings.append(WarningItem("Conductos", str(tramos.at[i, "Tramo"]), f"{tramos.at[i, 'Sistema']}: {tramos.at[i, 'Caudal (L/s)']:.0f} L/s "
+                                    f"no cabe en la mayor medida; se reparte en {tramos.at[i, 'Medida (mm)']}."))
+    if len(paralelos) > MAX_AVISOS:
+        warnings.append(WarningItem("Conductos", "-", f"Otros {len(paralelos) - MAX_AVISOS} tramos en paralelo."))
+    if n and not impulsion.any():
+        warnings.append(WarningItem("Conductos", "-", "Ninguna zona tiene caudal de ventilación ni de todo-aire."))
+
+    out_totals: Dict[str, Any] = {
+        "patinillos": patinillos, "plenum_necesario_mm": plenum_req,
+        "patinillos_m2": ocupado, "patinillos_garaje_m2": float(patinillos.loc[patinillos["Nivel"] == "Garaje", "Superficie ocupada (m²)"].sum()),
+        "reserva_tabla2_min_m2": reserva_min, "reserva_tabla2_max_m2": reserva_max,
+        "fraccion_reserva_min": ocupado / reserva_min if reserva_min > 0 else None,
+        "niveles": niveles, "nivel_montante": niveles[d_montante - 1] if d_montante else "Central",
+    }
+    return tramos, warnings, out_totals
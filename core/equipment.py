@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Selección de equipos (enfriadoras, bombas de calor, calderas y climatizadores) desde un
+catálogo local.
+
+El catálogo (`data/equipos.csv`, o un CSV/Parquet propio con las mismas columnas) tiene
+una fila por modelo: tipo, modelo, frio_kw, calor_kw, caudal_m3h, potencia_electrica_kw,
+huella_m2, peso_kg. Por tipo se ordena por capacidad y se enumeran de una vez todas las
+combinaciones de hasta `max_unidades` equipos (matriz de nº de unidades por modelo; solo
+unidades iguales o modelos mezclados), con su capacidad, huella, peso y potencia
+eléctrica (producto matricial). Con N+1 la capacidad útil descuenta la mayor unidad.
+
+Selección para muchas demandas a la vez (un edificio o una cartera entera):
+- combinaciones ordenadas por capacidad útil y, sobre ellas, el mínimo acumulado desde
+  el final del rango del criterio (huella, peso, potencia eléctrica o sobredimensionado);
+- cada demanda se resuelve con `np.searchsorted` (primera combinación que la cubre) y
+  una lectura de ese mínimo. Las bombas de calor, que deben cubrir frío y calor, filtran
+  además la segunda capacidad en bloques de demandas × combinaciones.
+"""
+from __future__ import annotations
+
+import functools
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import perf
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+EQUIPOS_CSV = DATA_DIR / "equipos.csv"
+COLUMNAS = ["tipo", "modelo", "frio_kw", "calor_kw", "caudal_m3h", "potencia_electrica_kw", "huella_m2", "peso_kg"]
+# Tipo -> columnas de capacidad que debe cubrir (la primera ordena el catálogo)
+TIPOS: Dict[str, Tuple[str, ...]] = {
+    "Enfriadora": ("frio_kw",),
+    "Bomba de calor": ("frio_kw", "calor_kw"),
+    "Caldera": ("calor_kw",),
+    "Climatizador": ("caudal_m3h",),
+}
+ETIQUETAS = {"frio_kw": ("frío", "kW"), "calor_kw": ("calor", "kW"), "caudal_m3h": ("caudal", "m³/h")}
+# Esquema de producción -> (servicio, tipo de equipo)
+PRODUCCION: Dict[str, List[Tuple[str, str]]] = {
+    "Enfriadora + caldera": [("Frío", "Enfriadora"), ("Calor", "Caldera")],
+    "Bomba de calor": [("Frío y calor", "Bomba de calor")],
+}
+CRITERIOS = {
+    "Menor sobredimensionado": None,
+    "Menor huella": "huella_m2",
+    "Menor peso": "peso_kg",
+    "Menor potencia eléctrica": "potencia_electrica_kw",
+}
+OPCIONES: Dict[str, Any] = {
+    "produccion": "Enfriadora + caldera", "climatizadores": True,
+    "max_unidades": 4, "n_mas_1": False, "mezclar_modelos": False,
+    "criterio": "Menor huella", "agrupacion": "Edificio",
+}
+BLOQUE = 2048  # demandas por bloque en la selección con dos capacidades
+
+class EquipmentCatalog:
+    """Modelos por tipo ordenados por su capacidad principal y combinaciones enumeradas (en caché)."""
+    def __init__(self, df: "pd.DataFrame"):
+        import pandas as pd
+        faltan = [c for c in COLUMNAS if c not in df.columns]
+        if faltan:
+            raise ValueError(f"Faltan columnas en el catálogo de equipos: {', '.join(faltan)}")
+        df = df[COLUMNAS].copy()
+        for c in COLUMNAS[2:]:
+            df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
+        self.modelos: Dict[str, "pd.DataFrame"] = {}
+        for tipo, caps in TIPOS.items():
+            sub = df[(df["tipo"].astype(str).str.strip() == tipo) & (df[caps[0]] > 0)]
+            self.modelos[tipo] = sub.sort_values(caps[0], kind="stable").reset_index(drop=True)
+        self._combos: Dict[Tuple[str, int, bool], Dict[str, np.ndarray]] = {}
+
+    def combos(self, tipo: str, max_unidades: int, mezclar: bool) -> Dict[str, np.ndarray]:
+        """
+        Todas las combinaciones de 1..max_unidades equipos del tipo: `n` (unidades por
+        modelo, combinaciones × modelos) y, por combinación, capacidades, mayor unidad de
+        cada capacidad, nº de unidades, potencia eléctrica, huella y peso.
+        """
+        key = (tipo, int(max_unidades), bool(mezclar))
+        if key in self._combos:
+            return self._combos[key]
+        m = self.modelos[tipo]
+        k = max(int(max_unidades), 1)
+        if mezclar:
+            n = np.zeros((1, 0), dtype=np.int64)
+            for _ in range(len(m)):  # añade un modelo cada vez: 0..k unidades, total ≤ k
+                n = np.repeat(n, k + 1, axis=0)
+                n = np.hstack([n, np.tile(np.arange(k + 1), len(n) // (k + 1))[:, None]])
+                n = n[n.sum(axis=1) <= k]
+            n = n[n.sum(axis=1) > 0]
+        else:
+            n = (np.arange(1, k + 1)[:, None, None] * np.eye(len(m), dtype=np.int64)[None]).reshape(-1, len(m))
+        out: Dict[str, np.ndarray] = {"n": n, "unidades": n.sum(axis=1)}
+        for c in TIPOS[tipo]:
+            cap = m[c].to_numpy(dtype=float)
+            out[c] = n @ cap
+            out[f"{c}_max"] = np.where(n > 0, cap[None, :], 0.0).max(axis=1, initial=0.0)
+        for c in ("potencia_electrica_kw", "huella_m2", "peso_kg"):
+            out[c] = n @ m[c].to_numpy(dtype=float)
+        self._combos[key] = out
+        return out
+
+    def describe(self, tipo: str, n_row: np.ndarray) -> str:
+        """Texto de una combinación: "2 × EAA-400 + EAA-200" (del mayor al menor)."""
+        nombres = self.modelos[tipo]["modelo"].astype(str).tolist()
+        partes = [f"{c} × {nombres[j]}" if c > 1 else nombres[j] for j, c in reversed(list(enumerate(n_row.tolist()))) if c]
+        return " + ".join(partes)
+
+    @perf.timed("equipos.select")
+    def select(self, tipo: str, demandas: np.ndarray, max_unidades: int = 4, n_mas_1: bool = False,
+               mezclar: bool = False, criterio: str = "Menor huella") -> np.ndarray:
+        """
+        Mejor combinación para cada demanda (filas × capacidades de TIPOS[tipo]); -1 si
+        ninguna la cubre y -2 si la demanda es nula (sin equipo).
+        """
+        c = self.combos(tipo, max_unidades, mezclar)
+        caps = TIPOS[tipo]
+        d = np.nan_to_num(np.asarray(demandas, dtype=float).reshape(-1, len(caps)), nan=0.0)
+        util = [c[k] - (c[f"{k}_max"] if n_mas_1 else 0.0) for k in caps]
+        if n_mas_1:  # N+1 exige al menos dos unidades
+            util = [np.where(c["unidades"] > 1, u, -np.inf) for u in util]
+        obj = c[CRITERIOS.get(criterio) or caps[0]]
+        rank = np.empty(len(obj), dtype=np.int64)
+        rank[np.lexsort((c["unidades"], c[caps[0]], obj))] = np.arange(len(obj))
+
+        order = np.argsort(util[0], kind="stable")
+        u0 = util[0][order]
+        r_sorted = rank[order]
+        start = np.searchsorted(u0, d[:, 0] - 1e-9, side="left")
+        best = np.full(len(d), -1, dtype=np.int64)
+        if not len(order):
+            return np.where(d[:, 0] <= 0, -2, best)
+        by_rank = np.argsort(rank)
+        if len(caps) == 1:
+            suffix = np.minimum.accumulate(r_sorted[::-1])[::-1]
+            ok = start < len(order)
+            best[ok] = by_rank[suffix[start[ok]]]
+        else:
+            u1 = util[1][order]
+            pos = np.arange(len(order))
+            for a in range(0, len(d), BLOQUE):
+                sl = slice(a, a + BLOQUE)
+                mask = (pos[None, :] >= start[sl, None]) & (u1[None, :] >= d[sl, 1:2] - 1e-9)
+                r = np.where(mask, r_sorted[None, :], len(order))
+                rmin = r.min(axis=1)
+                best[sl] = np.where(rmin < len(order), by_rank[np.minimum(rmin, len(order) - 1)], -1)
+        return np.where((d <= 0).all(axis=1), -2, best)
+
+def load_catalog(path: Optional[Path] = None) -> EquipmentCatalog:
+    """Catálogo desde CSV o Parquet (por defecto `data/equipos.csv`), una vez por proceso y ruta."""
+    return _load_catalog(str(path or EQUIPOS_CSV))
+
+@functools.lru_cache(maxsize=4)
+def _load_catalog(path: str) -> EquipmentCatalog:
+    import pandas as pd
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    return EquipmentCatalog(df)
+
+def _demanda_por_grupo(valores: np.ndarray, codes: np.ndarray, n_grupos: int, total: Optional[float]) -> np.ndarray:
+    """Suma por grupo; si se da `total` (p. ej. potencia de generador) se reescala para que sumen ese total."""
+    v = np.nan_to_num(np.asarray(valores, dtype=float), nan=0.0)
+    g = np.bincount(codes, weights=v, minlength=n_grupos) if len(v) else np.zeros(n_grupos)
+    if total is not None and g.sum() > 0:
+        g = g * (float(total) / g.sum())
+    return g
+
+@perf.timed("calc_equipos")
+def calc_equipos(res_clima: "pd.DataFrame", totals_clima: Dict[str, Any], res_vent: "pd.DataFrame",
+                 zones_df: "pd.DataFrame", settings: Dict[str, Any],
+                 catalogo: Optional[EquipmentCatalog] = None) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `res_clima`/`totals_clima`: salida de `calc_climatizacion`; `res_vent`: de
+    `calc_ventilacion_y_todo_aire` (mismo orden de zonas que `zones_df`). La demanda de
+    cada edificio (columna de agrupación) es la suma de sus zonas, reescalada para que el
+    conjunto sume la potencia de generador (sobredimensionado y simultaneidad); la de
+    climatizadores es el caudal todo-aire (o, sin él, el de ventilación).
+    Devuelve (selección por edificio y servicio, avisos, totales).
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("equipos", {}) or {})}
+    cat = catalogo or load_catalog(o.get("catalogo"))
+    warnings: List[WarningItem] = []
+    n = len(res_clima)
+    col = o["agrupacion"]
+    if col in zones_df.columns and len(zones_df) == n:
+        g = zones_df[col].astype(str).groupby(zones_df[col].astype(str), sort=False)
+        codes, grupos = g.ngroup().to_numpy(), [str(k) for k in g.groups.keys()]
+    else:
+        codes, grupos = np.zeros(n, dtype=np.int64), ["Edificio"]
+
+    def _col(df: "pd.DataFrame", c: str) -> np.ndarray:
+        return pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) if c in df.columns and len(df) == n else np.full(n, np.nan)
+    demanda = {
+        "frio_kw": _demanda_por_grupo(_col(res_clima, "Potencia frío (kW)"), codes, len(grupos), totals_clima.get("frio_generador_kw")),
+        "calor_kw": _demanda_por_grupo(_col(res_clima, "Potencia calor (kW)"), codes, len(grupos), totals_clima.get("calor_generador_kw")),
+    }
+    todo, vent = _col(res_vent, "Todo-aire total (L/s)"), _col(res_vent, "Ventilación total (L/s)")
+    demanda["caudal_m3h"] = _demanda_por_grupo(np.where(np.isnan(todo), vent, todo) * 3.6, codes, len(grupos), None)
+
+    servicios = list(PRODUCCION.get(o["produccion"], PRODUCCION["Enfriadora + caldera"]))
+    if o["climatizadores"]:
+        servicios.append(("Tratamiento de aire", "Climatizador"))
+    frames: List["pd.DataFrame"] = []
+    for servicio, tipo in servicios:
+        caps = TIPOS[tipo]
+        if cat.modelos[tipo].empty:
+            warnings.append(WarningItem("Equipos", tipo, "El catálogo no tiene modelos de este tipo."))
+            continue
+        d = np.column_stack([demanda[k] for k in caps])
+        best = cat.select(tipo, d, int(o["max_unidades"]), bool(o["n_mas_1"]), bool(o["mezclar_modelos"]), o["criterio"])
+        c = cat.combos(tipo, int(o["max_unidades"]), bool(o["mezclar_modelos"]))
+        ok = best >= 0
+        i = np.where(ok, best, 0)
+
+        def _sel(k: str) -> np.ndarray:
+            return np.where(ok, c[k][i], np.nan) if len(c[k]) else np.full(len(best), np.nan)
+        row = {
+            "Edificio": grupos, "Servicio": servicio, "Tipo": tipo,
+            "Demanda": [" / ".join(f"{v:,.0f} {ETIQUETAS[k][1]} {ETIQUETAS[k][0]}" for k, v in zip(caps, r)) for r in d],
+            "Selección": [cat.describe(tipo, c["n"][b]) if b >= 0 else ("—" if b == -2 else "Sin combinación válida") for b in best.tolist()],
+            "Unidades": np.where(ok, c["unidades"][i], 0),
+        }
+        for k in caps:
+            row[f"Instalado {ETIQUETAS[k][0]} ({ETIQUETAS[k][1]})"] = _sel(k)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            row["Margen (%)"] = np.where(ok & (d[:, 0] > 0), (_sel(caps[0]) / d[:, 0] - 1.0) * 100.0, np.nan)
+        for k, nombre in (("potencia_electrica_kw", "Potencia eléctrica (kW)"), ("huella_m2", "Huella (m²)"), ("peso_kg", "Peso (kg)")):
+            row[nombre] = _sel(k)
+        frames.append(pd.DataFrame(row))
+        for b in np.flatnonzero(best == -1)[:10].tolist():
+            warnings.append(WarningItem("Equipos", grupos[b], f"{servicio}: ninguna combinación de hasta {int(o['max_unidades'])} "
+                                        f"{tipo.lower()}s cubre la demanda; amplía el nº de unidades o el catálogo."))
+
+    sel = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    totals: Dict[str, Any] = {
+        "n_grupos": len(grupos),
+        "n_sin_seleccion": int((sel["Selección"] == "Sin combinación válida").sum()) if len(sel) else 0,
+        "potencia_electrica_kw": float(sel["Potencia eléctrica (kW)"].sum()) if len(sel) else 0.0,
+        "huella_m2": float(sel["Huella (m²)"].sum()) if len(sel) else 0.0,
+        "peso_kg": float(sel["Peso (kg)"].sum()) if len(sel) else 0.0,
+    }
+    return sel, warnings, totals
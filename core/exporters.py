@@ -1,20 +1,22 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any
 import io
-import pandas as pd
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import cm
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 
+from . import perf
+
+# pandas/reportlab/openpyxl se importan dentro de cada exportador: solo la página 9
+# los usa y no deben pesar en el arranque del resto de páginas.
+if TYPE_CHECKING:
+    import pandas as pd
+
+@perf.timed("export_excel")
 def export_excel(results: Dict[str, Any]) -> bytes:
     """
     results: dict con DataFrames y dicts de totales
     """
+    import pandas as pd
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine="openpyxl") as writer:
         for k, v in results.items():
@@ -22,15 +24,23 @@ def export_excel(results: Dict[str, Any]) -> bytes:
                 sheet = k[:31]
                 v.to_excel(writer, sheet_name=sheet, index=False)
             elif isinstance(v, dict):
-                df = pd.DataFrame([v])
+                # solo escalares (los totales también llevan tablas auxiliares y el cubo)
+                df = pd.DataFrame([{kk: vv for kk, vv in v.items() if vv is None or isinstance(vv, (int, float, str))}])
                 sheet = (k + "_tot")[:31]
                 df.to_excel(writer, sheet_name=sheet, index=False)
     return output.getvalue()
 
+@perf.timed("export_pdf_memoria")
 def export_pdf_memoria(meta: Dict[str, Any], tables: Dict[str, pd.DataFrame], totals: Dict[str, Dict[str, Any]]) -> bytes:
     """
     PDF simple de memoria de cálculo.
     """
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=1.5*cm, rightMargin=1.5*cm, topMargin=1.2*cm, bottomMargin=1.2*cm)
     styles = getSampleStyleSheet()
@@ -75,7 +85,9 @@ def export_pdf_memoria(meta: Dict[str, Any], tables: Dict[str, pd.DataFrame], to
             elif len(dff) == 0:
                 data = [list(dff.columns), ["(no rows)"]]
             else:
-                data = [list(dff.columns)] + dff.fillna("").astype(str).values.tolist()
+                # columnas tipadas (categóricas / float con nulos) no admiten fillna("")
+                dfo = dff.astype(object)
+                data = [list(dff.columns)] + dfo.where(dff.notna(), "").astype(str).values.tolist()
         t = Table(data, hAlign="LEFT")
         t.setStyle(TableStyle([
             ("BACKGROUND", (0,0), (-1,0), colors.lightgrey),
@@ -86,5 +98,6 @@ def export_pdf_memoria(meta: Dict[str, Any], tables: Dict[str, pd.DataFrame], to
         story.append(t)
         story.append(Spacer(1, 0.35*cm))
 
-    doc.build(story)
+    with perf.span("pdf.build"):
+        doc.build(story)
     return buffer.getvalue()
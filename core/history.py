@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+"""
+Historial de ediciones (deshacer / rehacer) de la tabla de zonas y de los ajustes.
+
+Cada revisión guarda solo lo que cambió:
+- zonas: filas eliminadas y añadidas (sub-DataFrames) y, para las filas comunes, las
+  celdas modificadas por columna (etiquetas de fila + valores antes/después);
+- ajustes: las claves modificadas con su valor anterior y nuevo.
+
+Las tablas guardadas son inmutables (copy-on-write, ver `core.state`), así que una
+revisión que sustituye la tabla entera (importar CSV, plantillas) solo retiene las
+referencias a las dos tablas, sin copiarlas. La memoria crece con el tamaño de las
+ediciones, no con tamaño de tabla × revisiones.
+"""
+from __future__ import annotations
+
+import copy
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+MAX_REVISIONS = 50
+
+_MISSING = object()  # clave de ajustes que no existía
+
+@dataclass
+class ZonesDiff:
+    """Diferencia entre dos versiones de la tabla de zonas."""
+    removed: Optional["pd.DataFrame"] = None   # filas de la versión anterior que desaparecen
+    added: Optional["pd.DataFrame"] = None     # filas nuevas
+    # columna -> (etiquetas de fila, valores antes, valores después)
+    cells: Dict[str, Tuple[Any, Any, Any]] = field(default_factory=dict)
+    # columna -> (Serie antes, Serie después) cuando cambia el tipo (salvo categorías)
+    columns: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)
+    order_before: Any = None   # índice completo solo si el orden de filas no es el natural
+    order_after: Any = None
+    replaced: Optional[Tuple["pd.DataFrame", "pd.DataFrame"]] = None  # sustitución completa
+
+    def n_cells(self) -> int:
+        n = sum(len(v[0]) for v in self.cells.values())
+        n += sum(len(v[1]) for v in self.columns.values())
+        for part in (self.removed, self.added):
+            if part is not None:
+                n += part.size
+        return n
+
+    def nbytes(self) -> int:
+        """Memoria propia de la revisión (no cuenta tablas compartidas en `replaced`)."""
+        import numpy as np
+        total = 0
+        for part in (self.removed, self.added):
+            if part is not None:
+                total += int(part.memory_usage(deep=True).sum())
+        for labels, before, after in self.cells.values():
+            total += sum(np.asarray(a).nbytes for a in (labels, before, after))
+        for before, after in self.columns.values():
+            total += int(before.memory_usage(deep=True)) + int(after.memory_usage(deep=True))
+        return total
+
+@dataclass
+class Revision:
+    label: str
+    zones: Optional[ZonesDiff] = None
+    settings: Dict[str, Tuple[Any, Any]] = field(default_factory=dict)  # clave -> (antes, después)
+    t: float = field(default_factory=time.time)
+
+    def describe(self) -> str:
+        parts = []
+        if self.zones is not None:
+            z = self.zones
+            if z.replaced is not None:
+                parts.append(f"tabla sustituida ({len(z.replaced[1])} zonas)")
+            else:
+                if z.added is not None and len(z.added):
+                    parts.append(f"+{len(z.added)} filas")
+                if z.removed is not None and len(z.removed):
+                    parts.append(f"-{len(z.removed)} filas")
+                n_cells = sum(len(v[0]) for v in z.cells.values())
+                if n_cells:
+                    parts.append(f"{n_cells} celdas")
+                if z.columns:
+                    parts.append(f"{len(z.columns)} columnas")
+        if self.settings:
+            keys = sorted(self.settings)
+            parts.append("ajustes: " + ", ".join(keys[:4]) + ("…" if len(keys) > 4 else ""))
+        return f"{self.label} ({'; '.join(parts)})" if parts else self.label
+
+# -----------------------------
+# Zonas
+# -----------------------------
+def _changed_mask(a: "pd.Series", b: "pd.Series"):
+    """Máscara de celdas distintas (dos nulos cuentan como iguales)."""
+    import numpy as np
+    na_a = a.isna().to_numpy()
+    na_b = b.isna().to_numpy()
+    both = ~na_a & ~na_b
+    ne = np.zeros(len(a), dtype=bool)
+    if both.any():
+        av = a.to_numpy(dtype=object)[both]
+        bv = b.to_numpy(dtype=object)[both]
+        ne[both] = av != bv
+    return ne | (na_a != na_b)
+
+def diff_zones(before: "pd.DataFrame", after: "pd.DataFrame", ignore: Tuple[str, ...] = ()) -> Optional[ZonesDiff]:
+    """
+    Diferencia por filas/celdas entre dos tablas alineadas por índice. Devuelve None si no
+    hay cambios. Si las columnas o el índice no permiten alinear, registra una sustitución.
+    """
+    import pandas as pd
+    if list(before.columns) != list(after.columns) or not before.index.is_unique or not after.index.is_unique:
+        return ZonesDiff(replaced=(before, after))
+    removed_idx = before.index.difference(after.index, sort=False)
+    added_idx = after.index.difference(before.index, sort=False)
+    common = after.index.intersection(before.index, sort=False)
+    # Si casi no hay filas en común (p. ej. tras una importación) es más barato sustituir
+    if len(common) < 0.5 * max(len(before), len(after)) and (len(removed_idx) or len(added_idx)):
+        return ZonesDiff(replaced=(before, after))
+
+    d = ZonesDiff()
+    if len(removed_idx):
+        d.removed = before.loc[removed_idx]
+    if len(added_idx):
+        d.added = after.loc[added_idx]
+    b_common = before.loc[common]
+    a_common = after.loc[common]
+    for col in after.columns:
+        if col in ignore:
+            continue
+        sb, sa = b_common[col], a_common[col]
+        both_cat = isinstance(sb.dtype, pd.CategoricalDtype) and isinstance(sa.dtype, pd.CategoricalDtype)
+        if sb.dtype != sa.dtype and not both_cat:
+            d.columns[col] = (before[col], after[col])
+            continue
+        mask = _changed_mask(sb, sa)
+        if mask.any():
+            labels = common[mask]
+            d.cells[col] = (labels.to_numpy(), sb.to_numpy(dtype=object)[mask], sa.to_numpy(dtype=object)[mask])
+
+    natural_after = before.index.drop(removed_idx).append(added_idx)
+    if not natural_after.equals(after.index):
+        d.order_after = after.index
+    natural_before = after.index.drop(added_idx).append(removed_idx)
+    if not natural_before.equals(before.index):
+        d.order_before = before.index
+
+    if d.removed is None and d.added is None and not d.cells and not d.columns and d.order_after is None:
+        return None
+    return d
+
+def _assign(df: "pd.DataFrame", col: str, labels, values) -> None:
+    import pandas as pd
+    s = df[col]
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        new = [v for v in set(values) if v is not None and v == v and v not in s.cat.categories]
+        if new:
+            s = s.cat.add_categories(new)
+    s = s.copy()
+    s.loc[labels] = pd.Series(values, index=labels, dtype=object).astype(s.dtype)
+    df[col] = s
+
+def _concat(df: "pd.DataFrame", rows: "pd.DataFrame") -> "pd.DataFrame":
+    """Añade filas conservando los tipos de `df` (los categóricos amplían categorías)."""
+    import pandas as pd
+    out = pd.concat([df, rows])
+    for col in df.columns:
+        dt = df[col].dtype
+        if out[col].dtype == dt:
+            continue
+        if isinstance(dt, pd.CategoricalDtype):
+            extra = [v for v in pd.unique(rows[col].dropna()) if v not in dt.categories]
+            out[col] = pd.Categorical(out[col], categories=list(dt.categories) + extra)
+        else:
+            out[col] = out[col].astype(dt)
+    return out
+
+def _apply(df: "pd.DataFrame", d: ZonesDiff, forward: bool) -> "pd.DataFrame":
+    if d.replaced is not None:
+        return d.replaced[1] if forward else d.replaced[0]
+    drop, add = (d.removed, d.added) if forward else (d.added, d.removed)
+    out = df.copy(deep=False)
+    if drop is not None and len(drop):
+        out = out.drop(index=drop.index)
+    for col, (before, after) in d.columns.items():
+        src = after if forward else before
+        out[col] = src.reindex(out.index)
+    for col, (labels, before, after) in d.cells.items():
+        if col in d.columns:
+            continue
+        _assign(out, col, labels, after if forward else before)
+    if add is not None and len(add):
+        out = _concat(out, add)
+    order = d.order_after if forward else d.order_before
+    if order is not None:
+        out = out.reindex(order)
+    return out
+
+def apply_zones_diff(df: "pd.DataFrame", d: ZonesDiff) -> "pd.DataFrame":
+    """Rehace el cambio `d` sobre `df` (la versión anterior)."""
+    return _apply(df, d, forward=True)
+
+def revert_zones_diff(df: "pd.DataFrame", d: ZonesDiff) -> "pd.DataFrame":
+    """Deshace el cambio `d` sobre `df` (la versión posterior)."""
+    return _apply(df, d, forward=False)
+
+# -----------------------------
+# Ajustes
+# -----------------------------
+def diff_settings(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Tuple[Any, Any]]:
+    """Claves cuyo valor cambia: clave -> (antes, después); `_MISSING` si no existía."""
+    out = {}
+    for k in set(before) | set(after):
+        a = before.get(k, _MISSING)
+        b = after.get(k, _MISSING)
+        if a is _MISSING or b is _MISSING or type(a) is not type(b) or a != b:
+            out[k] = (a, b if b is _MISSING else copy.deepcopy(b))
+    return out
+
+def _apply_settings(settings: Dict[str, Any], changes: Dict[str, Tuple[Any, Any]], forward: bool) -> None:
+    for k, (a, b) in changes.items():
+        v = b if forward else a
+        if v is _MISSING:
+            settings.pop(k, None)
+        else:
+            settings[k] = copy.deepcopy(v)
+
+# -----------------------------
+# Historial
+# -----------------------------
+class EditHistory:
+    """
+    Lista de revisiones con un cursor: `revisions[:pos]` están aplicadas. Registrar una
+    revisión nueva descarta las que se habían deshecho. Se conservan como mucho
+    `max_revisions` (las más antiguas se olvidan).
+    """
+    def __init__(self, max_revisions: int = MAX_REVISIONS):
+        self.max_revisions = max_revisions
+        self.revisions: List[Revision] = []
+        self.pos = 0
+        self.base = 0  # nº de revisiones olvidadas por el límite (numeración estable)
+        self._settings_snapshot: Dict[str, Any] = {}
+
+    # -- registro --
+    def record(self, rev: Revision) -> None:
+        del self.revisions[self.pos:]
+        self.revisions.append(rev)
+        self.pos = len(self.revisions)
+        self.trim()
+
+    def trim(self) -> None:
+        excess = len(self.revisions) - max(1, int(self.max_revisions))
+        if excess > 0:
+            del self.revisions[:excess]
+            self.pos = max(0, self.pos - excess)
+            self.base += excess
+
+    def record_zones(self, before: "pd.DataFrame", after: "pd.DataFrame", label: str = "Edición de zonas", ignore: Tuple[str, ...] = ()) -> bool:
+        d = diff_zones(before, after, ignore=ignore)
+        if d is None:
+            return False
+        self.record(Revision(label=label, zones=d))
+        return True
+
+    def snapshot_settings(self, settings: Dict[str, Any]) -> None:
+        self._settings_snapshot = copy.deepcopy(settings)
+
+    def sync_settings(self, settings: Dict[str, Any], label: str = "Ajustes", coalesce_s: float = 2.0) -> bool:
+        """
+        Registra como revisión los cambios de ajustes desde la última sincronización.
+        Las claves nuevas (valores por defecto que fija una página al visitarla) no generan
+        revisión. Cambios seguidos de las mismas claves en menos de `coalesce_s` segundos
+        (p. ej. pulsar varias veces +/- de un campo numérico) se funden en una sola revisión.
+        """
+        changes = diff_settings(self._settings_snapshot, settings)
+        if not changes:
+            return False
+        for k, (_, b) in changes.items():
+            if b is _MISSING:
+                self._settings_snapshot.pop(k, None)
+            else:
+                self._settings_snapshot[k] = copy.deepcopy(b)
+        changes = {k: v for k, v in changes.items() if v[0] is not _MISSING}
+        if not changes:
+            return False
+        last = self.revisions[-1] if self.revisions and self.pos == len(self.revisions) else None
+        if (last is not None and last.zones is None and set(last.settings) == set(changes)
+                and time.time() - last.t < coalesce_s):
+            last.settings = {k: (last.settings[k][0], changes[k][1]) for k in changes}
+            last.t = time.time()
+            return True
+        self.record(Revision(label=label, settings=changes))
+        return True
+
+    # -- navegación --
+    @property
+    def can_undo(self) -> bool:
+        return self.pos > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self.pos < len(self.revisions)
+
+    @property
+    def current(self) -> int:
+        """Número de revisión actual (0 = estado inicial)."""
+        return self.base + self.pos
+
+    def step(self, zones: "pd.DataFrame", settings: Dict[str, Any], forward: bool) -> "pd.DataFrame":
+        """Deshace (forward=False) o rehace una revisión; devuelve la tabla resultante."""
+        if forward:
+            rev = self.revisions[self.pos]
+            self.pos += 1
+        else:
+            self.pos -= 1
+            rev = self.revisions[self.pos]
+        if rev.zones is not None:
+            zones = _apply(zones, rev.zones, forward)
+        if rev.settings:
+            _apply_settings(settings, rev.settings, forward)
+            _apply_settings(self._settings_snapshot, rev.settings, forward)
+        return zones
+
+    def goto(self, revision: int, zones: "pd.DataFrame", settings: Dict[str, Any]) -> "pd.DataFrame":
+        """Salta a la revisión `revision` (numeración de `current`)."""
+        target = min(max(revision - self.base, 0), len(self.revisions))
+        while self.pos > target:
+            zones = self.step(zones, settings, forward=False)
+        while self.pos < target:
+            zones = self.step(zones, settings, forward=True)
+        return zones
+
+    def entries(self) -> List[Tuple[int, str]]:
+        """[(nº revisión, descripción)], incluyendo el estado inicial."""
+        out = [(self.base, "Estado inicial" if self.base == 0 else f"Revisión {self.base}")]
+        for i, rev in enumerate(self.revisions, start=1):
+            out.append((self.base + i, rev.describe()))
+        return out
+
+    def nbytes(self) -> int:
+        return sum(r.zones.nbytes() for r in self.revisions if r.zones is not None)
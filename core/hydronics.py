@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Predimensionado hidráulico de los circuitos de agua fría y caliente de climatización.
+
+Parte de la potencia de frío y calor por zona de `calc_climatizacion` y monta la red
+como árbol por niveles: central (generador) → agrupaciones (p. ej. edificio, montante)
+→ ramal de cada zona. En cada nivel los caudales se agregan de una vez (np.bincount
+sobre el código de grupo de cada zona) y todos los tramos de un circuito se dimensionan
+en una sola llamada a `pipes.size_pipes`.
+
+- Caudal: Q = P / (ρ·cp·ΔT), con ΔT e impulsión configurables por circuito.
+- Central: caudal del generador (con sobredimensionado y, si está activa, simultaneidad).
+- Pérdida de carga por tramo: R · L · 2 (ida y retorno) · (1 + singulares).
+- Bombas: primario (generador + tramo de central) y un secundario por agrupación del
+  primer nivel (o uno de distribución), con la altura del recorrido más desfavorable
+  más la pérdida del terminal.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import numpy as np
+
+from . import perf
+from .pipes import LevelNetwork, agua, caudal_ls, size_pipes
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CIRCUITOS = {"Frío": ("Potencia frío (kW)", "frio_generador_kw"), "Calor": ("Potencia calor (kW)", "calor_generador_kw")}
+OPCIONES: Dict[str, Any] = {
+    "material": "Acero (EN 10255 / EN 10216)",
+    "frio_t_impulsion": 7.0, "frio_dt": 5.0,
+    "calor_t_impulsion": 50.0, "calor_dt": 10.0,
+    "v_max": 1.5, "r_max_pa_m": 250.0,
+    "niveles": ["Edificio"],
+    "longitud_central_m": 20.0, "longitud_nivel_m": 60.0, "longitud_terminal_m": 15.0,
+    "singulares": 0.3, "dp_terminal_kpa": 30.0, "dp_generador_kpa": 50.0, "rendimiento_bomba": 0.6,
+}
+MAX_AVISOS = 20
+
+@perf.timed("calc_hidraulica")
+def calc_hidraulica(res: "pd.DataFrame", zones_df: "pd.DataFrame", settings: Dict[str, Any],
+                    totals: Dict[str, Any]) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `res`/`totals`: salida de `calc_climatizacion` (mismo orden de zonas que `zones_df`).
+    Devuelve (tramos, avisos, totales) con totals["bombas"] (caudal, altura y potencia
+    estimada por bomba) y el caudal de cada circuito.
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("hidraulica", {}) or {})}
+    warnings: List[WarningItem] = []
+    n = len(res)
+    niveles = [c for c in o["niveles"] if c in zones_df.columns] if len(zones_df) == n else []
+    zona = res["Zona"].astype(str).tolist() if "Zona" in res.columns else [f"Zona {i + 1}" for i in range(n)]
+    net = LevelNetwork(zones_df, niveles, zona)
+    longitud = net.by_level_length(o["longitud_central_m"], o["longitud_nivel_m"], o["longitud_terminal_m"])
+    factor_lineal = 2.0 * (1.0 + float(o["singulares"]))
+
+    frames: List["pd.DataFrame"] = []
+    bombas: List[Dict[str, Any]] = []
+    out_totals: Dict[str, Any] = {}
+    for circuito, (col, gen_key) in CIRCUITOS.items():
+        pref = "frio" if circuito == "Frío" else "calor"
+        t_c, dt = float(o[f"{pref}_t_impulsion"]), float(o[f"{pref}_dt"])
+        p_zona = np.nan_to_num(pd.to_numeric(res[col], errors="coerce").to_numpy(dtype=float), nan=0.0) if col in res.columns else np.zeros(n)
+        p = net.sum_up(p_zona)
+        p[0] = float(totals.get(gen_key, p_zona.sum()))
+        q = caudal_ls(p, dt, t_c)
+        s = size_pipes(q, o["material"], o["v_max"], o["r_max_pa_m"], t_c=t_c)
+        dp = s["r_pa_m"] * longitud * factor_lineal / 1000.0
+        acc = net.accumulate_down(dp)
+        frames.append(pd.DataFrame({
+            "Circuito": circuito, "Nivel": net.nivel, "Tramo": net.names, "Zonas": net.n_zonas,
+            "Potencia (kW)": p, "Caudal (L/s)": q, "Caudal (m³/h)": q * 3.6,
+            "Diámetro": np.where(s["paralelo"] > 1, [f"{k} × {d}" for k, d in zip(s["paralelo"].tolist(), s["dn"].tolist())], s["dn"]),
+            "Di (mm)": s["di_mm"], "v (m/s)": s["v_ms"], "R (Pa/m)": s["r_pa_m"],
+            "Longitud (m)": longitud, "Δp tramo (kPa)": dp, "Δp acumulada (kPa)": acc,
+            "Criterio": s["criterio"], "Cumple": s["cumple"],
+        }))
+
+        # bombas
+        rho = agua(t_c)[0]
+        zonas_acc = acc[net.zones] - acc[0] + float(o["dp_terminal_kpa"])
+        ramal = net.codes[0] if net.codes else np.zeros(n, dtype=np.int64)
+        ramal_nombres = net.group_names[0] if net.codes else ["Distribución"]
+        altura = np.zeros(len(ramal_nombres))
+        if n:
+            np.maximum.at(altura, ramal, np.where(p_zona > 0, zonas_acc, 0.0))
+        q_ramal = np.bincount(ramal, weights=q[net.zones], minlength=len(ramal_nombres)) if n else np.zeros(len(ramal_nombres))
+        heads = [float(o["dp_generador_kpa"]) + float(dp[0])] + altura.tolist()
+        flows = [float(q[0])] + q_ramal.tolist()
+        for nm, qq, hh in zip(["Primario (generador)"] + [f"Secundario {r}" for r in ramal_nombres], flows, heads):
+            bombas.append({"Circuito": circuito, "Bomba": nm, "Caudal (m³/h)": qq * 3.6, "Altura (kPa)": hh,
+                           "Altura (m.c.a.)": hh * 1000.0 / (rho * 9.81),
+                           "Potencia eléctrica (kW)": qq / 1000.0 * hh * 1000.0 / float(o["rendimiento_bomba"]) / 1000.0})
+        out_totals[f"caudal_{pref}_m3h"] = float(q[0]) * 3.6
+
+        paralelos = np.flatnonzero(s["paralelo"] > 1)
+        for i in paralelos[:MAX_AVISOS].tolist():
+            warnings.append(WarningItem("Hidráulica", net.names[i], f"{circuito}: {q[i]:.1f} L/s supera la mayor tubería de la tabla; "
+                                        f"se reparte en {s['paralelo'][i]} × {s['dn'][i]}."))
+        if len(paralelos) > MAX_AVISOS:
+            warnings.append(WarningItem("Hidráulica", "-", f"{circuito}: otros {len(paralelos) - MAX_AVISOS} tramos en paralelo."))
+
+    if n and not np.any([(pd.to_numeric(res.get(c), errors="coerce").fillna(0) > 0).any() for c, _ in CIRCUITOS.values() if c in res]):
+        warnings.append(WarningItem("Hidráulica", "-", "Ninguna zona tiene potencia de frío ni de calor."))
+    tramos = pd.concat(frames, ignore_index=True)
+    out_totals["bombas"] = pd.DataFrame(bombas)
+    out_totals["niveles"] = niveles
+    out_totals["material"] = o["material"]
+    return tramos, warnings, out_totals
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Totales incrementales: cada zona aporta un vector de contribuciones (kW, L/s, L/día, m²…)
+y los totales de cabecera son la suma de esos vectores. Al editar una celda solo se
+recalcula la fila afectada: se resta su contribución anterior y se suma la nueva.
+
+Las contribuciones por zona se obtienen con las mismas funciones por fila que usan las
+calculadoras de `core.calculations` (`fila_*`), sin la tabla de resultados, el cubo ni la
+simultaneidad de cada página (sobre la tabla completa al construir, sobre las filas
+tocadas al actualizar), y los totales derivados (generadores, m³/h, BT/MT…) con sus funciones
+`totals_*`, de modo que coinciden con los de cada página.
+"""
+from __future__ import annotations
+
+import json
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Contribución por zona: clave -> (calculadora, columna de su tabla de resultados)
+CONTRIBUTIONS: Dict[str, Tuple[str, str]] = {
+    "frio_kw": ("clima", "Potencia frío (kW)"),
+    "calor_kw": ("clima", "Potencia calor (kW)"),
+    "vent_lps": ("vent", "Ventilación total (L/s)"),
+    "todoaire_lps": ("vent", "Todo-aire total (L/s)"),
+    "ele_normal_kw": ("ele", "Potencia normal (kW)"),
+    "ele_comp_kw": ("ele", "Potencia comp (kW)"),
+    "agua_l_dia": ("agua", "Agua fría (L/día)"),
+    "acs_l_dia": ("agua", "ACS (L/día)"),
+    "acs_kw": ("agua", "Potencia ACS (kW)"),
+    "superficie_m2": ("reservas", "Superficie (m²)"),
+    "reserva_min_m2": ("reservas", "Reserva global mín. (m²)"),
+    "reserva_max_m2": ("reservas", "Reserva global máx. (m²)"),
+}
+KEYS = list(CONTRIBUTIONS)
+
+# Ajustes que cambian las contribuciones por zona (el resto solo afecta a los totales derivados)
+ZONE_SETTINGS = ("uso_edificio", "zona_climatica_global", "todo_aire_activo",
+                 "mapa_uso_tabla9", "mapa_uso_tabla13", "mapa_uso_tabla14")
+
+def settings_key(settings: Dict[str, Any]) -> str:
+    return json.dumps([settings.get(k) for k in ZONE_SETTINGS], sort_keys=True, default=str)
+
+def zone_contributions(zones_df: "pd.DataFrame", settings: Dict[str, Any]) -> np.ndarray:
+    """Matriz (zonas × KEYS) de contribuciones; los valores sin dato cuentan 0."""
+    from . import calculations as calc
+    out = np.zeros((len(zones_df), len(KEYS)))
+    if len(zones_df) == 0:
+        return out
+    zones_df = calc.normalize_zones_df(zones_df)
+    # solo las filas por zona: sin tabla de resultados, cubo ni simultaneidad
+    descartados: List[Any] = []
+    for j, r in enumerate(zones_df.to_dict("records")):
+        filas = {
+            "clima": calc.fila_climatizacion(r, descartados),
+            "vent": calc.fila_ventilacion(r, settings, descartados),
+            "ele": calc.fila_electricidad(r, descartados),
+            "agua": calc.fila_agua_y_acs(r, settings, descartados),
+            "reservas": calc.fila_reservas(r),
+        }
+        out[j] = [filas[src][col] for src, col in CONTRIBUTIONS.values()]
+        descartados.clear()
+    return np.nan_to_num(out, nan=0.0)
+
+def derived_totals(sums: Dict[str, float], settings: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Totales de cada módulo a partir de las sumas de contribuciones (O(1))."""
+    from . import calculations as calc
+    return {
+        "clima": calc.totals_climatizacion(sums["frio_kw"], sums["calor_kw"], settings),
+        "vent": calc.totals_ventilacion(sums["vent_lps"], sums["todoaire_lps"], settings),
+        "ele": calc.totals_electricidad(sums["ele_normal_kw"], sums["ele_comp_kw"]),
+        "agua": calc.totals_agua(sums["agua_l_dia"], sums["acs_l_dia"], sums["acs_kw"]),
+        "reservas": calc.totals_reservas(sums["superficie_m2"], sums["reserva_min_m2"], sums["reserva_max_m2"]),
+    }
+
+class IncrementalTotals:
+    """
+    Totales de una tabla base (la que se pasa al editor) más las ediciones del editor.
+
+    `apply_editor_state()` recibe el estado de `st.data_editor` (edited_rows, added_rows,
+    deleted_rows; posiciones respecto a la tabla base) y solo recalcula las filas cuyo
+    contenido ha cambiado desde la llamada anterior.
+    """
+    def __init__(self, base: "pd.DataFrame", settings: Dict[str, Any]):
+        self.base = base
+        self.settings = settings
+        self.contrib = zone_contributions(base, settings)
+        self.sums = self.contrib.sum(axis=0)
+        self.edits: Dict[int, Dict[str, Any]] = {}      # posición -> celdas editadas
+        self.edited_contrib: Dict[int, np.ndarray] = {}
+        self.deleted: set = set()
+        self.added: List[Dict[str, Any]] = []
+        self.added_contrib: List[np.ndarray] = []
+        self.last_recomputed = 0
+
+    # -- filas --
+    def _row(self, pos: int) -> np.ndarray:
+        if pos in self.deleted:
+            return np.zeros(len(KEYS))
+        return self.edited_contrib.get(pos, self.contrib[pos])
+
+    def _frame(self, rows: "pd.DataFrame") -> "pd.DataFrame":
+        from .schema import enforce_zones_schema, constant_category
+        from .state import BUILDING_COLUMNS
+        df = enforce_zones_schema(rows)
+        for col, k in BUILDING_COLUMNS.items():
+            if self.settings.get(k):
+                df[col] = constant_category(df, col, self.settings.get(k))
+        return df
+
+    def _edited_rows(self, positions: List[int]) -> "pd.DataFrame":
+        rows = self.base.iloc[positions].astype(object)
+        for i, pos in enumerate(positions):
+            for col, val in self.edits[pos].items():
+                if col in rows.columns:
+                    rows.iat[i, rows.columns.get_loc(col)] = val
+        return self._frame(rows)
+
+    def _added_rows(self, rows: List[Dict[str, Any]]) -> "pd.DataFrame":
+        import pandas as pd
+        return self._frame(pd.DataFrame(rows, columns=list(self.base.columns)).astype(object))
+
+    # -- editor --
+    def apply_editor_state(self, state: Optional[Dict[str, Any]]) -> int:
+        """Aplica el estado acumulado del editor. Devuelve el nº de filas recalculadas."""
+        state = state or {}
+        edits = {int(k): dict(v) for k, v in (state.get("edited_rows") or {}).items()}
+        deleted = {int(i) for i in (state.get("deleted_rows") or [])}
+        added = [dict(r) for r in (state.get("added_rows") or [])]
+
+        changed = sorted(p for p in set(self.edits) | set(edits) if self.edits.get(p) != edits.get(p))
+        touched = sorted(set(changed) | (self.deleted ^ deleted))
+        for pos in touched:
+            self.sums -= self._row(pos)
+
+        self.deleted = deleted
+        self.edits = edits
+        recompute = [p for p in changed if p in edits]
+        for p in changed:
+            self.edited_contrib.pop(p, None)
+        if recompute:
+            for p, vec in zip(recompute, zone_contributions(self._edited_rows(recompute), self.settings)):
+                self.edited_contrib[p] = vec
+        for pos in touched:
+            self.sums += self._row(pos)
+
+        # filas añadidas: se comparan por posición en la lista
+        new_idx = [i for i, r in enumerate(added) if i >= len(self.added) or self.added[i] != r]
+        for i in range(len(added), len(self.added)):
+            self.sums -= self.added_contrib[i]
+        del self.added_contrib[len(added):]
+        if new_idx:
+            vecs = zone_contributions(self._added_rows([added[i] for i in new_idx]), self.settings)
+            for i, vec in zip(new_idx, vecs):
+                if i < len(self.added_contrib):
+                    self.sums -= self.added_contrib[i]
+                    self.added_contrib[i] = vec
+                else:
+                    self.added_contrib.append(vec)
+                self.sums += vec
+        self.added = added
+
+        self.last_recomputed = len(recompute) + len(new_idx)
+        return self.last_recomputed
+
+    def commit(self, new_base: "pd.DataFrame") -> None:
+        """
+        La tabla editada pasa a ser la base (p. ej. al guardar): filas base no borradas en
+        su orden, más las añadidas. Reutiliza las contribuciones sin recalcular nada.
+        """
+        keep = [p for p in range(len(self.base)) if p not in self.deleted]
+        rows = [self._row(p) for p in keep] + list(self.added_contrib)
+        self.contrib = np.vstack(rows) if rows else np.zeros((0, len(KEYS)))
+        if len(self.contrib) != len(new_base):
+            self.__init__(new_base, self.settings)
+            return
+        self.base = new_base
+        self.sums = self.contrib.sum(axis=0)
+        self.edits, self.edited_contrib, self.deleted = {}, {}, set()
+        self.added, self.added_contrib = [], []
+
+    # -- totales --
+    def sums_dict(self) -> Dict[str, float]:
+        return {k: float(self.sums[i]) for i, k in enumerate(KEYS)}
+
+    def totals(self, settings: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        return derived_totals(self.sums_dict(), settings if settings is not None else self.settings)
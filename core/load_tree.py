@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Cuadro de cargas jerárquico: CGBT → cuadros secundarios → circuitos / motores.
+
+El árbol se guarda en arrays planos (un nodo por posición, `parent[i]` = posición del
+padre, -1 en la raíz). La agregación es de abajo arriba por niveles de profundidad: en
+cada nivel se cierran todos sus nodos a la vez y se suman (np.add.at) o maximizan
+(np.maximum.at) sobre sus padres, así que el coste es lineal en el nº de nodos y el
+nº de iteraciones es la profundidad del árbol.
+
+Por nodo:
+- circuito / motor: potencia instalada propia, factor de utilización ku;
+- cuadro: factor de simultaneidad ks sobre la suma de la demanda de sus hijos.
+
+Se agregan la potencia instalada y demandada (activa y reactiva), la intensidad de
+empleo Ib y la intensidad máxima en arranque (Ib del cuadro + el peor arranque de un
+motor aguas abajo, con el resto funcionando).
+"""
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import perf
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+TIPOS = ["CGBT", "Cuadro", "Circuito", "Motor"]
+COLUMNS = ["Nodo", "Padre", "Nombre", "Tipo", "P instalada (kW)", "ku", "ks", "Tensión (V)", "cosφ", "η", "Múltiplo arranque"]
+DEFAULTS: Dict[str, float] = {"ku": 1.0, "ks": 1.0, "Tensión (V)": 400.0, "cosφ": 0.9, "η": 1.0, "Múltiplo arranque": 1.0}
+MOTOR_DEFAULTS: Dict[str, float] = {"cosφ": 0.85, "η": 0.90, "Múltiplo arranque": 6.0}
+
+class LoadTree:
+    """Árbol en arrays planos (posición = nodo); `ids` son los identificadores de la tabla."""
+    def __init__(self, parent: np.ndarray, names: List[str], tipos: List[str], p_kw: np.ndarray,
+                 ku: np.ndarray, ks: np.ndarray, tension: np.ndarray, cosphi: np.ndarray, eta: np.ndarray,
+                 arranque: np.ndarray, ids: Optional[List[str]] = None):
+        self.ids = list(ids) if ids is not None else [str(i) for i in range(len(parent))]
+        self.parent = np.asarray(parent, dtype=np.int64)
+        self.names = list(names)
+        self.tipos = list(tipos)
+        self.p_kw = np.asarray(p_kw, dtype=float)
+        self.ku = np.asarray(ku, dtype=float)
+        self.ks = np.asarray(ks, dtype=float)
+        self.tension = np.asarray(tension, dtype=float)
+        self.cosphi = np.clip(np.asarray(cosphi, dtype=float), 0.05, 1.0)
+        self.eta = np.clip(np.asarray(eta, dtype=float), 0.05, 1.0)
+        self.arranque = np.asarray(arranque, dtype=float)
+        self.depth = _depths(self.parent)
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    # -- construcción --
+    @classmethod
+    def from_frame(cls, df: "pd.DataFrame") -> "LoadTree":
+        """
+        Tabla con columnas `COLUMNS` ("Padre" vacío = raíz; referencias por "Nodo"). Los
+        valores vacíos toman `DEFAULTS` (y `MOTOR_DEFAULTS` en motores). ValueError si un
+        padre no existe o hay ciclos.
+        """
+        import pandas as pd
+        if "Nodo" not in df.columns or "Padre" not in df.columns:
+            raise ValueError("El cuadro de cargas necesita las columnas 'Nodo' y 'Padre'.")
+        ids = df["Nodo"].astype(str).str.strip()
+        if ids.duplicated().any():
+            raise ValueError(f"Nodos repetidos: {', '.join(ids[ids.duplicated()].head(5))}.")
+        pos = pd.Series(np.arange(len(df)), index=ids.to_numpy())
+        padre = df["Padre"].astype(object).where(df["Padre"].notna(), "").astype(str).str.strip()
+        padre = padre.where(~padre.str.lower().isin(("", "nan", "none")), "")
+        missing = padre[(padre != "") & ~padre.isin(ids)]
+        if len(missing):
+            raise ValueError(f"Padres inexistentes: {', '.join(missing.head(5))}.")
+        parent = np.where(padre.to_numpy() == "", -1, pos.reindex(padre.to_numpy()).fillna(-1).to_numpy()).astype(np.int64)
+
+        tipos = df["Tipo"].astype(str).str.strip().tolist() if "Tipo" in df.columns else ["Circuito"] * len(df)
+        is_motor = np.array([t == "Motor" for t in tipos])
+
+        def col(name: str) -> np.ndarray:
+            v = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=float) if name in df.columns else np.full(len(df), np.nan)
+            default = np.where(is_motor, MOTOR_DEFAULTS.get(name, DEFAULTS.get(name, 0.0)), DEFAULTS.get(name, 0.0))
+            return np.where(np.isnan(v), default, v)
+
+        names = (df["Nombre"].astype(str).tolist() if "Nombre" in df.columns else ids.tolist())
+        return cls(parent, names, tipos, col("P instalada (kW)"), col("ku"), col("ks"), col("Tensión (V)"),
+                   col("cosφ"), col("η"), col("Múltiplo arranque"), ids=ids.tolist())
+
+    def to_frame(self) -> "pd.DataFrame":
+        import pandas as pd
+        ids = self.ids
+        return pd.DataFrame({
+            "Nodo": ids,
+            "Padre": [ids[p] if p >= 0 else "" for p in self.parent.tolist()],
+            "Nombre": self.names, "Tipo": self.tipos, "P instalada (kW)": self.p_kw, "ku": self.ku, "ks": self.ks,
+            "Tensión (V)": self.tension, "cosφ": self.cosphi, "η": self.eta, "Múltiplo arranque": self.arranque,
+        }, columns=COLUMNS)
+
+    # -- agregación --
+    @perf.timed("cuadro_cargas.aggregate")
+    def aggregate(self) -> Dict[str, np.ndarray]:
+        """Magnitudes agregadas de cada nodo (arrays en el orden de los nodos)."""
+        n = len(self)
+        is_motor = np.array([t == "Motor" for t in self.tipos], dtype=bool)
+        k3 = np.where(self.tension > 300.0, math.sqrt(3.0), 1.0)  # trifásico (400 V) / monofásico (230 V)
+        tan = np.tan(np.arccos(self.cosphi))
+        # potencia eléctrica absorbida por la carga propia (motores: potencia útil / η)
+        p_own = np.where(is_motor, self.p_kw / self.eta, self.p_kw)
+        own_dem = p_own * self.ku
+        ib_own_full = p_own * 1000.0 / (k3 * self.tension * self.cosphi)
+        extra_own = np.where(is_motor, (self.arranque - 1.0) * ib_own_full, 0.0)  # sobreintensidad de arranque
+
+        installed = p_own.copy()
+        child_p, child_q, child_extra = np.zeros(n), np.zeros(n), np.zeros(n)
+        dem_p, dem_q, extra = np.zeros(n), np.zeros(n), np.zeros(n)
+        for d, idx in reversed(self.levels()):
+            dem_p[idx] = own_dem[idx] + self.ks[idx] * child_p[idx]
+            dem_q[idx] = own_dem[idx] * tan[idx] + self.ks[idx] * child_q[idx]
+            extra[idx] = np.maximum(extra_own[idx], child_extra[idx])
+            if d > 0:
+                par = self.parent[idx]
+                np.add.at(installed, par, installed[idx])
+                np.add.at(child_p, par, dem_p[idx])
+                np.add.at(child_q, par, dem_q[idx])
+                np.maximum.at(child_extra, par, extra[idx])
+        s_kva = np.hypot(dem_p, dem_q)
+        ib = s_kva * 1000.0 / (k3 * self.tension)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cos_eq = np.where(s_kva > 0, dem_p / s_kva, np.nan)
+        return {"installed_kw": installed, "demand_kw": dem_p, "demand_kvar": dem_q, "demand_kva": s_kva,
+                "cosphi": cos_eq, "ib_a": ib, "inrush_a": ib + extra}
+
+    def levels(self) -> List[Tuple[int, np.ndarray]]:
+        """[(profundidad, posiciones de sus nodos)] de la raíz a las hojas."""
+        order = np.argsort(self.depth, kind="stable")
+        bounds = np.searchsorted(self.depth[order], np.arange(int(self.depth.max(initial=0)) + 2))
+        return [(d, order[bounds[d]:bounds[d + 1]]) for d in range(len(bounds) - 1) if bounds[d + 1] > bounds[d]]
+
+    def accumulate_down(self, values: np.ndarray) -> np.ndarray:
+        """Suma acumulada desde la raíz (p. ej. caída de tensión de cada tramo -> total en el nodo)."""
+        out = np.asarray(values, dtype=float).copy()
+        for d, idx in self.levels():
+            if d > 0:
+                out[idx] += out[self.parent[idx]]
+        return out
+
+    def report(self) -> "pd.DataFrame":
+        """Tabla de resultados en orden de árbol (cada nodo seguido de sus descendientes)."""
+        import pandas as pd
+        agg = self.aggregate()
+        order = self.tree_order()
+        ids = self.ids
+        return pd.DataFrame({
+            "Nodo": [ids[i] for i in order],
+            "Nombre": ["· " * int(self.depth[i]) + self.names[i] for i in order],
+            "Tipo": [self.tipos[i] for i in order],
+            "Nivel": self.depth[order],
+            "P instalada (kW)": agg["installed_kw"][order],
+            "ku": np.where(self.is_panel[order], np.nan, self.ku[order]),
+            "ks": np.where(self.is_panel[order], self.ks[order], np.nan),
+            "P demandada (kW)": agg["demand_kw"][order],
+            "S (kVA)": agg["demand_kva"][order],
+            "cosφ": agg["cosphi"][order],
+            "Ib (A)": agg["ib_a"][order],
+            "I arranque máx. (A)": agg["inrush_a"][order],
+        })
+
+    @property
+    def is_panel(self) -> np.ndarray:
+        has_children = np.zeros(len(self), dtype=bool)
+        has_children[self.parent[self.parent >= 0]] = True
+        return has_children | np.array([t in ("CGBT", "Cuadro") for t in self.tipos], dtype=bool)
+
+    def tree_order(self) -> np.ndarray:
+        """Recorrido en profundidad (padre antes que hijos, hermanos en su orden original)."""
+        children: Dict[int, List[int]] = {}
+        for i, p in enumerate(self.parent.tolist()):
+            children.setdefault(p, []).append(i)
+        out: List[int] = []
+        stack = list(reversed(children.get(-1, [])))
+        while stack:
+            i = stack.pop()
+            out.append(i)
+            stack.extend(reversed(children.get(i, [])))
+        return np.asarray(out, dtype=np.int64)
+
+def _depths(parent: np.ndarray) -> np.ndarray:
+    """Profundidad de cada nodo saltando de padre en padre para todos a la vez (ValueError si hay ciclos)."""
+    n = len(parent)
+    depth = np.zeros(n, dtype=np.int64)
+    p = parent.copy()
+    for _ in range(n + 1):
+        up = p >= 0
+        if not up.any():
+            return depth
+        depth[up] += 1
+        p[up] = parent[p[up]]
+    raise ValueError("El cuadro de cargas tiene ciclos (un nodo es antecesor de sí mismo).")
+
+# -----------------------------
+# Árbol inicial desde los resultados de Electricidad
+# -----------------------------
+def seed_from_zones(res: "pd.DataFrame", settings: Dict[str, Any], zones_df: Optional["pd.DataFrame"] = None) -> "pd.DataFrame":
+    """
+    Tabla de nodos: CGBT → cuadro de zonas (uno por edificio en carteras) → un circuito por
+    zona (Tabla 11), cuadro complementario (Tabla 12) y cuadro de motores (`settings["motores"]`).
+    Todos los ks y ku valen 1 (ver `apply_factors`).
+    """
+    import pandas as pd
+    rows: List[Dict[str, Any]] = []
+
+    def panel(nodo: str, padre: str, nombre: str, tipo: str = "Cuadro") -> None:
+        rows.append({"Nodo": nodo, "Padre": padre, "Nombre": nombre, "Tipo": tipo, "P instalada (kW)": 0.0, "ks": 1.0})
+
+    panel("CGBT", "", "CGBT", "CGBT")
+    n = len(res)
+    p_norm = pd.to_numeric(res.get("Potencia normal (kW)", pd.Series(np.nan, index=res.index)), errors="coerce").fillna(0.0).to_numpy()
+    p_comp = pd.to_numeric(res.get("Potencia comp (kW)", pd.Series(0.0, index=res.index)), errors="coerce").fillna(0.0).to_numpy()
+    zona = res.get("Zona", pd.Series([f"Zona {i + 1}" for i in range(n)])).astype(str).to_numpy()
+    edificio = None
+    if zones_df is not None and "Edificio" in zones_df.columns and len(zones_df) == n:
+        edificio = zones_df["Edificio"].astype(str).to_numpy()
+
+    if n:
+        frame = pd.DataFrame({"zona": zona, "p": p_norm, "pc": p_comp, "ed": edificio if edificio is not None else ""})
+        frame["i"] = np.arange(n)
+        groups = [("CS-ZONAS", "Cuadro de zonas (Tabla 11)", frame)] if edificio is None else [
+            (f"CS-{ed}", f"Cuadro {ed}", part) for ed, part in frame.groupby("ed", sort=False)]
+        for nodo, nombre, part in groups:
+            panel(nodo, "CGBT", nombre)
+            rows.extend({"Nodo": f"Z{i + 1}", "Padre": nodo, "Nombre": z, "Tipo": "Circuito", "P instalada (kW)": p, "ku": 1.0}
+                        for i, z, p in zip(part["i"].tolist(), part["zona"].tolist(), part["p"].tolist()))
+        if (p_comp > 0).any():
+            panel("CS-COMP", "CGBT", "Cuadro suministro complementario (Tabla 12)")
+            rows.extend({"Nodo": f"ZC{i + 1}", "Padre": "CS-COMP", "Nombre": f"{zona[i]} (comp.)", "Tipo": "Circuito",
+                         "P instalada (kW)": float(p_comp[i]), "ku": 1.0} for i in np.flatnonzero(p_comp > 0).tolist())
+
+    motores = settings.get("motores", []) or []
+    if motores:
+        panel("CS-MOT", "CGBT", "Cuadro de fuerza (motores)")
+        for k, m in enumerate(motores):
+            rows.append({"Nodo": f"M{k + 1}", "Padre": "CS-MOT", "Nombre": m.get("nombre", f"Motor {k + 1}"), "Tipo": "Motor",
+                         "P instalada (kW)": float(m.get("potencia_kw", 0) or 0), "ku": 1.0,
+                         "Tensión (V)": float(m.get("tension_v", 400) or 400), "cosφ": float(m.get("cosphi", 0.85) or 0.85),
+                         "η": float(m.get("eta", 0.90) or 0.90), "Múltiplo arranque": float(m.get("multiplo_arranque", 6.0) or 6.0)})
+    return pd.DataFrame(rows, columns=COLUMNS)
+
+def panels(nodes: "pd.DataFrame") -> "pd.DataFrame":
+    """Cuadros de la tabla (nodos que son padre de alguno o de tipo CGBT/Cuadro)."""
+    padres = set(nodes["Padre"].astype(str))
+    mask = nodes["Nodo"].astype(str).isin(padres) | nodes["Tipo"].isin(["CGBT", "Cuadro"])
+    return nodes.loc[mask, ["Nodo", "Nombre", "Tipo"]].reset_index(drop=True)
+
+def panel_factors(nodes: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Factores actuales de cada cuadro de la tabla: su ks y el ku común de sus circuitos y
+    motores directos (NaN si no tiene o si difieren). Vacíos -> `DEFAULTS`.
+    """
+    import pandas as pd
+    cuadros = panels(nodes)
+    nodo = nodes["Nodo"].astype(str)
+    ks = pd.to_numeric(nodes["ks"], errors="coerce") if "ks" in nodes.columns else pd.Series(np.nan, index=nodes.index)
+    ku = pd.to_numeric(nodes["ku"], errors="coerce") if "ku" in nodes.columns else pd.Series(np.nan, index=nodes.index)
+    ks = pd.Series(ks.fillna(DEFAULTS["ks"]).to_numpy(), index=nodo.to_numpy())
+    hijos = nodes["Tipo"].isin(["Circuito", "Motor"]).to_numpy()
+    ku_h = pd.DataFrame({"padre": nodes["Padre"].astype(str).to_numpy()[hijos], "ku": ku.fillna(DEFAULTS["ku"]).to_numpy()[hijos]})
+    g = ku_h.groupby("padre")["ku"]
+    comun = g.first().where(g.nunique() == 1)
+    cuadros["ks"] = ks[~ks.index.duplicated()].reindex(cuadros["Nodo"].astype(str)).to_numpy()
+    cuadros["ku circuitos"] = comun.reindex(cuadros["Nodo"].astype(str)).to_numpy()
+    return cuadros
+
+def apply_factors(nodes: "pd.DataFrame", factores: Dict[str, Dict[str, float]]) -> "pd.DataFrame":
+    """
+    `factores`: nodo de cuadro -> {"ks": simultaneidad del cuadro, "ku": utilización de sus
+    circuitos y motores directos}. Devuelve una copia de la tabla con los factores aplicados.
+    """
+    out = nodes.copy()
+    nodo = out["Nodo"].astype(str)
+    padre = out["Padre"].astype(str)
+    for panel_id, f in (factores or {}).items():
+        if f.get("ks") is not None:
+            out.loc[nodo == panel_id, "ks"] = float(f["ks"])
+        if f.get("ku") is not None:
+            out.loc[(padre == panel_id) & out["Tipo"].isin(["Circuito", "Motor"]), "ku"] = float(f["ku"])
+    return out
@@ -0,0 +1,385 @@
+# -*- coding: utf-8 -*-
+"""
+Municipios y zona climática del CTE (DB-HE, Apéndice B).
+
+Fuentes editables (CSV, en `data/`):
+- `municipios_es.csv`: municipio, provincia, altitud_m, lat, lon
+- `zonas_cte_altitud.csv`: provincia, altitud_max_m, zona_cte — tramos de altitud por
+  provincia (altitud_max_m vacío = sin límite). La zona de cada municipio es la del
+  primer tramo cuya altitud máxima no supera.
+
+`python -m core.municipios` compila ambos a `data/municipios_es.npz` (arrays compactos:
+nombres en un bloque UTF-8, códigos enteros, altitudes int16, coordenadas float32).
+La app solo lee el .npz, una vez por proceso (compartido entre sesiones), y construye
+un índice ordenado de claves sin acentos para búsqueda por prefijo y, al primer uso, una
+rejilla espacial para resolver coordenadas al municipio más cercano.
+"""
+from __future__ import annotations
+
+import csv
+import functools
+import math
+import sys
+import unicodedata
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+EARTH_RADIUS_KM = 6371.0
+DISTANCIA_MAX_KM = 50.0  # más lejos del municipio más cercano no se asigna zona climática
+GRID_POINTS_PER_CELL = 4  # densidad objetivo de la rejilla espacial
+MUNICIPIOS_CSV = DATA_DIR / "municipios_es.csv"
+REGLAS_CSV = DATA_DIR / "zonas_cte_altitud.csv"
+MUNICIPIOS_NPZ = DATA_DIR / "municipios_es.npz"
+
+def normalize(text: str) -> str:
+    """Clave de búsqueda: minúsculas, sin acentos ni signos, espacios simples."""
+    s = unicodedata.normalize("NFKD", str(text))
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower()
+    s = "".join(c if c.isalnum() else " " for c in s)
+    return " ".join(s.split())
+
+def _blob(strings: List[str]) -> np.ndarray:
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+def _unblob(arr: np.ndarray) -> List[str]:
+    return arr.tobytes().decode("utf-8").split("\n") if len(arr) else []
+
+# -----------------------------
+# Compilación (CSV -> npz)
+# -----------------------------
+def _read_rules(path: Path) -> Dict[str, List[Tuple[float, str]]]:
+    rules: Dict[str, List[Tuple[float, str]]] = {}
+    with open(path, encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            alt = (r.get("altitud_max_m") or "").strip()
+            rules.setdefault(r["provincia"].strip(), []).append((float(alt) if alt else math.inf, r["zona_cte"].strip()))
+    for bands in rules.values():
+        bands.sort()
+    return rules
+
+def zone_for(rules: Dict[str, List[Tuple[float, str]]], provincia: str, altitud: float) -> Optional[str]:
+    """Zona del primer tramo de la provincia que admite la altitud (None si no hay reglas)."""
+    for alt_max, zona in rules.get(provincia, []):
+        if altitud <= alt_max:
+            return zona
+    return None
+
+def build(municipios_csv: Path = MUNICIPIOS_CSV, reglas_csv: Path = REGLAS_CSV, out: Path = MUNICIPIOS_NPZ) -> int:
+    """Compila los CSV al .npz. Devuelve el nº de municipios."""
+    rules = _read_rules(reglas_csv)
+    with open(municipios_csv, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    provincias = sorted({r["provincia"].strip() for r in rows} | set(rules))
+    zonas = sorted({z for bands in rules.values() for _, z in bands})
+    prov_code = {p: i for i, p in enumerate(provincias)}
+    zona_code = {z: i for i, z in enumerate(zonas)}
+
+    names, prov, alt, lat, lon, zona = [], [], [], [], [], []
+    missing = []
+    for r in rows:
+        p = r["provincia"].strip()
+        a = float(r["altitud_m"])
+        z = zone_for(rules, p, a)
+        if z is None:
+            missing.append(p)
+        names.append(r["municipio"].strip())
+        prov.append(prov_code[p])
+        alt.append(round(a))
+        lat.append(float(r["lat"]))
+        lon.append(float(r["lon"]))
+        zona.append(zona_code[z] if z is not None else -1)
+    if missing:
+        print(f"Aviso: provincias sin reglas de zona: {sorted(set(missing))}", file=sys.stderr)
+
+    # reglas en forma de arrays (provincia, altitud máxima, zona) para consultas por altitud
+    r_prov, r_alt, r_zona = [], [], []
+    for p, bands in rules.items():
+        for alt_max, z in bands:
+            r_prov.append(prov_code[p])
+            r_alt.append(alt_max)
+            r_zona.append(zona_code[z])
+
+    np.savez_compressed(
+        out,
+        nombres=_blob(names),
+        provincias=_blob(provincias),
+        zonas=_blob(zonas),
+        provincia=np.asarray(prov, dtype=np.int16),
+        altitud=np.asarray(alt, dtype=np.int16),
+        lat=np.asarray(lat, dtype=np.float32),
+        lon=np.asarray(lon, dtype=np.float32),
+        zona=np.asarray(zona, dtype=np.int8),
+        regla_provincia=np.asarray(r_prov, dtype=np.int16),
+        regla_altitud_max=np.asarray(r_alt, dtype=np.float32),
+        regla_zona=np.asarray(r_zona, dtype=np.int8),
+    )
+    return len(names)
+
+# -----------------------------
+# Índice en memoria
+# -----------------------------
+class MunicipalityIndex:
+    """
+    Municipios en arrays paralelos (posición = id). La búsqueda usa un array ordenado de
+    claves normalizadas: una por cada palabra inicial posible del nombre ("a coruna",
+    "coruna"), de modo que un prefijo se resuelve con dos búsquedas binarias.
+    """
+    def __init__(self, data: Dict[str, np.ndarray]):
+        self.names = _unblob(data["nombres"])
+        self.provincias = _unblob(data["provincias"])
+        self.zonas = _unblob(data["zonas"])
+        self.provincia = data["provincia"]
+        self.altitud = data["altitud"]
+        self.lat = data["lat"]
+        self.lon = data["lon"]
+        self.zona = data["zona"]
+        self._rules: Dict[int, List[Tuple[float, int]]] = {}
+        for p, a, z in zip(data["regla_provincia"].tolist(), data["regla_altitud_max"].tolist(), data["regla_zona"].tolist()):
+            self._rules.setdefault(p, []).append((a, z))
+        for bands in self._rules.values():
+            bands.sort()
+        # provincias con más de un tramo: solo en ellas la altitud puede cambiar la zona
+        self._por_altitud = np.zeros(len(self.provincias), dtype=bool)
+        self._por_altitud[[p for p, bands in self._rules.items() if len(bands) > 1]] = True
+
+        keys: List[str] = []
+        ids: List[int] = []
+        for i, name in enumerate(self.names):
+            words = normalize(name).split()
+            for w in range(len(words)):
+                keys.append(" ".join(words[w:]))
+                ids.append(i)
+        order = np.argsort(np.asarray(keys, dtype=object), kind="stable")
+        self._keys = np.asarray(keys, dtype=str)[order]
+        self._key_ids = np.asarray(ids, dtype=np.int32)[order]
+        self._by_label = {self.label(i): i for i in range(len(self.names))}
+        self._by_name: Dict[str, int] = {}
+        for i, name in enumerate(self.names):
+            self._by_name.setdefault(normalize(name), i)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def label(self, i: int) -> str:
+        return f"{self.names[i]} ({self.provincias[self.provincia[i]]})"
+
+    def search(self, text: str, limit: int = 50) -> List[int]:
+        """Ids cuyo nombre (o una de sus palabras) empieza por `text`, sin distinguir acentos."""
+        q = normalize(text)
+        if not q:
+            return []
+        lo = int(np.searchsorted(self._keys, q, side="left"))
+        hi = int(np.searchsorted(self._keys, q + "\uffff", side="right"))
+        out: List[int] = []
+        seen = set()
+        for i in self._key_ids[lo:hi].tolist():
+            if i not in seen:
+                seen.add(i)
+                out.append(i)
+        # primero los que empiezan por el texto buscado, después los de palabra interior
+        out.sort(key=lambda i: (not normalize(self.names[i]).startswith(q), self.names[i]))
+        return out[:limit]
+
+    def find(self, text: str) -> Optional[int]:
+        """Id por etiqueta "Municipio (Provincia)" o por nombre exacto (sin acentos)."""
+        i = self._by_label.get(text)
+        return i if i is not None else self._by_name.get(normalize(text))
+
+    def zone(self, i: int) -> Optional[str]:
+        z = int(self.zona[i])
+        return self.zonas[z] if z >= 0 else None
+
+    def altitude_applies(self, i: int) -> bool:
+        """True si la provincia del municipio `i` tiene varios tramos de altitud (la altitud puede cambiar su zona)."""
+        return bool(self._por_altitud[int(self.provincia[i])])
+
+    def zone_at_altitude(self, i: int, altitud: float) -> Optional[str]:
+        """Zona que corresponde al municipio `i` si estuviera a `altitud` m (tramos de su provincia)."""
+        for alt_max, z in self._rules.get(int(self.provincia[i]), []):
+            if altitud <= alt_max:
+                return self.zonas[z]
+        return None
+
+    def zone_codes_at_altitudes(self, ids: np.ndarray, altitudes: np.ndarray) -> np.ndarray:
+        """
+        Versión vectorizada: código de zona de cada municipio `ids[k]` a `altitudes[k]` m
+        (-1 sin reglas). Las altitudes NaN conservan la zona del municipio.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        alt = np.asarray(altitudes, dtype=float)
+        out = self.zona[ids].astype(np.int16)
+        prov = self.provincia[ids]
+        has_alt = ~np.isnan(alt)
+        for p in np.unique(prov[has_alt]).tolist():
+            bands = self._rules.get(p)
+            if not bands:
+                continue
+            m = has_alt & (prov == p)
+            pos = np.searchsorted(np.array([a for a, _ in bands]), alt[m], side="left")
+            codes = np.array([z for _, z in bands] + [-1], dtype=np.int16)
+            out[m] = codes[np.minimum(pos, len(bands))]
+        return out
+
+    # -- índice espacial --
+    @functools.cached_property
+    def _grid(self) -> Dict[str, Any]:
+        """
+        Rejilla regular sobre una proyección equirectangular (km) con los municipios
+        ordenados por celda: `start[c]:start[c+1]` son los de la celda c.
+        """
+        lat0 = float(np.mean(self.lat)) if len(self) else 40.0
+        kx = math.radians(1.0) * EARTH_RADIUS_KM * math.cos(math.radians(lat0))
+        ky = math.radians(1.0) * EARTH_RADIUS_KM
+        x = self.lon.astype(float) * kx
+        y = self.lat.astype(float) * ky
+        x0, y0 = float(x.min()), float(y.min())
+        w, h = max(float(x.max()) - x0, 1.0), max(float(y.max()) - y0, 1.0)
+        cell = max(math.sqrt(w * h * GRID_POINTS_PER_CELL / max(len(self), 1)), 1.0)
+        nx, ny = int(w // cell) + 1, int(h // cell) + 1
+        cx = ((x - x0) // cell).astype(np.int64)
+        cy = ((y - y0) // cell).astype(np.int64)
+        cid = cy * nx + cx
+        order = np.argsort(cid, kind="stable")
+        start = np.searchsorted(cid[order], np.arange(nx * ny + 1))
+        return {"kx": kx, "ky": ky, "x0": x0, "y0": y0, "cell": cell, "nx": nx, "ny": ny,
+                "order": order, "start": start, "x": x[order], "y": y[order]}
+
+    def nearest(self, lat: Any, lon: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Municipio más cercano a cada punto (vectorizado). Recorre la rejilla por anillos
+        alrededor de la celda de cada punto y da por resuelto el punto en cuanto ningún
+        anillo pendiente puede contener uno más cercano. Devuelve (ids, distancia en km
+        por la fórmula del haversino).
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=float))
+        lon = np.atleast_1d(np.asarray(lon, dtype=float))
+        n = len(lat)
+        best = np.full(n, -1, dtype=np.int64)
+        if n == 0 or len(self) == 0:
+            return best, np.full(n, np.nan)
+        g = self._grid
+        valid = ~(np.isnan(lat) | np.isnan(lon))
+        qx = np.where(valid, lon, 0.0) * g["kx"]
+        qy = np.where(valid, lat, 0.0) * g["ky"]
+        qcx = np.clip((qx - g["x0"]) // g["cell"], -1, g["nx"]).astype(np.int64)
+        qcy = np.clip((qy - g["y0"]) // g["cell"], -1, g["ny"]).astype(np.int64)
+        fx = (qx - g["x0"]) / g["cell"] - qcx
+        fy = (qy - g["y0"]) / g["cell"] - qcy
+        edge = np.clip(np.minimum(np.minimum(fx, 1 - fx), np.minimum(fy, 1 - fy)), 0.0, 1.0)  # borde de su celda, en celdas
+        best_d2 = np.full(n, np.inf)
+        pending = np.flatnonzero(valid)
+        max_ring = max(g["nx"], g["ny"]) + 1
+        for r in range(max_ring + 1):
+            if len(pending) == 0:
+                break
+            ring = np.array([(dx, dy) for dx in range(-r, r + 1) for dy in range(-r, r + 1)
+                             if max(abs(dx), abs(dy)) == r], dtype=np.int64)
+            # pares (punto, celda del anillo) dentro de la rejilla
+            cx = (qcx[pending][:, None] + ring[:, 0]).ravel()
+            cy = (qcy[pending][:, None] + ring[:, 1]).ravel()
+            q = np.repeat(pending, len(ring))
+            inside = (cx >= 0) & (cx < g["nx"]) & (cy >= 0) & (cy < g["ny"])
+            q, c = q[inside], cy[inside] * g["nx"] + cx[inside]
+            lo, counts = g["start"][c], g["start"][c + 1] - g["start"][c]
+            if counts.sum():
+                # pares (punto, municipio) de esas celdas y el mínimo por punto
+                qq = np.repeat(q, counts)
+                kk = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+                d2 = (g["x"][kk] - qx[qq]) ** 2 + (g["y"][kk] - qy[qq]) ** 2
+                # los pares de cada punto son contiguos: mínimo por tramos
+                heads = np.flatnonzero(np.r_[True, qq[1:] != qq[:-1]])
+                wd = np.minimum.reduceat(d2, heads)
+                hit = np.flatnonzero(d2 == np.repeat(wd, np.diff(np.r_[heads, len(qq)])))
+                hit = hit[np.r_[True, qq[hit][1:] != qq[hit][:-1]]]  # primer empate de cada punto
+                wq, wk = qq[hit], kk[hit]
+                better = wd < best_d2[wq]
+                best_d2[wq[better]] = wd[better]
+                best[wq[better]] = g["order"][wk[better]]
+            # lo que quede por explorar está fuera del bloque de (2r+1)² celdas explorado
+            reach = (r + edge[pending]) * g["cell"]
+            pending = pending[best_d2[pending] > reach * reach]
+        found = best >= 0
+        dist = np.full(n, np.nan)
+        if found.any():
+            b = best[found]
+            p1, p2 = np.radians(lat[found]), np.radians(self.lat[b].astype(float))
+            dphi, dl = p2 - p1, np.radians(self.lon[b].astype(float) - lon[found])
+            a = np.sin(dphi / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+            dist[found] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        return best, dist
+
+    def resolve(self, lat: Any, lon: Any, altitud: Any = None, max_km: Optional[float] = DISTANCIA_MAX_KM) -> Dict[str, np.ndarray]:
+        """
+        Municipio más cercano y zona climática de cada emplazamiento. Si se da la altitud
+        del emplazamiento, la zona se corrige con los tramos de altitud de su provincia
+        (`corregida` solo si la provincia tiene más de uno); si no, se usa la del municipio. Los emplazamientos a más de `max_km` del municipio
+        más cercano quedan sin zona (`lejos`).
+        """
+        ids, dist = self.nearest(lat, lon)
+        lejos = (ids >= 0) & (dist > max_km) if max_km is not None else np.zeros(len(ids), dtype=bool)
+        found = (ids >= 0) & ~lejos
+        alt = np.full(len(ids), np.nan) if altitud is None else np.asarray(altitud, dtype=float).reshape(-1)
+        codes = np.full(len(ids), -1, dtype=np.int16)
+        if found.any():
+            codes[found] = self.zone_codes_at_altitudes(ids[found], alt[found])
+        zonas = np.array(self.zonas + [""], dtype=object)
+        corregida = found & ~np.isnan(alt) & self._por_altitud[self.provincia[np.where(found, ids, 0)]]
+        return {"id": ids, "distancia_km": dist, "zona": zonas[codes], "corregida": corregida, "lejos": lejos}
+
+# Columnas admitidas en una lista de emplazamientos (sin distinguir mayúsculas/acentos)
+SITE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "lat": ("lat", "latitud", "latitude"),
+    "lon": ("lon", "lng", "long", "longitud", "longitude"),
+    "altitud": ("altitud", "altitud m", "elevacion", "elevation", "alt", "cota"),
+}
+
+def _site_column(df: "pd.DataFrame", key: str) -> Optional[str]:
+    names = SITE_COLUMNS[key]
+    for col in df.columns:
+        if normalize(col) in names:
+            return col
+    return None
+
+def resolve_sites(index: MunicipalityIndex, sites: "pd.DataFrame", max_km: Optional[float] = DISTANCIA_MAX_KM) -> "pd.DataFrame":
+    """
+    Emplazamientos con coordenadas -> municipio más cercano y zona climática CTE.
+    Conserva las columnas de entrada y añade Municipio, Distancia (km), Altitud municipio (m),
+    Altitud emplazamiento (m), Zona climática, Corregida por altitud y Fuera de alcance (a
+    más de `max_km` del municipio más cercano: sin zona). Lanza ValueError si faltan latitud o longitud.
+    """
+    import pandas as pd
+    lat_col, lon_col = _site_column(sites, "lat"), _site_column(sites, "lon")
+    if lat_col is None or lon_col is None:
+        raise ValueError("La lista de emplazamientos necesita columnas de latitud y longitud.")
+    alt_col = _site_column(sites, "altitud")
+    lat = pd.to_numeric(sites[lat_col], errors="coerce").to_numpy(dtype=float)
+    lon = pd.to_numeric(sites[lon_col], errors="coerce").to_numpy(dtype=float)
+    alt = pd.to_numeric(sites[alt_col], errors="coerce").to_numpy(dtype=float) if alt_col else None
+    res = index.resolve(lat, lon, alt, max_km)
+    found = res["id"] >= 0
+    ids = np.where(found, res["id"], 0)
+    out = sites.reset_index(drop=True).copy()
+    out["Municipio"] = np.where(found, np.array([index.label(i) for i in ids.tolist()], dtype=object), None)
+    out["Distancia (km)"] = np.round(res["distancia_km"], 2)
+    out["Altitud municipio (m)"] = np.where(found, index.altitud[ids].astype(float), np.nan)
+    out["Altitud emplazamiento (m)"] = alt if alt is not None else np.nan
+    out["Zona climática"] = np.where(found & ~res["lejos"], res["zona"], None)
+    out["Corregida por altitud"] = res["corregida"]
+    out["Fuera de alcance"] = res["lejos"]
+    return out
+
+@functools.lru_cache(maxsize=1)
+def load_index(path: Path = MUNICIPIOS_NPZ) -> MunicipalityIndex:
+    """Índice cargado una sola vez por proceso (compartido por todas las sesiones)."""
+    with np.load(path) as data:
+        return MunicipalityIndex({k: data[k] for k in data.files})
+
+if __name__ == "__main__":
+    n = build()
+    print(f"{n} municipios -> {MUNICIPIOS_NPZ}")
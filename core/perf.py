@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación ligera: tramos de tiempo (y opcionalmente pico de memoria con
+tracemalloc) alrededor de cada etapa de cálculo, exportación y pintado de páginas.
+
+Desactivada por defecto: `span()` devuelve un contexto vacío compartido y el coste es
+una consulta a un ContextVar. Cada sesión de Streamlit tiene su propio registro
+(`st.session_state["perf_registry"]`), enlazado al hilo del script en `init_state()`.
+
+Variables de entorno:
+- PREDIM_PERF=1           activa la medición en sesiones nuevas
+- PREDIM_PERF_MEM=1       añade pico de memoria (tracemalloc; más lento)
+- PREDIM_PERF_LOG=<ruta>  añade cada medición a un fichero JSONL local
+"""
+from __future__ import annotations
+
+import functools
+import json
+import os
+import time
+import tracemalloc
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+MAX_SAMPLES = 200  # nº de ejecuciones recientes que se guardan por etapa
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+class MetricsRegistry:
+    """
+    Muestras recientes por etapa: (ms, pico de memoria en KB o None).
+    """
+    def __init__(self, enabled: bool = False, memory: bool = False, log_path: Optional[str] = None, maxlen: int = MAX_SAMPLES):
+        self.enabled = enabled
+        self.memory = memory
+        self.log_path = log_path
+        self.maxlen = maxlen
+        self.samples: Dict[str, Deque[Tuple[float, Optional[float]]]] = {}
+        self._mem_stack: List[List[int]] = []
+        self._page: Optional["_Span"] = None  # tramo abierto con begin() y aún sin end()
+
+    def record(self, stage: str, ms: float, peak_kb: Optional[float] = None) -> None:
+        q = self.samples.get(stage)
+        if q is None:
+            q = self.samples[stage] = deque(maxlen=self.maxlen)
+        q.append((ms, peak_kb))
+        if self.log_path:
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"t": round(time.time(), 3), "stage": stage, "ms": round(ms, 3), "peak_kb": peak_kb}) + "\n")
+            except OSError:
+                self.log_path = None
+
+    def clear(self) -> None:
+        self.samples.clear()
+
+    def summary(self):
+        """DataFrame con percentiles de latencia y pico de memoria por etapa."""
+        import numpy as np
+        import pandas as pd
+        rows = []
+        for stage, q in sorted(self.samples.items()):
+            ms = np.array([s[0] for s in q], dtype=float)
+            mem = [s[1] for s in q if s[1] is not None]
+            rows.append({
+                "Etapa": stage,
+                "N": len(ms),
+                "p50 (ms)": float(np.percentile(ms, 50)),
+                "p90 (ms)": float(np.percentile(ms, 90)),
+                "p99 (ms)": float(np.percentile(ms, 99)),
+                "Máx (ms)": float(ms.max()),
+                "Última (ms)": float(ms[-1]),
+                "Pico memoria máx (KB)": max(mem) if mem else None,
+            })
+        return pd.DataFrame(rows)
+
+_REGISTRY: ContextVar[Optional[MetricsRegistry]] = ContextVar("predim_perf_registry", default=None)
+
+class _NoopSpan:
+    __slots__ = ()
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ("reg", "stage", "t0", "depth", "closed")
+
+    def __init__(self, reg: MetricsRegistry, stage: str):
+        self.reg = reg
+        self.stage = stage
+        self.depth: Optional[int] = None  # posición en la pila de memoria (si se midió)
+        self.closed = False
+
+    def __enter__(self):
+        reg = self.reg
+        if reg.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            cur, peak = tracemalloc.get_traced_memory()
+            if reg._mem_stack:
+                # conservar el pico del tramo padre antes de reiniciarlo
+                reg._mem_stack[-1][1] = max(reg._mem_stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            reg._mem_stack.append([cur, 0])
+            self.depth = len(reg._mem_stack) - 1
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.closed:
+            return False
+        self.closed = True
+        ms = (time.perf_counter() - self.t0) * 1000.0
+        reg = self.reg
+        peak_kb = None
+        if self.depth is not None and len(reg._mem_stack) > self.depth:
+            # descartar entradas de hijos que quedaran abiertas
+            del reg._mem_stack[self.depth + 1:]
+            cur0, child_peak = reg._mem_stack.pop()
+            _, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, child_peak)
+            peak_kb = round((peak - cur0) / 1024.0, 1)
+            if reg._mem_stack:
+                reg._mem_stack[-1][1] = max(reg._mem_stack[-1][1], peak)
+        reg.record(self.stage, ms, peak_kb)
+        return False
+
+    def abandon(self) -> None:
+        """Cierra el tramo sin registrar muestra (ejecución interrumpida)."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.depth is not None:
+            # la entrada del tramo y las de cualquier hijo que quedara abierto
+            del self.reg._mem_stack[self.depth:]
+
+def span(stage: str):
+    """
+    Contexto que mide la etapa `stage` si la sesión actual tiene la medición activa:
+
+        with perf.span("clima.tablas"):
+            ...
+    """
+    reg = _REGISTRY.get()
+    if reg is None or not reg.enabled:
+        return _NOOP
+    return _Span(reg, stage)
+
+def begin(stage: str):
+    """
+    Variante sin `with` (páginas): `t = begin("page.x")` … `end(t)`.
+
+    Si la ejecución anterior de la sesión no llegó a `end()` (st.stop(), rerun o una
+    excepción), su tramo se descarta aquí y la pila de memoria vuelve a quedar cuadrada.
+    """
+    reg = _REGISTRY.get()
+    if reg is not None and reg._page is not None:
+        reg._page.abandon()
+        reg._page = None
+    s = span(stage)
+    s.__enter__()
+    if reg is not None and s is not _NOOP:
+        reg._page = s
+    return s
+
+def end(token) -> None:
+    token.__exit__(None, None, None)
+    reg = _REGISTRY.get()
+    if reg is not None and reg._page is token:
+        reg._page = None
+
+def current_registry() -> Optional[MetricsRegistry]:
+    return _REGISTRY.get()
+
+def bind(registry: Optional[MetricsRegistry]) -> None:
+    """Enlaza un registro al contexto actual (scripts/benchmarks fuera de Streamlit)."""
+    _REGISTRY.set(registry)
+
+def bind_session() -> MetricsRegistry:
+    """Crea (si falta) el registro de la sesión de Streamlit y lo enlaza al hilo del script."""
+    import streamlit as st
+    reg = st.session_state.get("perf_registry")
+    if reg is None:
+        reg = MetricsRegistry(
+            enabled=_env_flag("PREDIM_PERF"),
+            memory=_env_flag("PREDIM_PERF_MEM"),
+            log_path=os.environ.get("PREDIM_PERF_LOG") or None,
+        )
+        st.session_state["perf_registry"] = reg
+    _REGISTRY.set(reg)
+    return reg
+
+def timed(stage: str):
+    """Decorador: mide cada llamada a la función como la etapa `stage`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Tuberías de agua: diámetros comerciales, propiedades del agua y selección de diámetro.
+
+`size_pipes` elige, para arrays de caudales, el menor diámetro comercial que cumple la
+velocidad máxima y la pérdida de carga unitaria máxima:
+- velocidad: diámetro interior mínimo directo (√(4Q/πv)) y `np.searchsorted` sobre la
+  tabla ordenada de diámetros interiores;
+- pérdida unitaria (Darcy-Weisbach, Swamee-Jain): cota inferior con el factor de
+  fricción mínimo y búsqueda en la misma tabla; después se sube de diámetro solo en los
+  tramos que aún la superan (la pérdida decrece con el diámetro);
+- caudales mayores que la capacidad del mayor diámetro se reparten en paralelo.
+Sin bucles por tramo: decenas de miles de tramos se dimensionan en una llamada.
+"""
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
+
+from . import perf
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Material -> (designación, diámetro interior en mm, rugosidad absoluta en mm); orden creciente
+TUBERIAS: Dict[str, Tuple[Tuple[str, ...], Tuple[float, ...], float]] = {
+    "Acero (EN 10255 / EN 10216)": (
+        ("DN15", "DN20", "DN25", "DN32", "DN40", "DN50", "DN65", "DN80", "DN100", "DN125", "DN150",
+         "DN200", "DN250", "DN300", "DN350", "DN400", "DN500"),
+        (16.1, 21.7, 27.3, 36.0, 41.9, 53.1, 68.9, 80.9, 105.3, 130.0, 155.4,
+         206.5, 260.4, 309.7, 339.6, 388.8, 486.0),
+        0.045,
+    ),
+    "Cobre (EN 1057)": (
+        ("12x1", "15x1", "18x1", "22x1", "28x1", "35x1,2", "42x1,2", "54x1,5", "64x2", "76,1x2", "88,9x2", "108x2,5"),
+        (10.0, 13.0, 16.0, 20.0, 26.0, 32.6, 39.6, 51.0, 60.0, 72.1, 84.9, 103.0),
+        0.0015,
+    ),
+    "Multicapa / PP-R": (
+        ("16x2", "20x2", "25x2,5", "32x3", "40x3,5", "50x4", "63x4,5", "75x5", "90x6", "110x8", "125x9", "160x11,5"),
+        (12.0, 16.0, 20.0, 26.0, 33.0, 42.0, 54.0, 65.0, 78.0, 94.0, 107.0, 137.0),
+        0.007,
+    ),
+    "Polietileno PE100 (PN16)": (
+        ("25", "32", "40", "50", "63", "75", "90", "110", "125", "160", "200"),
+        (20.4, 26.2, 32.6, 40.8, 51.4, 61.4, 73.6, 90.0, 102.2, 130.8, 163.6),
+        0.007,
+    ),
+}
+
+# Agua: temperatura (°C) -> densidad (kg/m³), viscosidad cinemática (m²/s), cp (kJ/kg·K)
+_AGUA_T = np.array([5.0, 10.0, 20.0, 40.0, 60.0, 80.0])
+_AGUA_RHO = np.array([1000.0, 999.7, 998.2, 992.2, 983.2, 971.8])
+_AGUA_NU = np.array([1.519e-6, 1.306e-6, 1.004e-6, 0.658e-6, 0.475e-6, 0.365e-6])
+_AGUA_CP = np.array([4.202, 4.192, 4.182, 4.179, 4.185, 4.197])
+F_MIN = 0.008  # factor de fricción mínimo en el rango de uso (cota inferior para la búsqueda)
+
+def agua(t_c: float) -> Tuple[float, float, float]:
+    """(densidad kg/m³, viscosidad cinemática m²/s, cp kJ/kg·K) a la temperatura dada."""
+    return (float(np.interp(t_c, _AGUA_T, _AGUA_RHO)), float(np.interp(t_c, _AGUA_T, _AGUA_NU)),
+            float(np.interp(t_c, _AGUA_T, _AGUA_CP)))
+
+def caudal_ls(p_kw: np.ndarray, dt_k: float, t_c: float) -> np.ndarray:
+    """Caudal de agua (L/s) que transporta la potencia dada con el salto térmico ΔT."""
+    rho, _, cp = agua(t_c)
+    return np.asarray(p_kw, dtype=float) / (rho * cp * dt_k) * 1000.0
+
+def gradient_pa_m(q_m3s: np.ndarray, d_m: np.ndarray, eps_m: float, rho: float, nu: float) -> np.ndarray:
+    """Pérdida de carga unitaria (Pa/m), Darcy-Weisbach con Swamee-Jain (laminar: 64/Re)."""
+    area = math.pi * d_m ** 2 / 4.0
+    v = q_m3s / area
+    re = np.maximum(v * d_m / nu, 1e-9)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        f_t = 0.25 / np.log10(eps_m / (3.7 * d_m) + 5.74 / re ** 0.9) ** 2
+    f = np.where(re < 2300.0, 64.0 / re, f_t)
+    return f * rho * v ** 2 / (2.0 * d_m)
+
+@perf.timed("tuberias.size")
+def size_pipes(q_ls: np.ndarray, material: str, v_max: np.ndarray, r_max_pa_m: np.ndarray,
+               t_c: float = 10.0) -> Dict[str, np.ndarray]:
+    """
+    Diámetro comercial mínimo para cada caudal (L/s) con velocidad ≤ v_max (m/s) y pérdida
+    unitaria ≤ r_max (Pa/m); si no cabe en el mayor diámetro se reparte en tuberías
+    iguales en paralelo. Devuelve el índice en la tabla del material, diámetros, nº en
+    paralelo, velocidad y pérdida unitaria (de cada tubería), criterio y si cumple.
+    """
+    nombres, di_mm, eps_mm = TUBERIAS[material]
+    di = np.asarray(di_mm) / 1000.0
+    eps = eps_mm / 1000.0
+    rho, nu, _ = agua(t_c)
+    q = np.nan_to_num(np.asarray(q_ls, dtype=float), nan=0.0).clip(min=0.0) / 1000.0
+    v_max = np.broadcast_to(np.asarray(v_max, dtype=float), q.shape)
+    r_max = np.broadcast_to(np.asarray(r_max_pa_m, dtype=float), q.shape)
+    top = len(di) - 1
+
+    # tuberías en paralelo si el caudal no cabe en el mayor diámetro
+    a_top = math.pi * di[top] ** 2 / 4.0
+    paralelo = np.maximum(np.ceil(q / (a_top * v_max) - 1e-9), 1.0)
+    bad = gradient_pa_m(q / paralelo, np.full(q.shape, di[top]), eps, rho, nu) > r_max
+    while bad.any():
+        paralelo[bad] += 1.0
+        bad = gradient_pa_m(q / paralelo, np.full(q.shape, di[top]), eps, rho, nu) > r_max
+    q = q / paralelo
+
+    # velocidad: D ≥ √(4Q/πv)
+    d_v = np.sqrt(4.0 * q / (math.pi * v_max))
+    idx_v = np.searchsorted(di, d_v, side="left")
+    # pérdida unitaria: con f ≥ F_MIN, R ≥ 8·F_MIN·ρ·Q²/(π²·D⁵) -> cota inferior de D
+    d_r = (8.0 * F_MIN * rho * q ** 2 / (math.pi ** 2 * r_max)) ** 0.2
+    idx_r0 = np.searchsorted(di, d_r, side="left")
+    idx = np.minimum(np.maximum(idx_v, idx_r0), top)
+    r = gradient_pa_m(q, di[idx], eps, rho, nu)
+    bad = (r > r_max) & (idx < top)
+    while bad.any():
+        idx[bad] += 1
+        r = gradient_pa_m(q, di[idx], eps, rho, nu)
+        bad = (r > r_max) & (idx < top)
+
+    d = di[idx]
+    v = q / (math.pi * d ** 2 / 4.0)
+    criterio = np.where(np.maximum(idx_v, 0) >= idx, "Velocidad", "Pérdida de carga")
+    return {"idx": idx, "dn": np.asarray(nombres, dtype=object)[idx], "paralelo": paralelo.astype(np.int64),
+            "di_mm": d * 1000.0, "v_ms": v, "r_pa_m": r, "criterio": criterio,
+            "cumple": (v <= v_max + 1e-9) & (r <= r_max + 1e-9)}
+
+# -----------------------------
+# Red por niveles: central → agrupaciones → zonas
+# -----------------------------
+NIVELES_POSIBLES = ["Edificio", "Montante", "Planta", "Uso", "Zona climática"]  # columnas de agrupación habituales
+
+class LevelNetwork:
+    """
+    Árbol de tramos en arrays planos: nodo 0 = central, después los grupos de cada nivel
+    (columnas de la tabla de zonas, de la central hacia las zonas) y al final una hoja
+    por zona. `codes[k]` es el grupo de cada zona en el nivel k.
+    """
+    def __init__(self, zones_df: "pd.DataFrame", niveles: List[str], zone_names: List[str]):
+        n = len(zone_names)
+        self.niveles = list(niveles)
+        self.codes: List[np.ndarray] = []
+        self.group_names: List[List[str]] = []
+        for k in range(1, len(niveles) + 1):
+            cols = niveles[:k]
+            g = zones_df[cols].astype(str).groupby(cols, sort=False, dropna=False)
+            self.codes.append(g.ngroup().to_numpy())
+            self.group_names.append([" / ".join(map(str, t if isinstance(t, tuple) else (t,))) for t in g.groups.keys()] if n else [])
+        self.sizes = [1] + [len(nm) for nm in self.group_names] + [n]
+        self.start = np.cumsum([0] + self.sizes)
+        self.depth = np.repeat(np.arange(len(self.sizes)), self.sizes)
+        self.parent = np.full(self.start[-1], -1, dtype=np.int64)
+        member = np.zeros(n, dtype=np.int64)  # nodo del nivel anterior de cada zona
+        for k, c in enumerate(self.codes, start=1):
+            self.parent[self.start[k] + c] = member
+            member = self.start[k] + c
+        self.parent[self.start[-2]:self.start[-1]] = member
+        self.names = ["Central"] + [nm for lvl in self.group_names for nm in lvl] + list(zone_names)
+        self.nivel = np.array(["Central"] + [niveles[k] for k, lvl in enumerate(self.group_names) for _ in lvl] + ["Zona"] * n,
+                              dtype=object)
+        self.n_zonas = self.sum_up(np.ones(n)).astype(int)
+
+    def __len__(self) -> int:
+        return int(self.start[-1])
+
+    @property
+    def zones(self) -> slice:
+        return slice(int(self.start[-2]), int(self.start[-1]))
+
+    @property
+    def is_leaf(self) -> np.ndarray:
+        return self.depth == len(self.sizes) - 1
+
+    def sum_up(self, zone_values: np.ndarray) -> np.ndarray:
+        """Valor de cada nodo = suma de sus zonas (np.bincount por nivel)."""
+        v = np.nan_to_num(np.asarray(zone_values, dtype=float), nan=0.0)
+        out = np.zeros(len(self))
+        out[0] = v.sum()
+        for k, c in enumerate(self.codes, start=1):
+            out[self.start[k]:self.start[k + 1]] = np.bincount(c, weights=v, minlength=self.sizes[k])
+        out[self.zones] = v
+        return out
+
+    def max_up(self, zone_values: np.ndarray) -> np.ndarray:
+        """Valor de cada nodo = máximo de sus zonas (np.maximum.at por nivel)."""
+        v = np.nan_to_num(np.asarray(zone_values, dtype=float), nan=0.0)
+        out = np.zeros(len(self))
+        out[0] = v.max(initial=0.0)
+        for k, c in enumerate(self.codes, start=1):
+            np.maximum.at(out[self.start[k]:self.start[k + 1]], c, v)
+        out[self.zones] = v
+        return out
+
+    def accumulate_down(self, values: np.ndarray) -> np.ndarray:
+        """Suma acumulada desde la central (p. ej. pérdida de carga del recorrido hasta cada nodo)."""
+        acc = np.asarray(values, dtype=float).copy()
+        for d in range(1, len(self.sizes)):
+            sl = slice(int(self.start[d]), int(self.start[d + 1]))
+            acc[sl] += acc[self.parent[sl]]
+        return acc
+
+    def by_level_length(self, central: float, nivel: float, terminal: float) -> np.ndarray:
+        """Longitud de cada tramo según su nivel (central, agrupación o ramal de zona)."""
+        return np.select([self.depth == 0, self.is_leaf], [central, terminal], nivel).astype(float)
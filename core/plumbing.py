@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Red de abastecimiento de agua fría y ACS: caudales instantáneos, diámetros, acometida
+y grupo de presión.
+
+1. Aparatos por zona: columnas de la tabla de zonas con el nombre del aparato ("Lavabo",
+   "Ducha"...) si existen; si no, dotación orientativa por unidad de ocupación (persona,
+   cama, cubierto: las mismas unidades que las Tablas 13/14) redondeada hacia arriba.
+2. Caudal instalado Qt = Σ aparatos × caudal mínimo (CTE DB-HS 4, tabla 2.1), por zona y
+   agregado por niveles (central → agrupaciones → zonas) con np.bincount.
+3. Caudal simultáneo Qc = A·Qt^B + C (UNE 149201, coeficientes por tipo de edificio y
+   tramo de Qt: el tramo se localiza con np.searchsorted), entre el mayor aparato del
+   tramo y Qt.
+4. Diámetros con `pipes.size_pipes`; la acometida (agua fría + agua para ACS) igual.
+5. Grupo de presión: altura geométrica + presión residual + pérdidas del recorrido más
+   desfavorable, frente a la presión de red (o desde aljibe).
+
+Valores orientativos de anteproyecto; no sustituyen el cálculo del proyecto de fontanería.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import numpy as np
+
+from . import perf
+from .pipes import LevelNetwork, agua, size_pipes
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Aparato -> (caudal mínimo agua fría, caudal mínimo ACS) en L/s (CTE DB-HS 4, tabla 2.1)
+APARATOS: Dict[str, Tuple[float, float]] = {
+    "Lavabo": (0.10, 0.065),
+    "Inodoro con cisterna": (0.10, 0.0),
+    "Inodoro con fluxor": (1.25, 0.0),
+    "Urinario con grifo temporizado": (0.15, 0.0),
+    "Urinario con cisterna": (0.04, 0.0),
+    "Ducha": (0.20, 0.10),
+    "Bañera": (0.30, 0.20),
+    "Bidé": (0.10, 0.065),
+    "Fregadero doméstico": (0.20, 0.10),
+    "Fregadero no doméstico": (0.30, 0.20),
+    "Lavavajillas doméstico": (0.15, 0.10),
+    "Lavavajillas industrial": (0.25, 0.20),
+    "Lavadora doméstica": (0.20, 0.15),
+    "Lavadora industrial": (0.60, 0.40),
+    "Grifo aislado": (0.15, 0.10),
+    "Vertedero": (0.20, 0.0),
+}
+
+# Dotación orientativa: aparatos por unidad de ocupación
+DOTACION: Dict[str, Dict[str, float]] = {
+    "persona": {"Lavabo": 0.05, "Inodoro con cisterna": 0.05, "Urinario con cisterna": 0.025, "Ducha": 0.01,
+                "Fregadero doméstico": 0.02, "Vertedero": 0.005},
+    "cama": {"Lavabo": 0.5, "Inodoro con cisterna": 0.5, "Ducha": 0.5, "Bidé": 0.25, "Fregadero no doméstico": 0.02,
+             "Lavavajillas industrial": 0.01, "Lavadora industrial": 0.01, "Vertedero": 0.02},
+    "cubierto": {"Lavabo": 0.01, "Inodoro con cisterna": 0.01, "Urinario con cisterna": 0.005,
+                 "Fregadero no doméstico": 0.01, "Lavavajillas industrial": 0.005},
+}
+
+# Tipo de edificio -> tramos (Qt máx. del tramo, A, B, C), ordenados por Qt (UNE 149201)
+SIMULTANEIDAD: Dict[str, List[Tuple[float, float, float, float]]] = {
+    "Viviendas": [(20.0, 0.682, 0.45, -0.14), (np.inf, 1.7, 0.21, -0.7)],
+    "Oficinas, estaciones, aeropuertos": [(20.0, 0.682, 0.45, -0.14), (np.inf, 0.4, 0.54, 0.48)],
+    "Hoteles, discotecas, museos": [(20.0, 0.698, 0.5, -0.12), (np.inf, 1.0, 0.366, 0.0)],
+    "Centros comerciales": [(20.0, 0.698, 0.5, -0.12), (np.inf, 4.3, 0.27, -6.65)],
+    "Hospitales": [(20.0, 0.698, 0.5, -0.12), (np.inf, 0.25, 0.65, 1.25)],
+    "Escuelas, polideportivos": [(1.5, 1.0, 1.0, 0.0), (20.0, 4.4, 0.27, -3.41), (np.inf, -22.5, -0.5, 11.5)],
+}
+
+OPCIONES: Dict[str, Any] = {
+    "tipo_edificio": None,  # None = según el uso del edificio
+    "material": "Multicapa / PP-R", "material_acometida": "Polietileno PE100 (PN16)",
+    "v_max": 1.5, "r_max_pa_m": 400.0,
+    "niveles": ["Edificio"],
+    "longitud_acometida_m": 10.0, "longitud_central_m": 15.0, "longitud_nivel_m": 40.0, "longitud_terminal_m": 15.0,
+    "singulares": 0.3, "t_af": 15.0, "t_acs": 60.0,
+    "altura_geometrica_m": 15.0, "presion_residual_kpa": 100.0, "dp_contador_kpa": 30.0,
+    "presion_red_kpa": 250.0, "aljibe": True, "rendimiento_bomba": 0.6,
+    "dotacion": None,  # None = DOTACION
+}
+CIRCUITOS = {"Agua fría": 0, "ACS": 1}
+MAX_AVISOS = 20
+
+def tipo_edificio_por_uso(uso: str) -> str:
+    u = (uso or "").lower()
+    if "hotel" in u or "museo" in u or "discoteca" in u:
+        return "Hoteles, discotecas, museos"
+    if "hospital" in u or "sanitari" in u:
+        return "Hospitales"
+    if "enseñanza" in u or "escuela" in u or "deport" in u or "instituto" in u:
+        return "Escuelas, polideportivos"
+    if "comerc" in u or "almacenes" in u:
+        return "Centros comerciales"
+    if "vivienda" in u or "residencial" in u:
+        return "Viviendas"
+    return "Oficinas, estaciones, aeropuertos"
+
+def simultaneous_flow(qt_ls: np.ndarray, tipo: str, q_min_ls: np.ndarray) -> np.ndarray:
+    """Qc = A·Qt^B + C con el tramo de Qt de cada valor, acotado entre el mayor aparato y Qt."""
+    tramos = np.array(SIMULTANEIDAD[tipo], dtype=float)
+    qt = np.nan_to_num(np.asarray(qt_ls, dtype=float), nan=0.0)
+    j = np.minimum(np.searchsorted(tramos[:, 0], qt, side="left"), len(tramos) - 1)
+    a, b, c = tramos[j, 1], tramos[j, 2], tramos[j, 3]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        qc = np.where(qt > 0, a * np.power(np.maximum(qt, 1e-9), b) + c, 0.0)
+    return np.clip(qc, np.minimum(q_min_ls, qt), qt)
+
+def fixture_counts(zones_df: "pd.DataFrame", unidad: np.ndarray, cantidad: np.ndarray,
+                   dotacion: Dict[str, Dict[str, float]]) -> np.ndarray:
+    """Matriz zonas × aparatos (orden de `APARATOS`): columnas explícitas o dotación por unidad."""
+    import pandas as pd
+    nombres = list(APARATOS)
+    unidades = list(dotacion)
+    ratio = np.array([[dotacion[u].get(a, 0.0) for a in nombres] for u in unidades], dtype=float).reshape(len(unidades), len(nombres))
+    code = pd.Categorical(unidad, categories=unidades).codes
+    cant = np.nan_to_num(np.asarray(cantidad, dtype=float), nan=0.0)
+    counts = np.zeros((len(unidad), len(nombres)))
+    ok = code >= 0
+    counts[ok] = np.ceil(np.maximum(cant[ok, None] * ratio[code[ok]] - 1e-9, 0.0))
+    for j, a in enumerate(nombres):
+        if a in zones_df.columns and len(zones_df) == len(unidad):
+            v = pd.to_numeric(zones_df[a], errors="coerce").to_numpy(dtype=float)
+            counts[:, j] = np.where(np.isnan(v), counts[:, j], v)
+    return counts
+
+@perf.timed("calc_fontaneria")
+def calc_fontaneria(res: "pd.DataFrame", zones_df: "pd.DataFrame", settings: Dict[str, Any]) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `res`: salida de `calc_agua_y_acs` (unidad y cantidad de ocupación por zona, en el
+    orden de `zones_df`). Devuelve (tramos, avisos, totales) con la acometida, el grupo de
+    presión y la matriz de aparatos por zona.
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("fontaneria", {}) or {})}
+    tipo = o["tipo_edificio"] or tipo_edificio_por_uso(str(settings.get("uso_edificio", "")))
+    dotacion = o["dotacion"] or DOTACION
+    warnings: List[WarningItem] = []
+    n = len(res)
+    unidad = res["Unidad ocupación"].astype(str).to_numpy() if "Unidad ocupación" in res.columns else np.full(n, "persona")
+    cantidad = pd.to_numeric(res["Cantidad"], errors="coerce").to_numpy(dtype=float) if "Cantidad" in res.columns else np.zeros(n)
+    counts = fixture_counts(zones_df, unidad, cantidad, dotacion)
+    q_ap = np.array(list(APARATOS.values()), dtype=float)  # aparatos × (AF, ACS)
+
+    niveles = [c for c in o["niveles"] if c in zones_df.columns] if len(zones_df) == n else []
+    zona = res["Zona"].astype(str).tolist() if "Zona" in res.columns else [f"Zona {i + 1}" for i in range(n)]
+    net = LevelNetwork(zones_df, niveles, zona)
+    longitud = net.by_level_length(o["longitud_central_m"], o["longitud_nivel_m"], o["longitud_terminal_m"])
+    factor_lineal = 1.0 + float(o["singulares"])
+
+    frames: List["pd.DataFrame"] = []
+    out: Dict[str, Any] = {"tipo_edificio": tipo}
+    qt_total, qmax_total, perdidas_af = 0.0, 0.0, 0.0
+    for circuito, col in CIRCUITOS.items():
+        t_c = float(o["t_af"] if col == 0 else o["t_acs"])
+        qt_zona = counts @ q_ap[:, col]
+        qmax_zona = np.where(counts > 0, q_ap[None, :, col], 0.0).max(axis=1, initial=0.0)
+        qt = net.sum_up(qt_zona)
+        qmax = net.max_up(qmax_zona)
+        qc = simultaneous_flow(qt, tipo, qmax)
+        s = size_pipes(qc, o["material"], o["v_max"], o["r_max_pa_m"], t_c=t_c)
+        dp = s["r_pa_m"] * longitud * factor_lineal / 1000.0
+        acc = net.accumulate_down(dp)
+        frames.append(pd.DataFrame({
+            "Circuito": circuito, "Nivel": net.nivel, "Tramo": net.names, "Zonas": net.n_zonas,
+            "Caudal instalado (L/s)": qt, "Coef. simultaneidad": np.divide(qc, qt, out=np.ones_like(qt), where=qt > 0),
+            "Caudal simultáneo (L/s)": qc,
+            "Diámetro": np.where(s["paralelo"] > 1, [f"{k} × {d}" for k, d in zip(s["paralelo"].tolist(), s["dn"].tolist())], s["dn"]),
+            "Di (mm)": s["di_mm"], "v (m/s)": s["v_ms"], "R (Pa/m)": s["r_pa_m"], "Longitud (m)": longitud,
+            "Δp tramo (kPa)": dp, "Δp acumulada (kPa)": acc, "Criterio": s["criterio"],
+        }))
+        key = "af" if col == 0 else "acs"
+        out[f"caudal_{key}_instalado_ls"] = float(qt[0])
+        out[f"caudal_{key}_simultaneo_ls"] = float(qc[0])
+        qt_total += float(qt[0])
+        qmax_total = max(qmax_total, float(qmax[0]))
+        if col == 0:
+            perdidas_af = float(acc[net.zones].max(initial=acc[0]))
+
+    # acometida: agua fría de consumo + agua de aporte a la producción de ACS
+    qc_acom = simultaneous_flow(np.array([qt_total]), tipo, np.array([qmax_total]))
+    sa = size_pipes(qc_acom, o["material_acometida"], o["v_max"], o["r_max_pa_m"], t_c=float(o["t_af"]))
+    dp_acom = float(sa["r_pa_m"][0]) * float(o["longitud_acometida_m"]) * factor_lineal / 1000.0
+    dn_acom = sa["dn"][0] if sa["paralelo"][0] == 1 else f"{sa['paralelo'][0]} × {sa['dn'][0]}"
+    out["acometida"] = {"caudal_instalado_ls": qt_total, "caudal_simultaneo_ls": float(qc_acom[0]), "diametro": dn_acom,
+                        "material": o["material_acometida"], "v_ms": float(sa["v_ms"][0]), "dp_kpa": dp_acom}
+
+    # grupo de presión (recorrido más desfavorable de agua fría)
+    rho = agua(float(o["t_af"]))[0]
+    geom_kpa = float(o["altura_geometrica_m"]) * rho * 9.81 / 1000.0
+    requerida = geom_kpa + float(o["presion_residual_kpa"]) + perdidas_af + dp_acom + float(o["dp_contador_kpa"])
+    disponible = 0.0 if o["aljibe"] else float(o["presion_red_kpa"])
+    altura = max(requerida - disponible, 0.0)
+    q_bomba = float(qc_acom[0])
+    out["grupo_presion"] = {
+        "necesario": bool(o["aljibe"] or requerida > float(o["presion_red_kpa"])),
+        "presion_requerida_kpa": requerida, "caudal_m3h": q_bomba * 3.6, "altura_kpa": altura,
+        "altura_mca": altura * 1000.0 / (rho * 9.81),
+        "potencia_kw": q_bomba / 1000.0 * altura * 1000.0 / float(o["rendimiento_bomba"]) / 1000.0,
+    }
+    if not o["aljibe"] and requerida <= float(o["presion_red_kpa"]):
+        out["grupo_presion"].update({"altura_kpa": 0.0, "altura_mca": 0.0, "potencia_kw": 0.0})
+
+    sin_ocupacion = int(((counts.sum(axis=1) == 0)).sum())
+    if n and sin_ocupacion:
+        warnings.append(WarningItem("Fontanería", "-", f"{sin_ocupacion} zonas sin aparatos (sin ocupación o unidad sin dotación)."))
+    tramos = pd.concat(frames, ignore_index=True)
+    paralelos = np.flatnonzero(tramos["Diámetro"].astype(str).str.contains("×").to_numpy())
+    for i in paralelos[:MAX_AVISOS].tolist():
+        warnings.append(WarningItem("Fontanería", str(tramos["Tramo"].iat[i]),
+                                    f"{tramos['Circuito'].iat[i]}: caudal mayor que la mayor tubería de la tabla ({tramos['Diámetro'].iat[i]})."))
+    out["aparatos"] = pd.DataFrame(counts, columns=list(APARATOS)).assign(Zona=zona)[["Zona"] + list(APARATOS)]
+    out["niveles"] = niveles
+    return tramos, warnings, out
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+"""
+Perfiles horarios anuales (8760 h) a partir de las puntas por zona.
+
+Cada zona aporta su punta (kW de frío/calor/eléctrica de las calculadoras) o su consumo
+diario (L/día de agua fría y ACS) repartido en el año con una forma unitaria que depende de:
+- el horario de ocupación de su uso (laborable / fin de semana),
+- la zona climática del CTE (temperatura exterior horaria orientativa: la letra fija la
+  severidad de invierno y el número la de verano).
+
+Las zonas con el mismo uso y zona climática comparten forma (float32, grupos × 8760), así
+que los totales se agregan por grupo; el detalle (zonas × horas) se genera en float32 por
+bloques de zonas solo cuando se pide, de modo que la memoria queda acotada aunque la
+cartera tenga cientos de miles de zonas. De cada módulo se obtiene el perfil horario
+total, la energía anual por zona, las puntas mensuales y la curva monótona de carga.
+
+Los horarios y temperaturas son valores orientativos de anteproyecto (editables aquí),
+no sustituyen una simulación energética.
+"""
+from __future__ import annotations
+
+import io
+import math
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import perf
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+HOURS = 8760
+BLOCK_ZONES = 1024  # zonas por bloque del detalle: 1024 × 8760 × 4 B ≈ 36 MB
+MESES = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+ACS_KWH_POR_LITRO = 4.186 * 50.0 / 3600.0  # calentar de 10 a 60 °C
+
+# -----------------------------
+# Horarios de ocupación (fracción 0–1 por hora; laborable, fin de semana)
+# -----------------------------
+def _h(*tramos: Tuple[int, int, float]) -> List[float]:
+    """24 valores a partir de tramos (hora inicio, hora fin, fracción)."""
+    out = [0.0] * 24
+    for a, b, v in tramos:
+        for h in range(a, b):
+            out[h] = v
+    return out
+
+HORARIOS: Dict[str, Tuple[List[float], List[float]]] = {
+    "oficina": (_h((7, 8, 0.3), (8, 9, 0.8), (9, 13, 1.0), (13, 15, 0.7), (15, 18, 0.9), (18, 19, 0.5), (19, 21, 0.15)),
+                _h((9, 14, 0.1))),
+    "comercio": (_h((9, 10, 0.4), (10, 14, 0.8), (14, 17, 0.6), (17, 21, 1.0), (21, 22, 0.4)),
+                 _h((10, 14, 0.9), (14, 17, 0.7), (17, 21, 1.0), (21, 22, 0.4))),
+    "ensenanza": (_h((8, 9, 0.6), (9, 14, 1.0), (14, 15, 0.5), (15, 18, 0.7), (18, 20, 0.2)), _h()),
+    "residencial": (_h((0, 7, 1.0), (7, 9, 0.7), (9, 14, 0.3), (14, 16, 0.5), (16, 19, 0.5), (19, 24, 0.9)),
+                    _h((0, 9, 1.0), (9, 14, 0.6), (14, 16, 0.7), (16, 20, 0.6), (20, 24, 0.9))),
+    "hotel": (_h((0, 8, 0.8), (8, 11, 0.6), (11, 17, 0.35), (17, 20, 0.55), (20, 24, 0.8)),
+              _h((0, 9, 0.85), (9, 12, 0.6), (12, 17, 0.45), (17, 20, 0.6), (20, 24, 0.85))),
+    "hospital": (_h((0, 7, 0.7), (7, 8, 0.85), (8, 15, 1.0), (15, 21, 0.9), (21, 24, 0.75)),
+                 _h((0, 8, 0.7), (8, 21, 0.85), (21, 24, 0.7))),
+    "restauracion": (_h((8, 11, 0.3), (11, 13, 0.5), (13, 16, 1.0), (16, 20, 0.4), (20, 23, 0.9), (23, 24, 0.3)),
+                     _h((10, 13, 0.5), (13, 16, 1.0), (16, 20, 0.5), (20, 24, 1.0))),
+    "espectaculos": (_h((17, 19, 0.3), (19, 23, 1.0)), _h((11, 14, 0.4), (17, 19, 0.5), (19, 24, 1.0))),
+    "cultural": (_h((10, 14, 0.8), (14, 16, 0.5), (16, 20, 0.8)), _h((10, 14, 1.0), (14, 16, 0.6), (16, 20, 0.9))),
+    "deportivo": (_h((7, 10, 0.5), (10, 17, 0.4), (17, 22, 1.0)), _h((9, 14, 0.9), (14, 17, 0.6), (17, 21, 0.8))),
+    "continuo": ([1.0] * 24, [1.0] * 24),
+}
+
+# Uso (texto del catálogo) -> horario; se busca la primera clave contenida en el uso
+USO_A_HORARIO: List[Tuple[str, str]] = [
+    ("CPD", "continuo"), ("Laboratorio", "oficina"), ("Hospital", "hospital"), ("Industrial", "oficina"),
+    ("Hotel", "hotel"), ("Internado", "residencial"), ("Residencial", "residencial"),
+    ("Restaurante", "restauracion"), ("Cafeter", "restauracion"),
+    ("Comercio", "comercio"), ("Enseñanza", "ensenanza"), ("Escuela", "ensenanza"),
+    ("Auditorio", "espectaculos"), ("Teatro", "espectaculos"), ("Salones de actos", "espectaculos"),
+    ("Salas de fiesta", "espectaculos"), ("Museo", "cultural"), ("Biblioteca", "cultural"),
+    ("Deportivo", "deportivo"), ("Oficina", "oficina"), ("bancario", "oficina"), ("Archivo", "oficina"),
+]
+
+# Fracción de la punta eléctrica que se mantiene sin ocupación (equipos en espera, CPD…)
+BASE_ELECTRICA: Dict[str, float] = {"continuo": 0.85, "hospital": 0.5, "hotel": 0.35, "residencial": 0.2}
+BASE_ELECTRICA_DEFECTO = 0.15
+
+# Clima orientativo: temperatura media de enero por letra y semiamplitud anual por número
+T_ENERO: Dict[str, float] = {"A": 12.5, "B": 11.0, "C": 9.0, "D": 5.5, "E": 3.0}
+AMPLITUD_ANUAL: Dict[str, float] = {"1": 6.0, "2": 8.0, "3": 9.0, "4": 10.5}
+OSCILACION_DIARIA = 5.0  # ± °C alrededor de la media diaria (máxima a las 15 h)
+T_BASE_CALOR = 16.0
+T_BASE_FRIO = 20.0
+
+# Módulo -> (calculadora, columna de la tabla de resultados, unidad horaria, unidad anual, tipo)
+#   tipo "punta": la punta de la zona se reparte con la forma normalizada a máx. = 1
+#   tipo "diario": el consumo diario se reparte con la forma de cada día (suma diaria = 1)
+MODULOS: Dict[str, Tuple[str, str, str, str, str]] = {
+    "Frío": ("clima", "Potencia frío (kW)", "kW", "kWh", "punta"),
+    "Calor": ("clima", "Potencia calor (kW)", "kW", "kWh", "punta"),
+    "Eléctrica": ("ele", "Potencia normal (kW)", "kW", "kWh", "punta"),
+    "Agua fría": ("agua", "Agua fría (L/día)", "L/h", "m³", "diario"),
+    "ACS": ("agua", "ACS (L/día)", "L/h", "m³", "diario"),
+    "ACS térmica": ("agua", "ACS (L/día)", "kW", "kWh", "diario"),
+}
+FACTOR_ANUAL = {"kWh": 1.0, "m³": 1.0 / 1000.0}
+
+def horario_de_uso(uso: str) -> str:
+    u = str(uso or "")
+    for key, horario in USO_A_HORARIO:
+        if key.lower() in u.lower():
+            return horario
+    return "oficina"
+
+# -----------------------------
+# Calendario y clima
+# -----------------------------
+def calendario(year: int = 2025) -> Dict[str, np.ndarray]:
+    """Hora del día, día del año, mes y laborable de las 8760 h (sin festivos; 29-feb se omite)."""
+    days = np.arange(np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01"), dtype="datetime64[D]")
+    month = days.astype("datetime64[M]").astype(int) % 12
+    day_of_month = (days - days.astype("datetime64[M]")).astype(int) + 1
+    keep = ~((month == 1) & (day_of_month == 29))
+    days, month = days[keep], month[keep]
+    weekday = (days.astype(int) + 3) % 7  # 0 = lunes (1970-01-01 fue jueves)
+    return {
+        "hora": np.tile(np.arange(24), 365),
+        "dia": np.repeat(np.arange(365), 24),
+        "mes": np.repeat(month, 24),
+        "laborable": np.repeat(weekday < 5, 24),
+    }
+
+def temperatura_exterior(zona: str, cal: Dict[str, np.ndarray]) -> np.ndarray:
+    """Temperatura horaria orientativa (°C) de una zona climática del CTE."""
+    letra, numero = (zona or "D3")[:1], (zona or "D3")[1:2]
+    t_ene = T_ENERO.get(letra, T_ENERO["D"])
+    amp = AMPLITUD_ANUAL.get(numero, AMPLITUD_ANUAL["3"])
+    t_dia = t_ene + amp * (1.0 - np.cos(2.0 * math.pi * (cal["dia"] - 15) / 365.0))  # mínima a mediados de enero
+    return t_dia + OSCILACION_DIARIA * np.cos(2.0 * math.pi * (cal["hora"] - 15) / 24.0)
+
+def formas(horario: str, zona: str, cal: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Formas unitarias (float32, 8760) de un par (horario, zona climática): las de tipo
+    "punta" con máximo 1 y las de tipo "diario" con suma 1 cada día.
+    """
+    lab, finde = HORARIOS[horario]
+    occ = np.where(cal["laborable"], np.asarray(lab)[cal["hora"]], np.asarray(finde)[cal["hora"]])
+    # el sistema funciona con ocupación y una hora antes (puesta en régimen)
+    on = (occ > 0) | (np.roll(occ, -1) > 0)
+    t = temperatura_exterior(zona, cal)
+    # salto térmico normalizado a 0–1 para que pese como la ocupación
+    dt = np.clip(t - T_BASE_FRIO, 0.0, None)
+    dt = dt / dt.max() if dt.max() > 0 else dt
+    frio = on * (0.4 * occ + 0.6 * dt)
+    calor = on * np.clip(T_BASE_CALOR - t, 0.0, None)
+    base = BASE_ELECTRICA.get(horario, BASE_ELECTRICA_DEFECTO)
+    ele = base + (1.0 - base) * occ
+    # consumo de agua: con la ocupación, con algo de uso residual en horas vacías
+    agua = occ + 0.02
+    agua_dia = np.bincount(cal["dia"], weights=agua)[cal["dia"]]
+    out = {"frio": frio, "calor": calor, "ele": ele}
+    out = {k: v / v.max() if v.max() > 0 else v for k, v in out.items()}
+    out["agua"] = agua / agua_dia
+    return {k: v.astype(np.float32) for k, v in out.items()}
+
+FORMA_DE_MODULO = {"Frío": "frio", "Calor": "calor", "Eléctrica": "ele", "Agua fría": "agua", "ACS": "agua", "ACS térmica": "agua"}
+
+# -----------------------------
+# Resultado por módulo
+# -----------------------------
+class HourlyProfile:
+    """Perfil horario total de un módulo, energía anual por zona y métricas derivadas."""
+    def __init__(self, modulo: str, unidad: str, unidad_anual: str, hourly: np.ndarray, zone_annual: np.ndarray,
+                 month: np.ndarray):
+        self.modulo = modulo
+        self.unidad = unidad
+        self.unidad_anual = unidad_anual
+        self.hourly = hourly            # float64, 8760
+        self.zone_annual = zone_annual  # por zona, en unidad anual
+        self._month = month
+
+    @property
+    def peak(self) -> float:
+        return float(self.hourly.max()) if len(self.hourly) else 0.0
+
+    @property
+    def annual(self) -> float:
+        return float(self.hourly.sum()) * FACTOR_ANUAL[self.unidad_anual]
+
+    @property
+    def equivalent_hours(self) -> float:
+        """Horas equivalentes a plena carga (energía anual / punta)."""
+        return float(self.hourly.sum()) / self.peak if self.peak > 0 else 0.0
+
+    def monthly_peaks(self) -> np.ndarray:
+        out = np.zeros(12)
+        np.maximum.at(out, self._month, self.hourly)
+        return out
+
+    def monthly_energy(self) -> np.ndarray:
+        return np.bincount(self._month, weights=self.hourly, minlength=12) * FACTOR_ANUAL[self.unidad_anual]
+
+    def duration_curve(self) -> np.ndarray:
+        """Curva monótona: las 8760 horas ordenadas de mayor a menor."""
+        return np.sort(self.hourly)[::-1]
+
+# -----------------------------
+# Motor
+# -----------------------------
+def _zone_values(zones_df: "pd.DataFrame", settings: Dict[str, Any]) -> Tuple[Dict[str, np.ndarray], List[WarningItem]]:
+    """Punta o consumo diario de cada zona y módulo (NaN -> 0), con los avisos de las calculadoras."""
+    from . import calculations as calc
+    df = calc.normalize_zones_df(zones_df)
+    tables: Dict[str, "pd.DataFrame"] = {}
+    warnings: List[WarningItem] = []
+    for key, fn in (("clima", calc.calc_climatizacion), ("ele", calc.calc_electricidad), ("agua", calc.calc_agua_y_acs)):
+        res, w, _ = fn(df, settings)
+        tables[key] = res
+        warnings += w
+    out: Dict[str, np.ndarray] = {}
+    for modulo, (src, col, unidad, _, _) in MODULOS.items():
+        t = tables[src]
+        vals = np.asarray(t[col].astype(float), dtype=float) if col in t.columns else np.full(len(df), np.nan)
+        vals = np.nan_to_num(vals, nan=0.0)
+        if modulo == "ACS térmica":
+            vals = vals * ACS_KWH_POR_LITRO
+        out[modulo] = vals
+    return out, warnings
+
+class ZoneProfiles:
+    """
+    Perfiles por zona sin materializarlos: valor de cada zona y módulo, grupo (horario,
+    zona climática) de cada zona y forma unitaria de cada grupo (grupos × 8760, float32).
+
+    Como el perfil de una zona es su valor por la forma de su grupo, los totales se
+    obtienen agregando primero por grupo (grupos × 8760). `iter_blocks()` genera las
+    matrices (zonas × 8760) en float32 por bloques para quien necesite el detalle horario
+    de cada zona (exportación, simultaneidad de subconjuntos…) con memoria acotada.
+    """
+    def __init__(self, values: Dict[str, np.ndarray], group_idx: np.ndarray, groups: List[Tuple[str, str]],
+                 shapes: Dict[str, np.ndarray], calendar: Dict[str, np.ndarray]):
+        self.values = values
+        self.group_idx = group_idx
+        self.groups = groups
+        self.shapes = shapes
+        self.calendar = calendar
+
+    def __len__(self) -> int:
+        return len(self.group_idx)
+
+    def iter_blocks(self, modulo: str, block_zones: int = BLOCK_ZONES, zones: Optional[np.ndarray] = None):
+        """(posiciones, matriz float32 bloque × 8760) del módulo, bloque a bloque."""
+        pos = np.arange(len(self)) if zones is None else np.asarray(zones, dtype=np.int64)
+        shape = self.shapes[FORMA_DE_MODULO[modulo]]
+        vals = self.values[modulo]
+        for lo in range(0, len(pos), block_zones):
+            p = pos[lo:lo + block_zones]
+            yield p, vals[p].astype(np.float32)[:, None] * shape[self.group_idx[p]]
+
+    def to_csv(self, modulo: str, labels: List[str], top: Optional[int] = None, block_zones: int = BLOCK_ZONES) -> bytes:
+        """
+        CSV del detalle horario (una fila por zona, una columna por hora) escrito bloque a
+        bloque; `top`: solo las zonas de mayor valor anual.
+        """
+        zones = np.argsort(-self.zone_annual(modulo), kind="stable")[:top] if top is not None else None
+        out = io.BytesIO()
+        out.write(("Zona," + ",".join(f"h{h + 1}" for h in range(len(self.calendar["hora"]))) + "\n").encode("utf-8"))
+        for p, blk in self.iter_blocks(modulo, block_zones, zones):
+            for lab, row in zip((labels[i] for i in p.tolist()), blk):
+                out.write((str(lab).replace(",", " ") + ",").encode("utf-8"))
+                np.savetxt(out, row[None, :], fmt="%.3f", delimiter=",")
+        return out.getvalue()
+
+    def hourly(self, modulo: str, zones: Optional[np.ndarray] = None) -> np.ndarray:
+        """Perfil horario agregado (float64) de todas las zonas o de un subconjunto."""
+        g = self.group_idx if zones is None else self.group_idx[zones]
+        v = self.values[modulo] if zones is None else self.values[modulo][zones]
+        weight = np.bincount(g, weights=v, minlength=len(self.groups))
+        return weight @ self.shapes[FORMA_DE_MODULO[modulo]].astype(np.float64)
+
+    def zone_annual(self, modulo: str) -> np.ndarray:
+        """Energía (o volumen) anual de cada zona en la unidad anual del módulo."""
+        per_group = self.shapes[FORMA_DE_MODULO[modulo]].sum(axis=1, dtype=np.float64)
+        return self.values[modulo] * per_group[self.group_idx] * FACTOR_ANUAL[MODULOS[modulo][3]]
+
+def zone_groups(zones_df: "pd.DataFrame", settings: Dict[str, Any]) -> Tuple[np.ndarray, List[Tuple[str, str]]]:
+    """Grupo (horario, zona climática) de cada zona: (índice de grupo por zona, grupos)."""
+    import pandas as pd
+    n = len(zones_df)
+    usos = zones_df["Uso"].astype(object) if "Uso" in zones_df.columns else pd.Series([""] * n, dtype=object)
+    zonas = zones_df["Zona climática"].astype(object) if "Zona climática" in zones_df.columns else pd.Series([""] * n, dtype=object)
+    default_zone = str(settings.get("zona_climatica_global") or "D3")
+    horarios = usos.map({u: horario_de_uso(u) for u in set(usos.tolist())}).reset_index(drop=True)
+    zonas = zonas.where(zonas.map(lambda z: isinstance(z, str) and z != ""), default_zone).reset_index(drop=True)
+    group_idx, uniques = pd.factorize(horarios + "|" + zonas)
+    return np.asarray(group_idx, dtype=np.int64), [tuple(k.split("|", 1)) for k in uniques]
+
+def group_shapes(groups: List[Tuple[str, str]], cal: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Formas de cada grupo apiladas por tipo: {forma: (grupos × horas) float32}."""
+    per_group = [formas(h, z, cal) for h, z in groups]
+    steps = len(cal["hora"])
+    return {f: np.stack([s[f] for s in per_group]) if per_group else np.zeros((0, steps), np.float32)
+            for f in ("frio", "calor", "ele", "agua")}
+
+def build_zone_profiles(zones_df: "pd.DataFrame", settings: Dict[str, Any], year: int = 2025) -> Tuple[ZoneProfiles, List[WarningItem]]:
+    values, warnings = _zone_values(zones_df, settings)
+    cal = calendario(year)
+    group_idx, groups = zone_groups(zones_df, settings)
+    with perf.span("perfiles.formas"):
+        shapes = group_shapes(groups, cal)
+    return ZoneProfiles(values, group_idx, groups, shapes, cal), warnings
+
+@perf.timed("calc_perfiles_horarios")
+def calc_perfiles_horarios(zones_df: "pd.DataFrame", settings: Dict[str, Any], year: int = 2025) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    Perfiles de 8760 h por módulo. Devuelve (resumen por módulo, avisos, totales) con
+    totals["perfiles"] = {módulo: HourlyProfile}, totals["mensual"] (puntas y energía por
+    mes) y totals["zonas"] (ZoneProfiles, para el detalle por zona).
+    """
+    import pandas as pd
+    zp, warnings = build_zone_profiles(zones_df, settings, year)
+    with perf.span("perfiles.agregado"):
+        perfiles = {m: HourlyProfile(m, MODULOS[m][2], MODULOS[m][3], zp.hourly(m), zp.zone_annual(m), zp.calendar["mes"])
+                    for m in MODULOS}
+    res = pd.DataFrame([{
+        "Módulo": m,
+        "Unidad": p.unidad,
+        "Punta simultánea": p.peak,
+        "Suma de puntas": float(zp.values[m].sum()) if MODULOS[m][4] == "punta" else None,
+        "Energía / volumen anual": p.annual,
+        "Unidad anual": p.unidad_anual,
+        "Horas equivalentes": p.equivalent_hours,
+    } for m, p in perfiles.items()])
+    mensual = pd.DataFrame({"Mes": MESES})
+    for m, p in perfiles.items():
+        mensual[f"{m} punta ({p.unidad})"] = p.monthly_peaks()
+        mensual[f"{m} ({p.unidad_anual})"] = p.monthly_energy()
+    if len(zp) and not any(zp.values[m].any() for m in MODULOS):
+        warnings.append(WarningItem("Perfiles", "-", "Ninguna zona tiene potencias ni consumos calculados."))
+    totals: Dict[str, Any] = {"perfiles": perfiles, "mensual": mensual, "zonas": zp, "grupos": len(zp.groups)}
+    return res, warnings, totals
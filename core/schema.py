@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Esquema tipado de la tabla de zonas.
+
+Los textos repetidos (uso, nivel, exposición, zona climática, categoría) se guardan como
+categóricos; las magnitudes como float; el suministro complementario como bool y los
+overrides (casi siempre vacíos) como float con nulos. Se aplica al importar, al cargar
+plantillas y tras cada edición, de modo que los cálculos reciben columnas ya numéricas.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .constants import ZONAS_CLIMATICAS, NIVELES_CARGA, EXPOSICION_TODO_AIRE, TABLA_1_ESPACIO_GLOBAL
+from .utils import parse_numeric_series
+
+# Tipos lógicos: "id", "text", "category", "float", "count", "bool", "opt_float" (float con nulos)
+ZONES_SCHEMA: Dict[str, str] = {
+    "ID": "id",
+    "Nombre zona": "text",
+    "Uso": "category",
+    "Superficie (m²)": "float",
+    "Zona climática": "category",
+    "Nivel carga (B/M/A)": "category",
+    "Exposición (E/S/W, N, Interior)": "category",
+    "Densidad (pers/m²)": "opt_float",
+    "Personas": "count",
+    "Camas": "count",
+    "Cubiertos/día": "count",
+    "Suministro complementario": "bool",
+    "Frío override (W/m²)": "opt_float",
+    "Calor override (W/m²)": "opt_float",
+    "Ventilación override (L/s·m²)": "opt_float",
+    "Eléctrica override (W/m²)": "opt_float",
+    "Eléctrica comp. override (W/m²)": "opt_float",
+    "Categoría global (Tabla 1)": "category",
+}
+
+# Valores conocidos de cada categórico (se añaden al principio; los valores no previstos se conservan)
+CATEGORY_VALUES: Dict[str, List[str]] = {
+    "Zona climática": list(ZONAS_CLIMATICAS),
+    "Nivel carga (B/M/A)": list(NIVELES_CARGA),
+    "Exposición (E/S/W, N, Interior)": list(EXPOSICION_TODO_AIRE),
+    "Categoría global (Tabla 1)": list(TABLA_1_ESPACIO_GLOBAL.keys()),
+}
+
+DTYPES: Dict[str, Any] = {
+    "id": "Int64",
+    "text": "string",
+    "float": "float64",
+    "count": "Float32",
+    "bool": "bool",
+    "opt_float": "Float64",
+}
+
+_TRUE = {"true", "1", "si", "sí", "s", "yes", "y", "x", "verdadero"}
+
+def _known_values(col: str) -> List[str]:
+    if col == "Uso":
+        from .catalog import all_usos
+        return all_usos()
+    return CATEGORY_VALUES.get(col, [])
+
+NUMERIC_KINDS = ("id", "float", "count", "opt_float")
+NUMERIC_COLUMNS = [c for c, k in ZONES_SCHEMA.items() if k in NUMERIC_KINDS]
+
+def parse_numeric(s: pd.Series) -> pd.Series:
+    """Serie float64 (NaN si vacío o no numérico). No reprocesa columnas ya numéricas."""
+    if s.dtype == "float64":
+        return s
+    return parse_numeric_series(s)[0]
+
+def _to_category(s: pd.Series, col: str) -> pd.Series:
+    known = _known_values(col)
+    if isinstance(s.dtype, pd.CategoricalDtype) and list(s.cat.categories[:len(known)]) == known:
+        return s
+    vals = s.astype("string").str.strip()
+    vals = vals.mask(vals == "")
+    extra = sorted(set(vals.dropna().unique()) - set(known))
+    return pd.Series(pd.Categorical(vals, categories=known + extra), index=s.index, name=s.name)
+
+def _to_bool(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(s.dtype):
+        return s.fillna(False).astype(bool)
+    if pd.api.types.is_numeric_dtype(s.dtype):
+        return s.fillna(0).ne(0).astype(bool)
+    txt = s.astype("string").str.strip().str.lower()
+    return txt.isin(_TRUE).fillna(False).astype(bool)
+
+def enforce_zones_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devuelve una copia con las columnas del esquema (añadiendo las que falten) en su tipo
+    declarado y en el orden del esquema; las columnas adicionales se conservan al final.
+    """
+    return enforce_zones_schema_report(df)[0]
+
+def enforce_zones_schema_report(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Como `enforce_zones_schema`, y además devuelve las celdas numéricas no interpretables
+    (quedan vacías): DataFrame con columnas "Fila", "ID", "Columna", "Valor".
+    """
+    out = {}
+    failures = []
+    n = len(df)
+    for col, kind in ZONES_SCHEMA.items():
+        s = df[col] if col in df.columns else pd.Series([None] * n, index=df.index, dtype=object, name=col)
+        if kind == "category":
+            s = _to_category(s, col)
+        elif kind == "bool":
+            s = _to_bool(s)
+        elif kind == "text":
+            s = s.astype(object).where(s.notna(), None).astype(DTYPES["text"])
+        else:
+            raw = s
+            s, failed = parse_numeric_series(s)
+            if failed.any():
+                pos = np.flatnonzero(failed.to_numpy())
+                failures.append(pd.DataFrame({"Fila": pos + 1, "Columna": col, "Valor": raw.iloc[pos].astype(str).to_numpy()}))
+            if kind == "id":
+                s = s.round()
+            s = s.astype(DTYPES[kind])
+        out[col] = s
+    extra = [c for c in df.columns if c not in ZONES_SCHEMA]
+    res = pd.DataFrame(out, index=df.index)
+    for c in extra:
+        res[c] = df[c]
+    if failures:
+        report = pd.concat(failures, ignore_index=True)
+        report.insert(1, "ID", res["ID"].iloc[report["Fila"] - 1].to_numpy())
+    else:
+        report = pd.DataFrame(columns=["Fila", "ID", "Columna", "Valor"])
+    return res, report
+
+def conforms(df: pd.DataFrame) -> bool:
+    """True si `df` ya cumple el esquema (permite saltarse la conversión)."""
+    for col, kind in ZONES_SCHEMA.items():
+        if col not in df.columns:
+            return False
+        dt = df[col].dtype
+        if kind == "category":
+            if not isinstance(dt, pd.CategoricalDtype):
+                return False
+        elif dt != pd.api.types.pandas_dtype(DTYPES[kind]):
+            return False
+    return True
+
+def memory_per_zone(df: pd.DataFrame) -> Optional[float]:
+    """Bytes por zona (memoria profunda)."""
+    if len(df) == 0:
+        return None
+    return float(df.memory_usage(deep=True, index=False).sum()) / len(df)
+
+def constant_category(df: pd.DataFrame, col: str, value: Any) -> pd.Series:
+    """Columna categórica de `df` con el mismo valor en todas las filas (uso/zona del edificio)."""
+    known = _known_values(col)
+    cats = known if value in known or value is None else known + [str(value)]
+    code = -1 if value is None else cats.index(value if value in known else str(value))
+    codes = np.full(len(df), code, dtype=np.int16 if len(cats) > 127 else np.int8)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=cats), index=df.index, name=col)
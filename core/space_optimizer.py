@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Combinaciones de instalaciones de la Tabla 2 que caben en una superficie disponible.
+
+Se enumeran todos los subconjuntos de instalaciones como máscaras de bits (2ⁿ filas ×
+n columnas de 0/1) y se evalúan de una vez:
+- reglas: exclusiones mutuas (como mucho una instalación de cada grupo), dependencias
+  (una instalación exige alguna de otras), categorías obligatorias (al menos una de
+  cada una) e instalaciones forzadas o descartadas, todas como operaciones con máscaras;
+- superficie: máscara × porcentajes mín./máx. (producto matricial) × superficie total;
+- frontera de Pareto entre las combinaciones válidas que caben (m² mín. ≤ disponible):
+  menos m² mínimos, menos m² máximos y más instalaciones (comparación por pares en
+  bloques).
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import numpy as np
+
+from . import perf
+from .constants import TABLA_2_ESPACIO_POR_INSTALACION
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Categoría -> instalaciones de la Tabla 2 que la cubren
+CATEGORIAS: Dict[str, List[str]] = {
+    "Producción de frío": ["Producción de frío"],
+    "Producción de calor": ["Producción de calor"],
+    "Disipación": ["Torres enfriamiento"],
+    "Combustible": ["Almacenamiento combustible (gasóleo)"],
+    "Tratamiento de aire / terminales": [
+        "Tratamiento aire - Caudal constante (baja velocidad)", "Tratamiento aire - Caudal variable",
+        "Sistema fancoils", "Sistema inducción", "Bombas de calor en anillo de agua",
+    ],
+    "Electricidad": ["Electricidad general (sin GE/SAI)"],
+    "Ascensores": ["Sala máquinas ascensores"],
+}
+# Como mucho una instalación de cada grupo
+EXCLUSIONES: List[List[str]] = [
+    ["Tratamiento aire - Caudal constante (baja velocidad)", "Tratamiento aire - Caudal variable"],
+    ["Sistema fancoils", "Sistema inducción", "Bombas de calor en anillo de agua"],
+]
+# Instalación -> exige al menos una de
+DEPENDENCIAS: Dict[str, List[str]] = {
+    "Torres enfriamiento": ["Producción de frío", "Bombas de calor en anillo de agua"],
+    "Almacenamiento combustible (gasóleo)": ["Producción de calor"],
+}
+OPCIONES: Dict[str, Any] = {
+    "superficie_disponible_m2": 0.0,
+    "obligatorias": ["Tratamiento de aire / terminales", "Electricidad"],
+    "forzadas": [], "descartadas": [],
+    "max_resultados": 200,
+}
+BLOQUE = 512  # filas por bloque en la comparación de dominancia
+
+def _bits(nombres: List[str], sel: List[str]) -> int:
+    return sum(1 << nombres.index(s) for s in sel if s in nombres)
+
+def valid_subsets(nombres: List[str], obligatorias: List[str], forzadas: List[str], descartadas: List[str]) -> np.ndarray:
+    """Máscaras enteras de los subconjuntos que cumplen exclusiones, dependencias, categorías y forzadas/descartadas."""
+    m = np.arange(2 ** len(nombres), dtype=np.int64)
+    ok = np.ones(len(m), dtype=bool)
+    for grupo in EXCLUSIONES:
+        g = m & _bits(nombres, grupo)
+        ok &= (g & (g - 1)) == 0  # como mucho un bit
+    for inst, req in DEPENDENCIAS.items():
+        b = _bits(nombres, [inst])
+        if b:
+            ok &= ((m & b) == 0) | ((m & _bits(nombres, req)) != 0)
+    for cat in obligatorias:
+        b = _bits(nombres, CATEGORIAS.get(cat, []))
+        if b:
+            ok &= (m & b) != 0
+    f, d = _bits(nombres, forzadas), _bits(nombres, descartadas)
+    ok &= ((m & f) == f) & ((m & d) == 0)
+    return m[ok]
+
+def pareto_mask(f: np.ndarray) -> np.ndarray:
+    """Filas no dominadas de `f` (objetivos a minimizar en columnas)."""
+    f = np.asarray(f, dtype=float)
+    keep = np.ones(len(f), dtype=bool)
+    for a in range(0, len(f), BLOQUE):
+        blk = f[a:a + BLOQUE]
+        le = (f[None, :, :] <= blk[:, None, :] + 1e-9).all(axis=2)
+        lt = (f[None, :, :] < blk[:, None, :] - 1e-9).any(axis=2)
+        keep[a:a + BLOQUE] = ~(le & lt).any(axis=1)
+    return keep
+
+@perf.timed("calc_optimo_salas")
+def calc_optimo_salas(totals: Dict[str, Any], settings: Dict[str, Any]) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `totals`: salida de `calc_reservas_espacios` (superficie total). Devuelve (frontera de
+    Pareto de combinaciones que caben en la superficie disponible, avisos, totales).
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("optimo_salas", {}) or {})}
+    warnings: List[WarningItem] = []
+    nombres = list(TABLA_2_ESPACIO_POR_INSTALACION)
+    pmin = np.array([TABLA_2_ESPACIO_POR_INSTALACION[k][0] for k in nombres])
+    pmax = np.array([TABLA_2_ESPACIO_POR_INSTALACION[k][1] for k in nombres])
+    area = float(totals.get("superficie_total_m2", 0.0) or 0.0)
+    disponible = float(o["superficie_disponible_m2"])
+
+    with perf.span("salas.enumeracion"):
+        masks = valid_subsets(nombres, o["obligatorias"], o["forzadas"], o["descartadas"])
+        bits = ((masks[:, None] >> np.arange(len(nombres))) & 1).astype(float)
+        m2 = bits @ np.column_stack([pmin, pmax]) * area / 100.0
+        n_inst = bits.sum(axis=1)
+    cabe = m2[:, 0] <= disponible + 1e-9
+    with perf.span("salas.pareto"):
+        idx = np.flatnonzero(cabe)
+        front = idx[pareto_mask(np.column_stack([m2[idx, 0], m2[idx, 1], -n_inst[idx]]))]
+    n_pareto = len(front)
+    front = front[np.lexsort((m2[front, 1], -n_inst[front]))][:int(o["max_resultados"])]
+
+    rows = [{
+        "Combinación": " + ".join(nm for j, nm in enumerate(nombres) if masks[i] >> j & 1),
+        "Instalaciones": int(n_inst[i]), "m² mín": float(m2[i, 0]), "m² máx": float(m2[i, 1]),
+        "Holgura (m²)": disponible - float(m2[i, 1]),
+        "Cabe": "Sí" if m2[i, 1] <= disponible + 1e-9 else "Solo con el mínimo",
+    } for i in front.tolist()]
+    res = pd.DataFrame(rows, columns=["Combinación", "Instalaciones", "m² mín", "m² máx", "Holgura (m²)", "Cabe"])
+
+    if not len(masks):
+        warnings.append(WarningItem("Espacios", "Tabla 2", "Ninguna combinación cumple las reglas: revisa categorías obligatorias y forzadas/descartadas."))
+    elif not len(idx):
+        warnings.append(WarningItem("Espacios", "Tabla 2", f"Ninguna combinación válida cabe en {disponible:.0f} m²: la menor necesita "
+                                    f"{float(m2[:, 0].min()):.0f} m²."))
+    if area <= 0:
+        warnings.append(WarningItem("Espacios", "Tabla 2", "Superficie total nula: define la superficie de las zonas."))
+
+    out: Dict[str, Any] = {
+        "n_combinaciones": int(2 ** len(nombres)), "n_validas": int(len(masks)), "n_caben": int(len(idx)),
+        "n_pareto": int(n_pareto), "superficie_disponible_m2": disponible,
+    }
+    return res, warnings, out
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
-import pandas as pd
-from .sample_data import sample_zones_office
+from typing import TYPE_CHECKING
 from .constants import ZONAS_CLIMATICAS, NIVELES_CARGA, EXPOSICION_TODO_AIRE
 
+if TYPE_CHECKING:  # pandas/streamlit se cargan en la primera llamada, no al importar
+    import pandas as pd
+
 DEFAULT_COLUMNS = [
     "ID",
     "Nombre zona",
@@ -25,19 +27,33 @@ DEFAULT_COLUMNS = [
     "Categoría global (Tabla 1)",
 ]
 
+# Columnas que son propiedad del edificio (settings), no de cada zona
+BUILDING_COLUMNS = {"Uso": "uso_edificio", "Zona climática": "zona_climatica_global"}
+
+def _enable_copy_on_write() -> None:
+    # pandas>=3 ya trabaja en copy-on-write; en 2.x se activa para que las vistas
+    # entregadas por get_zones_df() no puedan modificar la tabla guardada.
+    import pandas as pd
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
 def init_state():
     import streamlit as st
+    from . import perf
+    perf.bind_session()
     if "zones_df" not in st.session_state:
-        st.session_state["zones_df"] = sample_zones_office()
-        # añadir columnas faltantes
-        for c in DEFAULT_COLUMNS:
-            if c not in st.session_state["zones_df"].columns:
-                st.session_state["zones_df"][c] = None
+        from .sample_data import sample_zones_office
+        from .schema import enforce_zones_schema
+        _enable_copy_on_write()
+        # añade columnas faltantes y aplica tipos del esquema
+        st.session_state["zones_df"] = enforce_zones_schema(sample_zones_office())
+        st.session_state["zones_version"] = 0
 
     if "settings" not in st.session_state:
         st.session_state["settings"] = {
             "oversize_frio": 1.00,
             "oversize_calor": 1.10,
+            "simultaneidad_activa": False,
             "uso_edificio": "Oficinas",
             "gfa_above_m2": 4500.0,
             "gfa_below_m2": 1000.0,
@@ -55,28 +71,139 @@ def init_state():
             "meta_proyecto": {"proyecto": "", "ubicacion": "", "titulo": "Memoria de Predimensionamiento"},
         }
 
+    if "history" not in st.session_state:
+        from .history import EditHistory
+        hist = EditHistory()
+        hist.snapshot_settings(st.session_state["settings"])
+        st.session_state["history"] = hist
+    # los widgets escriben directamente en settings: los cambios se registran aquí
+    st.session_state["history"].sync_settings(st.session_state["settings"])
+
+def get_zones_version() -> int:
+    """Contador que solo aumenta cuando cambia el contenido de la tabla de zonas."""
+    import streamlit as st
+    init_state()
+    return int(st.session_state.get("zones_version", 0))
+
+def zones_cache_key(settings: dict | None = None) -> tuple:
+    """Clave para cachés derivadas de la tabla: (versión, uso del edificio, zona climática)."""
+    import streamlit as st
+    init_state()
+    settings = st.session_state["settings"] if settings is None else settings
+    return (get_zones_version(),) + tuple(settings.get(k) for k in BUILDING_COLUMNS.values())
+
 def get_zones_df() -> pd.DataFrame:
+    """
+    Vista de solo lectura (copy-on-write) de la tabla de zonas, con el uso y la zona
+    climática del edificio. La vista se reconstruye solo cuando cambian la versión
+    de la tabla o esos dos ajustes; el resto de llamadas no copia datos.
+    """
+    import streamlit as st
     init_state()
-    df = st.session_state["zones_df"]
     settings = st.session_state.get("settings", {})
-    # Enforce "one building = one use" and "one climate zone" across all zone rows
-    uso = settings.get("uso_edificio")
-    zona = settings.get("zona_climatica_global")
-    if uso or zona:
-        df2 = df.copy()
-        if uso:
-            df2["Uso"] = uso
-        if zona:
-            df2["Zona climática"] = zona
-        st.session_state["zones_df"] = df2
-        return df2
-    return df
-
-def set_zones_df(df: pd.DataFrame):
+    key = zones_cache_key(settings)
+    cached = st.session_state.get("_zones_view")
+    if cached is None or cached[0] != key:
+        df = st.session_state["zones_df"]
+        # Enforce "one building = one use" and "one climate zone" across all zone rows
+        if any(settings.get(k) for k in BUILDING_COLUMNS.values()):
+            from .schema import constant_category
+            view = df.copy(deep=False)
+            for col, k in BUILDING_COLUMNS.items():
+                if settings.get(k):
+                    view[col] = constant_category(view, col, settings.get(k))
+        else:
+            view = df
+        cached = (key, view)
+        st.session_state["_zones_view"] = cached
+    return cached[1].copy(deep=False)
+
+def _same_zones(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    if a is b:
+        return True
+    if a.shape != b.shape or list(a.columns) != list(b.columns):
+        return False
+    cols = [c for c in a.columns if c not in BUILDING_COLUMNS]
+    return a[cols].reset_index(drop=True).equals(b[cols].reset_index(drop=True))
+
+def _store_zones(df: pd.DataFrame) -> None:
     import streamlit as st
     st.session_state["zones_df"] = df
+    st.session_state["zones_version"] = get_zones_version() + 1
+
+def set_zones_df(df: pd.DataFrame, label: str = "Edición de zonas") -> bool:
+    """
+    Guarda la tabla (tipada) y aumenta la versión si hay cambios reales; el cambio queda
+    en el historial de deshacer. Devuelve si cambió.
+    """
+    import streamlit as st
+    from .schema import enforce_zones_schema, conforms
+    init_state()
+    df = df if conforms(df) else enforce_zones_schema(df)
+    old = st.session_state["zones_df"]
+    if _same_zones(old, df):
+        return False
+    get_history().record_zones(old, df, label=label, ignore=tuple(BUILDING_COLUMNS))
+    _store_zones(df)
+    return True
+
+def get_history():
+    """Historial de ediciones de la sesión (`core.history.EditHistory`)."""
+    import streamlit as st
+    init_state()
+    return st.session_state["history"]
+
+def _navigate(move) -> bool:
+    import streamlit as st
+    hist = get_history()
+    pos = hist.pos
+    zones = move(hist, st.session_state["zones_df"], st.session_state["settings"])
+    if hist.pos == pos:
+        return False
+    if zones is not st.session_state["zones_df"]:
+        _store_zones(zones)
+    return True
+
+def undo_edit() -> bool:
+    """Deshace la última revisión (zonas y/o ajustes). Devuelve si había algo que deshacer."""
+    return get_history().can_undo and _navigate(lambda h, z, s: h.step(z, s, forward=False))
+
+def redo_edit() -> bool:
+    return get_history().can_redo and _navigate(lambda h, z, s: h.step(z, s, forward=True))
+
+def goto_revision(revision: int) -> bool:
+    """Salta a la revisión indicada (ver `EditHistory.entries()`)."""
+    return _navigate(lambda h, z, s: h.goto(revision, z, s))
+
+def get_live_totals(base: pd.DataFrame):
+    """
+    Totales incrementales (`core.incremental.IncrementalTotals`) de la tabla guardada `base`
+    (la vista de `get_zones_df()`). Se reconstruyen solo si cambian la versión de la tabla
+    o los ajustes que afectan a cada zona.
+    """
+    import streamlit as st
+    from .incremental import IncrementalTotals, settings_key
+    settings = get_settings()
+    key = (get_zones_version(), settings_key(settings))
+    cached = st.session_state.get("_live_totals")
+    if cached is None or cached[0] != key:
+        cached = (key, IncrementalTotals(base, settings))
+        st.session_state["_live_totals"] = cached
+    return cached[1]
+
+def commit_live_totals() -> None:
+    """Tras guardar desde el editor: la tabla editada pasa a ser la base sin recalcular."""
+    import streamlit as st
+    from .incremental import settings_key
+    cached = st.session_state.get("_live_totals")
+    if cached is None:
+        return
+    inc = cached[1]
+    inc.commit(get_zones_df())
+    st.session_state["_live_totals"] = ((get_zones_version(), settings_key(get_settings())), inc)
 
 def get_settings() -> dict:
+    import streamlit as st
     init_state()
     return st.session_state["settings"]
 
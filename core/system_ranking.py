@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+Clasificación de sistemas de climatización a partir de la Tabla 16.
+
+La Tabla 16 se compila una vez por proceso en un índice de bits: un entero por
+aplicación con un bit por sistema aplicable. Cada zona toma el de su aplicación (uso
+mapeado a la Tabla 16; sin mapeo no restringe) y, por edificio, se obtiene la fracción
+de superficie en la que cada sistema es aplicable (desempaquetado de bits × superficie,
+`np.bincount` por edificio). Con ella y con las magnitudes calculadas se puntúa cada
+sistema en cada edificio a la vez (matrices edificios × sistemas):
+
+- cobertura: fracción de la punta de frío y de calor que el sistema puede cubrir con su
+  capacidad específica orientativa (W/m²) y, si la tiene, con su potencia máxima
+  razonable por edificio (kW, p. ej. expansión directa), ponderada por las potencias;
+- espacio: reserva de la Tabla 2 de las instalaciones que requiere, con un mínimo útil
+  por sala (máscara sistemas × instalaciones, como en el optimizador de salas), más la
+  de los equipos fuera de la Tabla 2 (m² por kW de frío, p. ej. unidades exteriores);
+- aire: caudal que mueve el sistema, entre la ventilación (Tabla 10) y el todo-aire
+  (Tabla 9, o estimado desde la potencia de frío) según la fracción de carga por aire.
+
+Puntuación = 100 · aplicabilidad · cobertura · (1 − w_espacio·espacio − w_aire·aire),
+con espacio y aire en valor absoluto por m² del edificio (fracción de la superficie y
+L/s·m²) sobre una referencia, de modo que un edificio más cargado penaliza más los
+sistemas que mueven más aire o necesitan más sala. Es orientativa.
+"""
+from __future__ import annotations
+
+import functools
+import math
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+import numpy as np
+
+from . import perf
+from .constants import TABLA_2_ESPACIO_POR_INSTALACION, TABLA_16_SISTEMAS_CLIMA
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Uso de la tabla de zonas -> aplicación de la Tabla 16 (además de coincidencia exacta)
+USO_A_TABLA16 = {
+    "Comercios - Galerías comerciales": "Comercios",
+    "Comercios - Supermercados": "Comercios",
+    "Comercios - Grandes almacenes": "Grandes almacenes",
+    "Edificios bancarios": "Bancos - Oficinas",
+    "Hospitales - General (excepto quirófanos)": "Hospitales - General",
+    "Hospitales - Hospitalización": "Hospitales - Habitaciones",
+    "Hoteles": "Hoteles - Habitaciones",
+    "Hoteles media categoría": "Hoteles - Habitaciones",
+    "Hoteles alta categoría": "Hoteles - Habitaciones",
+    "Oficinas con cafetería": "Oficinas",
+    "Oficinas sin cafetería": "Oficinas",
+    "Salones de actos": "Auditorios",
+    "Archivos": "Bibliotecas",
+}
+# Sistema -> (frío W/m², calor W/m²) máximos orientativos (inf = sin límite práctico)
+CAPACIDAD_W_M2: Dict[str, Tuple[float, float]] = {
+    "Expansión directa": (200.0, 200.0),
+    "UTA con aire exterior": (0.0, 0.0),
+    "Calefacción: Radiadores": (0.0, 150.0),
+    "Fancoil": (math.inf, math.inf),
+    "Techo/Suelo radiante": (40.0, 70.0),
+    "Todo-aire caudal constante": (math.inf, math.inf),
+    "Todo-aire caudal variable": (math.inf, math.inf),
+    "Inducción con aire primario": (120.0, 100.0),
+    "Inducción radiadores con aire primario": (120.0, 150.0),
+}
+# Sistema -> potencia máxima orientativa por edificio (kW, frío y calor): varios sistemas
+# VRF/partidos; por encima conviene producción centralizada
+CAPACIDAD_MAX_KW: Dict[str, float] = {"Expansión directa": 350.0}
+# Sistema -> m² por kW de frío de equipos que no están en la Tabla 2 (unidades exteriores)
+ESPACIO_M2_POR_KW: Dict[str, float] = {"Expansión directa": 0.03}
+# Referencias de las penalizaciones: reserva (% de la superficie) y caudal (L/s·m²) que puntúan 1
+SALA_MIN_M2 = 10.0  # superficie mínima útil de cada sala de la Tabla 2
+ESPACIO_REF_PCT = 10.0
+AIRE_REF_LS_M2 = 10.0
+# Sistema -> instalaciones de la Tabla 2 que requiere
+PRODUCCION_T2 = ["Producción de frío", "Producción de calor"]
+INSTALACIONES_T2: Dict[str, List[str]] = {
+    "Expansión directa": [],
+    "UTA con aire exterior": ["Tratamiento aire - Caudal variable"],
+    "Calefacción: Radiadores": ["Producción de calor"],
+    "Fancoil": PRODUCCION_T2 + ["Sistema fancoils"],
+    "Techo/Suelo radiante": PRODUCCION_T2,
+    "Todo-aire caudal constante": PRODUCCION_T2 + ["Tratamiento aire - Caudal constante (baja velocidad)"],
+    "Todo-aire caudal variable": PRODUCCION_T2 + ["Tratamiento aire - Caudal variable"],
+    "Inducción con aire primario": PRODUCCION_T2 + ["Sistema inducción"],
+    "Inducción radiadores con aire primario": PRODUCCION_T2 + ["Sistema inducción"],
+}
+# Sistema -> fracción de la carga que se trata por aire (0 = solo ventilación, 1 = todo-aire)
+FRACCION_AIRE: Dict[str, float] = {
+    "Expansión directa": 0.0, "UTA con aire exterior": 0.0, "Calefacción: Radiadores": 0.0, "Fancoil": 0.0,
+    "Techo/Suelo radiante": 0.0, "Todo-aire caudal constante": 1.0, "Todo-aire caudal variable": 0.8,
+    "Inducción con aire primario": 0.3, "Inducción radiadores con aire primario": 0.3,
+}
+LS_POR_KW_FRIO = 1000.0 / (1.2 * 1.005 * 10.0)  # L/s de aire por kW con ΔT de impulsión 10 K
+OPCIONES: Dict[str, Any] = {"peso_espacio": 0.3, "peso_aire": 0.2, "agrupacion": "Edificio"}
+
+class Tabla16Index:
+    """Tabla 16 como enteros de bits: `bits[a]` tiene el bit j si el sistema j es aplicable a la aplicación a."""
+    def __init__(self, tabla: Dict[str, Dict[str, bool]]):
+        self.aplicaciones = list(tabla)
+        self.sistemas = list(dict.fromkeys(s for fila in tabla.values() for s in fila))
+        self.bits = np.array([sum(1 << j for j, s in enumerate(self.sistemas) if fila.get(s)) for fila in tabla.values()],
+                             dtype=np.int64)
+        self.todos = (1 << len(self.sistemas)) - 1
+        self._pos = {a: i for i, a in enumerate(self.aplicaciones)}
+
+    def aplicacion(self, uso: str) -> str:
+        """Aplicación de la Tabla 16 de un uso ("" si no hay)."""
+        u = str(uso or "").strip()
+        return u if u in self._pos else USO_A_TABLA16.get(u, "")
+
+    def bits_de(self, aplicaciones: np.ndarray) -> np.ndarray:
+        """Bits de cada aplicación (todos los sistemas si no está en la tabla)."""
+        idx = np.array([self._pos.get(a, -1) for a in aplicaciones.tolist()], dtype=np.int64)
+        return np.where(idx >= 0, self.bits[np.maximum(idx, 0)], self.todos)
+
+    def unpack(self, bits: np.ndarray) -> np.ndarray:
+        """Matriz filas × sistemas de 0/1."""
+        return ((np.asarray(bits, dtype=np.int64)[:, None] >> np.arange(len(self.sistemas))) & 1).astype(np.int8)
+
+    def frame(self) -> "pd.DataFrame":
+        import pandas as pd
+        df = pd.DataFrame(self.unpack(self.bits).astype(bool), columns=self.sistemas)
+        df.insert(0, "Aplicación", self.aplicaciones)
+        return df
+
+@functools.lru_cache(maxsize=1)
+def load_index() -> Tabla16Index:
+    """Índice compilado una vez por proceso."""
+    return Tabla16Index(TABLA_16_SISTEMAS_CLIMA)
+
+@perf.timed("calc_ranking_sistemas")
+def calc_ranking_sistemas(res_clima: "pd.DataFrame", res_vent: "pd.DataFrame", zones_df: "pd.DataFrame",
+                          settings: Dict[str, Any]) -> Tuple["pd.DataFrame", List[WarningItem], Dict[str, Any]]:
+    """
+    `res_clima`: salida de `calc_climatizacion`; `res_vent`: de
+    `calc_ventilacion_y_todo_aire` (mismo orden de zonas que `zones_df`). Devuelve (una
+    fila por edificio y sistema, ordenada por puntuación dentro de cada edificio, avisos,
+    totales con el mejor sistema de cada edificio).
+    """
+    import pandas as pd
+    o = {**OPCIONES, **(settings.get("ranking_sistemas", {}) or {})}
+    warnings: List[WarningItem] = []
+    idx = load_index()
+    sis = idx.sistemas
+    n = len(res_clima)
+
+    def _col(df: "pd.DataFrame", c: str) -> np.ndarray:
+        return np.nan_to_num(pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float), nan=0.0) \
+            if c in df.columns and len(df) == n else np.zeros(n)
+    def _col_nan(df: "pd.DataFrame", c: str) -> np.ndarray:
+        return pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float) if c in df.columns and len(df) == n else np.full(n, np.nan)
+    col = o["agrupacion"]
+    if col in zones_df.columns and len(zones_df) == n:
+        g = zones_df[col].astype(str).groupby(zones_df[col].astype(str), sort=False)
+        codes, grupos = g.ngroup().to_numpy(), [str(k) for k in g.groups.keys()]
+    else:
+        codes, grupos = np.zeros(n, dtype=np.int64), ["Edificio"]
+    nb = len(grupos)
+
+    def _per(v: np.ndarray) -> np.ndarray:
+        return np.bincount(codes, weights=v, minlength=nb) if n else np.zeros(nb)
+    area = _col(res_clima, "Superficie (m²)")
+    frio, calor = _col(res_clima, "Potencia frío (kW)"), _col(res_clima, "Potencia calor (kW)")
+    vent = _col(res_vent, "Ventilación total (L/s)")
+    todo = _col_nan(res_vent, "Todo-aire total (L/s)")
+    todo = np.where(np.isnan(todo), np.maximum(frio * LS_POR_KW_FRIO, vent), todo)
+
+    with perf.span("ranking.aplicabilidad"):
+        usos = res_clima["Uso"].astype(str).to_numpy() if "Uso" in res_clima.columns else np.full(n, "", dtype=object)
+        aplic = np.array([idx.aplicacion(u) for u in usos.tolist()], dtype=object)
+        bits = idx.bits_de(aplic)
+        apl_area = np.zeros((nb, len(sis)))
+        if n:
+            np.add.at(apl_area, codes, idx.unpack(bits) * area[:, None])
+        a_b = _per(area)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            aplicabilidad = np.where(a_b[:, None] > 0, apl_area / a_b[:, None], 0.0)
+
+    with perf.span("ranking.puntuacion"):
+        f_b, c_b = _per(frio), _per(calor)
+        cap = np.array([CAPACIDAD_W_M2.get(s, (math.inf, math.inf)) for s in sis])  # sistemas × (frío, calor)
+        dem = np.column_stack([f_b, c_b])  # edificios × (frío, calor) kW
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w_m2 = np.where(a_b[:, None] > 0, dem * 1000.0 / a_b[:, None], 0.0)  # W/m²
+            cub = np.where(w_m2[:, None, :] > 0, np.minimum(cap[None, :, :] / w_m2[:, None, :], 1.0), 1.0)
+            cap_kw = np.array([CAPACIDAD_MAX_KW.get(s, math.inf) for s in sis])
+            cub = np.minimum(cub, np.where(dem[:, None, :] > 0, np.minimum(cap_kw[None, :, None] / dem[:, None, :], 1.0), 1.0))
+            tot = dem.sum(axis=1)
+            cobertura = np.where(tot[:, None] > 0, (cub * dem[:, None, :]).sum(axis=2) / tot[:, None], 1.0)
+
+        t2 = list(TABLA_2_ESPACIO_POR_INSTALACION)
+        mask = np.array([[1.0 if i in INSTALACIONES_T2.get(s, []) else 0.0 for i in t2] for s in sis])
+        sala = np.maximum(a_b[:, None, None] * np.array([TABLA_2_ESPACIO_POR_INSTALACION[i] for i in t2])[None, :, :] / 100.0,
+                          np.where(a_b > 0, SALA_MIN_M2, 0.0)[:, None, None])  # edificios × instalaciones × (mín, máx)
+        m2 = np.einsum("si,bik->bsk", mask, sala)  # edificios × sistemas × (mín, máx)
+        m2 = m2 + (f_b[:, None] * np.array([ESPACIO_M2_POR_KW.get(s, 0.0) for s in sis])[None, :])[:, :, None]
+        fa = np.array([FRACCION_AIRE.get(s, 0.0) for s in sis])
+        v_b, t_b = _per(vent), _per(todo)
+        aire = v_b[:, None] + fa[None, :] * np.maximum(t_b - v_b, 0.0)[:, None]
+
+        def _por_m2(x: np.ndarray, ref: float) -> np.ndarray:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(a_b[:, None] > 0, np.minimum(x / a_b[:, None] / ref, 1.0), 0.0)
+        esp_n = _por_m2(m2.mean(axis=2), ESPACIO_REF_PCT / 100.0)
+        aire_n = _por_m2(aire, AIRE_REF_LS_M2)
+        score = 100.0 * aplicabilidad * cobertura * (1.0 - float(o["peso_espacio"]) * esp_n - float(o["peso_aire"]) * aire_n)
+        score = np.maximum(score, 0.0)
+        orden = np.argsort(-score, axis=1, kind="stable")
+        pos = np.empty_like(orden)
+        np.put_along_axis(pos, orden, np.arange(len(sis))[None, :].repeat(nb, axis=0), axis=1)
+
+    res = pd.DataFrame({
+        "Edificio": np.repeat(np.array(grupos, dtype=object), len(sis)),
+        "Posición": (pos + 1).ravel(), "Sistema": np.tile(np.array(sis, dtype=object), nb),
+        "Puntuación": score.ravel(), "Aplicable (% sup.)": aplicabilidad.ravel() * 100.0,
+        "Cobertura (%)": cobertura.ravel() * 100.0,
+        "Espacio Tabla 2 mín. (m²)": m2[:, :, 0].ravel(), "Espacio Tabla 2 máx. (m²)": m2[:, :, 1].ravel(),
+        "Caudal de aire (L/s)": aire.ravel(),
+    }).sort_values(["Edificio", "Posición"], kind="stable").reset_index(drop=True)
+
+    sin_mapeo = sorted({u for u, a in zip(usos.tolist(), aplic.tolist()) if not a and u.strip()})
+    if sin_mapeo:
+        warnings.append(WarningItem("Sistemas", "-", f"Usos sin aplicación en la Tabla 16 (no restringen): {', '.join(sin_mapeo[:10])}"
+                                    f"{'…' if len(sin_mapeo) > 10 else ''}."))
+    mejores = res[res["Posición"] == 1][["Edificio", "Sistema", "Puntuación"]].reset_index(drop=True)
+    totals: Dict[str, Any] = {"mejores": mejores, "n_edificios": nb, "sistemas": sis}
+    return res, warnings, totals
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from .utils import WarningItem
+
+if TYPE_CHECKING:
+    from .cube import ResultsCube
+
+MAX_ZONAS_AVISO = 3  # zonas listadas por aviso agrupado (como en la memoria); el resto, "(+N más)"
+
+def group_warnings(warnings: Iterable[WarningItem]) -> List[Tuple[str, List[str], str]]:
+    """
+    Agrupa los avisos con el mismo módulo y mensaje: (módulo, zonas afectadas sin repetir ni vacías,
+    mensaje), en el orden de su primera aparición.
+    """
+    groups: Dict[Tuple[str, str], Dict[str, None]] = {}  # dict como conjunto ordenado de zonas
+    for w in warnings:
+        zonas = groups.setdefault((w.module, w.message), {})
+        if str(w.zone).strip() != "":
+            zonas[w.zone] = None
+    return [(module, list(zonas), message) for (module, message), zonas in groups.items()]
+
+def render_warnings(warnings: Iterable[WarningItem], title: str = "Avisos") -> None:
+    """
+    Muestra los avisos de un módulo agrupando los idénticos (mismo módulo y mensaje) en una
+    línea que lista las zonas afectadas.
+    """
+    import streamlit as st
+    grouped = group_warnings(warnings)
+    if not grouped:
+        return
+    st.subheader(title)
+    for module, zonas, message in grouped:
+        txt = ", ".join(zonas[:MAX_ZONAS_AVISO]) or "(global)"
+        if len(zonas) > MAX_ZONAS_AVISO:
+            txt += f" (+{len(zonas) - MAX_ZONAS_AVISO} más)"
+        st.warning(f"[{module}] {txt}: {message}")
+
+def render_breakdown(cube: Optional["ResultsCube"], key: str, title: str = "Desglose") -> None:
+    """
+    Desglose (tabla + gráfico de barras) servido desde el cubo de resultados del módulo:
+    no recorre las zonas, solo las celdas ya agregadas.
+    """
+    import streamlit as st
+    if cube is None or cube.empty or not cube.dims:
+        return
+    st.subheader(title)
+    dims = cube.dims
+    principal = [m for m in cube.measures if m not in ("Superficie (m²)", "Personas")] or cube.measures
+    c1, c2 = st.columns(2)
+    by = c1.multiselect("Agrupar por", options=dims, default=["Nivel" if "Nivel" in dims else dims[0]], key=f"{key}_desglose_por")
+    measure = c2.selectbox("Magnitud del gráfico", options=cube.measures, index=cube.measures.index(principal[0]), key=f"{key}_desglose_magnitud")
+    tab = cube.breakdown(by)
+    st.dataframe(tab, use_container_width=True, hide_index=True)
+    if by and len(tab) > 1:
+        labels = tab[by].astype(str).agg(" · ".join, axis=1)
+        st.bar_chart(tab.set_index(labels)[measure])
+
+def simultaneidad_toggle(settings: Dict[str, Any]) -> bool:
+    """Activa la punta coincidente (horarios por uso) en generadores y acometida."""
+    import streamlit as st
+    settings["simultaneidad_activa"] = st.toggle(
+        "Aplicar simultaneidad por horarios de uso", value=bool(settings.get("simultaneidad_activa", False)),
+        help="Punta coincidente = máximo de la suma de las curvas semanales de cada zona (horario de su uso y zona climática). "
+             "Con un solo uso el factor es 1; reduce la punta en conjuntos con usos que no coinciden en el tiempo.",
+    )
+    return settings["simultaneidad_activa"]
@@ -2,16 +2,19 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, Any, Optional, Tuple
 import math
-import pandas as pd
+
+if TYPE_CHECKING:  # solo para anotaciones: no cargar pandas al importar utils
+    import pandas as pd
 
 def to_float(x: Any) -> Optional[float]:
     try:
         if x is None:
             return None
         if isinstance(x, (int, float)):
-            return float(x)
+            f = float(x)
+            return None if f != f else f  # NaN (celda vacía en CSV) = sin dato
         s = str(x).strip().replace(",", ".")
         if s == "":
             return None
@@ -19,6 +22,50 @@ def to_float(x: Any) -> Optional[float]:
     except Exception:
         return None
 
+_BLANKS = ("", "nan", "none", "null", "<na>")
+
+def parse_numeric_series(s: "pd.Series") -> Tuple["pd.Series", "pd.Series"]:
+    """
+    Versión por columnas de `to_float`: devuelve (valores float64, máscara de celdas no vacías
+    que no se han podido interpretar).
+
+    Acepta coma decimal ("12,5"), separadores de miles ("1.234,5", "1,234.5", "1 234,5",
+    "1.234.567") y espacios; vacíos/None/NaN quedan como NaN sin contar como error.
+    Los valores ya numéricos no pasan por el tratamiento de texto.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(s.dtype) or pd.api.types.is_numeric_dtype(s.dtype):
+        vals = s.astype("float64")
+        return vals, pd.Series(False, index=s.index)
+
+    vals = pd.to_numeric(s, errors="coerce")
+    if not pd.api.types.is_float_dtype(vals.dtype) or vals.dtype != "float64":
+        vals = vals.astype("float64")
+    pending = vals.isna().to_numpy() & s.notna().to_numpy()
+    failed = np.zeros(len(s), dtype=bool)
+    if pending.any():
+        txt = s[pending].astype("string").str.strip().str.replace("[\\s\u00a0'’]", "", regex=True)
+        blank = txt.str.lower().isin(_BLANKS).fillna(True).to_numpy()
+        last_c = txt.str.rfind(",")
+        last_d = txt.str.rfind(".")
+        n_c = txt.str.count(",")
+        n_d = txt.str.count(r"\.")
+        comma_dec = (last_c > last_d) & (n_c == 1)          # "1.234,5" / "12,5"
+        dot_dec = (last_d > last_c) & (n_d == 1)            # "1,234.5" / "12.5"
+        thousands_only = ((n_c > 1) & (n_d == 0)) | ((n_d > 1) & (n_c == 0))
+        clean = txt.where(~comma_dec, txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+        clean = clean.where(~dot_dec, txt.str.replace(",", "", regex=False))
+        clean = clean.where(~thousands_only, txt.str.replace(r"[.,]", "", regex=True))
+        parsed = pd.to_numeric(clean, errors="coerce").astype("float64").to_numpy()
+        sub = vals.to_numpy(copy=True)
+        sub[pending] = parsed
+        vals = pd.Series(sub, index=s.index, name=s.name)
+        idx = np.flatnonzero(pending)
+        failed[idx] = np.isnan(parsed) & ~blank
+    return vals, pd.Series(failed, index=s.index, name=s.name)
+
 def nz(x: Optional[float], default: float = 0.0) -> float:
     return default if x is None or (isinstance(x, float) and math.isnan(x)) else float(x)
 
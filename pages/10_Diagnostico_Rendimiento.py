@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+
+from core.state import init_state
+from core import perf
+
+init_state()
+st.title("10) Diagnóstico de rendimiento")
+
+reg = perf.current_registry()
+
+st.write("Tiempos por etapa (normalización, cálculo por zonas, construcción de tablas, exportación y pintado de páginas) en las últimas ejecuciones de esta sesión.")
+st.caption("La medición está desactivada por defecto. Actívala aquí o arranca la app con PREDIM_PERF=1.")
+
+c1, c2 = st.columns(2)
+with c1:
+    reg.enabled = st.checkbox("Medir tiempos en esta sesión", value=reg.enabled)
+with c2:
+    reg.memory = st.checkbox("Medir pico de memoria (tracemalloc, más lento)", value=reg.memory, disabled=not reg.enabled)
+
+log_path = st.text_input("Fichero de log JSONL (opcional)", value=reg.log_path or "", placeholder="p.ej. perf_log.jsonl")
+reg.log_path = log_path.strip() or None
+
+if st.button("Borrar mediciones"):
+    reg.clear()
+
+st.divider()
+
+if not reg.samples:
+    st.info("Sin mediciones todavía. Activa la medición y navega por las páginas de cálculo.")
+else:
+    summary = reg.summary()
+    st.subheader("Latencia por etapa")
+    st.dataframe(
+        summary, use_container_width=True, hide_index=True,
+        column_config={c: st.column_config.NumberColumn(c, format="%.2f") for c in summary.columns if "(ms)" in c},
+    )
+    st.bar_chart(summary.set_index("Etapa")["p90 (ms)"])
+    if summary["Pico memoria máx (KB)"].notna().any():
+        st.subheader("Pico de memoria por etapa (KB)")
+        st.bar_chart(summary.set_index("Etapa")["Pico memoria máx (KB)"].dropna())
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import json
+
+import streamlit as st
+
+from core.state import init_state, get_zones_df, get_settings
+from core.calculations import calc_climatizacion, calc_ventilacion_y_todo_aire, calc_electricidad
+from core.benchmarking import (
+    BenchmarkIndex, load_index, default_index_path, project_ratios, ratios_dict, compare,
+)
+from core import perf
+
+init_state()
+_perf_page = perf.begin("page.11_Benchmarking")
+st.title("11) Benchmarking frente a proyectos anteriores")
+st.caption("Compara los ratios del proyecto (W/m² de frío, calor y eléctrica; L/s·m² de ventilación) con los proyectos registrados del mismo uso, zona climática y nivel de carga.")
+
+zones_df = get_zones_df()
+settings = get_settings()
+
+if "benchmark_index" not in st.session_state:
+    st.session_state["benchmark_index"] = load_index()
+index: BenchmarkIndex = st.session_state["benchmark_index"]
+
+cubes = {
+    "clima": calc_climatizacion(zones_df, settings)[2]["cubo"],
+    "vent": calc_ventilacion_y_todo_aire(zones_df, settings)[2]["cubo"],
+    "ele": calc_electricidad(zones_df, settings)[2]["cubo"],
+}
+ratios = project_ratios(cubes)
+
+c1, c2 = st.columns(2)
+c1.metric("Proyectos en el índice", len(index))
+c2.caption(f"Índice local: `{default_index_path()}`")
+
+if ratios.empty:
+    st.info("El proyecto no tiene todavía superficies con resultados para comparar.")
+else:
+    with perf.span("benchmark.compare"):
+        cmp = compare(index, ratios)
+    st.subheader("Posición del proyecto")
+    st.dataframe(
+        cmp, use_container_width=True, hide_index=True,
+        column_config={
+            "Valor": st.column_config.NumberColumn("Valor", format="%.2f"),
+            "Superficie (m²)": st.column_config.NumberColumn("Superficie (m²)", format="%.0f"),
+            "Percentil": st.column_config.ProgressColumn("Percentil", min_value=0, max_value=100, format="%.0f"),
+            "p10": st.column_config.NumberColumn("p10", format="%.2f"),
+            "p50": st.column_config.NumberColumn("p50", format="%.2f"),
+            "p90": st.column_config.NumberColumn("p90", format="%.2f"),
+        },
+    )
+    fuera = cmp[(cmp["Proyectos"] >= 5) & ((cmp["Percentil"] < 5) | (cmp["Percentil"] > 95))]
+    for r in fuera.to_dict("records"):
+        st.warning(f"{r['Ratio']} en {r['Uso']} / {r['Zona climática']} / nivel {r['Nivel']}: {r['Valor']:.2f} queda en el percentil {r['Percentil']:.0f} de {r['Proyectos']} proyectos.")
+
+st.divider()
+st.subheader("Registrar este proyecto")
+meta = settings.get("meta_proyecto", {}) or {}
+project_id = st.text_input("Identificador del proyecto", value=str(meta.get("proyecto", "") or ""))
+st.caption("Si el identificador ya existe en el índice, sus ratios se sustituyen (no se cuentan dos veces).")
+if st.button("Registrar en el índice", type="primary", disabled=ratios.empty or not project_id.strip()):
+    index.register(project_id.strip(), ratios_dict(ratios))
+    try:
+        path = index.save()
+        st.success(f"Proyecto registrado. Índice guardado en {path}.")
+    except OSError as e:
+        st.error(f"No se pudo guardar el índice: {e}")
+
+with st.expander("Combinar con el índice de otro equipo"):
+    up = st.file_uploader("Índice (JSON)", type=["json"])
+    if up is not None and st.button("Combinar"):
+        try:
+            other = BenchmarkIndex.from_dict(json.loads(up.getvalue().decode("utf-8")))
+            added = index.merge(other)
+            index.save()
+            st.success(f"Índice combinado: {added} proyectos nuevos.")
+        except (ValueError, OSError) as e:
+            st.error(f"No se pudo combinar el índice: {e}")
+    st.download_button("Descargar índice", data=json.dumps(index.to_dict(), ensure_ascii=False).encode("utf-8"),
+                       file_name="indice_benchmarking.json", mime="application/json")
+
+perf.end(_perf_page)
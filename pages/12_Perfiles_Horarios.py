@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import streamlit as st
+import pandas as pd
+
+from core.state import init_state, get_zones_df, get_settings
+from core.profiles import calc_perfiles_horarios, MODULOS, HORARIOS, FORMA_DE_MODULO
+from core.ui import render_warnings
+from core import perf
+
+init_state()
+_perf_page = perf.begin("page.12_Perfiles_Horarios")
+st.title("12) Perfiles horarios anuales (8760 h)")
+st.caption("Reparte las puntas por zona (frío, calor, eléctrica) y los consumos diarios (agua fría, ACS) en las 8760 horas del año "
+           "según el horario de ocupación de cada uso y la zona climática. Útil para contratación de potencia y decisiones de acumulación.")
+
+zones_df = get_zones_df()
+settings = get_settings()
+
+year = int(st.number_input("Año del calendario", min_value=2000, max_value=2100, step=1, value=int(settings.get("perfiles_anio", 2025))))
+settings["perfiles_anio"] = year
+
+res, warnings, totals = calc_perfiles_horarios(zones_df, settings, year=year)
+perfiles = totals["perfiles"]
+
+st.dataframe(
+    res, use_container_width=True, hide_index=True,
+    column_config={
+        "Punta simultánea": st.column_config.NumberColumn("Punta simultánea", format="%.1f"),
+        "Suma de puntas": st.column_config.NumberColumn("Suma de puntas", format="%.1f"),
+        "Energía / volumen anual": st.column_config.NumberColumn("Energía / volumen anual", format="%.0f"),
+        "Horas equivalentes": st.column_config.NumberColumn("Horas equivalentes", format="%.0f"),
+    },
+)
+st.caption(f"Formas distintas (horario × zona climática): {totals['grupos']}. La punta simultánea es la máxima horaria del conjunto; "
+           "la suma de puntas es el valor de las calculadoras por zona.")
+
+modulo = st.selectbox("Módulo", options=list(MODULOS))
+p = perfiles[modulo]
+c1, c2, c3 = st.columns(3)
+c1.metric(f"Punta ({p.unidad})", f"{p.peak:,.1f}".replace(",", " "))
+c2.metric(f"Anual ({p.unidad_anual})", f"{p.annual:,.0f}".replace(",", " "))
+c3.metric("Horas equivalentes", f"{p.equivalent_hours:.0f}")
+
+tab1, tab2, tab3 = st.tabs(["Perfil horario", "Curva monótona", "Mensual"])
+with tab1:
+    st.line_chart(pd.DataFrame({p.unidad: p.hourly}), height=260)
+with tab2:
+    st.line_chart(pd.DataFrame({p.unidad: p.duration_curve()}), height=260)
+    st.caption("Horas del año ordenadas de mayor a menor carga.")
+with tab3:
+    mensual = totals["mensual"]
+    cols = ["Mes", f"{modulo} punta ({p.unidad})", f"{modulo} ({p.unidad_anual})"]
+    st.dataframe(mensual[cols], use_container_width=True, hide_index=True)
+    st.bar_chart(mensual.set_index("Mes")[[cols[1]]], height=220)
+
+with st.expander("Energía anual por zona"):
+    por_zona = pd.DataFrame({
+        "ID": zones_df["ID"].to_numpy() if "ID" in zones_df.columns else range(1, len(zones_df) + 1),
+        "Nombre zona": zones_df["Nombre zona"].to_numpy() if "Nombre zona" in zones_df.columns else "",
+        f"{modulo} ({p.unidad_anual})": p.zone_annual,
+    })
+    st.dataframe(por_zona.sort_values(por_zona.columns[-1], ascending=False).head(500), use_container_width=True, hide_index=True)
+
+with st.expander("Detalle horario por zona"):
+    zp = totals["zonas"]
+    top = int(st.number_input("Zonas (las de mayor valor anual)", min_value=1, max_value=max(1, min(len(zp), 5000)),
+                              step=10, value=min(50, max(1, len(zp)))))
+    st.caption("Una fila por zona y una columna por hora del módulo elegido. Se genera por bloques de zonas, con memoria acotada.")
+    if len(zp) and st.toggle("Preparar CSV del detalle", value=False):
+        etiquetas = (zones_df["Nombre zona"].astype(str).tolist() if "Nombre zona" in zones_df.columns
+                     else [f"Zona {i + 1}" for i in range(len(zp))])
+        st.download_button("Descargar detalle por zona (CSV)", data=zp.to_csv(modulo, etiquetas, top),
+                           file_name=f"perfiles_8760_zonas_{FORMA_DE_MODULO[modulo]}.csv", mime="text/csv")
+
+horario = pd.DataFrame({f"{m} ({q.unidad})": q.hourly for m, q in perfiles.items()})
+horario.insert(0, "Hora", range(1, len(horario) + 1))
+st.download_button("Descargar perfiles horarios (CSV)", data=horario.to_csv(index=False).encode("utf-8"),
+                   file_name="perfiles_8760.csv", mime="text/csv")
+
+with st.expander("Horarios de ocupación por tipo de uso"):
+    st.dataframe(pd.DataFrame({f"{k} ({d})": v[i] for k, v in HORARIOS.items() for i, d in enumerate(("lab.", "f.s."))},
+                               index=[f"{h:02d} h" for h in range(24)]), use_container_width=True)
+    st.caption("Valores orientativos de anteproyecto (fracción de la ocupación máxima). No sustituyen una simulación energética.")
+
+render_warnings(warnings)
+
+perf.end(_perf_page)
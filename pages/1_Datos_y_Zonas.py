@@ -1,41 +1,78 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
 import pandas as pd
-from pathlib import Path
+from typing import Any, Dict
 
-from core.state import init_state, get_zones_df, set_zones_df, get_settings
+from core.state import (
+    init_state, get_zones_df, set_zones_df, get_settings, get_zones_version, get_history, undo_edit, redo_edit, goto_revision,
+    get_live_totals, commit_live_totals,
+)
 from core.catalog import all_usos
 from core.constants import ZONAS_CLIMATICAS, NIVELES_CARGA, EXPOSICION_TODO_AIRE, TABLA_1_ESPACIO_GLOBAL
 from core.sample_data import sample_zones_office
+from core.schema import enforce_zones_schema, enforce_zones_schema_report, constant_category, conforms
+from core.municipios import load_index as load_municipios, resolve_sites, DISTANCIA_MAX_KM
+from core import perf
 
 init_state()
+_perf_page = perf.begin("page.1_Datos_y_Zonas")
 st.title("1) Datos del edificio (uso único) y zonas")
 
-DATA_DIR = Path(__file__).resolve().parents[1] / "data"
 settings = get_settings()
 
 # -----------------------------
-# Ciudad -> zona climática CTE sugerida
+# Historial (deshacer / rehacer)
+# -----------------------------
+history = get_history()
+h1, h2, h3 = st.columns([1, 1, 4])
+h1.button("↶ Deshacer", on_click=undo_edit, disabled=not history.can_undo, use_container_width=True)
+h2.button("↷ Rehacer", on_click=redo_edit, disabled=not history.can_redo, use_container_width=True)
+with h3.expander(f"Historial de cambios (revisión {history.current})"):
+    entries = dict(history.entries())
+    target = st.selectbox("Ir a la revisión", options=list(entries), index=list(entries).index(history.current),
+                          format_func=lambda r: f"{r}: {entries[r]}")
+    st.button("Ir", on_click=goto_revision, args=(target,), disabled=target == history.current)
+    history.max_revisions = int(st.number_input("Revisiones conservadas", min_value=1, max_value=500, step=10, value=int(history.max_revisions)))
+    history.trim()
+    st.caption(f"Memoria de los cambios guardados: {history.nbytes() / 1024:.1f} KB (solo celdas y filas modificadas).")
+
+# -----------------------------
+# Municipio -> zona climática CTE sugerida
 # -----------------------------
 try:
-    cities_df = pd.read_csv(DATA_DIR / "cities_es_cte.csv")
-    city_names = cities_df["city"].astype(str).tolist()
+    municipios = load_municipios()
 except Exception:
-    cities_df = pd.DataFrame(columns=["city", "climate_zone_cte"])
-    city_names = []
-
-with st.expander("Ubicación: ciudad y zona climática (valor único para TODO el edificio)", expanded=True):
-    if city_names:
-        default_city = settings.get("city", city_names[0])
-        if default_city not in city_names:
-            default_city = city_names[0]
-        city = st.selectbox("Ciudad", options=city_names, index=city_names.index(default_city))
-        suggested = str(cities_df.loc[cities_df["city"] == city, "climate_zone_cte"].iloc[0])
+    municipios = None
+
+with st.expander("Ubicación: municipio y zona climática (valor único para TODO el edificio)", expanded=True):
+    if municipios is not None and len(municipios):
+        current = municipios.find(str(settings.get("city", "")))
+        query = st.text_input("Buscar municipio", value="", placeholder="Escribe el inicio del nombre (sin importar acentos)")
+        matches = municipios.search(query) if query.strip() else []
+        if query.strip() and not matches:
+            st.caption("Sin coincidencias.")
+        if current is not None and current not in matches:
+            matches = matches + [current]  # al buscar se propone la primera coincidencia
+        if not matches:
+            matches = [0]
+        mun = st.selectbox("Municipio", options=matches, format_func=municipios.label)
+        city = municipios.label(mun)
+        altitud = st.number_input("Altitud del emplazamiento (m, opcional)", min_value=-100.0, max_value=4000.0, step=10.0,
+                                  value=settings.get("altitud_m"), placeholder=f"{int(municipios.altitud[mun])} (la del municipio)")
+        settings["altitud_m"] = altitud
+        suggested = (municipios.zone(mun) if altitud is None else municipios.zone_at_altitude(mun, altitud)) or ""
+        por_altitud = altitud is not None and municipios.altitude_applies(mun)
+        st.caption(f"Altitud de referencia del municipio: {int(municipios.altitud[mun])} m · zona CTE sugerida: {suggested or 's/d'}"
+                   + (" (corregida por altitud)" if por_altitud else ""))
+        if altitud is not None and not por_altitud:
+            st.info(f"Corrección por altitud inactiva: {municipios.provincias[municipios.provincia[mun]]} tiene un solo tramo en "
+                    "`data/zonas_cte_altitud.csv`, así que la altitud no cambia la zona. Añade los tramos del Apéndice B del CTE "
+                    "para la provincia y recompila con `python -m core.municipios`.")
     else:
         city = st.text_input("Ciudad", value=str(settings.get("city", "")))
         suggested = ""
 
-    st.caption("La ciudad sugiere una zona climática (capital de provincia) basada en el Apéndice B del CTE. Verifica la localidad exacta si aplica.")
+    st.caption("El municipio sugiere una zona climática según el Apéndice B del CTE (provincia y altitud). Verifica la localidad exacta si aplica.")
     default_zone = suggested if suggested in ZONAS_CLIMATICAS else settings.get("zona_climatica_global", ZONAS_CLIMATICAS[0])
     zone_global = st.selectbox(
         "Zona climática (auto / override)",
@@ -46,6 +83,46 @@ with st.expander("Ubicación: ciudad y zona climática (valor único para TODO e
     settings["city"] = city
     settings["zona_climatica_global"] = zone_global
 
+def _use_site(site: Dict[str, Any]) -> None:
+    settings["city"] = site["Municipio"]
+    settings["altitud_m"] = site.get("altitud")
+    settings["zona_climatica_global"] = site["Zona climática"]
+
+if municipios is not None and len(municipios):
+    with st.expander("Cartera geolocalizada: coordenadas → municipio y zona climática"):
+        st.caption("CSV con una fila por emplazamiento y columnas de latitud y longitud (grados decimales); opcionales: Edificio y altitud (m), que corrige la zona según los tramos de altitud de la provincia.")
+        sites_file = st.file_uploader("Emplazamientos (CSV)", type=["csv"], key="sites_csv")
+        max_km = float(st.number_input("Distancia máxima al municipio más cercano (km)", min_value=1.0, step=10.0,
+                                       value=float(settings.get("emplazamientos_max_km", DISTANCIA_MAX_KM))))
+        settings["emplazamientos_max_km"] = max_km
+        if sites_file is not None:
+            try:
+                with perf.span("zonas.resolver_emplazamientos"):
+                    sites = resolve_sites(municipios, pd.read_csv(sites_file), max_km)
+            except Exception as e:
+                st.error(f"No se pudo resolver la lista: {e}")
+            else:
+                lejos = sites["Fuera de alcance"]
+                if lejos.any():
+                    st.warning(f"{int(lejos.sum())} emplazamientos a más de {max_km:.0f} km del municipio más cercano quedan sin zona "
+                               "climática: revisa sus coordenadas o amplía la lista de municipios.")
+                sin_tramos = sites["Altitud emplazamiento (m)"].notna() & ~lejos & ~sites["Corregida por altitud"]
+                if sin_tramos.any():
+                    st.info(f"{int(sin_tramos.sum())} emplazamientos con altitud están en provincias con un solo tramo en "
+                            "`data/zonas_cte_altitud.csv`: la altitud no cambia su zona (se usa la del municipio).")
+                st.dataframe(sites, use_container_width=True, hide_index=True)
+                st.download_button("Descargar CSV resuelto", data=sites.to_csv(index=False).encode("utf-8"),
+                                   file_name="emplazamientos_zona_cte.csv", mime="text/csv")
+                ok = sites["Zona climática"].notna() & sites["Zona climática"].ne("")
+                if ok.any():
+                    tag = "Edificio" if "Edificio" in sites.columns else "Municipio"
+                    pick = st.selectbox("Emplazamiento de este edificio", options=list(sites.index[ok]),
+                                        format_func=lambda i: f"{sites.at[i, tag]} → {sites.at[i, 'Zona climática']}")
+                    alt = sites.at[pick, "Altitud emplazamiento (m)"]
+                    site = {"Municipio": sites.at[pick, "Municipio"], "Zona climática": sites.at[pick, "Zona climática"],
+                            "altitud": float(alt) if pd.notna(alt) else None}
+                    st.button("Usar en este edificio", on_click=_use_site, args=(site,))
+
 # -----------------------------
 # Uso + superficies sobre/bajo rasante
 # -----------------------------
@@ -76,12 +153,14 @@ with st.expander("Definición del edificio (1 uso general + superficies sobre/ba
 st.write("Define las **zonas/áreas** del edificio (detalle opcional).")
 st.caption("La app fuerza: **1 edificio = 1 uso** y **1 zona climática**. Las filas de zona solo sirven para repartir superficie, exposición y nivel de carga.")
 
-zones_df = get_zones_df().copy()
+zones_df = get_zones_df()  # vista copy-on-write: editarla no toca la tabla guardada
+editor_source = "tabla"  # origen de lo que muestra el editor (la tabla guardada u otra sin guardar)
 
 colA, colB, colC = st.columns([1, 1, 2])
 with colA:
     if st.button("Cargar ejemplo (Oficinas – 2 zonas)", use_container_width=True):
         zones_df = sample_zones_office()
+        editor_source = "ejemplo"
 with colB:
     uploaded = st.file_uploader("Importar CSV (zonas)", type=["csv"])
 with colC:
@@ -89,9 +168,14 @@ with colC:
 
 if uploaded is not None:
     try:
-        df_in = pd.read_csv(uploaded)
-        zones_df = df_in
+        df_in = pd.read_csv(uploaded, low_memory=False)
+        zones_df, parse_errors = enforce_zones_schema_report(df_in)
+        editor_source = f"csv-{uploaded.file_id}"
         st.success("CSV importado.")
+        if len(parse_errors):
+            st.warning(f"{len(parse_errors)} celdas numéricas no se han podido interpretar y quedan vacías.")
+            with st.expander("Ver celdas no interpretadas"):
+                st.dataframe(parse_errors.head(500), use_container_width=True, hide_index=True)
     except Exception as e:
         st.error(f"No se pudo leer el CSV: {e}")
 
@@ -103,13 +187,16 @@ required_cols = [
     "Eléctrica override (W/m²)", "Eléctrica comp. override (W/m²)",
     "Categoría global (Tabla 1)",
 ]
-for c in required_cols:
-    if c not in zones_df.columns:
-        zones_df[c] = None
+
+def _enforce_building(df: pd.DataFrame) -> pd.DataFrame:
+    """Esquema tipado (añade columnas faltantes) + uso único y zona climática única."""
+    df = df.copy(deep=False) if conforms(df) else enforce_zones_schema(df)
+    df["Uso"] = constant_category(df, "Uso", settings.get("uso_edificio", "Oficinas"))
+    df["Zona climática"] = constant_category(df, "Zona climática", settings.get("zona_climatica_global", ZONAS_CLIMATICAS[0]))
+    return df
 
 # FORZAR uso único + zona climática única
-zones_df["Uso"] = settings.get("uso_edificio", "Oficinas")
-zones_df["Zona climática"] = settings.get("zona_climatica_global", ZONAS_CLIMATICAS[0])
+zones_df = _enforce_building(zones_df)
 
 st.divider()
 st.subheader("Plantillas rápidas (opcional)")
@@ -124,11 +211,8 @@ if t1.button("Zonas = 2 filas (sobre rasante / bajo rasante)", use_container_wid
          "Nivel carga (B/M/A)": "B", "Exposición (E/S/W, N, Interior)": "Interior", "Densidad (pers/m²)": 0.02,
          "Suministro complementario": False},
     ])
-    for c in required_cols:
-        if c not in zones_df.columns:
-            zones_df[c] = None
-    zones_df["Uso"] = settings.get("uso_edificio", "Oficinas")
-    zones_df["Zona climática"] = settings.get("zona_climatica_global", ZONAS_CLIMATICAS[0])
+    zones_df = _enforce_building(zones_df)
+    editor_source = "plantilla-2"
     st.success("Plantilla aplicada.")
 
 if t2.button("Zonas = 1 fila (edificio completo)", use_container_width=True):
@@ -138,11 +222,8 @@ if t2.button("Zonas = 1 fila (edificio completo)", use_container_width=True):
          "Nivel carga (B/M/A)": "M", "Exposición (E/S/W, N, Interior)": "Interior", "Densidad (pers/m²)": 0.08,
          "Suministro complementario": False},
     ])
-    for c in required_cols:
-        if c not in zones_df.columns:
-            zones_df[c] = None
-    zones_df["Uso"] = settings.get("uso_edificio", "Oficinas")
-    zones_df["Zona climática"] = settings.get("zona_climatica_global", ZONAS_CLIMATICAS[0])
+    zones_df = _enforce_building(zones_df)
+    editor_source = "plantilla-1"
     st.success("Plantilla aplicada.")
 
 st.divider()
@@ -150,8 +231,10 @@ st.subheader("Tabla de zonas")
 
 categorias = list(TABLA_1_ESPACIO_GLOBAL.keys())
 
+editor_key = f"zones_editor_{get_zones_version()}_{editor_source}"
 edited = st.data_editor(
     zones_df[required_cols],
+    key=editor_key,
     use_container_width=True,
     num_rows="dynamic",
     hide_index=True,
@@ -178,15 +261,38 @@ edited = st.data_editor(
     },
 )
 
-# reforzar tras edición
-edited["Uso"] = settings.get("uso_edificio", "Oficinas")
-edited["Zona climática"] = settings.get("zona_climatica_global", ZONAS_CLIMATICAS[0])
+# reforzar tras edición (tipos del esquema + uso/zona del edificio)
+edited = _enforce_building(edited)
+
+# Totales en vivo: solo se recalculan las filas tocadas en el editor
+live = None
+if editor_source == "tabla":
+    live_on = st.toggle("Totales en vivo al editar", value=len(zones_df) <= 20_000,
+                        help="La primera vez calcula todas las zonas; después cada edición solo recalcula las filas modificadas.")
+    if live_on:
+        live = get_live_totals(zones_df)
+        with perf.span("zonas.totales_en_vivo"):
+            live.apply_editor_state(st.session_state.get(editor_key))
+        tot = live.totals(settings)
+        m1, m2, m3, m4, m5 = st.columns(5)
+        m1.metric("Superficie (m²)", f"{tot['reservas']['superficie_total_m2']:.0f}")
+        m2.metric("Frío (kW)", f"{tot['clima']['frio_total_kw']:.1f}")
+        m3.metric("Calor (kW)", f"{tot['clima']['calor_total_kw']:.1f}")
+        m4.metric("Ventilación (m³/h)", f"{tot['vent']['vent_total_m3h']:.0f}")
+        m5.metric("Eléctrica (kW)", f"{tot['ele']['potencia_total_kw']:.1f}")
+        st.caption(f"Incluye cambios sin guardar. Filas recalculadas en la última edición: {live.last_recomputed}.")
+else:
+    st.caption("Los totales en vivo se muestran al editar la tabla guardada (guarda primero la tabla importada o la plantilla).")
 
 col1, col2 = st.columns([1, 1])
 with col1:
     if st.button("Guardar cambios", type="primary", use_container_width=True):
-        set_zones_df(edited)
-        st.success("Zonas guardadas.")
+        if set_zones_df(edited):
+            if live is not None:
+                commit_live_totals()
+            st.success("Zonas guardadas.")
+        else:
+            st.info("Sin cambios respecto a la tabla guardada.")
 with col2:
     csv_bytes = edited.to_csv(index=False).encode("utf-8")
     st.download_button("Descargar CSV", data=csv_bytes, file_name="zonas.csv", mime="text/csv", use_container_width=True)
@@ -195,10 +301,10 @@ st.divider()
 st.subheader("Validaciones rápidas")
 
 errs = []
-if pd.to_numeric(edited["Superficie (m²)"], errors="coerce").fillna(0).le(0).any():
+if edited["Superficie (m²)"].fillna(0).le(0).any():
     errs.append("Hay filas con superficie 0 o no válida.")
 
-total_area = float(pd.to_numeric(edited["Superficie (m²)"], errors="coerce").fillna(0).sum())
+total_area = float(edited["Superficie (m²)"].fillna(0).sum())
 target_total = float(settings.get("gfa_above_m2", 0.0)) + float(settings.get("gfa_below_m2", 0.0))
 if target_total > 0 and abs(total_area - target_total) / max(target_total, 1.0) > 0.05:
     errs.append(f"La suma de zonas ({total_area:.0f} m²) difiere de la superficie total ({target_total:.0f} m²) en más de un 5%.")
@@ -208,3 +314,5 @@ if errs:
         st.warning(e)
 else:
     st.success("OK: tabla coherente para cálculo.")
+
+perf.end(_perf_page)
@@ -3,8 +3,11 @@ import streamlit as st
 from core.state import init_state, get_zones_df, get_settings
 from core.calculations import calc_reservas_espacios
 from core.constants import TABLA_2_ESPACIO_POR_INSTALACION
+from core.space_optimizer import CATEGORIAS, calc_optimo_salas, OPCIONES as OPCIONES_SALAS
+from core import perf
 
 init_state()
+_perf_page = perf.begin("page.2_Reservas_de_Espacio")
 st.title("2) Reservas de espacio")
 
 zones_df = get_zones_df()
@@ -27,7 +30,34 @@ c3.metric("Reserva global máx (m²)", f"{totals['reserva_global_max_m2']:.0f}")
 
 st.dataframe(df, use_container_width=True, hide_index=True)
 
+st.subheader("Combinaciones que caben en la superficie disponible")
+st.caption("Todas las combinaciones de instalaciones de la Tabla 2 que cumplen las reglas (una sola opción de tratamiento de aire "
+           "y de sistema terminal, torres con producción de frío, gasóleo con producción de calor) y las categorías obligatorias. "
+           "Se muestra la frontera de Pareto: menos m² y más instalaciones.")
+opt = {**OPCIONES_SALAS, **(settings.get("optimo_salas", {}) or {})}
+if not opt["superficie_disponible_m2"]:
+    opt["superficie_disponible_m2"] = round(float(totals["reserva_global_min_m2"]))
+o1, o2 = st.columns([1, 2])
+opt["superficie_disponible_m2"] = float(o1.number_input("Superficie disponible para salas (m²)", min_value=0.0, step=10.0,
+                                                        value=float(opt["superficie_disponible_m2"])))
+opt["obligatorias"] = o2.multiselect("Categorías obligatorias", list(CATEGORIAS), default=[c for c in opt["obligatorias"] if c in CATEGORIAS])
+o3, o4 = st.columns(2)
+opt["forzadas"] = o3.multiselect("Incluir siempre", inst_opts, default=[c for c in opt["forzadas"] if c in inst_opts])
+opt["descartadas"] = o4.multiselect("Descartar", inst_opts, default=[c for c in opt["descartadas"] if c in inst_opts])
+settings["optimo_salas"] = opt
+
+pareto, avisos_opt, tot_opt = calc_optimo_salas(totals, settings)
+warnings = list(warnings) + avisos_opt
+p1, p2, p3 = st.columns(3)
+p1.metric("Combinaciones válidas", f"{tot_opt['n_validas']} / {tot_opt['n_combinaciones']}")
+p2.metric("Caben (con el mínimo)", f"{tot_opt['n_caben']}")
+p3.metric("Frontera de Pareto", f"{tot_opt['n_pareto']}")
+st.dataframe(pareto, use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.0f") for c in ("m² mín", "m² máx", "Holgura (m²)")})
+
 if warnings:
     st.subheader("Avisos")
     for w in warnings:
         st.warning(f"[{w.module}] {w.zone}: {w.message}")
+
+perf.end(_perf_page)
@@ -2,9 +2,15 @@
 import streamlit as st
 
 from core.state import init_state, get_zones_df, get_settings
-from core.calculations import calc_climatizacion
+from core.calculations import calc_climatizacion, calc_ventilacion_y_todo_aire
+from core.equipment import CRITERIOS, PRODUCCION, calc_equipos, OPCIONES as OPCIONES_EQUIPOS
+from core.ui import render_breakdown, simultaneidad_toggle
+from core.hydronics import calc_hidraulica, OPCIONES as OPCIONES_HIDRAULICA
+from core.pipes import TUBERIAS, NIVELES_POSIBLES
+from core import perf
 
 init_state()
+_perf_page = perf.begin("page.3_Climatizacion")
 st.title("3) Climatización (Frío y Calor)")
 
 zones_df = get_zones_df()
@@ -19,6 +25,8 @@ with col1:
 with col2:
     settings["oversize_calor"] = st.number_input("Factor sobredimensionado generador calor", min_value=0.8, max_value=1.8, value=float(settings.get("oversize_calor", 1.1)), step=0.05)
 
+simultaneidad_toggle(settings)
+
 df, warnings, totals = calc_climatizacion(zones_df, settings)
 
 c1, c2, c3, c4 = st.columns(4)
@@ -26,8 +34,92 @@ c1.metric("Frío total (kW)", f"{totals['frio_total_kw']:.1f}")
 c2.metric("Gen. frío (kW)", f"{totals['frio_generador_kw']:.1f}")
 c3.metric("Calor total (kW)", f"{totals['calor_total_kw']:.1f}")
 c4.metric("Gen. calor (kW)", f"{totals['calor_generador_kw']:.1f}")
+if "fs_frio" in totals:
+    s1, s2, s3, s4 = st.columns(4)
+    s1.metric("Frío coincidente (kW)", f"{totals['frio_coincidente_kw']:.1f}")
+    s2.metric("Simultaneidad frío", f"{totals['fs_frio']:.2f}")
+    s3.metric("Calor coincidente (kW)", f"{totals['calor_coincidente_kw']:.1f}")
+    s4.metric("Simultaneidad calor", f"{totals['fs_calor']:.2f}")
+    st.caption(f"Generadores dimensionados con la punta coincidente. Punta de frío: {totals['frio_punta_momento'] or '-'}; "
+               f"de calor: {totals['calor_punta_momento'] or '-'} (semana tipo de cada mes).")
 
 st.dataframe(df, use_container_width=True, hide_index=True)
+render_breakdown(totals.get("cubo"), key="clima")
+
+st.divider()
+st.subheader("Distribución hidráulica (agua fría y caliente)")
+st.caption("Caudal Q = P / (ρ·cp·ΔT) por zona y agrupación, diámetro comercial mínimo con velocidad y pérdida de carga "
+           "unitaria máximas, y caudal y altura orientativos de las bombas.")
+hid = {**OPCIONES_HIDRAULICA, **(settings.get("hidraulica", {}) or {})}
+with st.expander("Parámetros de la red"):
+    h1, h2, h3, h4 = st.columns(4)
+    hid["frio_t_impulsion"] = float(h1.number_input("Impulsión frío (°C)", min_value=0.0, max_value=20.0, step=0.5, value=float(hid["frio_t_impulsion"])))
+    hid["frio_dt"] = float(h2.number_input("ΔT frío (K)", min_value=1.0, max_value=15.0, step=0.5, value=float(hid["frio_dt"])))
+    hid["calor_t_impulsion"] = float(h3.number_input("Impulsión calor (°C)", min_value=25.0, max_value=90.0, step=1.0, value=float(hid["calor_t_impulsion"])))
+    hid["calor_dt"] = float(h4.number_input("ΔT calor (K)", min_value=1.0, max_value=30.0, step=0.5, value=float(hid["calor_dt"])))
+    h5, h6, h7 = st.columns(3)
+    materiales = list(TUBERIAS)
+    hid["material"] = h5.selectbox("Tubería", materiales, index=materiales.index(hid["material"]) if hid["material"] in materiales else 0)
+    hid["v_max"] = float(h6.number_input("Velocidad máx. (m/s)", min_value=0.3, max_value=4.0, step=0.1, value=float(hid["v_max"])))
+    hid["r_max_pa_m"] = float(h7.number_input("Pérdida unitaria máx. (Pa/m)", min_value=50.0, max_value=1000.0, step=10.0, value=float(hid["r_max_pa_m"])))
+    disponibles = [c for c in NIVELES_POSIBLES if c in zones_df.columns]
+    hid["niveles"] = st.multiselect("Agrupaciones (de la central hacia las zonas)", disponibles,
+                                    default=[c for c in hid["niveles"] if c in disponibles],
+                                    help="Columnas de la tabla de zonas que definen los ramales (edificio, montante, planta...).")
+    h8, h9, h10 = st.columns(3)
+    hid["longitud_central_m"] = float(h8.number_input("Longitud tramo central (m)", min_value=0.0, step=5.0, value=float(hid["longitud_central_m"])))
+    hid["longitud_nivel_m"] = float(h9.number_input("Longitud por agrupación (m)", min_value=0.0, step=5.0, value=float(hid["longitud_nivel_m"])))
+    hid["longitud_terminal_m"] = float(h10.number_input("Longitud ramal de zona (m)", min_value=0.0, step=5.0, value=float(hid["longitud_terminal_m"])))
+    h11, h12, h13, h14 = st.columns(4)
+    hid["singulares"] = float(h11.number_input("Singulares (fracción)", min_value=0.0, max_value=2.0, step=0.05, value=float(hid["singulares"])))
+    hid["dp_terminal_kpa"] = float(h12.number_input("Δp terminal (kPa)", min_value=0.0, step=5.0, value=float(hid["dp_terminal_kpa"])))
+    hid["dp_generador_kpa"] = float(h13.number_input("Δp generador (kPa)", min_value=0.0, step=5.0, value=float(hid["dp_generador_kpa"])))
+    hid["rendimiento_bomba"] = float(h14.number_input("Rendimiento bomba", min_value=0.2, max_value=0.95, step=0.05, value=float(hid["rendimiento_bomba"])))
+settings["hidraulica"] = hid
+
+tramos, avisos_hid, tot_hid = calc_hidraulica(df, zones_df, settings, totals)
+warnings = list(warnings) + avisos_hid
+b1, b2, b3 = st.columns(3)
+b1.metric("Caudal frío (m³/h)", f"{tot_hid['caudal_frio_m3h']:.1f}")
+b2.metric("Caudal calor (m³/h)", f"{tot_hid['caudal_calor_m3h']:.1f}")
+b3.metric("Bombeo estimado (kW)", f"{tot_hid['bombas']['Potencia eléctrica (kW)'].sum():.1f}")
+st.dataframe(tot_hid["bombas"], use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.1f") for c in ("Caudal (m³/h)", "Altura (kPa)", "Altura (m.c.a.)")})
+ver_zonas = st.toggle("Incluir ramales de zona", value=len(tramos) <= 2000)
+shown = tramos if ver_zonas else tramos[tramos["Nivel"] != "Zona"]
+st.dataframe(shown.head(5000), use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.2f") for c in ("Caudal (L/s)", "v (m/s)", "Δp tramo (kPa)", "Δp acumulada (kPa)")})
+st.download_button("Descargar tramos (CSV)", data=tramos.to_csv(index=False).encode("utf-8"),
+                   file_name="hidraulica_tramos.csv", mime="text/csv")
+
+st.divider()
+st.subheader("Selección de equipos")
+st.caption("Mejor combinación de enfriadoras/calderas (o bombas de calor) y climatizadores del catálogo (`data/equipos.csv`) "
+           "para la potencia de generador y el caudal de aire de cada edificio.")
+eq = {**OPCIONES_EQUIPOS, **(settings.get("equipos", {}) or {})}
+with st.expander("Parámetros de selección"):
+    q1, q2, q3 = st.columns(3)
+    prods = list(PRODUCCION)
+    eq["produccion"] = q1.selectbox("Producción", prods, index=prods.index(eq["produccion"]) if eq["produccion"] in prods else 0)
+    crits = list(CRITERIOS)
+    eq["criterio"] = q2.selectbox("Criterio", crits, index=crits.index(eq["criterio"]) if eq["criterio"] in crits else 0)
+    eq["max_unidades"] = int(q3.number_input("Máx. unidades por servicio", min_value=1, max_value=6, step=1, value=int(eq["max_unidades"])))
+    q4, q5, q6 = st.columns(3)
+    eq["n_mas_1"] = q4.checkbox("Redundancia N+1", value=bool(eq["n_mas_1"]))
+    eq["mezclar_modelos"] = q5.checkbox("Mezclar modelos", value=bool(eq["mezclar_modelos"]),
+                                        help="Si no, solo combinaciones de unidades iguales.")
+    eq["climatizadores"] = q6.checkbox("Incluir climatizadores", value=bool(eq["climatizadores"]))
+settings["equipos"] = eq
+
+df_vent, _, _ = calc_ventilacion_y_todo_aire(zones_df, settings)
+sel_eq, avisos_eq, tot_eq = calc_equipos(df, totals, df_vent, zones_df, settings)
+warnings = list(warnings) + avisos_eq
+g1, g2, g3 = st.columns(3)
+g1.metric("Potencia eléctrica equipos (kW)", f"{tot_eq['potencia_electrica_kw']:.1f}")
+g2.metric("Huella equipos (m²)", f"{tot_eq['huella_m2']:.1f}")
+g3.metric("Peso equipos (t)", f"{tot_eq['peso_kg'] / 1000.0:.1f}")
+st.dataframe(sel_eq.head(5000), use_container_width=True, hide_index=True,
+             column_config={"Margen (%)": st.column_config.NumberColumn("Margen (%)", format="%.0f")})
 
 if warnings:
     st.subheader("Avisos")
@@ -35,3 +127,5 @@ if warnings:
         st.warning(f"[{w.module}] {w.zone}: {w.message}")
 
 st.info("Si un uso no existe en la Tabla correspondiente, usa los campos **override** en 'Datos y zonas'.")
+
+perf.end(_perf_page)
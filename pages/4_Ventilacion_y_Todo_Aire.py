@@ -3,9 +3,15 @@ import streamlit as st
 
 from core.state import init_state, get_zones_df, get_settings
 from core.calculations import calc_ventilacion_y_todo_aire
-from core.constants import TABLA_9_TODO_AIRE_LS_M2
+from core.constants import TABLA_2_ESPACIO_POR_INSTALACION, TABLA_9_TODO_AIRE_LS_M2
+from core.ducts import FORMAS, MATERIALES_CONDUCTO, METODOS, calc_conductos, OPCIONES as OPCIONES_CONDUCTOS
+from core.pipes import NIVELES_POSIBLES
+from core.ahu_grouping import CRITERIOS_AGRUPACION, calc_agrupacion_uta, OPCIONES as OPCIONES_UTA
+from core.ui import render_breakdown, render_warnings
+from core import perf
 
 init_state()
+_perf_page = perf.begin("page.4_Ventilacion_y_Todo_Aire")
 st.title("4) Ventilación y sistema todo-aire")
 
 zones_df = get_zones_df()
@@ -151,16 +157,89 @@ if (totals.get('vent_garaje_extraccion_lps', 0) > 0) or (totals.get('vent_garaje
     st.info("La aportación/extracción del parking (bajo rasante) se reporta por separado y no se suma a la ventilación de sobre rasante.")
 
 st.dataframe(df, use_container_width=True, hide_index=True)
-
-if warnings:
-    st.subheader("Avisos")
-    # agrupar avisos idénticos para no repetir
-    seen = set()
-    for w in warnings:
-        key = (w.module, w.message)
-        if key in seen:
-            continue
-        seen.add(key)
-        st.warning(f"[{w.module}] {w.zone}: {w.message}")
+render_breakdown(totals.get("cubo"), key="vent")
+
+st.subheader("Conductos, patinillos y plenum")
+st.caption("Medida normalizada mínima de cada tramo (impulsión = todo-aire o, si no aplica, ventilación; retorno = impulsión × factor) "
+           "y del garaje, sección de patinillo por montante y contraste con la reserva de la Tabla 2.")
+cond = {**OPCIONES_CONDUCTOS, **(settings.get("conductos", {}) or {})}
+with st.expander("Parámetros de conductos"):
+    d1, d2, d3 = st.columns(3)
+    cond["forma"] = d1.selectbox("Forma", FORMAS, index=FORMAS.index(cond["forma"]) if cond["forma"] in FORMAS else 0)
+    mats = list(MATERIALES_CONDUCTO)
+    cond["material"] = d2.selectbox("Material", mats, index=mats.index(cond["material"]) if cond["material"] in mats else 0)
+    cond["metodo"] = d3.selectbox("Criterio", METODOS, index=METODOS.index(cond["metodo"]) if cond["metodo"] in METODOS else 0,
+                                  help="Velocidad máxima por nivel, o pérdida de carga constante con la velocidad principal como tope.")
+    d4, d5, d6, d7, d8 = st.columns(5)
+    cond["v_central"] = float(d4.number_input("v principal (m/s)", min_value=1.0, max_value=20.0, step=0.5, value=float(cond["v_central"])))
+    cond["v_nivel"] = float(d5.number_input("v montantes/planta (m/s)", min_value=1.0, max_value=20.0, step=0.5, value=float(cond["v_nivel"])))
+    cond["v_terminal"] = float(d6.number_input("v ramal de zona (m/s)", min_value=1.0, max_value=20.0, step=0.5, value=float(cond["v_terminal"])))
+    cond["v_garaje"] = float(d7.number_input("v garaje (m/s)", min_value=1.0, max_value=20.0, step=0.5, value=float(cond["v_garaje"])))
+    cond["r_max_pa_m"] = float(d8.number_input("Pérdida constante (Pa/m)", min_value=0.2, max_value=10.0, step=0.1, value=float(cond["r_max_pa_m"])))
+    disponibles = [c for c in NIVELES_POSIBLES if c in zones_df.columns]
+    cond["niveles"] = st.multiselect("Agrupaciones (de la central hacia las zonas)", disponibles,
+                                     default=[c for c in cond["niveles"] if c in disponibles],
+                                     help="Los tramos del nivel 'Montante' (o del primer nivel) suben por patinillo; los inferiores van por el plenum.")
+    d9, d10, d11, d12 = st.columns(4)
+    cond["altura_plenum_mm"] = float(d9.number_input("Altura libre de plenum (mm)", min_value=150.0, step=50.0, value=float(cond["altura_plenum_mm"])))
+    cond["relacion_aspecto"] = float(d10.number_input("Relación de aspecto máx.", min_value=1.0, max_value=8.0, step=0.5, value=float(cond["relacion_aspecto"])))
+    cond["aislamiento_mm"] = float(d11.number_input("Aislamiento (mm)", min_value=0.0, step=5.0, value=float(cond["aislamiento_mm"])))
+    cond["holgura_mm"] = float(d12.number_input("Holgura en patinillo (mm/lado)", min_value=0.0, step=10.0, value=float(cond["holgura_mm"])))
+    d13, d14, d15 = st.columns(3)
+    cond["factor_retorno"] = float(d13.number_input("Retorno / impulsión", min_value=0.0, max_value=1.5, step=0.05, value=float(cond["factor_retorno"])))
+    cond["plantas_por_montante"] = int(d14.number_input("Plantas por montante (sin columna 'Planta')", min_value=1, step=1, value=int(cond["plantas_por_montante"])))
+    inst_aire = [k for k in TABLA_2_ESPACIO_POR_INSTALACION if k.startswith("Tratamiento aire")]
+    cond["instalacion_tabla2"] = d15.selectbox("Reserva Tabla 2", inst_aire,
+                                               index=inst_aire.index(cond["instalacion_tabla2"]) if cond["instalacion_tabla2"] in inst_aire else 0)
+settings["conductos"] = cond
+
+tramos_c, avisos_c, tot_c = calc_conductos(df, zones_df, settings, totals)
+warnings = list(warnings) + avisos_c
+e1, e2, e3, e4 = st.columns(4)
+e1.metric("Patinillos (m²)", f"{tot_c['patinillos_m2']:.1f}")
+e2.metric("Reserva Tabla 2 (m²)", f"{tot_c['reserva_tabla2_min_m2']:.0f}–{tot_c['reserva_tabla2_max_m2']:.0f}")
+e3.metric("Patinillos / reserva mín.", "-" if tot_c["fraccion_reserva_min"] is None else f"{100 * tot_c['fraccion_reserva_min']:.0f} %")
+e4.metric("Plenum necesario (mm)", f"{tot_c['plenum_necesario_mm']:.0f}")
+st.dataframe(tot_c["patinillos"], use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.2f") for c in ("Sección por planta (m²)", "Superficie ocupada (m²)")})
+ver_ramales = st.toggle("Incluir ramales de zona", value=len(tramos_c) <= 2000, key="conductos_ramales")
+shown = tramos_c if ver_ramales else tramos_c[tramos_c["Nivel"] != "Zona"]
+st.dataframe(shown.head(5000), use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.2f") for c in ("Caudal (L/s)", "v (m/s)", "R (Pa/m)", "Sección exterior (m²)")})
+st.download_button("Descargar tramos (CSV)", data=tramos_c.to_csv(index=False).encode("utf-8"),
+                   file_name="conductos_tramos.csv", mime="text/csv")
+
+st.subheader("Agrupación de zonas en climatizadores")
+st.caption("Reparte las zonas en UTA con un caudal máximo por unidad, agrupando por los criterios elegidos y por planta y orden "
+           "de la tabla (zonas contiguas). Por UTA: caudal, zonas, equipo del catálogo y reserva de la Tabla 2.")
+uta = {**OPCIONES_UTA, **(settings.get("agrupacion_uta", {}) or {})}
+with st.expander("Parámetros de agrupación"):
+    u1, u2, u3 = st.columns(3)
+    uta["caudal_max_m3h"] = float(u1.number_input("Caudal máx. por UTA (m³/h)", min_value=1000.0, step=1000.0, value=float(uta["caudal_max_m3h"])))
+    uta["fraccion_minima"] = float(u2.number_input("Fracción mínima antes de fundir", min_value=0.0, max_value=0.9, step=0.05, value=float(uta["fraccion_minima"])))
+    uta["fusionar"] = u3.checkbox("Fundir UTA pequeñas", value=bool(uta["fusionar"]),
+                                  help="Une las UTA por debajo de la fracción mínima con otra que comparta todos los criterios menos el último.")
+    crits_uta = list(CRITERIOS_AGRUPACION)
+    uta["agrupar_por"] = st.multiselect("Agrupar por (de más a menos importante)", crits_uta,
+                                        default=[c for c in uta["agrupar_por"] if c in crits_uta])
+    inst_uta = [k for k in TABLA_2_ESPACIO_POR_INSTALACION if k.startswith("Tratamiento aire")]
+    uta["instalacion_tabla2"] = st.selectbox("Reserva Tabla 2 por UTA", inst_uta, key="uta_tabla2",
+                                             index=inst_uta.index(uta["instalacion_tabla2"]) if uta["instalacion_tabla2"] in inst_uta else 0)
+settings["agrupacion_uta"] = uta
+
+utas, avisos_uta, tot_uta = calc_agrupacion_uta(df, zones_df, settings)
+warnings = list(warnings) + avisos_uta
+f1, f2, f3 = st.columns(3)
+f1.metric("Nº de UTA", f"{tot_uta['n_uta']}")
+f2.metric("Carga media (%)", f"{tot_uta['carga_media_pct']:.0f}")
+f3.metric("Reserva Tabla 2 (m²)", f"{tot_uta['reserva_tabla2_min_m2']:.0f}–{tot_uta['reserva_tabla2_max_m2']:.0f}")
+st.dataframe(utas.head(5000), use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.0f") for c in ("Caudal (L/s)", "Caudal (m³/h)", "Carga (%)")})
+st.download_button("Descargar asignación de zonas (CSV)", data=tot_uta["asignacion"].to_csv(index=False).encode("utf-8"),
+                   file_name="uta_asignacion.csv", mime="text/csv")
+
+render_warnings(warnings)
 
 st.info("Para zonas sin dato en Tabla 10, usa **Ventilación override** en 'Datos y zonas'.")
+
+perf.end(_perf_page)
@@ -4,8 +4,13 @@ import pandas as pd
 
 from core.state import init_state, get_zones_df, get_settings
 from core.calculations import calc_electricidad
+from core.ui import render_breakdown, simultaneidad_toggle
+from core.load_tree import LoadTree, seed_from_zones, panel_factors, apply_factors
+from core.cables import size_tree, OPCIONES, METODOS, MATERIALES, AISLAMIENTOS
+from core import perf
 
 init_state()
+_perf_page = perf.begin("page.5_Electricidad")
 st.title("5) Electricidad")
 
 zones_df = get_zones_df()
@@ -14,6 +19,8 @@ settings = get_settings()
 st.write("Potencia eléctrica específica (suministro normal): Tabla 11. Suministro complementario: Tabla 12.")
 st.caption("Criterio del documento: <400 kW -> acometida BT; >400 kW -> considerar MT.")
 
+simultaneidad_toggle(settings)
+
 df, warnings, totals = calc_electricidad(zones_df, settings)
 
 c1, c2, c3, c4 = st.columns(4)
@@ -21,8 +28,117 @@ c1.metric("Normal (kW)", f"{totals['potencia_normal_kw']:.1f}")
 c2.metric("Complementario (kW)", f"{totals['potencia_comp_kw']:.1f}")
 c3.metric("Total (kW)", f"{totals['potencia_total_kw']:.1f}")
 c4.metric("Acometida sugerida", totals["acometida_sugerida"])
+if "fs_electrica" in totals:
+    s1, s2, s3 = st.columns(3)
+    s1.metric("Normal coincidente (kW)", f"{totals['potencia_normal_coincidente_kw']:.1f}")
+    s2.metric("Simultaneidad", f"{totals['fs_electrica']:.2f}")
+    s3.metric("Total coincidente (kW)", f"{totals['potencia_total_coincidente_kw']:.1f}")
+    st.caption(f"La acometida se decide con la potencia normal coincidente (punta: {totals['electrica_punta_momento'] or '-'}).")
 
 st.dataframe(df, use_container_width=True, hide_index=True)
+render_breakdown(totals.get("cubo"), key="ele")
+
+st.divider()
+st.subheader("Cuadro de cargas (CGBT → cuadros → circuitos)")
+st.caption("Árbol inicial con un circuito por zona (Tabla 11), el suministro complementario (Tabla 12) y los motores definidos. "
+           "Ajusta ks (simultaneidad del cuadro) y ku (utilización de sus circuitos), o importa tu propio árbol en CSV.")
+tree_file = st.file_uploader("Importar cuadro de cargas (CSV)", type=["csv"], key="cuadro_csv")
+nodes = None
+if tree_file is not None:
+    try:
+        nodes = pd.read_csv(tree_file, dtype={"Nodo": str, "Padre": str})
+    except Exception as e:
+        st.error(f"No se pudo leer el CSV: {e}")
+if nodes is None:
+    nodes = seed_from_zones(df, settings, zones_df)
+
+factores = dict(settings.get("cuadro_factores", {}) or {})
+if "fs_electrica" in totals and "CGBT" not in factores and tree_file is None:
+    factores["CGBT"] = {"ks": round(float(totals["fs_electrica"]), 3)}  # propuesta: simultaneidad por horarios
+# valores de la tabla (los del CSV importado) salvo los que se hayan editado aquí
+base = panel_factors(nodes)
+cuadros = base.copy()
+cuadros["ks"] = [factores.get(n, {}).get("ks", v) for n, v in zip(cuadros["Nodo"], base["ks"])]
+cuadros["ku circuitos"] = [factores.get(n, {}).get("ku", v) for n, v in zip(cuadros["Nodo"], base["ku circuitos"])]
+edited_f = st.data_editor(
+    cuadros, key="cuadro_factores_editor", hide_index=True, use_container_width=True,
+    disabled=["Nodo", "Nombre", "Tipo"],
+    column_config={
+        "ks": st.column_config.NumberColumn("ks", min_value=0.0, max_value=1.0, step=0.05, format="%.2f"),
+        "ku circuitos": st.column_config.NumberColumn("ku circuitos", min_value=0.0, max_value=1.0, step=0.05, format="%.2f",
+                                                      help="Vacío: los circuitos conservan su propio ku."),
+    },
+)
+
+def _editado(v, v0) -> bool:
+    return v == v and not (v0 == v0 and abs(float(v) - float(v0)) < 1e-9)
+
+settings["cuadro_factores"] = {}
+for r, b in zip(edited_f.to_dict("records"), base.to_dict("records")):
+    f = {k: float(r[c]) for k, c in (("ks", "ks"), ("ku", "ku circuitos")) if _editado(r[c], b[c])}
+    if f:
+        settings["cuadro_factores"][r["Nodo"]] = f
+
+try:
+    tree = LoadTree.from_frame(apply_factors(nodes, settings["cuadro_factores"]))
+except ValueError as e:
+    st.error(str(e))
+    tree = None
+with st.expander("Líneas: material, instalación y límites de caída de tensión"):
+    opc = {**OPCIONES, **(settings.get("cables", {}) or {})}
+    l1, l2, l3 = st.columns(3)
+    opc["material"] = l1.selectbox("Material", MATERIALES, index=MATERIALES.index(opc["material"]))
+    opc["aislamiento"] = l2.selectbox("Aislamiento", AISLAMIENTOS, index=AISLAMIENTOS.index(opc["aislamiento"]))
+    opc["metodo"] = l3.selectbox("Método de instalación", list(METODOS), index=list(METODOS).index(opc["metodo"]),
+                                 format_func=lambda k: f"{k} - {METODOS[k]}")
+    l4, l5 = st.columns(2)
+    opc["longitud_alimentacion_m"] = float(l4.number_input("Longitud alimentación a cuadros (m)", min_value=0.0, step=5.0, value=float(opc["longitud_alimentacion_m"])))
+    opc["longitud_circuito_m"] = float(l5.number_input("Longitud circuitos (m)", min_value=0.0, step=5.0, value=float(opc["longitud_circuito_m"])))
+    l6, l7, l8 = st.columns(3)
+    opc["dv_alimentacion_pct"] = float(l6.number_input("ΔV máx alimentación (%)", min_value=0.1, step=0.5, value=float(opc["dv_alimentacion_pct"])))
+    opc["dv_circuito_pct"] = float(l7.number_input("ΔV máx circuito (%)", min_value=0.1, step=0.5, value=float(opc["dv_circuito_pct"])))
+    opc["dv_total_pct"] = float(l8.number_input("ΔV máx acumulada (%)", min_value=0.1, step=0.5, value=float(opc["dv_total_pct"])))
+    settings["cables"] = opc
+    st.caption("Columnas opcionales del CSV por nodo: Longitud (m), Material, Aislamiento, Método, ΔV máx (%), Factor corrección. "
+               "Intensidades admisibles orientativas (UNE-HD 60364-5-52); In = calibre normalizado ≥ Ib.")
+
+if tree is not None and len(tree):
+    report = tree.report()
+    try:
+        lineas = size_tree(tree, nodes, settings["cables"])
+    except ValueError as e:
+        st.error(str(e))
+        lineas = None
+    if lineas is not None:
+        by_node = lineas.set_index("Circuito")
+        for col in ("In (A)", "Sección (mm²)", "Conductores en paralelo", "Iz (A)", "ΔV (%)", "ΔV acumulada (%)", "ΔV arranque (%)", "Criterio", "Cumple"):
+            report[col] = by_node[col].reindex(report["Nodo"]).to_numpy()
+    raiz = report.iloc[0]
+    t1, t2, t3, t4 = st.columns(4)
+    t1.metric(f"{raiz['Nodo']} instalada (kW)", f"{raiz['P instalada (kW)']:.1f}")
+    t2.metric(f"{raiz['Nodo']} demandada (kW)", f"{raiz['P demandada (kW)']:.1f}")
+    t3.metric("Ib (A)", f"{raiz['Ib (A)']:.0f}")
+    t4.metric("I arranque máx. (A)", f"{raiz['I arranque máx. (A)']:.0f}")
+    if lineas is not None:
+        acumulada = lineas["ΔV acumulada (%)"] > float(settings["cables"]["dv_total_pct"]) + 1e-9
+        tramo = ~lineas["Cumple"] & ~acumulada
+        st.caption(f"Sección de la derivación del {raiz['Nodo']}: {int(raiz['Conductores en paralelo'])} × {raiz['Sección (mm²)']:g} mm² "
+                   f"· ΔV acumulada máx.: {lineas['ΔV acumulada (%)'].max():.2f} %")
+        if acumulada.any():
+            st.warning(f"{int(acumulada.sum())} líneas superan la caída de tensión acumulada máxima ({settings['cables']['dv_total_pct']:.1f} %). "
+                       "Reduce longitudes o los límites por tramo.")
+        if tramo.any():
+            st.warning(f"{int(tramo.sum())} líneas no cumplen en su propio tramo (Ib ≤ In ≤ Iz o caída de tensión del tramo): "
+                       "revisa la columna 'Cumple'.")
+    solo_cuadros = st.toggle("Mostrar solo cuadros", value=len(report) > 2000)
+    shown = report[report["Nodo"].isin(cuadros["Nodo"])] if solo_cuadros else report
+    st.dataframe(shown, use_container_width=True, hide_index=True,
+                 column_config={c: st.column_config.NumberColumn(c, format="%.2f") for c in ("ku", "ks", "cosφ", "ΔV (%)", "ΔV acumulada (%)")})
+    d1, d2 = st.columns(2)
+    d1.download_button("Descargar árbol (CSV, editable)", data=tree.to_frame().to_csv(index=False).encode("utf-8"),
+                       file_name="cuadro_cargas.csv", mime="text/csv", use_container_width=True)
+    d2.download_button("Descargar resultados (CSV)", data=report.to_csv(index=False).encode("utf-8"),
+                       file_name="cuadro_cargas_resultados.csv", mime="text/csv", use_container_width=True)
 
 if warnings:
     st.subheader("Avisos")
@@ -30,3 +146,5 @@ if warnings:
         st.warning(f"[{w.module}] {w.zone}: {w.message}")
 
 # Motors/inrush module removed per requirements.
+
+perf.end(_perf_page)
@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
+import pandas as pd
 
 from core.state import init_state, get_zones_df, get_settings
 from core.calculations import calc_agua_y_acs
 from core.constants import TABLA_13_AGUA_FRIA_L_DIA, TABLA_14_ACS
+from core.ui import render_breakdown, render_warnings
+from core.plumbing import calc_fontaneria, OPCIONES as OPCIONES_FONTANERIA, SIMULTANEIDAD, DOTACION, APARATOS, tipo_edificio_por_uso
+from core.pipes import TUBERIAS, NIVELES_POSIBLES
+from core.acs_storage import calc_acumulacion_acs, OPCIONES as OPCIONES_ACUMULACION
+from core import perf
 
 init_state()
+_perf_page = perf.begin("page.6_Agua_y_ACS")
 st.title("6) Fontanería: Agua potable y ACS")
 
 zones_df = get_zones_df()
@@ -85,15 +92,103 @@ c2.metric("ACS total (m³/día)", f"{totals['acs_total_m3_dia']:.1f}")
 c3.metric("Potencia ACS (kW)", f"{totals['acs_potencia_total_kw']:.1f}")
 
 st.dataframe(df, use_container_width=True, hide_index=True)
-
-if warnings:
-    st.subheader("Avisos")
-    seen = set()
-    for w in warnings:
-        key = (w.module, w.message)
-        if key in seen:
-            continue
-        seen.add(key)
-        st.warning(f"[{w.module}] {w.zone}: {w.message}")
+render_breakdown(totals.get("cubo"), key="agua")
+
+st.divider()
+st.subheader("Red de abastecimiento (agua fría y ACS)")
+st.caption("Aparatos por zona (columnas de la tabla de zonas con el nombre del aparato o dotación por unidad de ocupación), "
+           "caudal instantáneo con coeficientes de simultaneidad (UNE 149201), diámetros, acometida y grupo de presión.")
+fon = {**OPCIONES_FONTANERIA, **(settings.get("fontaneria", {}) or {})}
+with st.expander("Parámetros de la red"):
+    tipos = list(SIMULTANEIDAD)
+    tipo_def = fon["tipo_edificio"] or tipo_edificio_por_uso(uso_global)
+    tipo_sel = st.selectbox("Tipo de edificio (simultaneidad)", tipos, index=tipos.index(tipo_def))
+    fon["tipo_edificio"] = None if tipo_sel == tipo_edificio_por_uso(uso_global) else tipo_sel
+    f1, f2, f3, f4 = st.columns(4)
+    materiales = list(TUBERIAS)
+    fon["material"] = f1.selectbox("Tubería interior", materiales, index=materiales.index(fon["material"]))
+    fon["material_acometida"] = f2.selectbox("Tubería acometida", materiales, index=materiales.index(fon["material_acometida"]))
+    fon["v_max"] = float(f3.number_input("Velocidad máx. (m/s)", min_value=0.5, max_value=3.5, step=0.1, value=float(fon["v_max"])))
+    fon["r_max_pa_m"] = float(f4.number_input("Pérdida unitaria máx. (Pa/m)", min_value=50.0, max_value=2000.0, step=50.0, value=float(fon["r_max_pa_m"])))
+    disponibles = [c for c in NIVELES_POSIBLES if c in zones_df.columns]
+    fon["niveles"] = st.multiselect("Agrupaciones (montantes, edificios...)", disponibles, default=[c for c in fon["niveles"] if c in disponibles])
+    f5, f6, f7, f8 = st.columns(4)
+    fon["longitud_acometida_m"] = float(f5.number_input("Longitud acometida (m)", min_value=0.0, step=5.0, value=float(fon["longitud_acometida_m"])))
+    fon["longitud_central_m"] = float(f6.number_input("Longitud tramo central (m)", min_value=0.0, step=5.0, value=float(fon["longitud_central_m"])))
+    fon["longitud_nivel_m"] = float(f7.number_input("Longitud por agrupación (m)", min_value=0.0, step=5.0, value=float(fon["longitud_nivel_m"])))
+    fon["longitud_terminal_m"] = float(f8.number_input("Longitud ramal de zona (m)", min_value=0.0, step=5.0, value=float(fon["longitud_terminal_m"])))
+    f9, f10, f11, f12 = st.columns(4)
+    fon["altura_geometrica_m"] = float(f9.number_input("Altura geométrica (m)", min_value=0.0, step=3.0, value=float(fon["altura_geometrica_m"])))
+    fon["presion_residual_kpa"] = float(f10.number_input("Presión residual (kPa)", min_value=0.0, step=10.0, value=float(fon["presion_residual_kpa"])))
+    fon["presion_red_kpa"] = float(f11.number_input("Presión de red (kPa)", min_value=0.0, step=10.0, value=float(fon["presion_red_kpa"])))
+    fon["dp_contador_kpa"] = float(f12.number_input("Δp contador y filtros (kPa)", min_value=0.0, step=5.0, value=float(fon["dp_contador_kpa"])))
+    fon["aljibe"] = st.toggle("Grupo de presión desde aljibe (sin aprovechar la presión de red)", value=bool(fon["aljibe"]))
+    dot = fon["dotacion"] or DOTACION
+    dot_df = pd.DataFrame([{"Unidad": u, **{a: dot[u].get(a, 0.0) for a in APARATOS}} for u in dot])
+    dot_edit = st.data_editor(dot_df, key="dotacion_editor", hide_index=True, use_container_width=True, disabled=["Unidad"])
+    st.caption("Dotación: aparatos por unidad de ocupación (se redondea hacia arriba por zona).")
+    fon["dotacion"] = {r["Unidad"]: {a: float(r[a]) for a in APARATOS if r[a] == r[a] and float(r[a]) > 0}
+                       for r in dot_edit.to_dict("records")}
+settings["fontaneria"] = fon
+
+red, avisos_red, tot_red = calc_fontaneria(df, zones_df, settings)
+warnings = list(warnings) + avisos_red
+acom, grupo = tot_red["acometida"], tot_red["grupo_presion"]
+r1, r2, r3, r4 = st.columns(4)
+r1.metric("Agua fría simultánea (L/s)", f"{tot_red['caudal_af_simultaneo_ls']:.2f}")
+r2.metric("ACS simultánea (L/s)", f"{tot_red['caudal_acs_simultaneo_ls']:.2f}")
+r3.metric("Acometida", f"{acom['diametro']}", help=f"{acom['material']}: {acom['caudal_simultaneo_ls']:.2f} L/s, v = {acom['v_ms']:.2f} m/s")
+r4.metric("Grupo de presión", f"{grupo['altura_mca']:.0f} m.c.a." if grupo["necesario"] else "No necesario")
+if grupo["necesario"]:
+    st.caption(f"Grupo de presión: {grupo['caudal_m3h']:.1f} m³/h a {grupo['altura_kpa']:.0f} kPa, ≈ {grupo['potencia_kw']:.1f} kW "
+               f"(presión requerida en cabecera {grupo['presion_requerida_kpa']:.0f} kPa).")
+ver_ramales = st.toggle("Incluir ramales de zona", value=len(red) <= 2000, key="fon_ramales")
+st.dataframe((red if ver_ramales else red[red["Nivel"] != "Zona"]).head(5000), use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.2f") for c in
+                            ("Caudal instalado (L/s)", "Coef. simultaneidad", "Caudal simultáneo (L/s)", "v (m/s)", "Δp tramo (kPa)", "Δp acumulada (kPa)")})
+with st.expander("Aparatos por zona"):
+    st.dataframe(tot_red["aparatos"].head(2000), use_container_width=True, hide_index=True)
+st.download_button("Descargar red de abastecimiento (CSV)", data=red.to_csv(index=False).encode("utf-8"),
+                   file_name="fontaneria_tramos.csv", mime="text/csv")
+
+st.divider()
+st.subheader("Acumulación de ACS frente a potencia de generación")
+st.caption("Simula el día de diseño (consumo de la Tabla 14 repartido según el horario de cada uso) para una rejilla de volúmenes "
+           "y potencias, y obtiene la potencia mínima necesaria para cada volumen de acumulación.")
+acu = {**OPCIONES_ACUMULACION, **(settings.get("acs_acumulacion", {}) or {})}
+with st.expander("Parámetros de la simulación"):
+    a1, a2, a3, a4 = st.columns(4)
+    acu["paso_min"] = int(a1.selectbox("Paso de tiempo (min)", [60, 15], index=[60, 15].index(int(acu["paso_min"]))))
+    acu["dias"] = int(a2.number_input("Días de diseño seguidos", min_value=1, max_value=7, step=1, value=int(acu["dias"])))
+    acu["factor_dia_punta"] = float(a3.number_input("Factor día punta", min_value=0.5, max_value=3.0, step=0.1, value=float(acu["factor_dia_punta"])))
+    acu["fraccion_util"] = float(a4.number_input("Fracción útil del depósito", min_value=0.3, max_value=1.0, step=0.05, value=float(acu["fraccion_util"])))
+    a5, a6, a7, a8 = st.columns(4)
+    acu["t_acumulacion"] = float(a5.number_input("T acumulación (°C)", min_value=45.0, max_value=80.0, step=1.0, value=float(acu["t_acumulacion"])))
+    acu["perdidas_kwh_l_dia"] = float(a6.number_input("Pérdidas (kWh/L·día)", min_value=0.0, max_value=0.05, step=0.001, format="%.3f", value=float(acu["perdidas_kwh_l_dia"])))
+    acu["coste_eur_l"] = float(a7.number_input("Coste acumulación (€/L)", min_value=0.0, step=0.5, value=float(acu["coste_eur_l"])))
+    acu["coste_eur_kw"] = float(a8.number_input("Coste generación (€/kW)", min_value=0.0, step=25.0, value=float(acu["coste_eur_kw"])))
+settings["acs_acumulacion"] = acu
+
+frontera, avisos_acu, tot_acu = calc_acumulacion_acs(df, zones_df, settings)
+warnings = list(warnings) + avisos_acu
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("ACS día de diseño (L)", f"{tot_acu['litros_dia']:.0f}")
+m2.metric("Potencia media (kW)", f"{tot_acu['potencia_media_kw']:.1f}")
+m3.metric("Sin acumulación (kW)", f"{tot_acu['potencia_punta_sin_acumulacion_kw']:.1f}")
+m4.metric("Tabla 14 (kW)", f"{tot_acu['potencia_tabla14_kw']:.1f}")
+if tot_acu["volumen_para_tabla14_l"] is not None:
+    st.caption(f"Con la potencia de la Tabla 14 basta una acumulación de ≈ {tot_acu['volumen_para_tabla14_l']:.0f} L.")
+st.line_chart(frontera.set_index("Volumen (L)"), height=260)
+st.dataframe(tot_acu["recomendaciones"], use_container_width=True, hide_index=True,
+             column_config={"Volumen (L)": st.column_config.NumberColumn("Volumen (L)", format="%.0f"),
+                            "Potencia (kW)": st.column_config.NumberColumn("Potencia (kW)", format="%.1f"),
+                            "Coste orientativo (€)": st.column_config.NumberColumn("Coste orientativo (€)", format="%.0f")})
+with st.expander("Perfil de extracción del día de diseño"):
+    paso = tot_acu["paso_min"]
+    st.bar_chart(pd.DataFrame({"L": tot_acu["perfil_l"]}, index=[f"{(i * paso) // 60:02d}:{(i * paso) % 60:02d}" for i in range(len(tot_acu["perfil_l"]))]), height=220)
+
+render_warnings(warnings)
 
 st.info("Para hoteles/hospitales usa 'Camas'. Para restaurantes usa 'Cubiertos/día'. En caso contrario usa densidad o 'Personas'.")
+
+perf.end(_perf_page)
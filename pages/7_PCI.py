@@ -3,12 +3,14 @@ import streamlit as st
 from core.state import get_settings, set_settings
 from core.calculations import calc_pci
 from core.ui import render_warnings
+from core import perf
 
 
 st.title("PCI – Reserva de agua (según JG 'Instalaciones a palmos')")
 st.caption("Módulo simplificado: caudales automáticos por m² (edificio + aparcamiento) con ratios habituales editables. Permite ajuste manual.")
 
 settings = get_settings()
+_perf_page = perf.begin("page.7_PCI")
 settings["pci_activo"] = True
 
 gfa_above = float(settings.get("gfa_above_m2", 0) or 0)
@@ -87,3 +89,5 @@ cR2.metric("Caudal rociadores (L/s)", f"{totals.get('pci_rociadores_caudal_lps',
 st.dataframe(df, use_container_width=True, hide_index=True)
 
 render_warnings(warnings)
+
+perf.end(_perf_page)
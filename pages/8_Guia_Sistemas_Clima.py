@@ -1,18 +1,45 @@
 # -*- coding: utf-8 -*-
 import streamlit as st
-import pandas as pd
 
-from core.state import init_state
-from core.constants import TABLA_16_SISTEMAS_CLIMA
+from core.state import init_state, get_zones_df, get_settings
+from core.calculations import calc_climatizacion, calc_ventilacion_y_todo_aire
+from core.system_ranking import calc_ranking_sistemas, load_index, OPCIONES as OPCIONES_RANKING
+from core import perf
 
 init_state()
+_perf_page = perf.begin("page.8_Guia_Sistemas_Clima")
 st.title("8) Guía (sistemas de climatización)")
 
 st.write("Matriz orientativa de aplicación de sistemas de climatización (Tabla 16 del documento).")
 
-df = pd.DataFrame(TABLA_16_SISTEMAS_CLIMA).T
-df = df.reset_index().rename(columns={"index":"Aplicación"})
-st.dataframe(df, use_container_width=True, hide_index=True)
+st.dataframe(load_index().frame(), use_container_width=True, hide_index=True)
+
+st.subheader("Sistemas recomendados")
+st.caption("Puntuación orientativa de cada sistema por edificio: superficie en la que la Tabla 16 lo admite × cobertura de las "
+           "puntas de frío y calor, penalizada por la reserva de espacio de la Tabla 2 y el caudal de aire que mueve.")
+zones_df = get_zones_df()
+settings = get_settings()
+rk = {**OPCIONES_RANKING, **(settings.get("ranking_sistemas", {}) or {})}
+r1, r2 = st.columns(2)
+rk["peso_espacio"] = float(r1.slider("Peso del espacio", min_value=0.0, max_value=1.0, step=0.05, value=float(rk["peso_espacio"])))
+rk["peso_aire"] = float(r2.slider("Peso del caudal de aire", min_value=0.0, max_value=1.0, step=0.05, value=float(rk["peso_aire"])))
+settings["ranking_sistemas"] = rk
+
+df_clima, _, _ = calc_climatizacion(zones_df, settings)
+df_vent, _, _ = calc_ventilacion_y_todo_aire(zones_df, settings)
+ranking, avisos_rk, tot_rk = calc_ranking_sistemas(df_clima, df_vent, zones_df, settings)
+edificios = ranking["Edificio"].unique().tolist()
+if len(edificios) > 1:
+    st.dataframe(tot_rk["mejores"], use_container_width=True, hide_index=True,
+                 column_config={"Puntuación": st.column_config.NumberColumn("Puntuación", format="%.0f")})
+    edificio = st.selectbox("Edificio", edificios)
+    ranking = ranking[ranking["Edificio"] == edificio]
+st.dataframe(ranking, use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.0f") for c in
+                            ("Puntuación", "Aplicable (% sup.)", "Cobertura (%)", "Espacio Tabla 2 mín. (m²)",
+                             "Espacio Tabla 2 máx. (m²)", "Caudal de aire (L/s)")})
+for w in avisos_rk:
+    st.warning(f"[{w.module}] {w.zone}: {w.message}")
 
 st.divider()
 st.subheader("Lista de comprobación (extracto Tabla 3)")
@@ -33,3 +60,5 @@ st.markdown("""
 - Grupos electrógenos (depósito combustible, ventilación, escape)  
 - SAI (sala de baterías, ventilación)
 """)
+
+perf.end(_perf_page)
@@ -7,9 +7,12 @@ from core.calculations import (
     calc_climatizacion, calc_ventilacion_y_todo_aire, calc_electricidad,
     calc_agua_y_acs, calc_reservas_espacios, calc_pci
 )
+from core.costs import calc_costes, load_price_book, OPCIONES as OPCIONES_COSTES, RESERVAS
 from core.exporters import export_excel, export_pdf_memoria
+from core import perf
 
 init_state()
+_perf_page = perf.begin("page.9_Memoria_y_Export")
 st.title("9) Memoria y exportación")
 
 zones_df = get_zones_df()
@@ -34,7 +37,32 @@ df_agua, w_agua, tot_agua = calc_agua_y_acs(zones_df, settings)
 df_esp, w_esp, tot_esp = calc_reservas_espacios(zones_df, settings)
 df_pci, w_pci, tot_pci = calc_pci(settings)
 
-all_w = w_clima + w_vent + w_ele + w_agua + w_esp + w_pci
+st.subheader("Estimación de costes")
+st.caption("Capex orientativo por edificio y partida: magnitudes del predimensionamiento × cuadro de precios local "
+           "(`data/precios.csv`) × coeficiente regional. Con columna `Región` en las zonas, cada edificio usa la suya.")
+co = {**OPCIONES_COSTES, **(settings.get("costes", {}) or {})}
+cuadro = load_price_book(co["precios"], co["coeficientes"])
+regiones = list(cuadro.regiones)
+k1, k2 = st.columns(2)
+co["region"] = k1.selectbox("Región (por defecto)", regiones,
+                            index=regiones.index(co["region"]) if co["region"] in regiones else 0)
+co["reserva_tabla2"] = k2.selectbox("Superficie de salas (Tabla 2)", RESERVAS, index=RESERVAS.index(co["reserva_tabla2"]))
+settings["costes"] = co
+df_cost, w_cost, tot_cost = calc_costes(df_clima, df_vent, df_ele, df_esp, tot_pci, zones_df, settings, cuadro)
+m1, m2, m3 = st.columns(3)
+m1.metric("Capex total (€)", f"{tot_cost['capex_total_eur']:,.0f}")
+m2.metric("Salas Tabla 2 (€)", f"{tot_cost['capex_salas_eur']:,.0f}")
+m3.metric("€/m²", f"{tot_cost['capex_eur_m2']:,.0f}")
+st.dataframe(tot_cost["por_edificio"], use_container_width=True, hide_index=True,
+             column_config={c: st.column_config.NumberColumn(c, format="%.0f") for c in
+                            ("Superficie (m²)", "Instalaciones (€)", "Salas Tabla 2 (€)", "Total (€)", "€/m²")})
+with st.expander("Detalle por partida"):
+    st.dataframe(df_cost, use_container_width=True, hide_index=True,
+                 column_config={c: st.column_config.NumberColumn(c, format="%.1f") for c in ("Cantidad", "Coste (€)")})
+with st.expander("Cuadro de precios"):
+    st.dataframe(cuadro.frame(), use_container_width=True, hide_index=True)
+
+all_w = w_clima + w_vent + w_ele + w_agua + w_esp + w_pci + w_cost
 if all_w:
     st.warning(f"Avisos totales: {len(all_w)}. Revisa antes de emitir memoria.")
 
@@ -46,12 +74,15 @@ results = {
     "Agua_ACS": df_agua,
     "Espacios": df_esp,
     "PCI": df_pci,
+    "Costes": df_cost,
+    "Costes_edificio": tot_cost["por_edificio"],
     "Totales_clima": tot_clima,
     "Totales_vent": tot_vent,
     "Totales_ele": tot_ele,
     "Totales_agua": tot_agua,
     "Totales_esp": tot_esp,
     "Totales_pci": tot_pci,
+    "Totales_costes": tot_cost,
 }
 
 col1, col2 = st.columns(2)
@@ -77,6 +108,7 @@ with col2:
             "Agua/ACS": df_agua,
             "Espacios": df_esp,
             "PCI": df_pci,
+            "Costes por edificio": tot_cost["por_edificio"],
         },
         totals={
             "Climatización": tot_clima,
@@ -85,6 +117,7 @@ with col2:
             "Agua/ACS": tot_agua,
             "Espacios": tot_esp,
             "PCI": tot_pci,
+            "Costes": tot_cost,
         }
     )
     st.download_button(
@@ -114,3 +147,5 @@ if all_w:
             st.warning(f"[{mod}] {shown}{more}: {msg}")
 else:
     st.success("Sin avisos relevantes.")
+
+perf.end(_perf_page)
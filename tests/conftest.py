@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""Configuración común de pytest: raíz del repositorio en sys.path y datos de ejemplo."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+@pytest.fixture
+def portfolio():
+    """Cartera sintética pequeña (varios edificios, con datos sucios)."""
+    from benchmarks.synthetic import synthetic_portfolio
+    return synthetic_portfolio(120, zones_per_building=20, seed=7)
+
+@pytest.fixture
+def settings():
+    from benchmarks.synthetic import synthetic_settings
+    return synthetic_settings(seed=7)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from core.acs_storage import KWH_L_K, calc_acumulacion_acs, simulate_grid
+
+def _res() -> pd.DataFrame:
+    return pd.DataFrame({"Uso": ["Hoteles", "Residencial - Viviendas"], "ACS (L/día)": [6000.0, 3000.0],
+                         "Potencia ACS (kW)": [40.0, 20.0]})
+
+def test_recomendaciones_con_acumulacion():
+    res = _res()
+    _, _, tot = calc_acumulacion_acs(res, res, {})
+    rec = tot["recomendaciones"].set_index("Criterio")
+    assert (rec["Volumen (L)"] > 0).all()
+    fila = rec.loc["Mínimo volumen (P ≤ Tabla 14)"]
+    assert fila["Potencia (kW)"] <= tot["potencia_tabla14_kw"] + 1e-9
+    assert fila["Potencia (kW)"] < tot["potencia_punta_sin_acumulacion_kw"]
+
+def test_rejilla_igual_a_simulacion_punto_a_punto():
+    rng = np.random.default_rng(2)
+    draw = rng.uniform(0.0, 300.0, 24)
+    vols, pots = np.linspace(0.0, 4000.0, 9), np.linspace(5.0, 60.0, 12)
+    sim = simulate_grid(draw, vols, pots, perdidas_kwh_l_dia=0.004)
+    d = draw * KWH_L_K * 50.0
+    for i, v in enumerate(vols):
+        for j, p in enumerate(pots):
+            e_max = v * KWH_L_K * 50.0 * 0.85
+            loss = v * 0.004 / 24.0
+            e, e_min = e_max, e_max
+            for _ in range(3):
+                for x in d:
+                    e = min(e + p - x - loss, e_max)
+                    e_min = min(e_min, e)
+            viable = e_min >= -1e-9 and p * 24 - d.sum() - loss * 24 >= -1e-9
+            assert np.isclose(sim["e_min_kwh"][i, j], e_min) and sim["viable"][i, j] == viable
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+
+from core.ahu_grouping import calc_agrupacion_uta, group_zones
+from core.calculations import calc_ventilacion_y_todo_aire
+from core.equipment import load_catalog
+
+def test_reparto_respeta_caudal_maximo_y_grupos():
+    rng = np.random.default_rng(11)
+    n = 500
+    q = rng.uniform(0.0, 3000.0, n)
+    q[rng.random(n) < 0.05] = 0.0
+    q[:3] = 9000.0  # mayores que el máximo: UTA propia
+    grupo = rng.integers(0, 12, n)
+    uta = group_zones(q, grupo, np.arange(n), 5000.0, grupo // 3, fraccion_minima=0.3)
+    assert (uta[q <= 0] == -1).all() and (uta[q > 0] >= 0).all()
+    carga = np.bincount(uta[uta >= 0], weights=q[uta >= 0])
+    solas = np.bincount(uta[uta >= 0])
+    assert ((carga <= 5000.0 + 1e-6) | (solas == 1)).all()
+    # cada UTA con varias zonas no mezcla grupos relajados
+    for u in np.unique(uta[uta >= 0]):
+        assert len(np.unique((grupo // 3)[uta == u])) == 1
+    assert np.array_equal(np.unique(uta[uta >= 0]), np.arange(uta.max() + 1))
+
+def test_equipo_usa_opciones_de_equipos(portfolio, settings):
+    res, _, _ = calc_ventilacion_y_todo_aire(portfolio, settings)
+    cat = load_catalog()
+    for k in (1, 3):
+        s = {**settings, "equipos": {"max_unidades": k, "criterio": "Menor peso"}}
+        utas, _, _ = calc_agrupacion_uta(res, portfolio, s)
+        best = cat.select("Climatizador", utas["Caudal (m³/h)"].to_numpy(), k, False, False, "Menor peso")
+        c = cat.combos("Climatizador", k, False)
+        esperado = [cat.describe("Climatizador", c["n"][b]) if b >= 0 else "Sin combinación válida" for b in best.tolist()]
+        assert utas["Equipo"].tolist() == esperado
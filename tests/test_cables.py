@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.cables import IZ_TABLA, INTENSIDADES_NORMALIZADAS, SECCIONES_MM2, combo_codes, size_arrays, size_cables
+
+def test_tension_no_positiva():
+    circuits = pd.DataFrame({"Circuito": ["C1", "C2"], "Ib (A)": [20.0, 30.0], "Tensión (V)": [400.0, 0.0]})
+    with pytest.raises(ValueError, match="Tensión"):
+        size_cables(circuits)
+
+def test_seccion_por_intensidad_igual_a_busqueda_lineal():
+    rng = np.random.default_rng(5)
+    n = 400
+    ib = rng.uniform(1.0, 600.0, n)
+    mat = rng.choice(["Cu", "Al"], n)
+    combo = combo_codes(mat, np.full(n, "XLPE", dtype=object), np.full(n, "B1", dtype=object))
+    # sin límite de caída: manda la intensidad
+    r = size_arrays(ib, np.zeros(n), np.full(n, 400.0), np.full(n, 0.9), combo, np.zeros(n))
+    for i in range(n):
+        i_n = next((x for x in INTENSIDADES_NORMALIZADAS if x >= ib[i]), ib[i])
+        fila = np.nan_to_num(IZ_TABLA[combo[i]])
+        p = 1
+        while fila[-1] * p < i_n:
+            p += 1
+        s = next(k for k in range(len(SECCIONES_MM2)) if fila[k] * p >= i_n)
+        assert r["in_a"][i] == i_n and r["paralelo"][i] == p and r["seccion_mm2"][i] == SECCIONES_MM2[s]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from core.calculations import (calc_climatizacion, calc_electricidad, calc_pci, calc_reservas_espacios,
+                               calc_ventilacion_y_todo_aire)
+from core.costs import calc_costes, load_price_book
+
+def _costes(zones, settings):
+    c, _, _ = calc_climatizacion(zones, settings)
+    v, _, _ = calc_ventilacion_y_todo_aire(zones, settings)
+    e, _, _ = calc_electricidad(zones, settings)
+    es, _, _ = calc_reservas_espacios(zones, settings)
+    _, _, p = calc_pci(settings)
+    return calc_costes(c, v, e, es, p, zones, settings)
+
+def test_regiones_con_huecos(portfolio, settings):
+    z = portfolio.copy()
+    edificios = z["Edificio"].unique().tolist()
+    z["Región"] = None
+    z.loc[z["Edificio"] == edificios[0], "Región"] = "Canarias"
+    z.loc[z.index[-1], "Región"] = "Atlántida"
+    z = pd.read_csv(io.StringIO(z.to_csv(index=False)))  # celdas vacías como NaN
+    _, avisos, tot = _costes(z, settings)
+    pe = tot["por_edificio"].set_index("Edificio")
+    assert pe.loc[str(edificios[0]), "Coef. regional"] == load_price_book().regiones["Canarias"]
+    assert pe.loc[str(edificios[1]), "Región"] == "Referencia"
+    assert pe.loc[str(edificios[-1]), "Coef. regional"] == 1.0
+    assert any("Atlántida" in w.message for w in avisos)
+
+def test_capex_es_producto_por_partida(portfolio, settings):
+    res, _, tot = _costes(portfolio, settings)
+    pb = load_price_book()
+    precio = dict(zip(pb.partidas.tolist(), pb.precios.tolist()))
+    esperado = res["Cantidad"] * res["Partida"].map(precio) * res["Coef. regional"]
+    np.testing.assert_allclose(res["Coste (€)"], esperado)
+    assert np.isclose(tot["capex_total_eur"], res["Coste (€)"].sum())
+    assert np.isclose(tot["por_edificio"]["Total (€)"].sum(), tot["capex_total_eur"])
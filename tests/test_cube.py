@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.calculations import (calc_agua_y_acs, calc_climatizacion, calc_electricidad, calc_ventilacion_y_todo_aire,
+                               normalize_zones_df)
+from core.cube import COUNT_PREFIX, DIMENSIONS, ZONES_COUNT
+
+CALCULADORAS = {
+    "clima": (calc_climatizacion, ["Potencia frío (kW)", "Potencia calor (kW)"]),
+    "vent": (calc_ventilacion_y_todo_aire, ["Ventilación total (L/s)", "Todo-aire total (L/s)"]),
+    "ele": (calc_electricidad, ["Potencia normal (kW)", "Potencia comp (kW)"]),
+    "agua": (calc_agua_y_acs, ["Agua fría (L/día)", "ACS (L/día)", "Potencia ACS (kW)"]),
+}
+
+@pytest.mark.parametrize("modulo", list(CALCULADORAS))
+@pytest.mark.parametrize("by", [["Uso"], ["Nivel"], ["Exposición"], ["Zona climática"], ["Edificio"],
+                                ["Uso", "Zona climática"], []])
+def test_desglose_igual_a_groupby(portfolio, settings, modulo, by):
+    calc, medidas = CALCULADORAS[modulo]
+    res, _, tot = calc(portfolio, settings)
+    zonas = normalize_zones_df(portfolio).reset_index(drop=True)
+    plano = pd.DataFrame({d: zonas[c] for d, c in DIMENSIONS.items()})
+    for m in medidas:
+        plano[m] = res[m].astype(float).to_numpy()
+
+    got = tot["cubo"].breakdown(by, counts=True)
+    if by:
+        g = plano.groupby(by, observed=True, dropna=False, sort=True)
+        ref = g[medidas].sum()
+        ref[ZONES_COUNT] = g.size()
+        for m in medidas:
+            ref[COUNT_PREFIX + m] = g[m].count()
+        ref = ref.reset_index()
+    else:
+        ref = pd.DataFrame([{**plano[medidas].sum().to_dict(), ZONES_COUNT: len(plano),
+                             **{COUNT_PREFIX + m: plano[m].count() for m in medidas}}])
+    assert len(got) == len(ref)
+    for col in by:
+        assert got[col].astype(str).tolist() == ref[col].astype(str).tolist()
+    for col in [ZONES_COUNT] + medidas + [COUNT_PREFIX + m for m in medidas]:
+        np.testing.assert_allclose(got[col].to_numpy(dtype=float), ref[col].to_numpy(dtype=float), err_msg=col)
+    for m in medidas:
+        assert tot["cubo"].total(m) == pytest.approx(np.nansum(plano[m]))
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import json
+import math
+
+import numpy as np
+import pytest
+
+from benchmarks.run import REFERENCE_PATH, SEED
+from benchmarks.synthetic import synthetic_portfolio, synthetic_settings
+from core.calculations import calc_climatizacion, calc_electricidad, normalize_zones_df
+from core.diversity import simultaneidad
+
+def _puntas(zones, settings):
+    c, _, _ = calc_climatizacion(zones, settings)
+    e, _, _ = calc_electricidad(zones, settings)
+    return {"Frío": c["Potencia frío (kW)"], "Calor": c["Potencia calor (kW)"], "Eléctrica": e["Potencia normal (kW)"]}
+
+def test_factor_no_supera_uno(portfolio, settings):
+    s = simultaneidad(normalize_zones_df(portfolio), _puntas(portfolio, settings), settings)
+    for modulo, r in s.items():
+        assert 0 < r["factor"] <= 1.0 + 1e-12, modulo
+        assert r["coincidente_kw"] <= r["suma_kw"] + 1e-9
+        assert math.isclose(r["factor"], r["coincidente_kw"] / r["suma_kw"])
+    assert min(r["factor"] for r in s.values()) < 1.0  # usos que no coinciden en el tiempo
+
+def test_un_solo_horario_da_factor_uno(portfolio, settings):
+    z = portfolio.copy()
+    z["Uso"] = "Oficinas"
+    z["Zona climática"] = "D3"
+    s = simultaneidad(normalize_zones_df(z), _puntas(z, settings), settings)
+    for modulo, r in s.items():
+        assert r["factor"] == pytest.approx(1.0), modulo
+        assert r["coincidente_kw"] == pytest.approx(r["suma_kw"])
+
+def test_sin_simultaneidad_totales_de_referencia():
+    zones = synthetic_portfolio(100, zones_per_building=50, seed=SEED)
+    settings = {**synthetic_settings(SEED), "simultaneidad_activa": False}
+    ref = json.loads(REFERENCE_PATH.read_text(encoding="utf-8"))["100"]
+    _, _, clima = calc_climatizacion(zones, settings)
+    _, _, ele = calc_electricidad(zones, settings)
+    for tot, nombre in ((clima, "calc_climatizacion"), (ele, "calc_electricidad")):
+        for k, v in ref[nombre].items():
+            if k not in ("rows", "warnings"):
+                assert tot[k] == pytest.approx(v, rel=1e-9), k
+    assert "frio_coincidente_kw" not in clima and "fs_electrica" not in ele
+    assert clima["frio_generador_kw"] == pytest.approx(clima["frio_total_kw"] * settings.get("oversize_frio", 1.0))
+    assert ele["acometida_sugerida"] == ("BT" if ele["potencia_normal_kw"] < 400 else "MT")
+
+def test_con_simultaneidad_generadores_con_punta_coincidente(portfolio, settings):
+    settings = {**settings, "simultaneidad_activa": True}
+    _, _, clima = calc_climatizacion(portfolio, settings)
+    _, _, ele = calc_electricidad(portfolio, settings)
+    assert clima["frio_coincidente_kw"] <= clima["frio_total_kw"] + 1e-9
+    assert clima["frio_generador_kw"] == pytest.approx(clima["frio_coincidente_kw"] * settings.get("oversize_frio", 1.0))
+    assert clima["calor_generador_kw"] == pytest.approx(clima["calor_coincidente_kw"] * settings.get("oversize_calor", 1.10))
+    assert ele["potencia_normal_coincidente_kw"] == pytest.approx(ele["fs_electrica"] * ele["potencia_normal_kw"])
+    assert ele["acometida_sugerida"] == ("BT" if ele["potencia_normal_coincidente_kw"] < 400 else "MT")
+    assert np.isfinite([clima["fs_frio"], clima["fs_calor"], ele["fs_electrica"]]).all()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from core.ducts import (AIRE_NU, AIRE_RHO, DIAMETROS_MM, MATERIALES_CONDUCTO, equivalent_diameter, rectangular_table,
+                        size_ducts)
+from core.pipes import gradient_pa_m
+
+def _tabla(forma: str, h_max: float, aspect: float):
+    if forma == "Circular":
+        d = np.asarray(DIAMETROS_MM, dtype=float) / 1000.0
+        return math.pi * d ** 2 / 4.0, d
+    w, h = rectangular_table(h_max, aspect)
+    return w * h / 1e6, equivalent_diameter(w, h) / 1000.0
+
+def _cumple(q: float, area: float, de: float, v_max: float, r_max: float, eps: float) -> bool:
+    r = float(gradient_pa_m(np.array([q]), np.array([de]), eps, AIRE_RHO, AIRE_NU)[0])
+    return q / area <= v_max + 1e-9 and r <= r_max + 1e-9
+
+def _referencia(q_ls: float, v_max: float, r_max: float, area, de, eps: float):
+    """Búsqueda lineal en la tabla ordenada por sección: menor nº en paralelo y menor medida que cumple."""
+    q = q_ls / 1000.0
+    n = 1
+    while not _cumple(q / n, area[-1], de[-1], v_max, r_max, eps):
+        n += 1
+    for i in range(len(area)):
+        if _cumple(q / n, area[i], de[i], v_max, r_max, eps):
+            return i, n
+    raise AssertionError("la mayor medida debería cumplir")
+
+@pytest.mark.parametrize("forma,h_max", [("Circular", math.inf), ("Rectangular", math.inf), ("Rectangular", 400.0)])
+@pytest.mark.parametrize("material", list(MATERIALES_CONDUCTO))
+def test_menor_medida_que_cumple(forma, h_max, material):
+    rng = np.random.default_rng(19)
+    q = np.r_[rng.uniform(10, 3000, 150), rng.uniform(3000, 60000, 50)].round(1)
+    v_max = rng.choice([4.0, 6.0, 8.0], len(q))
+    r_max = rng.choice([0.5, 1.0, 2.0], len(q))
+    out = size_ducts(q, forma, v_max, r_max, material=material, h_max_mm=h_max)
+    area, de = _tabla(forma, h_max, 4.0)
+    eps = MATERIALES_CONDUCTO[material] / 1000.0
+    ref = [_referencia(a, b, c, area, de, eps) for a, b, c in zip(q, v_max, r_max)]
+    np.testing.assert_array_equal(out["idx"], [r[0] for r in ref])
+    np.testing.assert_array_equal(out["paralelo"], [r[1] for r in ref])
+    assert out["cumple"].all()
+    if forma == "Rectangular":
+        assert (out["alto_mm"] <= h_max).all() and (out["ancho_mm"] <= 4.0 * out["alto_mm"]).all()
+
+def test_reparto_en_paralelo_por_encima_de_la_mayor_medida():
+    d_top = DIAMETROS_MM[-1] / 1000.0
+    q_cap = math.pi * d_top ** 2 / 4.0 * 8.0 * 1000.0  # L/s que caben en Ø1250 a 8 m/s
+    out = size_ducts(np.array([0.9 * q_cap, 2.2 * q_cap, 5.0 * q_cap]), "Circular", 8.0, 1e9)
+    np.testing.assert_array_equal(out["paralelo"], [1, 3, 5])
+    # 5 conductos llenan justo la mayor medida; 2,2 veces en 3 cabe en la anterior (Ø1120)
+    np.testing.assert_array_equal(out["idx"][1:], [len(DIAMETROS_MM) - 2, len(DIAMETROS_MM) - 1])
+    assert (out["v_ms"] <= 8.0 + 1e-9).all()
+
+def test_tabla_rectangular_ordenada_y_mayor_medida_al_final():
+    w, h = rectangular_table(500.0, 3.0)
+    area, de = w * h, equivalent_diameter(w, h)
+    assert (np.diff(area) >= 0).all()
+    assert area[-1] == area.max() and de[-1] == de.max()
+    # una sección rectangular nunca es menor que el círculo de su diámetro equivalente
+    assert (area >= math.pi * de ** 2 / 4.0 - 1e-9).all()
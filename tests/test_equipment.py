@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+import pytest
+
+from core.equipment import CRITERIOS, TIPOS, load_catalog
+
+def _seleccion_fuerza_bruta(cat, tipo, demanda, max_unidades, n_mas_1, mezclar, criterio) -> int:
+    """Referencia demanda a demanda: recorre todas las combinaciones y se queda con la mejor."""
+    if all(x <= 0 for x in demanda):
+        return -2
+    c = cat.combos(tipo, max_unidades, mezclar)
+    caps = TIPOS[tipo]
+    obj = c[CRITERIOS.get(criterio) or caps[0]]
+    mejor, clave_mejor = -1, None
+    for j in range(len(c["unidades"])):
+        if n_mas_1 and c["unidades"][j] < 2:
+            continue
+        util = [c[k][j] - (c[f"{k}_max"][j] if n_mas_1 else 0.0) for k in caps]
+        if any(u < x - 1e-9 for u, x in zip(util, demanda)):
+            continue
+        clave = (obj[j], c[caps[0]][j], c["unidades"][j], j)
+        if clave_mejor is None or clave < clave_mejor:
+            mejor, clave_mejor = j, clave
+    return mejor
+
+@pytest.mark.parametrize("tipo", ["Enfriadora", "Bomba de calor", "Climatizador"])
+def test_select_igual_a_fuerza_bruta(tipo):
+    cat = load_catalog()
+    rng = np.random.default_rng(11)
+    cap_max = cat.modelos[tipo][TIPOS[tipo][0]].max()
+    d = rng.uniform(0, 3.0 * cap_max, (60, len(TIPOS[tipo]))).round(1)
+    d[:3] = 0.0
+    d[3:6] = cat.modelos[tipo][TIPOS[tipo][0]].to_numpy()[:3, None]  # justo la capacidad de un modelo
+    for n_mas_1, mezclar, criterio in itertools.product((False, True), (False, True), CRITERIOS):
+        best = cat.select(tipo, d, max_unidades=3, n_mas_1=n_mas_1, mezclar=mezclar, criterio=criterio)
+        ref = [_seleccion_fuerza_bruta(cat, tipo, row, 3, n_mas_1, mezclar, criterio) for row in d.tolist()]
+        np.testing.assert_array_equal(best, ref, err_msg=f"{n_mas_1=} {mezclar=} {criterio=}")
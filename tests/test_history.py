@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+
+from core.history import EditHistory, diff_zones
+from core.schema import enforce_zones_schema
+
+@pytest.fixture
+def zonas(portfolio):
+    return enforce_zones_schema(portfolio.head(30))
+
+def _igual(a: pd.DataFrame, b: pd.DataFrame) -> None:
+    # mismas filas, orden, valores y tipos; un categórico puede conservar categorías sin uso
+    pd.testing.assert_frame_equal(a, b, check_categorical=False)
+
+def _recorrido(h: EditHistory, versiones, settings=None) -> None:
+    """Deshace hasta el estado inicial y rehace hasta el final comprobando cada versión."""
+    settings = {} if settings is None else settings
+    z = versiones[-1]
+    for i in range(len(versiones) - 1, 0, -1):
+        z = h.step(z, settings, forward=False)
+        _igual(z, versiones[i - 1])
+    assert not h.can_undo
+    for i in range(1, len(versiones)):
+        z = h.step(z, settings, forward=True)
+        _igual(z, versiones[i])
+    assert not h.can_redo
+
+def test_editar_celdas(zonas):
+    h = EditHistory()
+    v1 = zonas.copy()
+    v1.loc[[2, 5], "Superficie (m²)"] = [10.0, 20.0]
+    v1.loc[3, "Uso"] = next(u for u in zonas["Uso"].cat.categories if u != zonas.loc[3, "Uso"])
+    v1.loc[4, "Personas"] = 12.0 if pd.isna(zonas.loc[4, "Personas"]) else pd.NA
+    assert h.record_zones(zonas, v1)
+    d = h.revisions[-1].zones
+    assert d.replaced is None and set(d.cells) == {"Superficie (m²)", "Uso", "Personas"}
+    assert not h.record_zones(v1, v1.copy())  # sin cambios no hay revisión
+    _recorrido(h, [zonas, v1])
+
+def test_borrar_filas(zonas):
+    h = EditHistory()
+    v1 = zonas.drop(index=[0, 4, 11])
+    h.record_zones(zonas, v1)
+    assert len(h.revisions[-1].zones.removed) == 3
+    _recorrido(h, [zonas, v1])
+
+def test_anadir_filas_con_categorias_nuevas(zonas):
+    h = EditHistory()
+    nuevas = zonas.iloc[:2].copy()
+    nuevas.index = [100, 101]
+    nuevas["Uso"] = nuevas["Uso"].cat.add_categories(["Uso nuevo"])
+    nuevas.loc[100, "Uso"] = "Uso nuevo"
+    nuevas["Zona climática"] = nuevas["Zona climática"].cat.add_categories(["Z9"])
+    nuevas.loc[101, "Zona climática"] = "Z9"
+    v1 = zonas.copy()
+    v1["Uso"] = v1["Uso"].cat.add_categories(["Uso nuevo"])
+    v1["Zona climática"] = v1["Zona climática"].cat.add_categories(["Z9"])
+    v1 = pd.concat([v1, nuevas])
+    h.record_zones(zonas, v1)
+    _recorrido(h, [zonas, v1])
+    z = h.goto(h.current - 1, v1, {})
+    z = h.goto(h.current + 1, z, {})
+    assert z.loc[100, "Uso"] == "Uso nuevo" and z.loc[101, "Zona climática"] == "Z9"
+
+def test_insertar_a_mitad_de_tabla(zonas):
+    h = EditHistory()
+    fila = zonas.iloc[[0]].copy()
+    fila.index = [500]
+    v1 = pd.concat([zonas.iloc[:10], fila, zonas.iloc[10:]])
+    h.record_zones(zonas, v1)
+    assert h.revisions[-1].zones.order_after is not None
+    _recorrido(h, [zonas, v1])
+    assert list(v1.index[9:12]) == [9, 500, 10]
+
+def test_goto_y_ajustes(zonas):
+    h = EditHistory()
+    settings = {"oversize_frio": 1.0}
+    h.snapshot_settings(settings)
+    versiones = [zonas]
+    for i in range(4):
+        v = versiones[-1].copy()
+        v.loc[i, "Superficie (m²)"] = 1000.0 + i
+        h.record_zones(versiones[-1], v)
+        versiones.append(v)
+    settings["oversize_frio"] = 1.2
+    assert h.sync_settings(settings)
+    assert h.current == 5
+    z = h.goto(2, versiones[-1], settings)
+    _igual(z, versiones[2])
+    assert settings["oversize_frio"] == 1.0 and h.can_redo
+    z = h.goto(5, z, settings)
+    _igual(z, versiones[-1])
+    assert settings["oversize_frio"] == 1.2
+    z = h.goto(0, z, settings)
+    _igual(z, zonas)
+    # una edición nueva tras deshacer descarta las revisiones deshechas
+    v = z.copy()
+    v.loc[0, "Superficie (m²)"] = 1.0
+    h.record_zones(z, v)
+    assert h.current == 1 and not h.can_redo
+
+def test_ajustes_seguidos_se_funden(zonas):
+    h = EditHistory()
+    settings = {"oversize_frio": 1.0}
+    h.snapshot_settings(settings)
+    for v in (1.1, 1.2, 1.3):
+        settings["oversize_frio"] = v
+        h.sync_settings(settings)
+    assert len(h.revisions) == 1 and h.revisions[0].settings["oversize_frio"] == (1.0, 1.3)
+    settings["clave_nueva"] = 5  # valores por defecto de una página: sin revisión
+    assert not h.sync_settings(settings)
+    settings["oversize_frio"] = 1.5
+    h.sync_settings(settings, coalesce_s=0.0)
+    assert len(h.revisions) == 2
+    h.step(zonas, settings, forward=False)
+    h.step(zonas, settings, forward=False)
+    assert settings["oversize_frio"] == 1.0
+
+def test_limite_de_revisiones(zonas):
+    h = EditHistory(max_revisions=3)
+    versiones = [zonas]
+    for i in range(6):
+        v = versiones[-1].copy()
+        v.loc[i, "Superficie (m²)"] = 2000.0 + i
+        h.record_zones(versiones[-1], v)
+        versiones.append(v)
+    assert len(h.revisions) == 3 and h.base == 3 and h.current == 6
+    assert [n for n, _ in h.entries()] == [3, 4, 5, 6]
+    z = h.goto(0, versiones[-1], {})  # no se puede ir más atrás de lo conservado
+    assert h.current == 3
+    _igual(z, versiones[3])
+    z = h.goto(6, z, {})
+    _igual(z, versiones[6])
+
+def test_sustitucion_completa_si_no_se_puede_alinear(zonas):
+    otra = zonas.reset_index(drop=True).iloc[::-1].reset_index(drop=True).head(5)
+    d = diff_zones(zonas, otra)
+    assert d.replaced is not None and d.replaced[1] is otra
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from core import calculations as calc
+from core.incremental import CONTRIBUTIONS, KEYS, IncrementalTotals, zone_contributions
+from core.schema import enforce_zones_schema
+
+def _contribuciones_completas(zones, settings) -> np.ndarray:
+    """Referencia: columnas de las tablas de resultados de cada calculadora completa."""
+    tablas = {
+        "clima": calc.calc_climatizacion(zones, settings)[0],
+        "vent": calc.calc_ventilacion_y_todo_aire(zones, settings)[0],
+        "ele": calc.calc_electricidad(zones, settings)[0],
+        "agua": calc.calc_agua_y_acs(zones, settings)[0],
+        "reservas": calc.reservas_por_zona(calc.normalize_zones_df(zones)),
+    }
+    cols = [np.asarray(tablas[src][col].astype(float), dtype=float) for src, col in CONTRIBUTIONS.values()]
+    return np.nan_to_num(np.column_stack(cols), nan=0.0)
+
+def test_contribuciones_por_fila_igual_a_calculadoras(portfolio, settings):
+    z = portfolio.copy()
+    z.loc[z.index[:5], "Categoría global (Tabla 1)"] = "Industrial (asimilable)"
+    z.loc[z.index[5], "Uso"] = "Uso inventado"
+    np.testing.assert_allclose(zone_contributions(z, settings), _contribuciones_completas(z, settings))
+    np.testing.assert_allclose(zone_contributions(z, {**settings, "todo_aire_activo": False}),
+                               _contribuciones_completas(z, {**settings, "todo_aire_activo": False}))
+
+def test_ediciones_igual_a_recalculo(portfolio, settings):
+    # sin uso/zona del edificio: las filas se comparan tal como se editan
+    settings = {**settings, "uso_edificio": None, "zona_climatica_global": None}
+    base = enforce_zones_schema(portfolio)
+    inc = IncrementalTotals(base, settings)
+    nueva = base.iloc[0].to_dict()
+    nueva.update({"Nombre zona": "Añadida", "Superficie (m²)": 250.0})
+    estado = {
+        "edited_rows": {3: {"Superficie (m²)": 999.0}, 10: {"Uso": "Hoteles"}},
+        "deleted_rows": [7, 8],
+        "added_rows": [nueva],
+    }
+    inc.apply_editor_state(estado)
+
+    editada = base.astype(object).copy()
+    editada.iat[3, editada.columns.get_loc("Superficie (m²)")] = 999.0
+    editada.iat[10, editada.columns.get_loc("Uso")] = "Hoteles"
+    editada = editada.drop(index=editada.index[[7, 8]])
+    editada = pd.concat([editada, pd.DataFrame([nueva]).astype(object)], ignore_index=True)
+    editada = enforce_zones_schema(editada)
+
+    esperado = _contribuciones_completas(editada, settings).sum(axis=0)
+    np.testing.assert_allclose([inc.sums_dict()[k] for k in KEYS], esperado)
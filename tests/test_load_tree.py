@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+import math
+
+import numpy as np
+import pandas as pd
+
+from core.load_tree import LoadTree, apply_factors, panel_factors
+
+CSV = """Nodo,Padre,Nombre,Tipo,P instalada (kW),ku,ks
+CGBT,,CGBT,CGBT,0,,0.8
+CS1,CGBT,Cuadro 1,Cuadro,0,,0.7
+C1,CS1,Circuito 1,Circuito,10,0.5,
+C2,CS1,Circuito 2,Circuito,20,0.5,
+CS2,CGBT,Cuadro 2,Cuadro,0,,
+C3,CS2,Circuito 3,Circuito,5,0.6,
+C4,CS2,Circuito 4,Circuito,5,0.9,
+"""
+
+def _nodes() -> pd.DataFrame:
+    return pd.read_csv(io.StringIO(CSV), dtype={"Nodo": str, "Padre": str})
+
+def test_panel_factors_lee_los_del_csv():
+    f = panel_factors(_nodes()).set_index("Nodo")
+    assert f.loc["CGBT", "ks"] == 0.8 and f.loc["CS1", "ks"] == 0.7 and f.loc["CS2", "ks"] == 1.0
+    assert f.loc["CS1", "ku circuitos"] == 0.5
+    assert np.isnan(f.loc["CS2", "ku circuitos"])  # ku distintos: no se fija uno común
+
+def test_factores_sin_editar_conservan_el_arbol():
+    nodes = _nodes()
+    tree = LoadTree.from_frame(apply_factors(nodes, {}))
+    np.testing.assert_allclose(tree.ks[:2], [0.8, 0.7])
+    np.testing.assert_allclose(tree.ku[[2, 3, 5, 6]], [0.5, 0.5, 0.6, 0.9])
+    # solo se sobrescribe lo editado
+    tree = LoadTree.from_frame(apply_factors(nodes, {"CS2": {"ks": 0.9}}))
+    np.testing.assert_allclose(tree.ks[[0, 1, 4]], [0.8, 0.7, 0.9])
+    np.testing.assert_allclose(tree.ku[[5, 6]], [0.6, 0.9])
+
+def _arbol_aleatorio(n: int, seed: int = 5) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    padre = np.r_[-1, [rng.integers(0, i) for i in range(1, n)]]
+    tiene_hijos = np.zeros(n, dtype=bool)
+    tiene_hijos[padre[1:]] = True
+    tipo = np.where(tiene_hijos, "Cuadro", np.where(rng.random(n) < 0.2, "Motor", "Circuito"))
+    tipo[0] = "CGBT"
+    df = pd.DataFrame({
+        "Nodo": [f"N{i}" for i in range(n)],
+        "Padre": ["" if p < 0 else f"N{p}" for p in padre],
+        "Nombre": [f"Nodo {i}" for i in range(n)],
+        "Tipo": tipo,
+        "P instalada (kW)": np.where(tiene_hijos, 0.0, rng.uniform(0.5, 40, n).round(1)),
+        "ku": np.where(tiene_hijos, np.nan, rng.uniform(0.3, 1.0, n).round(2)),
+        "ks": np.where(tiene_hijos, rng.uniform(0.5, 1.0, n).round(2), np.nan),
+        "Tensión (V)": rng.choice([230.0, 400.0], n),
+        "cosφ": rng.uniform(0.7, 1.0, n).round(2),
+        "η": np.where(tipo == "Motor", rng.uniform(0.8, 0.95, n).round(2), np.nan),
+        "Múltiplo arranque": np.where(tipo == "Motor", rng.uniform(3, 8, n).round(1), np.nan),
+    })
+    return df.sample(frac=1.0, random_state=seed).reset_index(drop=True)  # padres no siempre antes que hijos
+
+def _agregado_recursivo(tree: LoadTree, i: int, hijos: dict) -> dict:
+    """Referencia nodo a nodo: recorre el subárbol de `i` recursivamente."""
+    motor = tree.tipos[i] == "Motor"
+    k3 = math.sqrt(3.0) if tree.tension[i] > 300.0 else 1.0
+    p_own = tree.p_kw[i] / tree.eta[i] if motor else tree.p_kw[i]
+    tan = math.tan(math.acos(tree.cosphi[i]))
+    extra = (tree.arranque[i] - 1.0) * p_own * 1000.0 / (k3 * tree.tension[i] * tree.cosphi[i]) if motor else 0.0
+    inst, p, q = p_own, 0.0, 0.0
+    for h in hijos.get(i, []):
+        r = _agregado_recursivo(tree, h, hijos)
+        inst += r["installed_kw"]
+        p += r["demand_kw"]
+        q += r["demand_kvar"]
+        extra = max(extra, r["extra"])
+    p = p_own * tree.ku[i] + tree.ks[i] * p
+    q = p_own * tree.ku[i] * tan + tree.ks[i] * q
+    s = math.hypot(p, q)
+    ib = s * 1000.0 / (k3 * tree.tension[i])
+    return {"installed_kw": inst, "demand_kw": p, "demand_kvar": q, "demand_kva": s, "ib_a": ib,
+            "inrush_a": ib + extra, "extra": extra}
+
+def test_agregacion_igual_a_referencia_recursiva():
+    tree = LoadTree.from_frame(_arbol_aleatorio(300))
+    agg = tree.aggregate()
+    hijos: dict = {}
+    for i, p in enumerate(tree.parent.tolist()):
+        hijos.setdefault(p, []).append(i)
+    ref = [_agregado_recursivo(tree, i, hijos) for i in range(len(tree))]
+    for k in ("installed_kw", "demand_kw", "demand_kvar", "demand_kva", "ib_a", "inrush_a"):
+        np.testing.assert_allclose(agg[k], [r[k] for r in ref], err_msg=k)
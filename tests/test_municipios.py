@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from core.municipios import EARTH_RADIUS_KM, REGLAS_CSV, MunicipalityIndex, build, load_index, resolve_sites
+
+def _haversine(lat1, lon1, lat2, lon2):
+    p1, p2 = np.radians(lat1), np.radians(lat2)
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(np.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def test_nearest_igual_a_fuerza_bruta():
+    idx = load_index()
+    rng = np.random.default_rng(3)
+    lat, lon = rng.uniform(37.5, 43.0, 300), rng.uniform(-8.0, 2.5, 300)  # península
+    ids, dist = idx.nearest(lat, lon)
+    mlat, mlon = idx.lat.astype(float), idx.lon.astype(float)
+    ref = np.array([_haversine(a, b, mlat, mlon).min() for a, b in zip(lat, lon)])
+    # la rejilla trabaja en coordenadas proyectadas: la distancia puede diferir muy poco del óptimo
+    np.testing.assert_allclose(dist, ref, rtol=0.01)
+
+def test_emplazamiento_lejano_sin_zona():
+    sites = pd.DataFrame({"Edificio": ["Madrid", "Atlántico"], "lat": [40.42, 31.0], "lon": [-3.70, -25.0]})
+    out = resolve_sites(load_index(), sites, max_km=50.0)
+    assert out.loc[0, "Zona climática"] and not out.loc[0, "Fuera de alcance"]
+    assert out.loc[1, "Fuera de alcance"] and pd.isna(out.loc[1, "Zona climática"])
+    assert out.loc[1, "Distancia (km)"] > 50.0
+
+def test_correccion_por_altitud_solo_con_varios_tramos(tmp_path):
+    mun = tmp_path / "municipios.csv"
+    mun.write_text("municipio,provincia,altitud_m,lat,lon\n"
+                   "Llano,Tramos,300,40.0,-4.0\nSierra,Tramos,1200,40.5,-4.0\nUnico,Plana,50,39.0,-1.0\n", encoding="utf-8")
+    reglas = tmp_path / "reglas.csv"
+    reglas.write_text("provincia,altitud_max_m,zona_cte\nTramos,800,C3\nTramos,,E1\nPlana,,B3\n", encoding="utf-8")
+    assert build(mun, reglas, tmp_path / "m.npz") == 3
+    with np.load(tmp_path / "m.npz") as data:
+        idx = MunicipalityIndex({k: data[k] for k in data.files})
+    assert [idx.zone(i) for i in range(3)] == ["C3", "E1", "B3"]
+    assert [idx.altitude_applies(i) for i in range(3)] == [True, True, False]
+    assert idx.zone_at_altitude(0, 1000.0) == "E1" and idx.zone_at_altitude(2, 1000.0) == "B3"
+
+    res = idx.resolve(np.array([40.0, 40.0, 39.0, 39.0]), np.array([-4.0, -4.0, -1.0, -1.0]),
+                      np.array([900.0, np.nan, 900.0, np.nan]))
+    assert res["zona"].tolist() == ["E1", "C3", "B3", "B3"]
+    assert res["corregida"].tolist() == [True, False, False, False]
+
+def test_datos_incluidos_sin_tramos_no_marcan_correccion():
+    idx = load_index()
+    with open(REGLAS_CSV, encoding="utf-8") as f:
+        provs = [line.split(",")[0] for line in f.read().splitlines()[1:] if line]
+    varios = {p for p in provs if provs.count(p) > 1}
+    for i in range(len(idx)):
+        assert idx.altitude_applies(i) == (idx.provincias[idx.provincia[i]] in varios)
+    res = idx.resolve(idx.lat.astype(float), idx.lon.astype(float), np.full(len(idx), 2000.0))
+    applies = np.array([idx.altitude_applies(i) for i in range(len(idx))])
+    np.testing.assert_array_equal(res["corregida"], (res["id"] >= 0) & applies[np.maximum(res["id"], 0)])
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import tracemalloc
+
+import pytest
+
+from core import perf
+
+@pytest.fixture
+def reg():
+    r = perf.MetricsRegistry(enabled=True, memory=True)
+    perf.bind(r)
+    yield r
+    perf.bind(None)
+    tracemalloc.stop()
+
+def _pagina(interrumpir: bool) -> None:
+    t = perf.begin("page.x")
+    with perf.span("page.x.calculo"):
+        pass
+    if interrumpir:
+        raise RuntimeError("st.stop()")
+    perf.end(t)
+
+def test_pagina_interrumpida_no_desequilibra(reg):
+    with pytest.raises(RuntimeError):
+        _pagina(interrumpir=True)
+    assert len(reg._mem_stack) == 1      # tramo de página abierto
+    _pagina(interrumpir=False)
+    assert reg._mem_stack == [] and reg._page is None
+    assert len(reg.samples["page.x"]) == 1          # la ejecución interrumpida no cuenta
+    assert len(reg.samples["page.x.calculo"]) == 2
+
+def test_memoria_activada_a_mitad_de_pagina(reg):
+    reg.memory = False
+    t = perf.begin("page.x")
+    reg.memory = True
+    with perf.span("page.x.calculo"):
+        pass
+    perf.end(t)
+    assert reg._mem_stack == []
+    assert reg.samples["page.x"][-1][1] is None
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.pipes import TUBERIAS, LevelNetwork, agua, gradient_pa_m, size_pipes
+
+def _cumple(q_m3s: float, d_m: float, v_max: float, r_max: float, eps: float, rho: float, nu: float) -> bool:
+    v = q_m3s / (math.pi * d_m ** 2 / 4.0)
+    r = float(gradient_pa_m(np.array([q_m3s]), np.array([d_m]), eps, rho, nu)[0])
+    return v <= v_max + 1e-9 and r <= r_max + 1e-9
+
+def _referencia(q_ls: float, material: str, v_max: float, r_max: float, t_c: float):
+    """Búsqueda lineal: menor nº de tuberías en paralelo y, para él, el menor diámetro que cumple."""
+    _, di_mm, eps_mm = TUBERIAS[material]
+    di = [d / 1000.0 for d in di_mm]
+    rho, nu, _ = agua(t_c)
+    q = q_ls / 1000.0
+    n = 1
+    while not _cumple(q / n, di[-1], v_max, r_max, eps_mm / 1000.0, rho, nu):
+        n += 1
+    for i, d in enumerate(di):
+        if _cumple(q / n, d, v_max, r_max, eps_mm / 1000.0, rho, nu):
+            return i, n
+    raise AssertionError("el mayor diámetro debería cumplir")
+
+@pytest.mark.parametrize("material", list(TUBERIAS))
+@pytest.mark.parametrize("t_c", [10.0, 60.0])
+def test_menor_diametro_que_cumple(material, t_c):
+    rng = np.random.default_rng(13)
+    q = np.r_[rng.uniform(0.01, 5.0, 150), rng.uniform(5.0, 400.0, 50)].round(3)
+    v_max = rng.choice([1.0, 1.5, 2.0], len(q))
+    r_max = rng.choice([150.0, 250.0, 400.0], len(q))
+    out = size_pipes(q, material, v_max, r_max, t_c=t_c)
+    ref = [_referencia(qq, material, vv, rr, t_c) for qq, vv, rr in zip(q, v_max, r_max)]
+    np.testing.assert_array_equal(out["idx"], [r[0] for r in ref])
+    np.testing.assert_array_equal(out["paralelo"], [r[1] for r in ref])
+    assert out["cumple"].all()
+
+def test_reparto_en_paralelo_por_encima_del_mayor_diametro():
+    material = "Cobre (EN 1057)"
+    _, di_mm, _ = TUBERIAS[material]
+    a_top = math.pi * (di_mm[-1] / 1000.0) ** 2 / 4.0
+    q_cap = a_top * 1.5 * 1000.0  # L/s que caben en el mayor diámetro a 1,5 m/s
+    out = size_pipes(np.array([0.5 * q_cap, 2.5 * q_cap, 7.2 * q_cap]), material, 1.5, 1e9)
+    np.testing.assert_array_equal(out["paralelo"], [1, 3, 8])
+    assert (out["v_ms"] <= 1.5 + 1e-9).all()
+    assert out["idx"][1] == out["idx"][2] == len(di_mm) - 1
+
+def test_caudal_nulo():
+    out = size_pipes(np.array([0.0, np.nan]), "Multicapa / PP-R", 1.5, 400.0)
+    np.testing.assert_array_equal(out["idx"], [0, 0])
+    np.testing.assert_array_equal(out["paralelo"], [1, 1])
+
+def test_red_por_niveles_suma_como_groupby(portfolio):
+    z = portfolio.reset_index(drop=True)
+    net = LevelNetwork(z, ["Edificio", "Uso"], z["Nombre zona"].astype(str).tolist())
+    v = np.random.default_rng(2).uniform(0, 10, len(z))
+    tot = net.sum_up(v)
+    assert tot[0] == pytest.approx(v.sum())
+    for k, nivel in enumerate([["Edificio"], ["Edificio", "Uso"]], start=1):
+        ref = pd.Series(v).groupby(z[nivel].astype(str).apply(tuple, axis=1), sort=False).sum()
+        np.testing.assert_allclose(tot[net.start[k]:net.start[k + 1]], ref.to_numpy())
+    np.testing.assert_allclose(tot[net.zones], v)
+    # cada nodo suma lo de sus hijos y la acumulación desde la central sigue al padre
+    hijos = np.zeros(len(net))
+    np.add.at(hijos, net.parent[1:], tot[1:])
+    np.testing.assert_allclose(hijos[~net.is_leaf], tot[~net.is_leaf])
+    acc = net.accumulate_down(np.ones(len(net)))
+    np.testing.assert_array_equal(acc, net.depth + 1)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+from core.calculations import calc_agua_y_acs, normalize_zones_df
+from core.pipes import TUBERIAS, agua, gradient_pa_m
+from core.plumbing import OPCIONES, SIMULTANEIDAD, calc_fontaneria, simultaneous_flow
+
+def _qc(qt: float, tipo: str, q_min: float) -> float:
+    """Referencia valor a valor: primer tramo con Qt ≤ Qt máx., Qc = A·Qt^B + C acotado."""
+    if qt <= 0:
+        return 0.0
+    for qt_max, a, b, c in SIMULTANEIDAD[tipo]:
+        if qt <= qt_max:
+            break
+    return min(max(a * qt ** b + c, min(q_min, qt)), qt)
+
+@pytest.mark.parametrize("tipo", list(SIMULTANEIDAD))
+def test_caudal_simultaneo_igual_a_referencia(tipo):
+    rng = np.random.default_rng(17)
+    qt = np.r_[0.0, 0.1, 1.5, 1.5001, 20.0, 20.0001, rng.uniform(0, 200, 300)]
+    q_min = rng.choice([0.1, 0.2, 1.25], len(qt))
+    qc = simultaneous_flow(qt, tipo, q_min)
+    np.testing.assert_allclose(qc, [_qc(a, tipo, b) for a, b in zip(qt, q_min)])
+    assert (qc <= qt + 1e-12).all() and (qc >= np.minimum(q_min, qt) - 1e-12).all()
+
+def test_caudal_simultaneo_valores():
+    tipo = "Oficinas, estaciones, aeropuertos"
+    qc = simultaneous_flow(np.array([10.0, 50.0, 0.0]), tipo, np.array([0.1, 0.1, 0.1]))
+    np.testing.assert_allclose(qc, [0.682 * 10 ** 0.45 - 0.14, 0.4 * 50 ** 0.54 + 0.48, 0.0])
+    assert qc[0] == pytest.approx(1.782, abs=1e-3) and qc[1] == pytest.approx(3.788, abs=1e-3)
+
+def test_tramos_con_el_menor_diametro_que_cumple(portfolio, settings):
+    zones = normalize_zones_df(portfolio)
+    res, _, _ = calc_agua_y_acs(zones, settings)
+    o = {**OPCIONES, "niveles": ["Edificio", "Uso"]}
+    tramos, _, _ = calc_fontaneria(res, zones, {**settings, "fontaneria": o})
+    _, di_mm, eps_mm = TUBERIAS[o["material"]]
+    di = np.asarray(di_mm) / 1000.0
+    for _, t in tramos.iterrows():
+        q = t["Caudal simultáneo (L/s)"] / 1000.0
+        if q <= 0:
+            continue
+        n = int(str(t["Diámetro"]).split(" × ")[0]) if "×" in str(t["Diámetro"]) else 1
+        rho, nu, _ = agua(o["t_af"] if t["Circuito"] == "Agua fría" else o["t_acs"])
+        v = q / n / (math.pi * di ** 2 / 4.0)
+        r = gradient_pa_m(np.full(len(di), q / n), di, eps_mm / 1000.0, rho, nu)
+        ok = np.flatnonzero((v <= o["v_max"] + 1e-9) & (r <= o["r_max_pa_m"] + 1e-9))
+        assert t["Di (mm)"] == pytest.approx(di[ok[0]] * 1000.0), t["Tramo"]
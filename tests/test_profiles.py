@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from core.profiles import calc_perfiles_horarios, calendario, formas
+
+def test_forma_de_frio_depende_de_la_ocupacion():
+    cal = calendario(2025)
+    oficina, continuo = formas("oficina", "D3", cal)["frio"], formas("continuo", "D3", cal)["frio"]
+    assert np.isclose(oficina.max(), 1.0)
+    # sin ocupación (fin de semana a mediodía en verano) la forma de oficina cae claramente
+    h = np.flatnonzero(~cal["laborable"] & (cal["hora"] == 16) & (cal["mes"] == 6))
+    assert (oficina[h] < 0.8 * continuo[h]).all()
+
+def test_detalle_por_bloques_igual_al_agregado(portfolio, settings):
+    _, _, tot = calc_perfiles_horarios(portfolio, settings)
+    zp, p = tot["zonas"], tot["perfiles"]["Frío"]
+    suma = np.zeros(8760)
+    for _, blk in zp.iter_blocks("Frío", block_zones=7):
+        suma += blk.sum(axis=0, dtype=np.float64)
+    np.testing.assert_allclose(suma, p.hourly, rtol=1e-4, atol=1e-3)
+    csv = pd.read_csv(io.BytesIO(zp.to_csv("Frío", [f"z{i}" for i in range(len(zp))], top=5, block_zones=2)))
+    assert csv.shape == (5, 8761)
+    np.testing.assert_allclose(csv.iloc[:, 1:].sum(axis=1).to_numpy(), np.sort(p.zone_annual)[::-1][:5], rtol=1e-3)
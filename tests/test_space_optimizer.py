@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+import pytest
+
+from core.constants import TABLA_2_ESPACIO_POR_INSTALACION
+from core.space_optimizer import CATEGORIAS, DEPENDENCIAS, EXCLUSIONES, calc_optimo_salas, pareto_mask, valid_subsets
+
+NOMBRES = list(TABLA_2_ESPACIO_POR_INSTALACION)
+
+def _valido(sel: set, obligatorias, forzadas, descartadas) -> bool:
+    """Reglas aplicadas sobre el conjunto de nombres, sin máscaras de bits."""
+    if any(len(sel & set(g)) > 1 for g in EXCLUSIONES):
+        return False
+    if any(inst in sel and not sel & set(req) for inst, req in DEPENDENCIAS.items()):
+        return False
+    if any(not sel & set(CATEGORIAS[c]) for c in obligatorias):
+        return False
+    return set(forzadas) <= sel and not sel & set(descartadas)
+
+def _fuerza_bruta(obligatorias, forzadas, descartadas) -> list:
+    out = []
+    for r in range(len(NOMBRES) + 1):
+        for comb in itertools.combinations(range(len(NOMBRES)), r):
+            if _valido({NOMBRES[j] for j in comb}, obligatorias, forzadas, descartadas):
+                out.append(sum(1 << j for j in comb))
+    return sorted(out)
+
+@pytest.mark.parametrize("obligatorias,forzadas,descartadas", [
+    ([], [], []),
+    (["Tratamiento de aire / terminales", "Electricidad"], [], []),
+    (list(CATEGORIAS), [], []),
+    (["Disipación"], [], ["Producción de frío"]),
+    (["Electricidad"], ["Almacenamiento combustible (gasóleo)"], ["Sala máquinas ascensores"]),
+    ([], ["Sistema fancoils", "Sistema inducción"], []),
+])
+def test_subconjuntos_validos_igual_a_fuerza_bruta(obligatorias, forzadas, descartadas):
+    got = valid_subsets(NOMBRES, obligatorias, forzadas, descartadas)
+    assert got.tolist() == _fuerza_bruta(obligatorias, forzadas, descartadas)
+
+def test_torres_solo_con_frio_o_anillo():
+    got = valid_subsets(NOMBRES, ["Disipación"], [], ["Producción de frío"])
+    anillo = 1 << NOMBRES.index("Bombas de calor en anillo de agua")
+    assert len(got) and ((got & anillo) != 0).all()
+
+def _domina(a: np.ndarray, b: np.ndarray) -> bool:
+    return bool((a <= b).all() and (a < b).any())
+
+@pytest.mark.parametrize("n,k,seed", [(300, 3, 1), (1100, 2, 2), (700, 3, 3)])
+def test_frontera_sin_dominadas_por_pares(n, k, seed):
+    # valores enteros para forzar empates; n > BLOQUE para cruzar bloques
+    f = np.random.default_rng(seed).integers(0, 15, size=(n, k)).astype(float)
+    keep = pareto_mask(f)
+    for i in range(n):
+        dominada = any(_domina(f[j], f[i]) for j in range(n))
+        assert keep[i] == (not dominada), i
+    front = f[keep]
+    assert not any(_domina(a, b) for a in front for b in front)
+
+def test_optimo_salas_frontera_valida():
+    settings = {"optimo_salas": {"superficie_disponible_m2": 250.0}}
+    res, warns, out = calc_optimo_salas({"superficie_total_m2": 10000.0}, settings)
+    assert not warns and out["n_pareto"] == len(res) > 0
+    assert out["n_validas"] == len(_fuerza_bruta(["Tratamiento de aire / terminales", "Electricidad"], [], []))
+    f = np.column_stack([res["m² mín"], res["m² máx"], -res["Instalaciones"].astype(float)])
+    assert (res["m² mín"] <= 250.0 + 1e-9).all()
+    assert not any(_domina(f[i], f[j]) for i in range(len(f)) for j in range(len(f)))
+    for comb in res["Combinación"]:
+        assert _valido(set(comb.split(" + ")), ["Tratamiento de aire / terminales", "Electricidad"], [], [])
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import pytest
+
+from core.calculations import calc_climatizacion, calc_ventilacion_y_todo_aire
+from core.sample_data import sample_zones_office
+from core.system_ranking import calc_ranking_sistemas
+
+def _mejor(escala: float) -> str:
+    z = sample_zones_office()
+    z["Uso"] = "Comercios - Galerías comerciales"  # la Tabla 16 admite expansión directa
+    z["Superficie (m²)"] *= escala
+    c, _, _ = calc_climatizacion(z, {})
+    v, _, _ = calc_ventilacion_y_todo_aire(z, {})
+    _, _, tot = calc_ranking_sistemas(c, v, z, {})
+    return tot["mejores"]["Sistema"].iloc[0]
+
+@pytest.mark.parametrize("escala, esperado", [(0.05, True), (3.0, False)])
+def test_expansion_directa_depende_de_la_carga(escala, esperado):
+    assert (_mejor(escala) == "Expansión directa") is esperado
+
+def test_ranking_cartera_no_es_constante(portfolio, settings):
+    c, _, _ = calc_climatizacion(portfolio, settings)
+    v, _, _ = calc_ventilacion_y_todo_aire(portfolio, settings)
+    res, _, tot = calc_ranking_sistemas(c, v, portfolio, settings)
+    assert tot["n_edificios"] > 1
+    assert res.groupby("Sistema")["Puntuación"].nunique().max() > 1  # la puntuación varía entre edificios
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from core.ui import group_warnings
+from core.utils import WarningItem
+
+def test_agrupar_avisos_conserva_las_zonas():
+    ws = [
+        WarningItem("Clima", "Z1", "Sin dato en Tabla 5"),
+        WarningItem("Clima", "Z2", "Sin dato en Tabla 5"),
+        WarningItem("Clima", "Z1", "Sin dato en Tabla 5"),
+        WarningItem("Vent", "Z1", "Sin dato en Tabla 5"),
+        WarningItem("Clima", "Z3", "Zona climática no encontrada"),
+        WarningItem("Clima", "", "Sin dato en Tabla 5"),
+        WarningItem("PCI", "", "Superficie nula"),
+    ]
+    assert group_warnings(ws) == [
+        ("Clima", ["Z1", "Z2"], "Sin dato en Tabla 5"),
+        ("Vent", ["Z1"], "Sin dato en Tabla 5"),
+        ("Clima", ["Z3"], "Zona climática no encontrada"),
+        ("PCI", [], "Superficie nula"),
+    ]
+    assert group_warnings([]) == []
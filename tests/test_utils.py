@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.utils import parse_numeric_series, to_float
+
+NAN = float("nan")
+# celda -> (valor esperado, celda no interpretable)
+CASOS = [
+    ("1.234,5", 1234.5, False),
+    ("12,7", 12.7, False),
+    ("1,234.5", 1234.5, False),
+    ("1 234,5", 1234.5, False),
+    ("1 000,5", 1000.5, False),
+    ("3'500", 3500.0, False),
+    ("1.234.567", 1234567.0, False),
+    ("1,234,567", 1234567.0, False),
+    ("12.5", 12.5, False),
+    ("0,25", 0.25, False),
+    ("-3,5", -3.5, False),
+    (" 42 ", 42.0, False),
+    ("7", 7.0, False),
+    (7, 7.0, False),
+    (2.5, 2.5, False),
+    ("", NAN, False),
+    ("   ", NAN, False),
+    ("nan", NAN, False),
+    (None, NAN, False),
+    (NAN, NAN, False),
+    ("abc", NAN, True),
+    ("N/D", NAN, True),
+    ("12,5 m²", NAN, True),
+]
+
+def test_parse_numeric_valores_esperados():
+    s = pd.Series([c[0] for c in CASOS], dtype=object)
+    vals, fallos = parse_numeric_series(s)
+    np.testing.assert_allclose(vals.to_numpy(), [c[1] for c in CASOS], equal_nan=True)
+    assert fallos.tolist() == [c[2] for c in CASOS]
+    assert vals.dtype == "float64"
+
+def test_parse_numeric_independiente_del_orden_y_del_volumen():
+    # el resultado de cada celda no depende de las demás (mezcla grande y desordenada)
+    rng = np.random.default_rng(3)
+    idx = rng.integers(0, len(CASOS), 5000)
+    vals, fallos = parse_numeric_series(pd.Series([CASOS[i][0] for i in idx], dtype=object))
+    np.testing.assert_allclose(vals.to_numpy(), [CASOS[i][1] for i in idx], equal_nan=True)
+    np.testing.assert_array_equal(fallos.to_numpy(), [CASOS[i][2] for i in idx])
+
+def test_parse_numeric_columna_numerica_sin_texto():
+    vals, fallos = parse_numeric_series(pd.Series([1, 2, None], dtype="Float64"))
+    np.testing.assert_allclose(vals.to_numpy(), [1.0, 2.0, NAN], equal_nan=True)
+    assert not fallos.any()
+
+@pytest.mark.parametrize("x", ["12,5", "7", "0.25", "", None])
+def test_parse_numeric_coincide_con_to_float_sin_miles(x):
+    v = parse_numeric_series(pd.Series([x], dtype=object))[0].iloc[0]
+    assert (np.isnan(v) and to_float(x) is None) or v == to_float(x)